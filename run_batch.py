@@ -0,0 +1,19 @@
+"""バッチ実行 起動スクリプト
+
+このスクリプトは、Pythonパスを適切に設定してヘッドレスのバッチ実行を起動します。
+
+使用例:
+    python run_batch.py manifest.csv --concurrency 4 --output-root output/nightly
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+if __name__ == "__main__":
+    from src.presentation.batch_runner import main
+
+    sys.exit(main())
@@ -0,0 +1,19 @@
+"""模擬LLMサーバー 起動スクリプト
+
+このスクリプトは、Pythonパスを適切に設定して負荷試験用の模擬LLMサーバーを起動します。
+
+使用例:
+    python run_mock_llm_server.py --port 8765 --latency lognormal:1.5:0.5 --rate-429 0.05
+"""
+
+import sys
+from pathlib import Path
+
+# プロジェクトルートをPythonパスに追加
+project_root = Path(__file__).parent
+sys.path.insert(0, str(project_root))
+
+if __name__ == "__main__":
+    from src.infrastructure.services.mock_llm_server import main
+
+    sys.exit(main())
@@ -1,8 +1,18 @@
 """データフレーム記述ユースケース"""
 
 import io
+from typing import Any
+
 import pandas as pd
-from src.infrastructure.template_loader import load_template
+from src.infrastructure.services.dataset_profile import (
+    DatasetProfileService,
+    get_dataset_profile_service,
+)
+from src.infrastructure.template_loader import render_template
+
+
+_NUMERIC_STATISTICS = ("count", "mean", "std", "min", "25%", "50%", "75%", "max")
+_OBJECT_STATISTICS = ("count", "unique", "top", "freq")
 
 
 def _to_markdown_safe(frame: pd.DataFrame) -> str:
@@ -16,12 +26,18 @@ def _to_markdown_safe(frame: pd.DataFrame) -> str:
 class DescribeDataframeUseCase:
     """データフレーム記述ユースケース
 
-    CSVファイルからDataFrameを作成し、
+    データセットのプロファイル（DatasetProfileService）から、
     その構造と統計情報を記述したテキストを生成する
     """
 
-    def __init__(self):
-        """初期化"""
+    def __init__(self, profile_service: DatasetProfileService | None = None):
+        """初期化
+
+        Args:
+            profile_service: データセットのプロファイルの作成・共有（省略時は共有インスタンス）
+
+        """
+        self._profiles = profile_service or get_dataset_profile_service()
 
     def execute(
         self,
@@ -38,28 +54,97 @@ class DescribeDataframeUseCase:
             str: フォーマット済みのデータフレーム記述
 
         """
-        # CSVファイルを読み込み、データフレームを作成
-        df = pd.read_csv(file_object)
-
-        # データフレームの概要情報を取得
-        buf = io.StringIO()
-        df.info(buf=buf)
-        df_info = buf.getvalue()
-
-        # テンプレートを読み込み、データフレーム情報を構築して返す
-        template = load_template(template_file)
-        if len(df) == 0:
-            df_sample = df.head(0)
+        # ストリームは指紋を持たないため、その場でプロファイルを作成（キャッシュしない）
+        profile = self._profiles.profile_chunks(
+            pd.read_csv(file_object, chunksize=self._profiles.profiler.chunk_rows),
+        )
+        return self.describe_profile(profile, template_file)
+
+    def execute_file(
+        self,
+        file_path: str,
+        template_file: str = "src/prompts/describe_dataframe.jinja",
+    ) -> str:
+        """ファイルのデータフレーム記述（プロファイルはファイルの指紋毎に1回だけ作成）"""
+        return self.describe_profile(self._profiles.get_profile(file_path), template_file)
+
+    def describe_profile(
+        self,
+        profile: dict[str, Any],
+        template_file: str = "src/prompts/describe_dataframe.jinja",
+    ) -> str:
+        """プロファイルからデータフレーム記述を生成
+
+        Args:
+            profile: DatasetProfileServiceのプロファイル
+            template_file: 使用するテンプレートファイルパス
+
+        Returns:
+            str: フォーマット済みのデータフレーム記述
+
+        """
+        sample = profile.get("sample") or {}
+        df_sample = pd.DataFrame(
+            data=sample.get("data", []),
+            index=sample.get("index"),
+            columns=sample.get("columns"),
+        )
+
+        if not profile.get("rows"):
             df_description = pd.DataFrame({"detail": ["データが存在しません"]})
         else:
-            df_sample = df.sample(min(len(df), 5))
-            try:
-                df_description = df.describe()
-            except ValueError:
-                df_description = pd.DataFrame({"detail": ["統計量を計算できません"]})
-
-        return template.render(
-            df_info=df_info,
+            df_description = _describe_table(profile)
+
+        # データフレーム情報を構築し、共有のコンパイル済みテンプレートで描画して返す
+        return render_template(
+            template_file,
+            df_info=_format_info(profile),
             df_sample=_to_markdown_safe(df_sample),
             df_describe=_to_markdown_safe(df_description),
         )
+
+
+def _format_info(profile: dict[str, Any]) -> str:
+    """DataFrame.info() 相当の列構成の記述"""
+    columns = profile.get("column_profiles", [])
+    rows = int(profile.get("rows", 0))
+    width = max([len("Column"), *(len(column["name"]) for column in columns)])
+
+    lines = [
+        "<class 'pandas.core.frame.DataFrame'>",
+        f"RangeIndex: {rows} entries" + (f", 0 to {rows - 1}" if rows else ""),
+        f"Data columns (total {len(columns)} columns):",
+        f" #   {'Column'.ljust(width)}  Non-Null Count  Dtype",
+        f"---  {'------'.ljust(width)}  --------------  -----",
+    ]
+    for index, column in enumerate(columns):
+        non_null = f"{column['non_null']} non-null"
+        lines.append(
+            f" {str(index).ljust(3)} {column['name'].ljust(width)}  "
+            f"{non_null.ljust(14)}  {column['dtype']}",
+        )
+
+    dtype_counts = pd.Series([column["dtype"] for column in columns]).value_counts()
+    lines.append(
+        "dtypes: "
+        + ", ".join(f"{dtype}({count})" for dtype, count in sorted(dtype_counts.items())),
+    )
+    lines.append(f"memory usage: {profile.get('memory_usage_bytes', 0) / 1024:.1f} KB")
+    return "\n".join(lines)
+
+
+def _describe_table(profile: dict[str, Any]) -> pd.DataFrame:
+    """DataFrame.describe() 相当の統計量の表（数値列が無い場合は全列の頻度）"""
+    statistics = profile.get("statistics", [])
+    numeric_columns = set(profile.get("numeric_columns", []))
+    numeric = [row for row in statistics if row["index"] in numeric_columns]
+    rows, labels = (numeric, _NUMERIC_STATISTICS) if numeric else (
+        statistics,
+        _OBJECT_STATISTICS,
+    )
+    if not rows:
+        return pd.DataFrame({"detail": ["統計量を計算できません"]})
+    return pd.DataFrame(
+        {row["index"]: [row.get(label) for label in labels] for row in rows},
+        index=list(labels),
+    )
@@ -8,9 +8,19 @@
 - 複雑なビジネスルール: 前回スレッド情報に基づく自己修正機能
 """
 
+from typing import Any
+
 from src.domain.entities import DataThread, Program
 from src.domain.repositories.llm_repository import LLMRepository
-from src.infrastructure.template_loader import load_template
+from src.infrastructure.services.context_budget import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_MEDIUM,
+    PRIORITY_REQUIRED,
+    ContextBudget,
+    ContextSection,
+)
+from src.infrastructure.prompt_layout import build_prompt_messages
 
 
 class GenerateCodeUseCase:
@@ -26,14 +36,21 @@ class GenerateCodeUseCase:
     - 複雑な条件分岐: 前回スレッド情報による文脈構築
     """
 
-    def __init__(self, llm_repository: LLMRepository) -> None:
+    def __init__(
+        self,
+        llm_repository: LLMRepository,
+        context_budget: ContextBudget | None = None,
+    ) -> None:
         """依存性注入によるLLMRepositoryの設定
 
         Args:
             llm_repository: LLM操作を抽象化したリポジトリ
+            context_budget: プロンプトのトークン上限と区画毎の配分
+                （省略時は環境変数LLM_CONTEXT_MAX_TOKENSの上限）
 
         """
         self._llm_repository = llm_repository
+        self._context_budget = context_budget or ContextBudget()
 
     def execute(
         self,
@@ -86,6 +103,40 @@ class GenerateCodeUseCase:
         )
 
         # 4. LLMResponseからProgramエンティティを抽出
+        return self._extract_program(response)
+
+    async def aexecute(
+        self,
+        data_info: str,
+        user_request: str,
+        remote_save_dir: str = "outputs/process_id/id",
+        previous_thread: DataThread | None = None,
+        model: str = "gpt-4o-mini-2024-07-18",
+        template_file: str = "src/prompts/generate_code.jinja",
+    ) -> Program:
+        """コード生成を実行（非同期版）
+
+        引数・戻り値はexecuteと同じ。LLM呼び出しをイベントループ上で待機する。
+        """
+        messages = self._build_base_messages(
+            data_info,
+            user_request,
+            remote_save_dir,
+            template_file,
+        )
+        if previous_thread:
+            messages = self._add_previous_thread_context(messages, previous_thread)
+
+        response = await self._llm_repository.agenerate(
+            messages=messages,
+            model=model,
+            response_format=Program,
+        )
+        return self._extract_program(response)
+
+    @staticmethod
+    def _extract_program(response: Any) -> Program:
+        """LLMResponseからProgramエンティティを抽出"""
         if hasattr(response, "content") and isinstance(response.content, Program):
             return response.content
         # フォールバック: responseがProgramの場合はそのまま返す
@@ -114,19 +165,26 @@ class GenerateCodeUseCase:
         - プライベートメソッド: 外部から呼び出し不要
 
         """
-        # テンプレート読み込み（既存実装を踏襲）
-        template = load_template(template_file)
-        system_message = template.render(
-            data_info=data_info,
-            remote_save_dir=remote_save_dir,
+        # データ情報は長大になり得るため区画上限まで圧縮（先頭の列情報を優先）
+        data_info = self._context_budget.fit(
+            [
+                ContextSection(
+                    "data_info",
+                    data_info,
+                    PRIORITY_HIGH,
+                    max_tokens=self._context_budget.share(0.35),
+                    head_ratio=0.8,
+                ),
+            ],
+        )["data_info"]
+
+        # 静的な指示 → データセット情報 → タスク要求（プロンプトキャッシュが効く順）
+        return build_prompt_messages(
+            template_file,
+            data_info,
+            [{"role": "user", "content": f"タスク要求: {user_request}"}],
         )
 
-        # 基本メッセージ構築（OpenAI Chat API形式）
-        return [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": f"タスク要求: {user_request}"},
-        ]
-
     def _add_previous_thread_context(
         self,
         messages: list[dict[str, str]],
@@ -145,31 +203,68 @@ class GenerateCodeUseCase:
         1. 前回のコードをassistantメッセージとして追加
         2. stdout/stderrがあればsystemメッセージとして追加
         3. 観測結果があればuserメッセージとして改善要求を追加
+        4. 既存メッセージと合わせてトークン上限内に収める
+           （優先度: 観測結果・stderr > 前回のコード > stdout。
+           stderrとコードは末尾側を多めに残す）
 
         命名根拠:
         - _add_previous_thread_context: 文脈追加の意図が明確
         - previous_thread: 前回実行情報を表現
 
         """
+        budget = self._context_budget
+        fitted = budget.fit(
+            [
+                ContextSection(
+                    "messages",
+                    "\n".join(str(message["content"]) for message in messages),
+                    PRIORITY_REQUIRED,
+                ),
+                ContextSection(
+                    "code",
+                    previous_thread.code or "",
+                    PRIORITY_MEDIUM,
+                    max_tokens=budget.share(0.3),
+                    head_ratio=0.3,
+                ),
+                ContextSection(
+                    "stdout",
+                    previous_thread.stdout or "",
+                    PRIORITY_LOW,
+                    max_tokens=budget.share(0.15),
+                ),
+                ContextSection(
+                    "stderr",
+                    previous_thread.stderr or "",
+                    PRIORITY_HIGH,
+                    max_tokens=budget.share(0.15),
+                    head_ratio=0.3,
+                ),
+                ContextSection(
+                    "observation",
+                    previous_thread.observation or "",
+                    PRIORITY_HIGH,
+                    max_tokens=budget.share(0.1),
+                ),
+            ],
+        )
+
         # 前回のコードを会話履歴に追加
-        if previous_thread.code:
-            messages.append({"role": "assistant", "content": previous_thread.code})
+        if fitted["code"]:
+            messages.append({"role": "assistant", "content": fitted["code"]})
 
         # 前回の実行結果（stdout/stderr）を追加
-        if previous_thread.stdout and previous_thread.stderr:
-            messages.extend(
-                [
-                    {"role": "system", "content": f"stdout: {previous_thread.stdout}"},
-                    {"role": "system", "content": f"stderr: {previous_thread.stderr}"},
-                ],
-            )
+        if fitted["stdout"]:
+            messages.append({"role": "system", "content": f"stdout: {fitted['stdout']}"})
+        if fitted["stderr"]:
+            messages.append({"role": "system", "content": f"stderr: {fitted['stderr']}"})
 
         # 前回の観測結果を改善要求として追加
-        if previous_thread.observation:
+        if fitted["observation"]:
             messages.append(
                 {
                     "role": "user",
-                    "content": f"以下を参考にして、ユーザー要求を満たすコードを再生成してください: {previous_thread.observation}",
+                    "content": f"以下を参考にして、ユーザー要求を満たすコードを再生成してください: {fitted['observation']}",
                 },
             )
 
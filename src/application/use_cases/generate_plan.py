@@ -7,9 +7,17 @@
 - 関心の分離: ビジネスロジックと外部サービスを分離
 """
 
+from collections.abc import Callable
+from typing import Any
+
+from pydantic import ValidationError
+
 from src.domain.entities import Plan
+from src.domain.entities.llm_response import LLMResponse
+from src.domain.entities.plan import Task
 from src.domain.repositories.llm_repository import LLMRepository
-from src.infrastructure.template_loader import load_template
+from src.infrastructure.prompt_layout import build_prompt_messages
+from src.infrastructure.services.partial_json import IncrementalArrayParser
 
 
 class GeneratePlanUseCase:
@@ -39,6 +47,7 @@ class GeneratePlanUseCase:
         user_request: str,
         model: str = "gpt-4o-mini-2024-07-18",
         template_file: str = "src/prompts/generate_plan.jinja",
+        on_response: Callable[[LLMResponse], None] | None = None,
     ) -> Plan:
         """計画生成を実行
 
@@ -47,6 +56,8 @@ class GeneratePlanUseCase:
             user_request: ユーザーの分析要求
             model: 使用するLLMモデル名
             template_file: プロンプトテンプレートのパス
+            on_response: LLMの応答（モデル名・使用量）を受け取るコールバック。
+                ルールベースのフォールバックの計画かを呼び出し側で判定できる
 
         Returns:
             Plan: 生成された分析計画
@@ -69,8 +80,112 @@ class GeneratePlanUseCase:
             model=model,
             response_format=Plan,
         )
+        self._notify(response, on_response)
 
         # 3. LLMResponseからPlanエンティティを抽出
+        return self._extract_plan(response)
+
+    async def aexecute(
+        self,
+        data_info: str,
+        user_request: str,
+        model: str = "gpt-4o-mini-2024-07-18",
+        template_file: str = "src/prompts/generate_plan.jinja",
+        on_response: Callable[[LLMResponse], None] | None = None,
+    ) -> Plan:
+        """計画生成を実行（非同期版）
+
+        引数・戻り値はexecuteと同じ。LLM呼び出しをイベントループ上で待機する。
+        """
+        messages = self._build_messages(data_info, user_request, template_file)
+        response = await self._llm_repository.agenerate(
+            messages=messages,
+            model=model,
+            response_format=Plan,
+        )
+        self._notify(response, on_response)
+        return self._extract_plan(response)
+
+    async def astream_execute(
+        self,
+        data_info: str,
+        user_request: str,
+        on_task: Callable[[Task], None],
+        model: str = "gpt-4o-mini-2024-07-18",
+        template_file: str = "src/prompts/generate_plan.jinja",
+        on_response: Callable[[LLMResponse], None] | None = None,
+    ) -> Plan:
+        """計画をストリーミング生成し、タスクが完成する毎にon_taskを呼ぶ
+
+        呼び出し側は計画全体の完成を待たずに先頭のタスクから着手できる。
+
+        Args:
+            data_info: データの説明（CSV構造など）
+            user_request: ユーザーの分析要求
+            on_task: 完成したタスクを受け取るコールバック（計画内の順に呼ばれる）
+            model: 使用するLLMモデル名
+            template_file: プロンプトテンプレートのパス
+            on_response: LLMの応答を受け取るコールバック（再生成した場合は両方の応答）
+
+        Returns:
+            Plan: 完成した分析計画。on_taskで通知したタスクは
+            常にPlan.tasksの先頭と一致する
+
+        ビジネスルール:
+        - スキーマに一致しないタスクを受信した場合、以降は通知しない
+        - 受信完了後のJSONがスキーマに一致しない場合は非ストリーミングで再生成し、
+          通知済みのタスクに続きのタスクをつなげる
+
+        """
+        messages = self._build_messages(data_info, user_request, template_file)
+        parser = IncrementalArrayParser("tasks")
+        notified: list[Task] = []
+        notifying = True
+
+        async for chunk in self._llm_repository.astream(
+            messages=messages,
+            model=model,
+            response_format=Plan,
+            on_response=on_response,
+        ):
+            for item in parser.feed(chunk):
+                if not notifying:
+                    continue
+                try:
+                    task = Task.model_validate(item)
+                except ValidationError:
+                    notifying = False
+                    continue
+                notified.append(task)
+                on_task(task)
+
+        try:
+            plan = Plan.model_validate_json(parser.text)
+        except ValidationError:
+            plan = await self.aexecute(
+                data_info,
+                user_request,
+                model,
+                template_file,
+                on_response,
+            )
+
+        # 通知済みのタスクを先頭に固定（再生成した場合も実行済みタスクと整合させる）
+        return plan.model_copy(
+            update={"tasks": notified + list(plan.tasks[len(notified) :])},
+        )
+
+    @staticmethod
+    def _notify(
+        response: Any,
+        on_response: Callable[[LLMResponse], None] | None,
+    ) -> None:
+        if on_response is not None and isinstance(response, LLMResponse):
+            on_response(response)
+
+    @staticmethod
+    def _extract_plan(response: Any) -> Plan:
+        """LLMResponseからPlanエンティティを抽出"""
         if hasattr(response, "content") and isinstance(response.content, Plan):
             return response.content
         # フォールバック: responseがPlanの場合はそのまま返す
@@ -97,12 +212,9 @@ class GeneratePlanUseCase:
         - プライベートメソッド: 外部から呼び出し不要
 
         """
-        # テンプレート読み込み（既存実装を踏襲）
-        template = load_template(template_file)
-        system_message = template.render(data_info=data_info)
-
-        # メッセージ構築（OpenAI Chat API形式）
-        return [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": f"タスク要求: {user_request}"},
-        ]
+        # 静的な指示 → データセット情報 → タスク要求（プロンプトキャッシュが効く順）
+        return build_prompt_messages(
+            template_file,
+            data_info,
+            [{"role": "user", "content": f"タスク要求: {user_request}"}],
+        )
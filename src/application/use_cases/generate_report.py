@@ -1,14 +1,48 @@
-"""レポート生成ユースケース"""
+"""レポート生成ユースケース
 
+2つの生成方式を持つ:
+- 一括（execute）: 全タスクの実行結果を1回のLLM呼び出しでレポートにする
+- map-reduce（asection → acompose）: タスク毎の仮説セクションを完了した順に並行して書き、
+  最後にセクションの要約からエグゼクティブサマリー等を短い呼び出しで作成して組み立てる。
+  レポートの待ち時間が計画のタスク数に比例して伸びず、全タスクがレポートに含まれる
+
+方式は環境変数REPORT_MODE（map_reduce / single、既定: map_reduce）で選ぶ。
+LLMがオフライン（ルールベースの応答）の場合は一括方式を使う。
+"""
+
+import asyncio
+import os
+import re
 from pathlib import Path
 from typing import Any
 from src.domain.repositories.llm_repository import LLMRepository
 from src.domain.entities.data_thread import DataThread
 from src.domain.entities.llm_response import LLMResponse
-from src.infrastructure.template_loader import load_template
+from src.infrastructure.services.context_budget import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_MEDIUM,
+    PRIORITY_REQUIRED,
+    ContextBudget,
+    ContextSection,
+)
+from src.infrastructure.prompt_layout import (
+    build_prompt_messages,
+    render_instructions,
+)
+from src.infrastructure.services.image_thumbnailer import (
+    ImageBudget,
+    ImageThumbnailer,
+)
 from src.infrastructure.renderers.renderer_interface import ReportRenderer
 
 
+REPORT_TITLE = "# データ分析レポート"
+SECTION_TEMPLATE = "src/prompts/generate_report_section.jinja"
+SUMMARY_TEMPLATE = "src/prompts/generate_report_summary.jinja"
+_IMAGE_REFERENCE = re.compile(r"!\[[^\]]*\]\(([^)]+)\)")
+
+
 class GenerateReportUseCase:
     """レポート生成ユースケース
 
@@ -20,16 +54,36 @@ class GenerateReportUseCase:
         self,
         llm_repository: LLMRepository,
         renderer: ReportRenderer | None = None,
+        context_budget: ContextBudget | None = None,
+        thumbnailer: ImageThumbnailer | None = None,
+        mode: str | None = None,
     ):
         """初期化
 
         Args:
             llm_repository: LLMリポジトリ
             renderer: レポートレンダラー（オプション）
+            context_budget: プロンプトのトークン上限と区画毎の配分
+                （省略時は環境変数LLM_CONTEXT_MAX_TOKENSの上限）
+            thumbnailer: グラフ画像の縮小・圧縮
+                （省略時は環境変数REPORT_IMAGE_*の設定）
+            mode: 生成方式 map_reduce / single
+                （省略時は環境変数REPORT_MODE または map_reduce）
 
         """
         self.llm_repository = llm_repository
         self.renderer = renderer
+        self.context_budget = context_budget or ContextBudget()
+        self.thumbnailer = thumbnailer or ImageThumbnailer()
+        self.mode = (mode or os.environ.get("REPORT_MODE", "map_reduce")).lower()
+
+    @property
+    def map_reduce(self) -> bool:
+        """タスク毎のセクションを並行生成する方式を使うか
+
+        オフライン（ルールベースの応答）ではセクション毎の呼び出しに意味が無いため一括方式。
+        """
+        return self.mode == "map_reduce" and self.llm_repository.is_online
 
     def execute(
         self,
@@ -57,29 +111,62 @@ class GenerateReportUseCase:
         if process_data_threads is None:
             process_data_threads = []
 
-        # テンプレートの読み込み
-        template = load_template(template_file)
-
-        # data_infoを制限（長すぎる場合は要約）
-        max_data_info_length = 10000
-        if len(data_info) > max_data_info_length:
-            data_info = data_info[:max_data_info_length] + "...(省略)"
-
-        system_message = template.render(data_info=data_info)
+        # DataThreadの処理（全スレッド。各スレッドの上限はトークン予算を等分して決める）
+        threads = [
+            self._build_thread_messages(data_thread)
+            for data_thread in process_data_threads
+        ]
 
-        # 基本メッセージの構築
-        messages = [
-            {"role": "system", "content": system_message},
-            {"role": "user", "content": f"タスク要求: {user_request}"},
+        # トークン上限に合わせてdata_infoと各実行結果を圧縮
+        budget = self.context_budget
+        sections = [
+            ContextSection(
+                "instructions",
+                render_instructions(template_file),
+                PRIORITY_REQUIRED,
+            ),
+            ContextSection("user_request", user_request, PRIORITY_REQUIRED),
+            ContextSection(
+                "data_info",
+                data_info,
+                PRIORITY_HIGH,
+                max_tokens=budget.share(0.25),
+                head_ratio=0.8,
+            ),
         ]
+        for i, thread_messages in enumerate(threads):
+            sections.extend(
+                self._build_thread_sections(i, thread_messages, len(threads)),
+            )
+        fitted = budget.fit(sections)
+        image_parts = self._build_image_parts(threads)
+
+        # 静的な指示 → データセット情報 → タスク要求・実行結果（プロンプトキャッシュが効く順）
+        messages = build_prompt_messages(
+            template_file,
+            fitted["data_info"],
+            [{"role": "user", "content": f"タスク要求: {user_request}"}],
+        )
 
-        # DataThreadの処理とメッセージ追加（最大5スレッドまで制限）
-        max_threads = 5
-        for i, data_thread in enumerate(process_data_threads[:max_threads]):
-            thread_messages = self._build_thread_messages(data_thread)
-            # thread_messagesを文字列形式に変換してメッセージに追加
-            content_text = self._convert_thread_messages_to_text(thread_messages)
-            if content_text.strip():  # 空でない場合のみ追加
+        for i in range(len(threads)):
+            # 指示・観測結果・画像参照 → 出力（stdout・テキスト結果）の順に並べる
+            content_text = "\n".join(
+                part
+                for part in (fitted[f"thread{i}.notes"], fitted[f"thread{i}.outputs"])
+                if part
+            )
+            if image_parts[i]:
+                # グラフは縮小画像としてテキストの後ろに添付する
+                messages.append(
+                    {
+                        "role": "user",
+                        "content": [
+                            {"type": "text", "text": f"実行結果 {i + 1}:\n{content_text}"},
+                            *image_parts[i],
+                        ],
+                    },
+                )
+            elif content_text.strip():  # 空でない場合のみ追加
                 messages.append(
                     {"role": "user", "content": f"実行結果 {i + 1}:\n{content_text}"},
                 )
@@ -88,39 +175,222 @@ class GenerateReportUseCase:
         response = self.llm_repository.generate(messages, model=model)
 
         # Markdownコードブロックを削除（```markdown ... ``` の除去）
-        cleaned_response = response
-        # レスポンスから実際のコンテンツを抽出
-        response_content = (
-            response.content if hasattr(response, "content") else str(response)
+        cleaned_response = self._clean_markdown(response)
+        self._finish(cleaned_response, process_data_threads, output_dir)
+
+        return response
+
+    async def asection(
+        self,
+        data_info: str,
+        user_request: str,
+        data_thread: DataThread,
+        index: int,
+        model: str = "gpt-4o-mini-2024-07-18",
+        template_file: str = SECTION_TEMPLATE,
+    ) -> str:
+        """1つのDataThreadの仮説セクションを生成（map-reduceのmap）
+
+        タスクの完了直後に呼べるよう、他のスレッドには依存しない。
+
+        Args:
+            data_info: データ情報
+            user_request: ユーザーリクエスト（分析全体の要求）
+            data_thread: 実行済みDataThread
+            index: セクション番号（1始まり。見出しの仮説番号に使う）
+            model: 使用するLLMモデル
+            template_file: テンプレートファイルパス
+
+        Returns:
+            str: セクションのMarkdown
+
+        """
+        thread_messages = self._build_thread_messages(data_thread)
+        budget = self.context_budget
+        fitted = budget.fit(
+            [
+                ContextSection(
+                    "instructions",
+                    render_instructions(template_file),
+                    PRIORITY_REQUIRED,
+                ),
+                ContextSection("user_request", user_request, PRIORITY_REQUIRED),
+                ContextSection(
+                    "data_info",
+                    data_info,
+                    PRIORITY_HIGH,
+                    max_tokens=budget.share(0.25),
+                    head_ratio=0.8,
+                ),
+                *self._build_thread_sections(0, thread_messages, 1),
+            ],
+        )
+        # 画像の縮小・圧縮は共有イベントループ上の他のLLM呼び出しを止めないようスレッドで行う
+        image_parts = (
+            await asyncio.to_thread(self._build_image_parts, [thread_messages])
+        )[0]
+
+        messages = build_prompt_messages(
+            template_file,
+            fitted["data_info"],
+            [
+                {
+                    "role": "user",
+                    "content": f"タスク要求: {user_request}\nセクション番号: {index}",
+                },
+            ],
+        )
+        content_text = "\n".join(
+            part for part in (fitted["thread0.notes"], fitted["thread0.outputs"]) if part
+        )
+        messages.append(
+            {
+                "role": "user",
+                "content": (
+                    [{"type": "text", "text": f"実行結果:\n{content_text}"}, *image_parts]
+                    if image_parts
+                    else f"実行結果:\n{content_text}"
+                ),
+            },
         )
 
-        if isinstance(response_content, str):
-            # markdownコードブロックのみを削除（先頭と末尾のペアで削除）
-            # ただし他のコードブロック（```python など）は保持
-            import re
-
-            if response_content.strip().startswith(
-                "```markdown",
-            ) and response_content.strip().endswith("```"):
-                # 先頭の```markdownと末尾の```を削除
-                cleaned_response = re.sub(
-                    r"^```markdown\s*\n",
-                    "",
-                    response_content,
-                )
-                cleaned_response = re.sub(
-                    r"\n```\s*$",
-                    "",
-                    cleaned_response,
-                )
-            else:
-                cleaned_response = response_content
-        else:
-            cleaned_response = str(response_content)
+        response = await self.llm_repository.agenerate(messages, model=model)
+        section = self._clean_markdown(response).strip()
+        return section or self.fallback_section(data_thread, index)
+
+    @staticmethod
+    def fallback_section(data_thread: DataThread, index: int) -> str:
+        """LLMでセクションを生成できなかった場合の最小限のセクション（タスクを欠落させない）"""
+        hypothesis = (data_thread.user_request or "").strip().split("\n", 1)[0]
+        lines = [f"### 仮説{index}: {hypothesis or f'タスク{index}'}"]
+        if data_thread.observation:
+            lines.append(f"**結果**: {data_thread.observation}")
+        if data_thread.error:
+            lines.append(f"**制約**: 実行時にエラーが発生しました（{data_thread.error}）")
+        for image_path in data_thread.pathes.get("images", []):
+            lines.append("")
+            lines.append(f"![グラフ]({Path(image_path).name})")
+        return "\n".join(lines)
+
+    async def acompose(
+        self,
+        data_info: str,
+        user_request: str,
+        process_data_threads: list[DataThread],
+        sections: list[str],
+        model: str = "gpt-4o-mini-2024-07-18",
+        template_file: str = SUMMARY_TEMPLATE,
+        output_dir: str | None = None,
+    ) -> LLMResponse:
+        """セクションの要約からサマリーを生成し、レポートを組み立てる（map-reduceのreduce）
+
+        Args:
+            data_info: データ情報
+            user_request: ユーザーリクエスト
+            process_data_threads: 実行済みDataThreadリスト（未参照の画像の追記に使用）
+            sections: asection（またはfallback_section）で作成したセクション
+            model: 使用するLLMモデル
+            template_file: テンプレートファイルパス
+            output_dir: 出力ディレクトリパス（レンダラー使用時）
+
+        Returns:
+            LLMResponse: サマリーの生成結果
+
+        """
+        budget = self.context_budget
+        per_section = 1 / max(1, len(sections))
+        digest_sections = [
+            ContextSection(
+                f"section{i}",
+                # 画像の参照はサマリーに不要なため除く
+                _IMAGE_REFERENCE.sub("", section),
+                PRIORITY_MEDIUM,
+                max_tokens=budget.share(0.6 * per_section),
+                head_ratio=0.7,
+            )
+            for i, section in enumerate(sections)
+        ]
+        fitted = budget.fit(
+            [
+                ContextSection(
+                    "instructions",
+                    render_instructions(template_file),
+                    PRIORITY_REQUIRED,
+                ),
+                ContextSection("user_request", user_request, PRIORITY_REQUIRED),
+                ContextSection(
+                    "data_info",
+                    data_info,
+                    PRIORITY_HIGH,
+                    max_tokens=budget.share(0.15),
+                    head_ratio=0.8,
+                ),
+                *digest_sections,
+            ],
+        )
+        digests = "\n\n".join(
+            fitted[section.name] for section in digest_sections if fitted[section.name]
+        )
+        messages = build_prompt_messages(
+            template_file,
+            fitted["data_info"],
+            [
+                {"role": "user", "content": f"タスク要求: {user_request}"},
+                {"role": "user", "content": f"仮説セクションの要約:\n{digests}"},
+            ],
+        )
+
+        response = await self.llm_repository.agenerate(messages, model=model)
+        summary = self._clean_markdown(response).strip()
+
+        markdown = "\n\n".join(
+            part
+            for part in (
+                REPORT_TITLE,
+                summary,
+                "## 分析結果詳細",
+                "\n\n---\n\n".join(section.strip() for section in sections),
+            )
+            if part
+        )
+        # レンダリング（画像の埋め込み）とファイル書き込みはイベントループの外で行う
+        await asyncio.to_thread(
+            self._finish,
+            markdown,
+            process_data_threads,
+            output_dir,
+        )
+        return response
 
+    @staticmethod
+    def _clean_markdown(response: Any) -> str:
+        """応答からMarkdownを取り出す（全体を囲む```markdown ... ```のみ除去）"""
+        response_content = (
+            response.content if hasattr(response, "content") else str(response)
+        )
+        if not isinstance(response_content, str):
+            return str(response_content)
+
+        # markdownコードブロックのみを削除（先頭と末尾のペアで削除）
+        # ただし他のコードブロック（```python など）は保持
+        if response_content.strip().startswith(
+            "```markdown",
+        ) and response_content.strip().endswith("```"):
+            # 先頭の```markdownと末尾の```を削除
+            cleaned = re.sub(r"^```markdown\s*\n", "", response_content)
+            return re.sub(r"\n```\s*$", "", cleaned)
+        return response_content
+
+    def _finish(
+        self,
+        markdown_text: str,
+        process_data_threads: list[DataThread],
+        output_dir: str | None,
+    ) -> None:
+        """画像の漏れを補い、レンダリングとMarkdownの保存を行う"""
         # 生成済みの画像をMarkdownに追加して漏れを防ぐ
         enriched_markdown = self._append_missing_images(
-            cleaned_response,
+            markdown_text,
             process_data_threads,
         )
 
@@ -131,8 +401,6 @@ class GenerateReportUseCase:
         if output_dir is not None:
             self._write_markdown(enriched_markdown, output_dir)
 
-        return response
-
     def _build_thread_messages(self, data_thread: DataThread) -> list[dict[str, Any]]:
         """DataThreadからメッセージ構築
 
@@ -149,13 +417,24 @@ class GenerateReportUseCase:
             {"type": "input_text", "text": f"observation: {data_thread.observation}"},
         ]
 
+        # 保存済み画像はハッシュ名のファイルになっているため、論理名から引き当てる
+        artifact_hashes = data_thread.pathes.get("artifacts", {})
+        saved_images = {
+            Path(image_path).stem: Path(image_path).name
+            for image_path in data_thread.pathes.get("images", [])
+        }
+
         # 実行結果の処理
         for i, result in enumerate(data_thread.results):
             if result.get("type") == "image":
                 # PNG画像の処理
-                image_filename = (
+                logical_name = (
                     f"{data_thread.process_id}_{data_thread.thread_id}_{i}.png"
                 )
+                image_filename = saved_images.get(
+                    artifact_hashes.get(logical_name, ""),
+                    logical_name,
+                )
                 image_data = result.get("data", "")
                 user_contents.extend(
                     [
@@ -170,6 +449,7 @@ class GenerateReportUseCase:
                         {
                             "type": "input_image",
                             "image_url": f"data:image/png;base64,{image_data}",
+                            "file_name": image_filename,
                         },
                     ],
                 )
@@ -184,44 +464,89 @@ class GenerateReportUseCase:
 
         return user_contents
 
-    def _convert_thread_messages_to_text(
+    def _build_thread_sections(
         self,
+        index: int,
         thread_messages: list[dict[str, Any]],
-    ) -> str:
-        """DataThreadメッセージをテキスト形式に変換
+        thread_count: int,
+    ) -> list[ContextSection]:
+        """DataThreadメッセージを文脈の区画に分ける
+
+        指示・観測結果・画像ファイル名は短く重要なため優先し、
+        長くなりがちなstdoutとテキスト結果は低優先度で上限を設ける。
 
         Args:
+            index: スレッド番号（区画名に使用）
             thread_messages: DataThreadから構築されたメッセージリスト
+            thread_count: スレッド数（出力の上限を等分する）
 
         Returns:
-            str: テキスト形式のメッセージ
+            List[ContextSection]: thread{index}.notes / thread{index}.outputs
 
         """
-        text_parts = []
-        total_length = 0
-        max_length = 8000  # 各スレッドのメッセージを制限（コンテキスト制限対策）
-
+        notes: list[str] = []
+        outputs: list[str] = []
         for message in thread_messages:
-            if message.get("type") == "input_text" or message.get("type") == "text":
+            if message.get("type") == "text":
+                outputs.append(message["text"])
+            elif message.get("type") == "input_text":
                 text = message["text"]
-                # 長さ制限チェック
-                if total_length + len(text) > max_length:
-                    remaining_space = max_length - total_length
-                    if remaining_space > 100:  # 最低限のスペースがある場合のみ追加
-                        text = text[:remaining_space] + "...(省略)"
-                        text_parts.append(text)
-                    break
-                text_parts.append(text)
-                total_length += len(text)
-            elif message.get("type") == "input_image":
-                # 画像URLを完全な形式でテキストに含める（テスト要件に合わせる）
-                image_text = f"[画像: {message['image_url']}]"
-                if total_length + len(image_text) > max_length:
-                    break
-                text_parts.append(image_text)
-                total_length += len(image_text)
-
-        return "\n".join(text_parts)
+                (outputs if text.startswith("stdout:") else notes).append(text)
+            # input_image（base64のデータURL）はテキストに含めず、
+            # 縮小画像として別途添付する（_build_image_parts）
+
+        budget = self.context_budget
+        per_thread = 1 / max(1, thread_count)
+        return [
+            ContextSection(
+                f"thread{index}.notes",
+                "\n".join(notes),
+                PRIORITY_HIGH,
+                max_tokens=budget.share(0.15 * per_thread),
+            ),
+            ContextSection(
+                f"thread{index}.outputs",
+                "\n".join(outputs),
+                PRIORITY_LOW,
+                max_tokens=budget.share(0.5 * per_thread),
+            ),
+        ]
+
+    def _build_image_parts(
+        self,
+        threads: list[list[dict[str, Any]]],
+    ) -> list[list[dict[str, Any]]]:
+        """各スレッドのグラフを縮小画像のメッセージ部品に変換する
+
+        1レポートあたりの枚数・容量の上限内で、各スレッドの1枚目 → 2枚目 … の順に
+        選ぶ（上限に達しても、なるべく全タスクのグラフが1枚は含まれるようにする）。
+
+        Returns:
+            スレッド毎の [画像ファイル名のテキスト, image_url, ...]
+
+        """
+        images = [
+            [message for message in thread if message.get("type") == "input_image"]
+            for thread in threads
+        ]
+        parts: list[list[dict[str, Any]]] = [[] for _ in threads]
+        image_budget = ImageBudget.from_env()
+        for rank in range(max((len(thread) for thread in images), default=0)):
+            for index, thread_images in enumerate(images):
+                if rank >= len(thread_images):
+                    continue
+                image = thread_images[rank]
+                _, _, image_base64 = image["image_url"].partition(",")
+                part = self.thumbnailer.to_content_part(image_base64, image_budget)
+                if part is None:
+                    continue
+                parts[index].extend(
+                    [
+                        {"type": "text", "text": f'画像 "{image["file_name"]}":'},
+                        part,
+                    ],
+                )
+        return parts
 
     def _append_missing_images(
         self,
@@ -233,8 +558,6 @@ class GenerateReportUseCase:
         if not markdown_text:
             markdown_text = ""
 
-        import re
-
         existing_references = {
             Path(match).name
             for match in re.findall(r"!\[[^\]]*\]\(([^)]+)\)", markdown_text)
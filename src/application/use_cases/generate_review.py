@@ -14,7 +14,10 @@ from typing import Any
 
 from src.domain.entities import DataThread, Review
 from src.domain.repositories.llm_repository import LLMRepository
-from src.infrastructure.template_loader import load_template
+from src.infrastructure.prompt_layout import (
+    build_prompt_messages,
+    render_instructions,
+)
 
 
 class GenerateReviewUseCase:
@@ -96,6 +99,41 @@ class GenerateReviewUseCase:
         )
 
         # 4. LLMResponseからReviewエンティティを抽出
+        return self._extract_review(response)
+
+    async def aexecute(
+        self,
+        data_info: str,
+        user_request: str,
+        data_thread: DataThread,
+        has_results: bool = False,
+        remote_save_dir: str = "outputs/process_id/id",
+        model: str = "gpt-4o-mini-2024-07-18",
+        template_file: str = "src/prompts/generate_review.jinja",
+    ) -> Review:
+        """レビュー生成を実行（非同期版）
+
+        引数・戻り値はexecuteと同じ。LLM呼び出しをイベントループ上で待機するため、
+        次のタスクのコード生成・実行と並行してレビューできる。
+        """
+        messages = self._build_review_messages(
+            data_info=data_info,
+            user_request=user_request,
+            data_thread=data_thread,
+            has_results=has_results,
+            remote_save_dir=remote_save_dir,
+            template_file=template_file,
+        )
+        response = await self._llm_repository.agenerate(
+            messages=messages,
+            model=model,
+            response_format=Review,
+        )
+        return self._extract_review(response)
+
+    @staticmethod
+    def _extract_review(response: Any) -> Review:
+        """LLMResponseからReviewエンティティを抽出"""
         if hasattr(response, "content") and isinstance(response.content, Review):
             return response.content
         # フォールバック: responseがReviewの場合はそのまま返す
@@ -124,41 +162,39 @@ class GenerateReviewUseCase:
             List[Dict[str, Any]]: レビュー用メッセージリスト
 
         メッセージ構造:
-        1. システム指示（テンプレートから生成）
-        2. ユーザー要求
-        3. 生成されたコード（assistantとして）
-        4. 実行結果（has_resultsがTrueの場合のみ）
-        5. 標準出力
-        6. 標準エラー出力
-        7. フィードバック要求
+        1. システム指示（テンプレートから生成。ジョブに依存しない静的な内容）
+        2. データセット情報
+        3. ユーザー要求
+        4. 生成されたコード（assistantとして）
+        5. 実行結果（has_resultsがTrueの場合のみ）
+        6. 標準出力
+        7. 標準エラー出力
+        8. フィードバック要求
 
         """
-        # テンプレート読み込み
-        template = load_template(template_file)
-        system_instruction = template.render(
-            data_info=data_info,
-            remote_save_dir=remote_save_dir,
+        # 基本メッセージの構築（静的な指示 → データセット情報 → タスク内容）
+        messages = build_prompt_messages(
+            template_file,
+            self._truncate_text(data_info, self._system_limit),
+            [
+                {
+                    "role": "user",
+                    "content": self._truncate_text(user_request, self._user_limit),
+                },
+                {
+                    "role": "assistant",
+                    "content": self._truncate_text(
+                        data_thread.code or "",
+                        self._code_limit,
+                    ),
+                },
+            ],
+            instructions=self._truncate_text(
+                render_instructions(template_file),
+                self._system_limit,
+            ),
         )
 
-        # 基本メッセージの構築
-        messages = [
-            {
-                "role": "system",
-                "content": self._truncate_text(system_instruction, self._system_limit),
-            },
-            {
-                "role": "user",
-                "content": self._truncate_text(user_request, self._user_limit),
-            },
-            {
-                "role": "assistant",
-                "content": self._truncate_text(
-                    data_thread.code or "",
-                    self._code_limit,
-                ),
-            },
-        ]
-
         # 実行結果の追加（条件付き）
         if has_results and data_thread.results:
             results_summary = self._summarize_results_for_llm(
@@ -0,0 +1,435 @@
+"""SynthesizeCodeUseCase
+
+計画のタスク（Task.chart_type）とデータセットのスキーマから、定番の可視化
+（分布・箱ひげ・散布図・相関ヒートマップ・グループ比較・時系列・構成比）の
+分析コードをLLMを呼ばずに組み立てる。
+
+- 判定: chart_typeの全ての要素が既知の可視化で、タスク文がデータセットの列を
+  1つ以上名指ししており、回帰・予測等の個別の分析を求めていない場合のみ対象。
+  それ以外（新しい種類の可視化・派生変数が必要な分析）はNoneを返し、
+  呼び出し側はLLMでコードを生成する
+- テンプレート: 列名はrepr()で埋め込み、集計はpandasのベクトル演算
+  （groupby / corr / resample / value_counts）で行う。生成コードはサンドボックスの
+  df と show_plot() を前提とする（オーケストレーターが先頭に付加する）
+
+環境変数CODE_FAST_PATH_ENABLED=falseで無効化できる（既定: 有効）。
+
+設計原則:
+- 単一責任の原則（SRP）: 定型タスクのコード合成のみ
+- 決定的: 同じタスク・スキーマからは常に同じコード
+"""
+
+import os
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any
+
+import pandas as pd
+
+from src.domain.entities import Program
+from src.domain.entities.plan import Task
+from src.infrastructure.services.dataset_profile import dtype_kind, looks_like_datetime
+
+
+# 数値以外の列をカテゴリとして扱う最大のユニーク数
+_MAX_CATEGORY_UNIQUE = 30
+# 1つのグラフに並べる最大の列数
+_MAX_PLOT_COLUMNS = 4
+_MAX_HEATMAP_COLUMNS = 12
+
+# chart_type の要素 → 可視化の種類（先に一致したものを採用）
+_CHART_KEYWORDS: tuple[tuple[str, tuple[str, ...]], ...] = (
+    ("heatmap", ("ヒートマップ", "相関行列", "heatmap", "correlation")),
+    ("box", ("箱ひげ", "ボックスプロット", "box")),
+    ("histogram", ("ヒストグラム", "分布", "密度", "histogram", "kde", "density")),
+    ("scatter", ("散布図", "scatter")),
+    ("bar", ("棒グラフ", "バーチャート", "bar")),
+    ("line", ("折れ線", "時系列", "推移", "line")),
+    ("pie", ("円グラフ", "パイチャート", "pie")),
+)
+_CHART_SEPARATORS = re.compile(r"[/／・、,，+＋&]|および|及び|と")
+# タスク文にこれらが含まれる場合は定型の可視化では足りないためLLMに任せる
+_NOVEL_HINTS = (
+    "回帰",
+    "クラスタ",
+    "予測",
+    "検定",
+    "曜日",
+    "移動平均",
+    "前年",
+    "regression",
+    "cluster",
+    "forecast",
+)
+
+
+@dataclass(frozen=True)
+class ColumnSchema:
+    """列の種類（numeric / category / datetime / other）とユニーク数"""
+
+    name: str
+    kind: str
+    unique: int
+
+
+@dataclass(frozen=True)
+class DatasetSchema:
+    """コード合成に使うデータセットの列構成"""
+
+    columns: tuple[ColumnSchema, ...]
+    row_count: int
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "DatasetSchema":
+        """DataFrameから列の種類を判定する
+
+        読み込み直後の文字列の日時列（CSV等）も、先頭の値が日時として解釈できれば
+        datetimeとみなす（生成コード側でpd.to_datetimeする）。
+        """
+        columns = []
+        for name in df.columns:
+            series = df[name]
+            kind = dtype_kind(series.dtype)
+            columns.append(
+                _column_schema(
+                    str(name),
+                    kind,
+                    int(series.nunique(dropna=True)),
+                    kind == "string" and looks_like_datetime(series),
+                ),
+            )
+        return cls(tuple(columns), len(df))
+
+    @classmethod
+    def from_profile(cls, profile: dict[str, Any]) -> "DatasetSchema":
+        """データセットのプロファイル（DatasetProfileService）から列の種類を判定する"""
+        columns = tuple(
+            _column_schema(
+                column["name"],
+                column["kind"],
+                int(column.get("unique") or 0),
+                bool(column.get("datetime_like")),
+            )
+            for column in profile.get("column_profiles", [])
+        )
+        return cls(columns, int(profile.get("rows", 0)))
+
+    def of_kind(self, kind: str) -> list[str]:
+        return [column.name for column in self.columns if column.kind == kind]
+
+    def mentioned_in(self, text: str) -> list[str]:
+        """タスク文で名指しされている列（登場順）"""
+        positions = []
+        for column in self.columns:
+            name = column.name
+            if name.isascii():
+                match = re.search(
+                    rf"(?<![A-Za-z0-9_]){re.escape(name)}(?![A-Za-z0-9_])",
+                    text,
+                )
+                position = match.start() if match else -1
+            else:
+                position = text.find(name)
+            if position >= 0:
+                positions.append((position, name))
+        return [name for _, name in sorted(positions)]
+
+
+def _column_schema(name: str, kind: str, unique: int, datetime_like: bool) -> ColumnSchema:
+    if kind == "bool":
+        return ColumnSchema(name, "category", unique)
+    if kind in {"numeric", "datetime"}:
+        return ColumnSchema(name, kind, unique)
+    if datetime_like:
+        return ColumnSchema(name, "datetime", unique)
+    if unique <= _MAX_CATEGORY_UNIQUE:
+        return ColumnSchema(name, "category", unique)
+    return ColumnSchema(name, "other", unique)
+
+
+@dataclass(frozen=True)
+class _Columns:
+    """タスク文で名指しされた列を優先した、種類別の列"""
+
+    numeric: list[str]
+    category: list[str]
+    datetime: list[str]
+
+    @classmethod
+    def select(cls, schema: DatasetSchema, mentioned: list[str]) -> "_Columns":
+        def ordered(kind: str) -> list[str]:
+            of_kind = schema.of_kind(kind)
+            first = [name for name in mentioned if name in of_kind]
+            return first + [name for name in of_kind if name not in first]
+
+        return cls(ordered("numeric"), ordered("category"), ordered("datetime"))
+
+    def numeric_mentioned_first(self, mentioned: list[str], limit: int) -> list[str]:
+        chosen = [name for name in self.numeric if name in mentioned]
+        return (chosen or self.numeric)[:limit]
+
+
+class SynthesizeCodeUseCase:
+    """定型タスクの分析コードをテンプレートから合成する
+
+    使用方法:
+        ```python
+        schema = DatasetSchema.from_dataframe(df)
+        program = SynthesizeCodeUseCase().execute(task, schema)
+        if program is None:
+            program = code_use_case.execute(...)  # 定型でないタスクはLLMで生成
+        ```
+    """
+
+    def __init__(self, enabled: bool | None = None) -> None:
+        self.enabled = (
+            enabled
+            if enabled is not None
+            else os.environ.get("CODE_FAST_PATH_ENABLED", "true").lower() == "true"
+        )
+        self._templates: dict[str, Callable[[_Columns, list[str]], str | None]] = {
+            "histogram": self._histogram,
+            "box": self._box,
+            "scatter": self._scatter,
+            "heatmap": self._heatmap,
+            "bar": self._bar,
+            "line": self._line,
+            "pie": self._pie,
+        }
+
+    def execute(self, task: Task, schema: DatasetSchema | None) -> Program | None:
+        """定型タスクならProgramを返す（対象外ならNone）"""
+        if not self.enabled or schema is None or not schema.columns:
+            return None
+        kinds = self.chart_kinds(task.chart_type)
+        if not kinds:
+            return None
+
+        text = "\n".join((task.hypothesis, task.purpose, task.description))
+        lowered = text.lower()
+        if any(hint in lowered for hint in _NOVEL_HINTS):
+            return None
+        mentioned = schema.mentioned_in(text)
+        if not mentioned:
+            return None
+
+        columns = _Columns.select(schema, mentioned)
+        snippets = []
+        for kind in kinds:
+            snippet = self._templates[kind](columns, mentioned)
+            if snippet is None:
+                return None
+            snippets.append(snippet)
+
+        return Program(
+            achievement_condition=f"{task.chart_type} で {task.purpose} を確認できる",
+            execution_plan=(
+                f"定型の可視化（{', '.join(kinds)}）を列 {', '.join(mentioned)} に適用し、"
+                "集計値を出力する"
+            ),
+            code="\n\n".join(snippets) + "\n",
+        )
+
+    @staticmethod
+    def chart_kinds(chart_type: str) -> list[str]:
+        """chart_typeの各要素を可視化の種類に変換（1つでも不明なら空）"""
+        kinds: list[str] = []
+        for part in _CHART_SEPARATORS.split(chart_type or ""):
+            part = part.strip().lower()
+            if not part:
+                continue
+            kind = next(
+                (
+                    name
+                    for name, keywords in _CHART_KEYWORDS
+                    if any(keyword in part for keyword in keywords)
+                ),
+                None,
+            )
+            if kind is None:
+                return []
+            if kind not in kinds:
+                kinds.append(kind)
+        return kinds
+
+    # ==================================================================
+    # テンプレート（列名はrepr()で埋め込む）
+    # ==================================================================
+    @staticmethod
+    def _histogram(columns: _Columns, mentioned: list[str]) -> str | None:
+        cols = columns.numeric_mentioned_first(mentioned, _MAX_PLOT_COLUMNS)
+        if not cols:
+            return None
+        return f"""# Distribution
+_cols = {cols!r}
+print("=== Distribution summary ===")
+print(df[_cols].describe().round(3))
+print("skew:", df[_cols].skew(numeric_only=True).round(3).to_dict())
+_fig, _axes = plt.subplots(1, len(_cols), figsize=(5 * len(_cols), 4), squeeze=False)
+for _ax, _col in zip(_axes[0], _cols):
+    _ax.hist(df[_col].dropna(), bins=30, color="steelblue", alpha=0.8)
+    _ax.set_title(f"{{_col}} distribution")
+    _ax.set_xlabel(_col)
+    _ax.set_ylabel("count")
+plt.tight_layout()
+show_plot()"""
+
+    @staticmethod
+    def _box(columns: _Columns, mentioned: list[str]) -> str | None:
+        cols = columns.numeric_mentioned_first(mentioned, _MAX_PLOT_COLUMNS)
+        if not cols:
+            return None
+        group = next((name for name in mentioned if name in columns.category), None)
+        if group is not None:
+            return f"""# Box plot by group
+_col, _group = {cols[0]!r}, {group!r}
+print(f"=== {{_col}} by {{_group}} ===")
+print(df.groupby(_group, observed=True)[_col].describe().round(3))
+_order = df.groupby(_group, observed=True)[_col].median().sort_values().index[:20]
+_data = [df.loc[df[_group] == _key, _col].dropna() for _key in _order]
+plt.figure(figsize=(max(6, len(_order) * 0.8), 5))
+plt.boxplot(_data)
+plt.xticks(range(1, len(_order) + 1), [str(_key) for _key in _order], rotation=45, ha="right")
+plt.title(f"{{_col}} by {{_group}}")
+plt.xlabel(_group)
+plt.ylabel(_col)
+show_plot()"""
+        return f"""# Box plot
+_cols = {cols!r}
+_q1, _q3 = df[_cols].quantile(0.25), df[_cols].quantile(0.75)
+_iqr = _q3 - _q1
+_outliers = ((df[_cols] < _q1 - 1.5 * _iqr) | (df[_cols] > _q3 + 1.5 * _iqr)).sum()
+print("=== Outliers (1.5 IQR) ===")
+print(_outliers.to_dict())
+plt.figure(figsize=(max(6, 2 * len(_cols)), 5))
+plt.boxplot([df[_col].dropna() for _col in _cols])
+plt.xticks(range(1, len(_cols) + 1), _cols)
+plt.title("Box plot")
+show_plot()"""
+
+    @staticmethod
+    def _scatter(columns: _Columns, mentioned: list[str]) -> str | None:
+        cols = columns.numeric_mentioned_first(mentioned, 2)
+        if len(cols) < 2:
+            cols = (cols + [name for name in columns.numeric if name not in cols])[:2]
+        if len(cols) < 2:
+            return None
+        x, y = cols
+        hue = next((name for name in mentioned if name in columns.category), None)
+        if hue is not None:
+            plot = f"""_top = df[{hue!r}].value_counts().index[:10]
+for _key in _top:
+    _part = df[df[{hue!r}] == _key]
+    plt.scatter(_part[_x], _part[_y], s=12, alpha=0.6, label=str(_key))
+plt.legend(title={hue!r}, fontsize=8)"""
+        else:
+            plot = "plt.scatter(df[_x], df[_y], s=12, alpha=0.6, color=\"steelblue\")"
+        return f"""# Scatter plot
+_x, _y = {x!r}, {y!r}
+print("=== Correlation ===")
+print("pearson:", round(df[_x].corr(df[_y]), 4), "spearman:", round(df[_x].corr(df[_y], method="spearman"), 4))
+plt.figure(figsize=(7, 5))
+{plot}
+plt.title(f"{{_x}} vs {{_y}}")
+plt.xlabel(_x)
+plt.ylabel(_y)
+show_plot()"""
+
+    @staticmethod
+    def _heatmap(columns: _Columns, mentioned: list[str]) -> str | None:
+        cols = [name for name in columns.numeric if name in mentioned]
+        if len(cols) < 2:
+            cols = columns.numeric
+        cols = cols[:_MAX_HEATMAP_COLUMNS]
+        if len(cols) < 2:
+            return None
+        return f"""# Correlation heatmap
+_cols = {cols!r}
+_corr = df[_cols].corr()
+print("=== Correlation matrix ===")
+print(_corr.round(3))
+_pairs = _corr.where(~np.tril(np.ones(_corr.shape, dtype=bool))).stack()
+print("strongest pairs:")
+print(_pairs.reindex(_pairs.abs().sort_values(ascending=False).index).head(5).round(3))
+_fig, _ax = plt.subplots(figsize=(1.2 * len(_cols) + 3, 1.0 * len(_cols) + 2))
+_image = _ax.imshow(_corr.values, cmap="coolwarm", vmin=-1, vmax=1)
+_ax.set_xticks(range(len(_cols)), _cols, rotation=45, ha="right")
+_ax.set_yticks(range(len(_cols)), _cols)
+for (_i, _j), _value in np.ndenumerate(_corr.values):
+    _ax.text(_j, _i, f"{{_value:.2f}}", ha="center", va="center", fontsize=8)
+_fig.colorbar(_image)
+plt.title("Correlation matrix")
+plt.tight_layout()
+show_plot()"""
+
+    @staticmethod
+    def _bar(columns: _Columns, mentioned: list[str]) -> str | None:
+        if not columns.category:
+            return None
+        group = columns.category[0]
+        values = [name for name in columns.numeric if name in mentioned][:3]
+        if not values:
+            return f"""# Bar chart (counts)
+_group = {group!r}
+_counts = df[_group].value_counts().head(20)
+print(f"=== Counts by {{_group}} ===")
+print(_counts)
+plt.figure(figsize=(max(6, len(_counts) * 0.6), 5))
+_counts.plot.bar(color="steelblue")
+plt.title(f"count by {{_group}}")
+plt.xticks(rotation=45, ha="right")
+show_plot()"""
+        return f"""# Bar chart (group means)
+_group, _values = {group!r}, {values!r}
+_summary = df.groupby(_group, observed=True)[_values].mean().sort_values(_values[0], ascending=False).head(20)
+print(f"=== Mean by {{_group}} ===")
+print(_summary.round(3))
+print("n:", df[_group].value_counts().to_dict())
+_summary.plot.bar(subplots=len(_values) > 1, figsize=(max(6, len(_summary) * 0.6), 3 * len(_values) + 1), legend=False)
+plt.suptitle(f"mean by {{_group}}")
+plt.tight_layout()
+show_plot()"""
+
+    @staticmethod
+    def _line(columns: _Columns, mentioned: list[str]) -> str | None:
+        if not columns.datetime:
+            return None
+        values = columns.numeric_mentioned_first(mentioned, 3)
+        if not values:
+            return None
+        return f"""# Time series
+_time, _values = {columns.datetime[0]!r}, {values!r}
+_series = df.assign(_t=pd.to_datetime(df[_time], errors="coerce", format="mixed")).dropna(subset=["_t"]).set_index("_t")[_values].sort_index()
+_span = (_series.index.max() - _series.index.min()).days if len(_series) else 0
+_freq = "ME" if _span > 730 else ("W" if _span > 60 else "D")
+_resampled = _series.resample(_freq).mean()
+print("=== Time series ({{}}) ===".format(_freq))
+print(_resampled.describe().round(3))
+_resampled.plot(figsize=(10, 5), marker="o", markersize=3)
+plt.title(f"{{', '.join(_values)}} over time")
+plt.xlabel(_time)
+show_plot()"""
+
+    @staticmethod
+    def _pie(columns: _Columns, mentioned: list[str]) -> str | None:
+        if not columns.category:
+            return None
+        group = columns.category[0]
+        value = next((name for name in columns.numeric if name in mentioned), None)
+        aggregate = (
+            f"df.groupby(_group, observed=True)[{value!r}].sum().sort_values(ascending=False)"
+            if value is not None
+            else "df[_group].value_counts()"
+        )
+        return f"""# Pie chart
+_group = {group!r}
+_share = {aggregate}
+if len(_share) > 8:
+    _share = pd.concat([_share.iloc[:7], pd.Series({{"other": _share.iloc[7:].sum()}})])
+print(f"=== Share by {{_group}} ===")
+print((_share / _share.sum()).round(4))
+plt.figure(figsize=(6, 6))
+plt.pie(_share.values, labels=[str(_key) for _key in _share.index], autopct="%1.1f%%", startangle=90)
+plt.title(f"share by {{_group}}")
+show_plot()"""
@@ -11,11 +11,21 @@ LLMからのレスポンスを表現するドメインエンティティ。
 from pydantic import BaseModel, Field
 
 
+# LLMを呼ばずにルールベースで組み立てた応答のモデル名
+RULE_BASED_FALLBACK_MODEL = "rule-based-fallback"
+
+
 class LLMResponse(BaseModel):
     """LLMからのレスポンス構造
 
     LLMのレスポンス情報を構造化して保持する。
     コスト計算やトークン数の追跡を含む。
+
+    - cached_input_tokens: プロンプトキャッシュで課金が割り引かれた入力トークン数
+    - latency_seconds: 送信から応答完了まで（スロットリング・リトライ待ちを含む）
+    - time_to_first_token: ストリーミング時の最初のチャンクまでの秒数
+    - cache_hit: 応答キャッシュから復元した場合True（APIは呼ばれていない）
+    - usage_estimated: APIがusageを返さず、トークン数をローカルで概算した場合True
     """
 
     messages: list
@@ -24,4 +34,18 @@ class LLMResponse(BaseModel):
     created_at: int
     input_tokens: int
     output_tokens: int
-    cost: float | None = Field(default=None, init=False)
\ No newline at end of file
+    cost: float | None = Field(default=None, init=False)
+    cached_input_tokens: int = 0
+    latency_seconds: float | None = None
+    time_to_first_token: float | None = None
+    cache_hit: bool = False
+    usage_estimated: bool = False
+
+    @property
+    def total_tokens(self) -> int:
+        return self.input_tokens + self.output_tokens
+
+    @property
+    def is_fallback(self) -> bool:
+        """LLMの代わりにルールベースのフォールバックが返した応答か"""
+        return self.model == RULE_BASED_FALLBACK_MODEL
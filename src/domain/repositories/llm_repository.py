@@ -5,9 +5,11 @@
 - テスト容易性: モック化可能なインターフェース
 """
 
+import asyncio
+import threading
 from abc import ABC, abstractmethod
 from typing import Any
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Callable, Generator
 
 
 class LLMRepository(ABC):
@@ -21,6 +23,16 @@ class LLMRepository(ABC):
     - 開放閉鎖の原則（OCP）: 新しいLLMプロバイダを追加可能
     """
 
+    @property
+    def is_online(self) -> bool:
+        """実際のLLMから応答を得ているか
+
+        Falseの場合は全ての応答がルールベースのフォールバック・モック。
+        Trueでもサーキットブレーカー等で個々の応答がフォールバックになることがあるため、
+        永続キャッシュへの保存は応答毎（LLMResponse.is_fallback）に判定する。
+        """
+        return True
+
     @abstractmethod
     def generate(
         self,
@@ -29,6 +41,8 @@ class LLMRepository(ABC):
         temperature: float = 0.7,
         max_tokens: int | None = None,
         response_format: type | None = None,
+        *,
+        use_cache: bool = True,
     ) -> Any:
         """LLMから応答を生成
 
@@ -38,6 +52,8 @@ class LLMRepository(ABC):
             temperature: ランダム性（0.0-2.0）
             max_tokens: 最大トークン数（省略可）
             response_format: 応答フォーマット（Pydanticモデル、省略可）
+            use_cache: 応答キャッシュを参照するか
+                （キャッシュを持たない実装では無視される）
 
         Returns:
             Any: LLM応答（LLMResponse型を推奨）
@@ -56,6 +72,10 @@ class LLMRepository(ABC):
         model: str,
         temperature: float = 0.7,
         max_tokens: int | None = None,
+        response_format: type | None = None,
+        *,
+        use_cache: bool = True,
+        on_response: Callable[[Any], None] | None = None,
     ) -> Generator[str, None, None]:
         """LLMからストリーミング応答を生成
 
@@ -64,6 +84,12 @@ class LLMRepository(ABC):
             model: 使用するモデル名
             temperature: ランダム性
             max_tokens: 最大トークン数
+            response_format: 応答フォーマット（Pydanticモデルの場合は
+                スキーマに沿ったJSON文字列をストリーミングする）
+            use_cache: 応答キャッシュを参照するか
+                （キャッシュを持たない実装では無視される）
+            on_response: 受信完了後に応答全体（LLMResponse: モデル名・使用量）を
+                受け取るコールバック（応答を組み立てない実装では呼ばれない）
 
         Yields:
             str: 応答のチャンク（逐次的に生成される）
@@ -74,3 +100,96 @@ class LLMRepository(ABC):
 
         """
         ...
+
+    async def agenerate(
+        self,
+        messages: list[dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+        response_format: type | None = None,
+        *,
+        use_cache: bool = True,
+    ) -> Any:
+        """LLMから応答を生成（非同期版）
+
+        引数・戻り値はgenerateと同じ。
+        既定実装は同期版generateをワーカースレッドで実行する。
+        非同期クライアントを持つ実装はオーバーライドして
+        イベントループ上で直接I/Oを待つこと。
+
+        """
+        return await asyncio.to_thread(
+            self.generate,
+            messages,
+            model,
+            temperature,
+            max_tokens,
+            response_format,
+            use_cache=use_cache,
+        )
+
+    async def astream(
+        self,
+        messages: list[dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+        response_format: type | None = None,
+        *,
+        use_cache: bool = True,
+        on_response: Callable[[Any], None] | None = None,
+    ) -> AsyncGenerator[str, None]:
+        """LLMからストリーミング応答を生成（非同期版）
+
+        引数は同期版streamと同じ。
+        既定実装は同期版streamをワーカースレッドで回し、
+        チャンクをイベントループへ受け渡す。
+
+        Yields:
+            str: 応答のチャンク
+
+        """
+        loop = asyncio.get_running_loop()
+        chunks: asyncio.Queue[tuple[str, Any]] = asyncio.Queue()
+        cancelled = threading.Event()
+        # response_format・use_cache・on_responseに対応しない実装とも互換を保つため、
+        # 指定時のみ渡す
+        extra: dict[str, Any] = {}
+        if response_format:
+            extra["response_format"] = response_format
+        if not use_cache:
+            extra["use_cache"] = False
+        if on_response is not None:
+            extra["on_response"] = on_response
+
+        def _produce() -> None:
+            try:
+                for chunk in self.stream(
+                    messages,
+                    model,
+                    temperature,
+                    max_tokens,
+                    **extra,
+                ):
+                    if cancelled.is_set():
+                        return
+                    loop.call_soon_threadsafe(chunks.put_nowait, ("chunk", chunk))
+            except Exception as exc:  # noqa: BLE001 - 消費側で再送出
+                loop.call_soon_threadsafe(chunks.put_nowait, ("error", exc))
+            finally:
+                loop.call_soon_threadsafe(chunks.put_nowait, ("done", None))
+
+        producer = loop.run_in_executor(None, _produce)
+        try:
+            while True:
+                kind, value = await chunks.get()
+                if kind == "chunk":
+                    yield value
+                elif kind == "error":
+                    raise value
+                else:
+                    break
+        finally:
+            cancelled.set()
+            await asyncio.shield(producer)
@@ -54,6 +54,15 @@ class DIContainer:
         """
         self._sandbox_repository: SandboxRepository | None = None
         self._llm_repository: LLMRepository | None = None
+        self._session_result_store: "SessionResultStore | None" = None
+        self._job_checkpoint_store: "JobCheckpointStore | None" = None
+        self._artifact_store: "ArtifactStore | None" = None
+        self._llm_response_cache: "LLMResponseCache | None" = None
+        self._plan_cache: "PlanCache | None" = None
+        self._job_flight_registry: "JobFlightRegistry | None" = None
+        self._async_loop_runner: "AsyncLoopRunner | None" = None
+        self._llm_usage_tracker: "LLMUsageTracker | None" = None
+        self._dataset_summarizer: "DatasetSummarizer | None" = None
 
     def get_sandbox_repository(self, timeout: int | None = None) -> SandboxRepository:
         """SandboxRepositoryのインスタンスを取得
@@ -116,6 +125,8 @@ class DIContainer:
             self._llm_repository = OpenAILLMRepository(
                 api_key=api_key,
                 endpoint=endpoint,
+                response_cache=self.get_llm_response_cache(),
+                usage_tracker=self.get_llm_usage_tracker(),
             )
 
         return self._llm_repository
@@ -131,7 +142,9 @@ class DIContainer:
             DescribeDataframeUseCase,
         )
 
-        return DescribeDataframeUseCase()
+        return DescribeDataframeUseCase(
+            profile_service=self.get_dataset_profile_service(),
+        )
 
     def get_generate_plan_use_case(self) -> "GeneratePlanUseCase":
         """GeneratePlanUseCaseのインスタンスを取得
@@ -160,6 +173,17 @@ class DIContainer:
         llm_repository = self.get_llm_repository()
         return GenerateCodeUseCase(llm_repository)
 
+    def get_synthesize_code_use_case(self) -> "SynthesizeCodeUseCase":
+        """SynthesizeCodeUseCaseのインスタンスを取得
+
+        Returns:
+            SynthesizeCodeUseCase: 定型タスクのコード合成ユースケースのインスタンス
+
+        """
+        from src.application.use_cases.synthesize_code import SynthesizeCodeUseCase
+
+        return SynthesizeCodeUseCase()
+
     def get_generate_review_use_case(self) -> "GenerateReviewUseCase":
         """GenerateReviewUseCase のインスタンスを取得
 
@@ -240,6 +264,221 @@ class DIContainer:
             self.get_report_renderer(output_format),
         )
 
+    def get_session_result_store(self) -> "SessionResultStore":
+        """SessionResultStoreのインスタンスを取得
+
+        Returns:
+            SessionResultStore: セッション結果ストア
+
+        実装詳細:
+        - キャッシング: 同じインスタンスを再利用
+        - 環境変数対応: SESSION_STORE_MAX_BYTES, SESSION_STORE_TTL_SECONDS,
+          SESSION_STORE_SPILL_DIRから読み込み
+
+        """
+        if self._session_result_store is None:
+            from src.infrastructure.services.session_store import SessionResultStore
+
+            self._session_result_store = SessionResultStore()
+
+        return self._session_result_store
+
+    def get_job_checkpoint_store(
+        self,
+        output_root: str | None = None,
+    ) -> "JobCheckpointStore":
+        """JobCheckpointStoreのインスタンスを取得
+
+        Args:
+            output_root: ジョブディレクトリのルート（初回生成時のみ有効）
+                        Noneの場合は環境変数JOB_OUTPUT_ROOTまたはoutput
+
+        Returns:
+            JobCheckpointStore: ジョブチェックポイントストア
+
+        実装詳細:
+        - キャッシング: 同じインスタンスを再利用
+        - 環境変数対応: JOB_OUTPUT_ROOTから読み込み（デフォルト: output）
+
+        """
+        if self._job_checkpoint_store is None:
+            from src.infrastructure.services.job_checkpoint_store import (
+                JobCheckpointStore,
+            )
+
+            self._job_checkpoint_store = JobCheckpointStore(output_root)
+
+        return self._job_checkpoint_store
+
+    def get_artifact_store(self) -> "ArtifactStore":
+        """ArtifactStoreのインスタンスを取得
+
+        Returns:
+            ArtifactStore: コンテンツアドレス型の成果物ストア
+
+        実装詳細:
+        - キャッシング: 書き込みスレッドを共有するため同じインスタンスを再利用
+
+        """
+        if self._artifact_store is None:
+            from src.infrastructure.services.artifact_store import ArtifactStore
+
+            self._artifact_store = ArtifactStore()
+
+        return self._artifact_store
+
+    def get_llm_response_cache(self) -> "LLMResponseCache | None":
+        """LLMResponseCacheのインスタンスを取得
+
+        Returns:
+            LLMResponseCache: ディスク永続の応答キャッシュ
+            （環境変数LLM_CACHE_ENABLEDがfalseの場合はNone）
+
+        実装詳細:
+        - キャッシング: 同じインスタンスを再利用
+        - 環境変数対応: LLM_CACHE_PATH, LLM_CACHE_TTL_SECONDS,
+          LLM_CACHE_MAX_BYTESから読み込み
+
+        """
+        if os.environ.get("LLM_CACHE_ENABLED", "true").lower() in {"0", "false", "no"}:
+            return None
+
+        if self._llm_response_cache is None:
+            from src.infrastructure.services.llm_response_cache import LLMResponseCache
+
+            self._llm_response_cache = LLMResponseCache()
+
+        return self._llm_response_cache
+
+    def get_plan_cache(self) -> "PlanCache | None":
+        """PlanCacheのインスタンスを取得
+
+        Returns:
+            PlanCache: スキーマ指紋と要求文をキーにした計画のキャッシュ
+            （環境変数PLAN_CACHE_ENABLEDがfalseの場合はNone）
+
+        実装詳細:
+        - キャッシング: 同じインスタンスを再利用
+        - 環境変数対応: PLAN_CACHE_PATH, PLAN_CACHE_TTL_SECONDS,
+          PLAN_CACHE_MAX_ENTRIES, PLAN_CACHE_SIMILARITYから読み込み（既定は完全一致のみ）
+
+        """
+        if os.environ.get("PLAN_CACHE_ENABLED", "true").lower() in {"0", "false", "no"}:
+            return None
+
+        if self._plan_cache is None:
+            from src.infrastructure.services.plan_cache import PlanCache
+
+            self._plan_cache = PlanCache()
+
+        return self._plan_cache
+
+    def get_job_flight_registry(self) -> "JobFlightRegistry | None":
+        """JobFlightRegistryのインスタンスを取得
+
+        Returns:
+            JobFlightRegistry: 同時に開始された同一ジョブの相乗り（single-flight）
+            （環境変数JOB_COALESCING_ENABLEDがfalseの場合はNone）
+
+        """
+        if os.environ.get("JOB_COALESCING_ENABLED", "true").lower() in {"0", "false", "no"}:
+            return None
+
+        if self._job_flight_registry is None:
+            from src.infrastructure.services.job_flight_registry import (
+                JobFlightRegistry,
+            )
+
+            self._job_flight_registry = JobFlightRegistry()
+
+        return self._job_flight_registry
+
+    def get_llm_usage_tracker(self) -> "LLMUsageTracker":
+        """LLMUsageTrackerのインスタンスを取得
+
+        Returns:
+            LLMUsageTracker: LLM呼び出しのトークン数・レイテンシ・コストの集計
+
+        実装詳細:
+        - キャッシング: 同じインスタンスを再利用
+        - 環境変数対応: LLM_PRICE_TABLEで料金表を上書き
+
+        """
+        if self._llm_usage_tracker is None:
+            from src.infrastructure.services.llm_usage_tracker import LLMUsageTracker
+
+            self._llm_usage_tracker = LLMUsageTracker()
+
+        return self._llm_usage_tracker
+
+    def get_dataset_profile_service(self) -> "DatasetProfileService":
+        """DatasetProfileServiceのインスタンスを取得
+
+        Returns:
+            DatasetProfileService: ファイルの指紋毎に1回だけ作成するデータセットのプロファイル
+
+        実装詳細:
+        - プロセス全体のシングルトン（データプレビューとジョブで同じプロファイルを共有）
+        - 環境変数対応: DATASET_PROFILE_PERSIST, DATASET_PROFILE_CACHE_DIR,
+          DATASET_PROFILE_MEMORY_ENTRIESから読み込み
+
+        """
+        from src.infrastructure.services.dataset_profile import (
+            get_dataset_profile_service,
+        )
+
+        return get_dataset_profile_service()
+
+    def get_dataset_summarizer(self) -> "DatasetSummarizer":
+        """DatasetSummarizerのインスタンスを取得
+
+        Returns:
+            DatasetSummarizer: データセットのプロファイルをトークン上限内の要約にする
+
+        実装詳細:
+        - キャッシング: 同じインスタンスを再利用
+        - 環境変数対応: DATA_INFO_MAX_TOKENSから読み込み
+
+        """
+        if self._dataset_summarizer is None:
+            from src.infrastructure.services.dataset_summarizer import DatasetSummarizer
+
+            self._dataset_summarizer = DatasetSummarizer()
+
+        return self._dataset_summarizer
+
+    def get_template_registry(self) -> "TemplateRegistry":
+        """TemplateRegistryのインスタンスを取得
+
+        Returns:
+            TemplateRegistry: 共有のJinja環境とコンパイル済みプロンプトテンプレート
+
+        実装詳細:
+        - プロセス全体のシングルトン（初回取得時に src/prompts を一括コンパイル）
+        - 環境変数対応: TEMPLATE_BYTECODE_CACHE_DIR, TEMPLATE_AUTO_RELOADから読み込み
+
+        """
+        from src.infrastructure.template_loader import get_template_registry
+
+        return get_template_registry()
+
+    def get_async_loop_runner(self) -> "AsyncLoopRunner":
+        """AsyncLoopRunnerのインスタンスを取得
+
+        Returns:
+            AsyncLoopRunner: LLM呼び出しを集約する共有イベントループ
+
+        実装詳細:
+        - キャッシング: 全ジョブで同じイベントループ（= 同じ接続プール）を共有
+
+        """
+        if self._async_loop_runner is None:
+            from src.infrastructure.services.async_loop_runner import AsyncLoopRunner
+
+            self._async_loop_runner = AsyncLoopRunner()
+
+        return self._async_loop_runner
+
     def reset(self) -> None:
         """キャッシュをリセット
 
@@ -253,3 +492,14 @@ class DIContainer:
         """
         self._sandbox_repository = None
         self._llm_repository = None
+        self._session_result_store = None
+        self._job_checkpoint_store = None
+        self._artifact_store = None
+        self._llm_response_cache = None
+        self._plan_cache = None
+        self._job_flight_registry = None
+        if self._async_loop_runner is not None:
+            self._async_loop_runner.close()
+        self._async_loop_runner = None
+        self._llm_usage_tracker = None
+        self._dataset_summarizer = None
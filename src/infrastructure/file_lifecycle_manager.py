@@ -8,6 +8,8 @@ import time
 from pathlib import Path
 from typing import Set
 
+from src.infrastructure.services.dataset_profile import sidecar_path
+
 
 class FileLifecycleManager:
     """ファイルライフサイクル管理サービス
@@ -57,6 +59,8 @@ class FileLifecycleManager:
             try:
                 if file_path.exists() and file_path.is_file():
                     file_path.unlink()
+                    # データの隣に保存したプロファイルも削除
+                    sidecar_path(file_path).unlink(missing_ok=True)
                     # 成功した場合は追跡から削除
                     temp_files.discard(file_path)
             except (OSError, PermissionError):
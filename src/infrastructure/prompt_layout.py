@@ -0,0 +1,94 @@
+"""Prompt Layout
+
+プロバイダ側のプロンプトキャッシュ（先頭一致）が効くようにメッセージを並べる。
+
+1. 静的な指示: テンプレートをジョブに依存する値なしで描画したもの。
+   同じテンプレートなら全ジョブで同一のバイト列になる
+2. データセット情報: 同じデータからは同じバイト列になるよう正規化したもの。
+   同じジョブ内（計画・各タスクのコード生成・レポート）で共有される
+3. 可変のタスク内容: ユーザー要求・前回の実行結果等（呼び出し毎に異なる）
+
+設計原則:
+- 単一責任の原則（SRP）: メッセージの配置と正規化のみ
+- 決定的: 時刻・乱数・辞書順等に依存する値を先頭側に含めない
+"""
+
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Any
+
+from src.infrastructure.template_loader import render_template
+
+
+DATASET_HEADER = "## データセット情報"
+
+_instructions_cache: dict[tuple[str, int], str] = {}
+_instructions_lock = threading.Lock()
+
+
+def normalize_prompt_text(text: str) -> str:
+    """改行コード・行末の空白・Unicode正規化形式を揃える"""
+    text = unicodedata.normalize("NFC", text.replace("\r\n", "\n").replace("\r", "\n"))
+    return "\n".join(line.rstrip() for line in text.split("\n")).strip()
+
+
+def render_instructions(template_file: str) -> str:
+    """静的な指示（テンプレートを変数なしで描画）を取得
+
+    描画結果はファイルの更新時刻毎にキャッシュする。
+    """
+    path = Path(template_file)
+    key = (str(path.resolve()), path.stat().st_mtime_ns)
+    with _instructions_lock:
+        cached = _instructions_cache.get(key)
+    if cached is not None:
+        return cached
+
+    rendered = normalize_prompt_text(render_template(template_file))
+    with _instructions_lock:
+        _instructions_cache[key] = rendered
+    return rendered
+
+
+def dataset_message(data_info: str) -> dict[str, str] | None:
+    """データセット情報のsystemメッセージ（空の場合はNone）"""
+    normalized = normalize_prompt_text(data_info or "")
+    if not normalized:
+        return None
+    return {"role": "system", "content": f"{DATASET_HEADER}\n{normalized}"}
+
+
+def build_prompt_messages(
+    template_file: str,
+    data_info: str,
+    task_messages: list[dict[str, Any]],
+    instructions: str | None = None,
+) -> list[dict[str, Any]]:
+    """静的な指示 → データセット情報 → タスク内容 の順にメッセージを組み立てる
+
+    Args:
+        template_file: 指示のテンプレートファイルパス
+        data_info: データセット情報
+        task_messages: 可変のタスク内容（ユーザー要求・前回の実行結果等）
+        instructions: 描画済みの指示（切り詰め等を施した場合に指定）
+
+    Returns:
+        List[Dict[str, Any]]: OpenAI Chat API形式のメッセージリスト
+
+    """
+    messages: list[dict[str, Any]] = [
+        {
+            "role": "system",
+            "content": (
+                instructions
+                if instructions is not None
+                else render_instructions(template_file)
+            ),
+        },
+    ]
+    dataset = dataset_message(data_info)
+    if dataset is not None:
+        messages.append(dataset)
+    messages.extend(task_messages)
+    return messages
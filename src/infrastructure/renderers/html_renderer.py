@@ -4,7 +4,11 @@ Markdown コンテンツをHTMLに変換して出力
 """
 
 import base64
+import html
+import os
+import re
 import shutil
+import tempfile
 from pathlib import Path
 from .renderer_interface import ReportRenderer
 
@@ -14,6 +18,17 @@ except ImportError:
     markdown = None
 
 
+def _current_umask() -> int:
+    # os.umask は設定と同時にしか値を得られないため、読み取った値をすぐに戻す
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+# 一時ファイル（mkstemp は 0600 で作成）を通常のファイルと同じ権限にするため
+_FILE_MODE = 0o666 & ~_current_umask()
+
+
 class HTMLRenderer(ReportRenderer):
     """HTMLレンダラー具象クラス
 
@@ -33,16 +48,26 @@ class HTMLRenderer(ReportRenderer):
             OSError: ファイル操作でエラーが発生した場合
 
         """
-        if markdown is None:
-            raise ImportError("markdown library is required for HTML rendering")
-
-        # 出力ディレクトリの作成
         output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
+        html_content = self.to_html(content, output_path)
+        self.write_document(html_content, output_path)
+
+    def to_html(self, content: str, output_path: Path) -> str:
+        """MarkdownコンテンツをHTML断片に変換（ローカル画像はdata URIで埋め込む）
 
-        # シンプルなコードブロック処理
-        import re
-        import html
+        Args:
+            content: Markdownコンテンツ
+            output_path: 画像の相対パスの基準ディレクトリ
+
+        Returns:
+            str: <main> に挿入するHTML断片
+
+        Raises:
+            ImportError: markdownライブラリがインストールされていない場合
+
+        """
+        if markdown is None:
+            raise ImportError("markdown library is required for HTML rendering")
 
         # コードブロックを<pre><code>に変換
         def replace_code_block(match):
@@ -65,23 +90,73 @@ class HTMLRenderer(ReportRenderer):
             extensions=["tables"],
         )
 
-        html_content = self._inline_local_images(html_content, output_path)
+        return self._inline_local_images(html_content, output_path)
+
+    def write_document(
+        self,
+        body_content: str,
+        output_path: Path,
+        *,
+        status: str | None = None,
+        refresh_seconds: int | None = None,
+    ) -> None:
+        """HTML断片をreport.htmlとして書き出す
+
+        生成途中のレポートを読み込む利用者が書きかけのファイルを読まないよう、
+        一時ファイルへ書いてから置き換える。
+
+        Args:
+            body_content: <main> に挿入するHTML断片
+            output_path: 出力先ディレクトリパス
+            status: ヘッダーに表示する進捗（生成途中のレポートのみ）
+            refresh_seconds: ブラウザで開いた場合の自動再読み込み間隔（生成途中のレポートのみ）
+
+        Raises:
+            OSError: ファイル操作でエラーが発生した場合
+
+        """
+        # 出力ディレクトリの作成
+        output_path.mkdir(parents=True, exist_ok=True)
 
         # HTMLテンプレートの作成
-        full_html = self._create_html_template(html_content)
+        full_html = self._create_html_template(
+            body_content,
+            status=status,
+            refresh_seconds=refresh_seconds,
+        )
 
         # HTMLファイル出力
-        html_file = output_path / "report.html"
-        html_file.write_text(full_html, encoding="utf-8")
+        self._write_atomic(output_path / "report.html", full_html)
 
         # CSSファイルのコピー
-        self._copy_css_file(output_path)
-
-    def _create_html_template(self, body_content: str) -> str:
+        if not (output_path / "style.css").exists() or status is None:
+            self._copy_css_file(output_path)
+
+    @staticmethod
+    def _write_atomic(path: Path, text: str) -> None:
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".html")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as file:
+                file.write(text)
+            os.chmod(tmp_name, _FILE_MODE)
+            os.replace(tmp_name, path)
+        except BaseException:
+            Path(tmp_name).unlink(missing_ok=True)
+            raise
+
+    def _create_html_template(
+        self,
+        body_content: str,
+        *,
+        status: str | None = None,
+        refresh_seconds: int | None = None,
+    ) -> str:
         """HTMLテンプレートの作成
 
         Args:
             body_content: ボディに挿入するHTMLコンテンツ
+            status: ヘッダーに表示する進捗（生成途中のレポートのみ）
+            refresh_seconds: 自動再読み込み間隔（生成途中のレポートのみ）
 
         Returns:
             str: 完全なHTMLドキュメント
@@ -91,13 +166,23 @@ class HTMLRenderer(ReportRenderer):
 
         # 現在の日時を取得
         current_time = datetime.now().strftime("%Y年%m月%d日 %H:%M")
+        refresh_meta = (
+            f'\n    <meta http-equiv="refresh" content="{refresh_seconds}">'
+            if refresh_seconds
+            else ""
+        )
+        status_line = (
+            f'\n            <p class="report-status">{html.escape(status)}</p>'
+            if status
+            else ""
+        )
 
         return f"""<!DOCTYPE html>
 <html lang="ja">
 <head>
     <meta charset="utf-8">
     <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <meta name="generator" content="DataAnalysisAgent">
+    <meta name="generator" content="DataAnalysisAgent">{refresh_meta}
     <title>分析レポート</title>
     <link rel="stylesheet" href="style.css">
 </head>
@@ -105,7 +190,7 @@ class HTMLRenderer(ReportRenderer):
     <div class="container">
         <header>
             <h1>データ分析レポート</h1>
-            <p class="report-info">生成日時: {current_time}</p>
+            <p class="report-info">生成日時: {current_time}</p>{status_line}
         </header>
         <main>
             {body_content}
@@ -198,8 +283,6 @@ blockquote {
     def _inline_local_images(self, html_content: str, output_path: Path) -> str:
         """ローカル画像をdata URIに変換して埋め込む"""
 
-        import re
-
         pattern = re.compile(
             r"<img\s+([^>]*?)src=\"([^\"]+)\"([^>]*)>",
             re.IGNORECASE,
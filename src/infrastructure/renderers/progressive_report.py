@@ -0,0 +1,239 @@
+"""ProgressiveReportWriter
+
+分析ジョブの進行に合わせて report.html を書き足していくレポートライター。
+最終レポート（GenerateReportUseCase）の完成を待たずに、途中経過を利用者へ見せる。
+
+- 計画ができた時点: 要求文と計画したタスクの一覧（実行待ち）の骨組みを書き出す
+- タスクの実行完了: そのタスクのコード → 標準出力 → グラフの順にセクションを埋める
+- 仮説セクションの生成完了: タスクのセクション末尾に考察（LLMの仮説セクション）を追加する
+- 最終レポートの完成: close() 以降は書き込まない（最終レポートで置き換える）
+- ジョブの失敗: abort() で中断した旨を表示し、自動再読み込みを止めた版を書いて終える
+
+更新毎に report.html 全体を一時ファイルへ書いてから置き換えるため、読み込み側は
+書きかけのファイルを読まない。各セクションのHTML（画像のdata URIを含む）は
+変更されたセクションのみ変換し直す。
+
+設計原則:
+- 単一責任の原則（SRP）: 途中経過の組み立てのみ（HTMLへの変換・書き出しは HTMLRenderer）
+- スレッドセーフ: ジョブスレッドとイベントループ（セクション生成の完了通知）から同時に利用可能
+- 失敗の隔離: 書き込みに失敗しても分析ジョブは止めない
+"""
+
+import html
+import logging
+import re
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from src.domain.entities.data_thread import DataThread
+
+from .html_renderer import HTMLRenderer
+
+
+logger = logging.getLogger(__name__)
+
+# ブラウザで開いた場合の自動再読み込み間隔（秒）
+REFRESH_SECONDS = 5
+# セクションに載せる標準出力の最大文字数（超過分は末尾を省略）
+_MAX_STDOUT_CHARS = 4000
+_IMAGE_REFERENCE = re.compile(r"!\[[^\]]*\]\([^)]+\)")
+
+
+@dataclass
+class _TaskSection:
+    """1タスク分のセクション"""
+
+    title: str
+    result: str = ""  # コード・標準出力・グラフ（Markdown）
+    narrative: str = ""  # 考察（Markdown）
+    completed: bool = False
+    html: str | None = None  # 変換済みのHTML（変更時に破棄）
+
+
+class ProgressiveReportWriter:
+    """途中経過のレポートを report.html へ書き足す
+
+    使用方法:
+        ```python
+        writer = ProgressiveReportWriter(output_dir)
+        writer.start(user_request, plan.tasks)
+        writer.complete_task(1, data_thread, code=generated_code)
+        writer.set_narrative(1, section_markdown)
+        writer.close()  # 以降は最終レポートが report.html を置き換える
+        # 失敗した場合は writer.abort(f"失敗: {error}")
+        ```
+    """
+
+    def __init__(self, output_dir: str, renderer: HTMLRenderer | None = None) -> None:
+        """コンストラクタ
+
+        Args:
+            output_dir: 出力先ディレクトリパス
+            renderer: HTMLへの変換・書き出し（省略時は HTMLRenderer）
+
+        """
+        self.output_path = Path(output_dir)
+        self.renderer = renderer or HTMLRenderer()
+        self._request_html = ""
+        self._sections: dict[int, _TaskSection] = {}
+        self._closed = False
+        self._aborted = False
+        # 最後に書き出したreport.htmlの (inode, 更新時刻)。書き出しは毎回ファイルを
+        # 置き換えるため、最終レポートで置き換えられたかをこれで判定する
+        self._written_stamp: tuple[int, int] | None = None
+        self._lock = threading.Lock()
+
+    def start(self, user_request: str, tasks: list[Any] | None = None) -> None:
+        """要求文と計画したタスクの一覧で骨組みを書き出す（タスクは後から追加可能）"""
+        with self._lock:
+            self._request_html = self._to_html(f"**分析要求**: {user_request}")
+            for index, task in enumerate(tasks or [], start=1):
+                self._sections.setdefault(index, _TaskSection(self._task_title(index, task)))
+            self._write()
+
+    def add_task(self, index: int, task: Any) -> None:
+        """計画したタスクを実行待ちとして追加（ストリーミング生成中の計画向け）"""
+        with self._lock:
+            if index in self._sections:
+                return
+            self._sections[index] = _TaskSection(self._task_title(index, task))
+            self._write()
+
+    def complete_task(
+        self,
+        index: int,
+        data_thread: DataThread,
+        code: str | None = None,
+    ) -> None:
+        """タスクの実行結果（コード・標準出力・グラフ）でセクションを埋める
+
+        再実行した場合は同じタスク番号で呼び直すと結果を置き換える。
+
+        Args:
+            index: タスク番号（1始まり）
+            data_thread: 実行結果
+            code: 表示するコード（省略時は実行したコード全体）
+
+        """
+        lines = [f"**実行状態**: {'エラー' if data_thread.error else '完了'}"]
+        shown_code = (code if code is not None else data_thread.code or "").strip()
+        if shown_code:
+            lines.extend(["", "#### コード", "```python", shown_code, "```"])
+        stdout = (data_thread.stdout or "").strip()
+        if len(stdout) > _MAX_STDOUT_CHARS:
+            stdout = stdout[:_MAX_STDOUT_CHARS] + "\n…（以降省略）"
+        if stdout:
+            lines.extend(["", "#### 出力", "```text", stdout, "```"])
+        if data_thread.error:
+            lines.extend(["", "#### エラー", "```text", str(data_thread.error).strip(), "```"])
+        images = [Path(image).name for image in data_thread.pathes.get("images", [])]
+        if images:
+            lines.extend(["", "#### グラフ"])
+            lines.extend(f"![{name}]({name})" for name in images)
+
+        with self._lock:
+            section = self._sections.setdefault(
+                index,
+                _TaskSection(self._task_title(index, data_thread.user_request)),
+            )
+            section.result = "\n".join(lines)
+            section.completed = True
+            section.html = None
+            self._write()
+
+    def set_narrative(self, index: int, markdown_text: str) -> None:
+        """タスクの考察（仮説セクション）を追加（グラフは実行結果に表示済みのため除く）"""
+        with self._lock:
+            section = self._sections.get(index)
+            if section is None:
+                return
+            section.narrative = _IMAGE_REFERENCE.sub("", markdown_text).strip()
+            section.html = None
+            self._write()
+
+    def close(self) -> None:
+        """以降の書き込みを止める（最終レポートで置き換えるため）"""
+        with self._lock:
+            self._closed = True
+
+    def abort(self, status: str) -> None:
+        """ジョブの失敗・中断を表示した最終版を書き出し、以降の書き込みを止める
+
+        close() の後（最終レポートの生成中）に失敗した場合も書き出す。
+        最終レポートで既に置き換えられている場合は何もしない。
+
+        Args:
+            status: ヘッダーに表示する状態（例: "失敗: エラー内容"）
+
+        """
+        with self._lock:
+            if self._aborted or self._written_stamp is None or self._replaced():
+                self._closed = self._aborted = True
+                return
+            self._closed = False
+            self._write(status=status, refresh=False)
+            self._closed = self._aborted = True
+
+    def _replaced(self) -> bool:
+        try:
+            return self._stamp() != self._written_stamp
+        except OSError:
+            return False
+
+    def _stamp(self) -> tuple[int, int]:
+        stat = (self.output_path / "report.html").stat()
+        return stat.st_ino, stat.st_mtime_ns
+
+    def _write(self, status: str | None = None, *, refresh: bool = True) -> None:
+        if self._closed:
+            return
+        body = [self._request_html]
+        for index in sorted(self._sections):
+            section = self._sections[index]
+            if section.html is None:
+                section.html = self._render_section(index, section)
+            body.append(section.html)
+        if status is None:
+            completed = sum(section.completed for section in self._sections.values())
+            status = (
+                f"生成中: {completed}/{len(self._sections)} タスク完了"
+                if self._sections
+                else "生成中: 分析計画を作成しています"
+            )
+        try:
+            self.renderer.write_document(
+                "\n".join(body),
+                self.output_path,
+                status=status,
+                refresh_seconds=REFRESH_SECONDS if refresh else None,
+            )
+            self._written_stamp = self._stamp()
+        except (ImportError, OSError) as exc:
+            # 途中経過は補助的なもの。最終レポートの生成は続ける
+            logger.warning("途中経過のレポートを書き出せません: %s", exc)
+
+    def _render_section(self, index: int, section: _TaskSection) -> str:
+        parts = [f"## {section.title}"]
+        if not section.completed:
+            parts.append("*実行待ち*")
+        if section.result:
+            parts.append(section.result)
+        if section.narrative:
+            parts.append(section.narrative)
+        content = self._to_html("\n\n".join(parts))
+        return f'<section id="task-{index}">\n{content}\n</section>'
+
+    def _to_html(self, markdown_text: str) -> str:
+        try:
+            return self.renderer.to_html(markdown_text, self.output_path)
+        except ImportError:
+            # markdownライブラリが無い場合も文章は読めるようにする
+            return f"<pre>{html.escape(markdown_text)}</pre>"
+
+    @staticmethod
+    def _task_title(index: int, task: Any) -> str:
+        hypothesis = getattr(task, "hypothesis", task) or ""
+        first_line = str(hypothesis).strip().split("\n", 1)[0]
+        return f"タスク{index}: {first_line}" if first_line else f"タスク{index}"
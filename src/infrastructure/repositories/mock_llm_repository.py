@@ -12,6 +12,10 @@ class MockLLMRepository(LLMRepository):
     def __init__(self):
         pass
 
+    @property
+    def is_online(self) -> bool:
+        return False
+
     def generate_text(self, prompt: str, max_tokens: int = 1000) -> str:
         """テスト用の固定レスポンスを返す"""
         if "分析コード" in prompt or "matplotlib" in prompt or "seaborn" in prompt:
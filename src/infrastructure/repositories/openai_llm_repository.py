@@ -8,23 +8,154 @@ t-wadaさんのTDD原則: テストが通る最小限の実装
 - デプロイメント名: activarch-test-genpptx
 """
 
+import asyncio
+import inspect
 import logging
 import os
+import threading
+import time
+import weakref
 from typing import Any
-from collections.abc import Generator
+from collections.abc import AsyncGenerator, Awaitable, Callable, Generator
 
+from pydantic import BaseModel, ValidationError
+
+from src.domain.entities.llm_response import RULE_BASED_FALLBACK_MODEL, LLMResponse
 from src.domain.repositories.llm_repository import LLMRepository
+from src.infrastructure.services.llm_hedging import (
+    RequestHedger,
+    get_request_hedger,
+)
+from src.infrastructure.services.llm_rate_limiter import (
+    DeploymentGuard,
+    DeploymentGuardRegistry,
+    estimate_prompt_tokens,
+    estimate_request_tokens,
+    get_deployment_guards,
+    is_rate_limit_error,
+    is_retryable_error,
+    retry_after_seconds,
+)
+from src.infrastructure.services.llm_response_cache import LLMResponseCache
+from src.infrastructure.services.llm_router import (
+    ModelRouter,
+    RouteConfig,
+    get_model_router,
+)
+from src.infrastructure.services.llm_usage_tracker import (
+    LLMUsageTracker,
+    current_usage_tags,
+)
 
 # Azure OpenAI用の遅延インポート
 try:
-    from openai import AzureOpenAI
+    from openai import AsyncAzureOpenAI, AzureOpenAI
 except ImportError:
     AzureOpenAI = None  # type: ignore
+    AsyncAzureOpenAI = None  # type: ignore
+
+# parseと同じstrictなJSONスキーマをストリーミングでも使う（openaiの非公開API）。
+# 移動・削除された場合はストリーミングの構造化出力のみ簡易スキーマへ切り替える
+try:
+    from openai.lib._parsing._completions import type_to_response_format_param
+except ImportError:
+    type_to_response_format_param = None
 
 
 logger = logging.getLogger(__name__)
 
 
+def _client_settings() -> dict[str, Any]:
+    """Azure OpenAI クライアントの共通設定（環境変数で調整可能）
+
+    - LLM_HTTP_TIMEOUT: 1リクエストのタイムアウト秒数（既定: 120）
+
+    接続はクライアント毎に保持・再利用され、同時接続数は LLM_MAX_IN_FLIGHT で抑える。
+    httpxの設定オブジェクトはopenaiのバージョンで受け付ける形が変わるため渡さない。
+    """
+    return {
+        "timeout": float(os.environ.get("LLM_HTTP_TIMEOUT", "120")),
+        # リトライはレート制御と合わせて本クラスで行う
+        "max_retries": 0,
+    }
+
+
+class _AsyncClientState:
+    """イベントループ毎の非同期クライアントと同時実行セマフォ
+
+    httpxの非同期接続とasyncio.Semaphoreは生成したループに束縛されるため、
+    ループ単位で保持する（通常は共有ループ1つ分のみ生成される）。
+    """
+
+    def __init__(self, client: Any, max_in_flight: int) -> None:
+        self.client = client
+        self.semaphore = asyncio.Semaphore(max_in_flight)
+
+
+class _StreamAccounting:
+    """ストリーミング応答の本文・最初のチャンクまでの時間・usageを集める"""
+
+    def __init__(self, messages: list[dict[str, str]], model: str) -> None:
+        self.messages = messages
+        self.model = model
+        self.started_at = time.perf_counter()
+        self.first_token_at: float | None = None
+        self.parts: list[str] = []
+        self.usage: Any = None
+
+    def feed(self, chunk: Any) -> str | None:
+        """チャンクを記録し、利用者へ渡すテキストを返す"""
+        if getattr(chunk, "model", None):
+            self.model = chunk.model
+        if getattr(chunk, "usage", None) is not None:
+            self.usage = chunk.usage
+        # Azureはコンテンツフィルタ結果のみのチャンク（choices空）を返すことがある
+        if not chunk.choices or not chunk.choices[0].delta.content:
+            return None
+        if self.first_token_at is None:
+            self.first_token_at = time.perf_counter()
+        text = chunk.choices[0].delta.content
+        self.parts.append(text)
+        return text
+
+    def to_llm_response(self) -> LLMResponse:
+        content = "".join(self.parts)
+        usage_estimated = self.usage is None
+        if usage_estimated:
+            input_tokens = estimate_prompt_tokens(self.messages)
+            output_tokens = len(content) // 3
+            cached_tokens = 0
+        else:
+            input_tokens, output_tokens, cached_tokens = _usage_counts(self.usage)
+        return LLMResponse(
+            messages=self.messages,
+            content=content,
+            model=self.model,
+            created_at=int(time.time()),
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_input_tokens=cached_tokens,
+            latency_seconds=round(time.perf_counter() - self.started_at, 4),
+            time_to_first_token=(
+                round(self.first_token_at - self.started_at, 4)
+                if self.first_token_at is not None
+                else None
+            ),
+            usage_estimated=usage_estimated,
+        )
+
+
+def _usage_counts(usage: Any) -> tuple[int, int, int]:
+    """usageから (入力, 出力, キャッシュ済み入力) トークン数を取り出す"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    return (
+        int(getattr(usage, "prompt_tokens", 0) or 0),
+        int(getattr(usage, "completion_tokens", 0) or 0),
+        int(cached),
+    )
+
+
 class OpenAILLMRepository(LLMRepository):
     """Azure OpenAI LLM実装
 
@@ -39,14 +170,36 @@ class OpenAILLMRepository(LLMRepository):
     - APIキー: AZURE_OPENAI_API_KEY環境変数から取得
     """
 
-    def __init__(self, api_key: str | None = None, endpoint: str | None = None):
+    def __init__(
+        self,
+        api_key: str | None = None,
+        endpoint: str | None = None,
+        response_cache: LLMResponseCache | None = None,
+        guards: DeploymentGuardRegistry | None = None,
+        usage_tracker: LLMUsageTracker | None = None,
+        router: ModelRouter | None = None,
+        hedger: RequestHedger | None = None,
+    ):
         """コンストラクタ
 
         Args:
             api_key: Azure OpenAI APIキー（省略時は環境変数から取得）
             endpoint: Azure OpenAI エンドポイント（省略時は環境変数から取得）
+            response_cache: 応答キャッシュ（省略時はキャッシュしない）
+            guards: デプロイメント毎のレート制御・サーキットブレーカー
+                （省略時はプロセス共有のレジストリ）
+            usage_tracker: トークン数・レイテンシ・コストの記録先（省略時は記録しない）
+            router: ステージ毎の送信先デプロイメントの振り分け
+                （省略時はプロセス共有のルーター）
+            hedger: 応答の遅い呼び出しをヘッジする判断
+                （省略時はプロセス共有。環境変数LLM_HEDGE_ENABLEDで有効化）
 
         """
+        self.response_cache = response_cache
+        self.guards = guards or get_deployment_guards()
+        self.usage_tracker = usage_tracker
+        self.router = router or get_model_router()
+        self.hedger = hedger or get_request_hedger()
         # Azure OpenAI設定
         self.api_key = api_key or os.environ.get("AZURE_OPENAI_API_KEY")
         self.endpoint = endpoint or os.environ.get("AZURE_OPENAI_ENDPOINT")
@@ -56,9 +209,18 @@ class OpenAILLMRepository(LLMRepository):
         )
         self.deployment_name = os.environ.get(
             "AZURE_OPENAI_DEPLOYMENT_NAME", "activarch-test-genpptx",
-        )  # 環境変数から取得
+        )  # 環境変数から取得（ルートが設定されていないステージの送信先）
         self._offline_reason: str | None = None
 
+        # 同時に送信中のリクエスト数の上限（同期・非同期それぞれに適用）
+        self.max_in_flight = int(os.environ.get("LLM_MAX_IN_FLIGHT", "16"))
+        self._in_flight = threading.BoundedSemaphore(self.max_in_flight)
+        self._async_states: weakref.WeakKeyDictionary[
+            asyncio.AbstractEventLoop,
+            _AsyncClientState,
+        ] = weakref.WeakKeyDictionary()
+        self._async_lock = threading.Lock()
+
         # Azure OpenAI クライアントの初期化
         if AzureOpenAI and self.api_key and self.endpoint:
             try:
@@ -66,6 +228,7 @@ class OpenAILLMRepository(LLMRepository):
                     api_key=self.api_key,
                     api_version=self.api_version,
                     azure_endpoint=self.endpoint,
+                    **_client_settings(),
                 )
             except Exception as exc:  # noqa: BLE001
                 logger.warning("Azure OpenAI クライアント初期化に失敗しました: %s", exc)
@@ -84,6 +247,11 @@ class OpenAILLMRepository(LLMRepository):
                 self._offline_reason or "不明",
             )
 
+    @property
+    def is_online(self) -> bool:
+        """Azure OpenAIへ接続しているか（Falseはルールベースのフォールバック）"""
+        return self._client is not None
+
     def generate(
         self,
         messages: list[dict[str, str]],
@@ -91,68 +259,670 @@ class OpenAILLMRepository(LLMRepository):
         temperature: float = 0.7,
         max_tokens: int | None = None,
         response_format: type | None = None,
-    ) -> Any:
+        *,
+        use_cache: bool = True,
+    ) -> LLMResponse:
         """Azure OpenAIから応答を生成
 
         Args:
             messages: メッセージのリスト（役割とコンテンツ）
-            model: モデル名（デプロイメント名で上書きされます）
+            model: モデル名（ルーターが選んだデプロイメント名で上書きされます）
             temperature: ランダム性（0.0-2.0）
             max_tokens: 最大トークン数（省略可）
             response_format: 応答フォーマット（Pydanticモデル、省略可）
+            use_cache: Falseの場合は応答キャッシュを参照せずに再生成する
 
         Returns:
-            str: LLM応答テキスト
+            LLMResponse: 応答本文（テキストまたはresponse_formatのインスタンス）と
+            トークン数・レイテンシ・コスト
 
         実装詳細:
-        - Azure OpenAIではmodel引数をdeployment_nameに置き換え
-        - デプロイメント名は固定: activarch-test-genpptx
+        - Azure OpenAIではmodel引数を、現在のステージ（llm_usage_scopeのstage）の
+          ルートで選ばれたデプロイメント名に置き換え（ルートが無ければdeployment_name）
+        - SLO違反・ブレーカーのオープン中はルートの次のデプロイメントへ送信する
         - response.choices[0].message.contentを返す
         - response_formatが指定されている場合はStructured Outputsを使用
+        - 応答キャッシュがあれば同一リクエストはAPIを呼ばずに復元する
+          （ルールベースのフォールバック応答はキャッシュしない）
+        - 使用量トラッカーがあれば呼び出し毎に記録する
 
         """
+        started_at = time.perf_counter()
         if not self._client:
-            return self._generate_offline_response(messages, response_format)
+            return self._offline_llm_response(messages, response_format, started_at)
+
+        route = self._current_route()
+        cache_key = self._cache_key(
+            messages,
+            model,
+            temperature,
+            max_tokens,
+            response_format,
+            route,
+        )
+        if cache_key and use_cache:
+            hit, cached = self.response_cache.get(cache_key, response_format)
+            if hit:
+                logger.debug("LLM応答キャッシュヒット: %s", cache_key[:12])
+                return self._cached_llm_response(messages, cached, model, started_at)
+
+        with self.router.slot(route), self._in_flight:
+            online, api_response = self._call_routed(
+                route,
+                lambda deployment: self._generate_online(
+                    messages,
+                    temperature,
+                    max_tokens,
+                    response_format,
+                    deployment,
+                ),
+                estimate_request_tokens(messages, max_tokens),
+            )
+        if not online:
+            return self._offline_llm_response(messages, response_format, started_at)
+
+        content = self._extract_content(api_response, response_format)
+        if cache_key:
+            # 再生成（use_cache=False）の結果も保存し、次回以降はそれを返す
+            self.response_cache.put(cache_key, content)
+        return self._record(
+            self._build_llm_response(messages, content, model, api_response, started_at),
+        )
+
+    async def agenerate(
+        self,
+        messages: list[dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+        response_format: type | None = None,
+        *,
+        use_cache: bool = True,
+    ) -> LLMResponse:
+        """Azure OpenAIから応答を生成（非同期版）
+
+        AsyncAzureOpenAIでイベントループ上から直接送信する。
+        接続プールとセマフォ（LLM_MAX_IN_FLIGHT）はループ内の全呼び出しで共有。
+        キャッシュ・フォールバック・使用量記録の扱いは同期版generateと同じ。
+        ヘッジが有効なステージでは、しきい値までに応答が無ければ2本目を送信し、
+        先に得られた有効な応答を採用する（同期版はキャンセルできないためヘッジしない）。
+
+        """
+        started_at = time.perf_counter()
+        if not self._client:
+            return self._offline_llm_response(messages, response_format, started_at)
+
+        route = self._current_route()
+        cache_key = self._cache_key(
+            messages,
+            model,
+            temperature,
+            max_tokens,
+            response_format,
+            route,
+        )
+        if cache_key and use_cache:
+            hit, cached = self.response_cache.get(cache_key, response_format)
+            if hit:
+                logger.debug("LLM応答キャッシュヒット: %s", cache_key[:12])
+                return self._cached_llm_response(messages, cached, model, started_at)
+
+        state = self._get_async_state()
+
+        async def _call(deployment: str) -> Any:
+            params = self._build_request_params(
+                messages,
+                temperature,
+                max_tokens,
+                response_format,
+                deployment,
+            )
+            if self._is_pydantic_format(response_format):
+                return await state.client.beta.chat.completions.parse(**params)
+            return await state.client.chat.completions.create(**params)
+
+        async with self.router.aslot(route), state.semaphore:
+            if self.hedger.applies_to(route.stage):
+                online, api_response = await self._acall_hedged(
+                    route,
+                    _call,
+                    estimate_request_tokens(messages, max_tokens),
+                    response_format,
+                    state.semaphore,
+                )
+            else:
+                online, api_response = await self._acall_routed(
+                    route,
+                    _call,
+                    estimate_request_tokens(messages, max_tokens),
+                )
+        if not online:
+            return self._offline_llm_response(messages, response_format, started_at)
+
+        content = self._extract_content(api_response, response_format)
+        if cache_key:
+            self.response_cache.put(cache_key, content)
+        return self._record(
+            self._build_llm_response(messages, content, model, api_response, started_at),
+        )
+
+    def _current_route(self) -> RouteConfig:
+        """現在のステージ（llm_usage_scopeのstageタグ）のルート"""
+        return self.router.route_for(
+            current_usage_tags().get("stage"),
+            self.deployment_name,
+        )
+
+    def _call_routed(
+        self,
+        route: RouteConfig,
+        call: Callable[[str], Any],
+        estimated_tokens: int,
+    ) -> tuple[bool, Any]:
+        """ルートの候補デプロイメントへ順に送信する
+
+        ブレーカーがオープンしてフォールバック扱いになった場合、または
+        リトライ対象のエラーでリトライを使い切った場合は次の候補へ進む。
+        全ての候補で応答を得られなければ (False, None) を返す
+        （最後の候補のエラーはそのまま送出する）。
+        """
+        candidates = self.router.candidates(route)
+        for position, deployment in enumerate(candidates):
+            try:
+                online, result = self._call_guarded(
+                    lambda: call(deployment),
+                    estimated_tokens,
+                    deployment,
+                )
+            except Exception as exc:
+                if not self._should_try_next(candidates, position, exc):
+                    raise
+                continue
+            if online:
+                return True, result
+        return False, None
+
+    async def _acall_routed(
+        self,
+        route: RouteConfig,
+        call: Callable[[str], Awaitable[Any]],
+        estimated_tokens: int,
+    ) -> tuple[bool, Any]:
+        """_call_routedの非同期版"""
+        candidates = self.router.candidates(route)
+        for position, deployment in enumerate(candidates):
+            try:
+                online, result = await self._acall_guarded(
+                    lambda: call(deployment),
+                    estimated_tokens,
+                    deployment,
+                )
+            except Exception as exc:
+                if not self._should_try_next(candidates, position, exc):
+                    raise
+                continue
+            if online:
+                return True, result
+        return False, None
+
+    async def _acall_hedged(
+        self,
+        route: RouteConfig,
+        call: Callable[[str], Awaitable[Any]],
+        estimated_tokens: int,
+        response_format: type | None,
+        semaphore: asyncio.Semaphore,
+    ) -> tuple[bool, Any]:
+        """しきい値までに応答が無ければ2本目を送り、先に得た有効な応答を採用する
+
+        2本目はルートの次のデプロイメント（LLM_HEDGE_TO_FALLBACK=false または
+        候補が1つなら同じデプロイメント）へ送る。同時送信枠に空きが無い場合と、
+        ヘッジの割合が上限に達した場合は2本目を送らずに1本目を待つ。
+        採用されなかった側はキャンセルする。
+        """
+        started_at = time.perf_counter()
+        primary = asyncio.ensure_future(
+            self._acall_routed(route, call, estimated_tokens),
+        )
+        primary_finished_at: list[float] = []
+        primary.add_done_callback(
+            lambda _: primary_finished_at.append(time.perf_counter()),
+        )
+        tasks = [primary]
+        try:
+            delay = self.hedger.delay_for(route.stage)
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or semaphore.locked() or not self.hedger.try_acquire():
+                return await primary
+
+            candidates = self.router.candidates(route)
+            deployment = (
+                candidates[1]
+                if self.hedger.to_fallback and len(candidates) > 1
+                else candidates[0]
+            )
+            logger.info(
+                "LLM呼び出しが%.1f秒以内に応答しないため %s へヘッジします（ステージ: %s）",
+                delay,
+                deployment,
+                route.stage,
+            )
+
+            async def _hedge() -> tuple[bool, Any]:
+                async with semaphore:
+                    return await self._acall_guarded(
+                        lambda: call(deployment),
+                        estimated_tokens,
+                        deployment,
+                    )
+
+            hedge = asyncio.ensure_future(_hedge())
+            tasks.append(hedge)
+            return await self._first_valid(tasks, response_format, hedge)
+        finally:
+            primary_finished = primary.done() and not primary.cancelled()
+            cancelled_at = time.perf_counter()
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            if primary_finished:
+                # 応答を受信した1本目のみ完了したレイテンシとして記録（失敗は記録しない）
+                if primary.exception() is None:
+                    finished_at = (
+                        primary_finished_at[0] if primary_finished_at else cancelled_at
+                    )
+                    self.hedger.observe(route.stage, finished_at - started_at)
+            elif len(tasks) > 1:
+                # 2本目を採用してキャンセルした1本目は、実際のレイテンシの下限として記録
+                self.hedger.observe(
+                    route.stage,
+                    cancelled_at - started_at,
+                    finished=False,
+                )
+
+    async def _first_valid(
+        self,
+        tasks: list[asyncio.Future],
+        response_format: type | None,
+        hedge: asyncio.Future,
+    ) -> tuple[bool, Any]:
+        """先に完了した有効な応答を返す（全て失敗した場合は最初のエラーを送出）"""
+        pending = set(tasks)
+        first_error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is not None:
+                    first_error = first_error or task.exception()
+                    continue
+                online, result = task.result()
+                if online and self._extract_content(result, response_format) is not None:
+                    if task is hedge:
+                        self.hedger.record_win()
+                    return True, result
+        if first_error is not None:
+            raise first_error
+        return False, None
+
+    @staticmethod
+    def _should_try_next(candidates: list[str], position: int, exc: Exception) -> bool:
+        """失敗した候補の次へ進むか（リトライ対象のエラーで、後続の候補がある場合）"""
+        if position + 1 >= len(candidates) or not is_retryable_error(exc):
+            return False
+        logger.warning(
+            "デプロイメント %s で応答を得られないため %s へ送信します: %s",
+            candidates[position],
+            candidates[position + 1],
+            exc,
+        )
+        return True
+
+    def _call_guarded(
+        self,
+        call: Callable[[], Any],
+        estimated_tokens: int,
+        deployment: str,
+    ) -> tuple[bool, Any]:
+        """レート制御・リトライ・サーキットブレーカー付きでAPIを呼び出す
+
+        Returns:
+            (APIから応答を得たか, 応答)。Falseの場合、呼び出し側は
+            ルールベースのフォールバックへ切り替える
+
+        Raises:
+            リトライ対象外のエラー、またはリトライを使い切ったエラー
+            （ブレーカーがオープンした場合はフォールバック扱い）
+
+        送信1回毎のレイテンシと成否をルーターへ記録する
+        （ストリーミングは応答ヘッダーを受け取るまでの時間）。
+
+        """
+        guard = self.guards.get(deployment)
+        attempt = 0
+        while True:
+            if not guard.breaker.allow_request():
+                return self._fallback_for_open_breaker(guard)
+            guard.limiter.acquire(estimated_tokens)
+            sent_at = time.perf_counter()
+            try:
+                result = call()
+            except Exception as exc:
+                self.router.record(deployment, time.perf_counter() - sent_at, ok=False)
+                delay = self._handle_call_error(guard, exc, attempt)
+                if delay is None:
+                    if guard.breaker.state == guard.breaker.OPEN:
+                        return self._fallback_for_open_breaker(guard)
+                    raise
+                attempt += 1
+                time.sleep(delay)
+                continue
+            self.router.record(deployment, time.perf_counter() - sent_at, ok=True)
+            guard.breaker.record_success()
+            return True, result
+
+    async def _acall_guarded(
+        self,
+        call: Callable[[], Awaitable[Any]],
+        estimated_tokens: int,
+        deployment: str,
+    ) -> tuple[bool, Any]:
+        """_call_guardedの非同期版（待機はイベントループ上で行う）"""
+        guard = self.guards.get(deployment)
+        attempt = 0
+        while True:
+            if not guard.breaker.allow_request():
+                return self._fallback_for_open_breaker(guard)
+            await guard.limiter.aacquire(estimated_tokens)
+            sent_at = time.perf_counter()
+            try:
+                result = await call()
+            except asyncio.CancelledError:
+                # ヘッジで採用されなかった等。ハーフオープンの試行枠を返す
+                guard.breaker.cancel_probe()
+                raise
+            except Exception as exc:
+                self.router.record(deployment, time.perf_counter() - sent_at, ok=False)
+                delay = self._handle_call_error(guard, exc, attempt)
+                if delay is None:
+                    if guard.breaker.state == guard.breaker.OPEN:
+                        return self._fallback_for_open_breaker(guard)
+                    raise
+                attempt += 1
+                await asyncio.sleep(delay)
+                continue
+            self.router.record(deployment, time.perf_counter() - sent_at, ok=True)
+            guard.breaker.record_success()
+            return True, result
+
+    def _handle_call_error(
+        self,
+        guard: DeploymentGuard,
+        exc: Exception,
+        attempt: int,
+    ) -> float | None:
+        """API呼び出しの失敗を記録し、リトライまでの待機秒数を返す
+
+        Returns:
+            待機秒数。リトライしない場合はNone
+
+        """
+        if not is_retryable_error(exc):
+            # サーバーは応答している（400等）ためブレーカーの失敗には数えない
+            guard.breaker.record_success()
+            return None
+
+        policy = self.guards.retry_policy
+        retry_after = retry_after_seconds(exc)
+        if is_rate_limit_error(exc):
+            guard.rate_limited += 1
+            # 他スレッドの送信も止め、Retry-After明けに一斉再送しないようにする
+            guard.limiter.pause(retry_after or policy.base_delay)
+
+        if attempt >= policy.max_retries:
+            guard.breaker.record_failure()
+            logger.warning(
+                "LLM呼び出しのリトライ上限に達しました (%s): %s",
+                guard.deployment,
+                exc,
+            )
+            return None
+
+        guard.retries += 1
+        delay = policy.compute_delay(attempt, retry_after)
+        logger.info(
+            "LLM呼び出しをリトライします (%s, %d回目, %.1f秒後): %s",
+            guard.deployment,
+            attempt + 1,
+            delay,
+            exc,
+        )
+        return delay
+
+    def _fallback_for_open_breaker(self, guard: DeploymentGuard) -> tuple[bool, Any]:
+        guard.fallbacks += 1
+        logger.warning(
+            "デプロイメント %s が飽和しているため、フォールバックを使用します",
+            guard.deployment,
+        )
+        return False, None
+
+    def _record(self, response: LLMResponse) -> LLMResponse:
+        """使用量トラッカーへ記録（コストはトラッカーの料金表で算出される）"""
+        if self.usage_tracker is not None:
+            self.usage_tracker.record(response)
+        return response
+
+    def _build_llm_response(
+        self,
+        messages: list[dict[str, str]],
+        content: Any,
+        model: str,
+        api_response: Any,
+        started_at: float,
+    ) -> LLMResponse:
+        usage = getattr(api_response, "usage", None)
+        input_tokens, output_tokens, cached_tokens = _usage_counts(usage)
+        return LLMResponse(
+            messages=messages,
+            content=content if content is not None else "",
+            model=getattr(api_response, "model", None) or model,
+            created_at=int(getattr(api_response, "created", None) or time.time()),
+            input_tokens=input_tokens,
+            output_tokens=output_tokens,
+            cached_input_tokens=cached_tokens,
+            latency_seconds=round(time.perf_counter() - started_at, 4),
+            usage_estimated=usage is None,
+        )
+
+    def _cached_llm_response(
+        self,
+        messages: list[dict[str, str]],
+        content: Any,
+        model: str,
+        started_at: float,
+    ) -> LLMResponse:
+        """応答キャッシュから復元した応答（APIを呼んでいないためトークン・コストは0）"""
+        response = LLMResponse(
+            messages=messages,
+            content=content,
+            model=model,
+            created_at=int(time.time()),
+            input_tokens=0,
+            output_tokens=0,
+            latency_seconds=round(time.perf_counter() - started_at, 4),
+            cache_hit=True,
+        )
+        response.cost = 0.0
+        return self._record(response)
+
+    def _offline_llm_response(
+        self,
+        messages: list[dict[str, str]],
+        response_format: type | None,
+        started_at: float,
+    ) -> LLMResponse:
+        """ルールベースのフォールバック応答（APIを呼んでいないためコストは0）"""
+        response = LLMResponse(
+            messages=messages,
+            content=self._generate_offline_response(messages, response_format),
+            model=RULE_BASED_FALLBACK_MODEL,
+            created_at=int(time.time()),
+            input_tokens=0,
+            output_tokens=0,
+            latency_seconds=round(time.perf_counter() - started_at, 4),
+        )
+        response.cost = 0.0
+        return self._record(response)
 
-        # Azure OpenAI API呼び出しパラメータの構築
-        api_params = {
-            "model": self.deployment_name,  # デプロイメント名を使用
+    def _stream_params(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float,
+        max_tokens: int | None,
+        response_format: type | None,
+        deployment: str,
+    ) -> dict[str, Any]:
+        """ストリーミング用パラメータ（usageの同梱は環境変数で有効化）
+
+        stream_options.include_usage は新しいAPIバージョンのみ対応のため、
+        LLM_STREAM_INCLUDE_USAGE=true の場合だけ要求する。
+        無効時はトークン数をローカルで概算する。
+        Pydanticモデルの応答フォーマットはJSONスキーマ指定に変換する
+        （parseと同じstrictスキーマ）。
+        """
+        params: dict[str, Any] = {
+            "model": deployment,  # デプロイメント名を使用
             "messages": messages,
             "temperature": temperature,
+            "max_tokens": max_tokens,
+            "stream": True,
         }
+        if os.environ.get("LLM_STREAM_INCLUDE_USAGE", "false").lower() == "true":
+            params["stream_options"] = {"include_usage": True}
+        if self._is_pydantic_format(response_format):
+            params["response_format"] = self._json_schema_format(response_format)
+        return params
 
-        if max_tokens is not None:
-            api_params["max_tokens"] = max_tokens
+    @staticmethod
+    def _json_schema_format(response_format: type[BaseModel]) -> dict[str, Any]:
+        """Pydanticモデルをjson_schema形式の応答フォーマットに変換"""
+        if type_to_response_format_param is not None:
+            return type_to_response_format_param(response_format)
+        # openaiのstrict変換を使えない場合は、モデルのスキーマを非strictで渡す
+        # （受信したJSONは利用側でPydanticモデルとして検証する）
+        return {
+            "type": "json_schema",
+            "json_schema": {
+                "name": response_format.__name__,
+                "schema": response_format.model_json_schema(),
+                "strict": False,
+            },
+        }
 
-        # Structured Outputs対応: response_formatがPydantic BaseModelの場合はparse()を使用
+    def _cache_key(
+        self,
+        messages: list[dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int | None,
+        response_format: type | None,
+        route: RouteConfig,
+    ) -> str | None:
+        """応答キャッシュのキー（キャッシュ無効時はNone）
+
+        フォールバック先のデプロイメントの応答も同じルートの応答として共有する。
+        """
+        if self.response_cache is None:
+            return None
+        return self.response_cache.make_key(
+            messages,
+            {
+                "deployment": route.key,
+                "model": model,
+                "temperature": temperature,
+                "max_tokens": max_tokens,
+            },
+            response_format,
+        )
+
+    @staticmethod
+    def _is_pydantic_format(response_format: type | None) -> bool:
+        return inspect.isclass(response_format) and issubclass(
+            response_format,
+            BaseModel,
+        )
+
+    def _build_request_params(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float,
+        max_tokens: int | None,
+        response_format: type | None,
+        deployment: str,
+    ) -> dict[str, Any]:
+        """chat.completions（create / parse）用のパラメータを構築"""
+        params: dict[str, Any] = {
+            "model": deployment,  # デプロイメント名を使用
+            "messages": messages,
+            "temperature": temperature,
+        }
         if response_format is not None:
-            import inspect
-            from pydantic import BaseModel
+            params["response_format"] = response_format
+        if max_tokens is not None:
+            # Structured Outputs（parse）はmax_completion_tokensを使用
+            key = (
+                "max_completion_tokens"
+                if self._is_pydantic_format(response_format)
+                else "max_tokens"
+            )
+            params[key] = max_tokens
+        return params
+
+    def _get_async_state(self) -> _AsyncClientState:
+        """実行中ループ用の非同期クライアントを取得（初回のみ生成）"""
+        loop = asyncio.get_running_loop()
+        with self._async_lock:
+            state = self._async_states.get(loop)
+            if state is None:
+                client = AsyncAzureOpenAI(
+                    api_key=self.api_key,
+                    api_version=self.api_version,
+                    azure_endpoint=self.endpoint,
+                    **_client_settings(),
+                )
+                state = _AsyncClientState(client, self.max_in_flight)
+                self._async_states[loop] = state
+            return state
 
-            if inspect.isclass(response_format) and issubclass(
-                response_format,
-                BaseModel,
-            ):
-                # Pydantic BaseModelの場合はparse()メソッドを使用
-                parse_params = {
-                    "model": self.deployment_name,
-                    "messages": messages,
-                    "temperature": temperature,
-                    "response_format": response_format,
-                }
-
-                if max_tokens is not None:
-                    parse_params["max_completion_tokens"] = max_tokens
-
-                response = self._client.beta.chat.completions.parse(**parse_params)
-                return response.choices[0].message.parsed
-            # 従来のresponse_format（辞書形式など）の場合
-            api_params["response_format"] = response_format
-            response = self._client.chat.completions.create(**api_params)
-            return response.choices[0].message.content
-        # response_formatが指定されていない場合
-        response = self._client.chat.completions.create(**api_params)
-        return response.choices[0].message.content
+    def _generate_online(
+        self,
+        messages: list[dict[str, str]],
+        temperature: float,
+        max_tokens: int | None,
+        response_format: type | None,
+        deployment: str,
+    ) -> Any:
+        """Azure OpenAI APIを呼び出してAPIレスポンスを返す"""
+        params = self._build_request_params(
+            messages,
+            temperature,
+            max_tokens,
+            response_format,
+            deployment,
+        )
+
+        # Structured Outputs対応: response_formatがPydantic BaseModelの場合はparse()を使用
+        if self._is_pydantic_format(response_format):
+            return self._client.beta.chat.completions.parse(**params)
+        # 従来のresponse_format（辞書形式など）または指定なしの場合
+        return self._client.chat.completions.create(**params)
+
+    def _extract_content(self, api_response: Any, response_format: type | None) -> Any:
+        """APIレスポンスから本文（parse時はPydanticインスタンス）を取り出す"""
+        message = api_response.choices[0].message
+        if self._is_pydantic_format(response_format):
+            return message.parsed
+        return message.content
 
     def stream(
         self,
@@ -160,14 +930,23 @@ class OpenAILLMRepository(LLMRepository):
         model: str,
         temperature: float = 0.7,
         max_tokens: int | None = None,
+        response_format: type | None = None,
+        *,
+        use_cache: bool = True,
+        on_response: Callable[[LLMResponse], None] | None = None,
     ) -> Generator[str, None, None]:
         """Azure OpenAIからストリーミング応答を生成
 
         Args:
             messages: メッセージのリスト
-            model: モデル名（デプロイメント名で上書きされます）
+            model: モデル名（ルーターが選んだデプロイメント名で上書きされます）
             temperature: ランダム性
             max_tokens: 最大トークン数
+            response_format: Pydanticモデルを指定するとJSONスキーマに沿った
+                JSON文字列をストリーミングする（完成後の検証は呼び出し側）
+            use_cache: Falseの場合は応答キャッシュを参照しない（構造化応答のみ対象）
+            on_response: 受信完了後に応答全体（フォールバック・キャッシュの応答を含む）
+                を受け取るコールバック
 
         Yields:
             str: 応答のチャンク（逐次的に生成される）
@@ -175,25 +954,198 @@ class OpenAILLMRepository(LLMRepository):
         実装詳細:
         - stream=Trueでストリーミング応答を取得
         - チャンクごとにyield
+        - 構造化応答はキャッシュヒット時に保存済みのJSONを1チャンクで返し、
+          ストリーミング完了後にスキーマ検証を通ったものだけ保存する
 
         """
         if not self._client:
-            for chunk in self._generate_offline_stream(messages):
-                yield chunk
+            yield from self._generate_offline_stream(
+                messages,
+                response_format,
+                on_response,
+            )
             return
 
+        started_at = time.perf_counter()
+        route = self._current_route()
+        cache_key = self._stream_cache_key(
+            messages,
+            model,
+            temperature,
+            max_tokens,
+            response_format,
+            route,
+        )
+        if cache_key and use_cache:
+            hit, cached = self.response_cache.get(cache_key, response_format)
+            if hit:
+                cached_response = self._cached_llm_response(
+                    messages,
+                    cached,
+                    model,
+                    started_at,
+                )
+                yield cached.model_dump_json()
+                if on_response is not None:
+                    on_response(cached_response)
+                return
+
         # Azure OpenAI APIコール（ストリーミング）
-        response = self._client.chat.completions.create(
-            model=self.deployment_name,  # デプロイメント名を使用
-            messages=messages,
-            temperature=temperature,
-            max_tokens=max_tokens,
-            stream=True,
+        accounting = _StreamAccounting(messages, model)
+        # 同時実行数の上限は非同期版（state.semaphore）と同様に受信完了まで保持する
+        with self.router.slot(route), self._in_flight:
+            online, response = self._call_routed(
+                route,
+                lambda deployment: self._client.chat.completions.create(
+                    **self._stream_params(
+                        messages,
+                        temperature,
+                        max_tokens,
+                        response_format,
+                        deployment,
+                    ),
+                ),
+                estimate_request_tokens(messages, max_tokens),
+            )
+            if not online:
+                yield from self._generate_offline_stream(
+                    messages,
+                    response_format,
+                    on_response,
+                )
+                return
+
+            for chunk in response:
+                text = accounting.feed(chunk)
+                if text:
+                    yield text
+        llm_response = self._record(accounting.to_llm_response())
+        self._cache_streamed(cache_key, llm_response.content, response_format)
+        if on_response is not None:
+            on_response(llm_response)
+
+    async def astream(
+        self,
+        messages: list[dict[str, str]],
+        model: str,
+        temperature: float = 0.7,
+        max_tokens: int | None = None,
+        response_format: type | None = None,
+        *,
+        use_cache: bool = True,
+        on_response: Callable[[LLMResponse], None] | None = None,
+    ) -> AsyncGenerator[str, None]:
+        """Azure OpenAIからストリーミング応答を生成（非同期版）
+
+        引数・キャッシュの扱いは同期版streamと同じ。
+
+        Yields:
+            str: 応答のチャンク（逐次的に生成される）
+
+        """
+        if not self._client:
+            for chunk in self._generate_offline_stream(
+                messages,
+                response_format,
+                on_response,
+            ):
+                yield chunk
+            return
+
+        started_at = time.perf_counter()
+        route = self._current_route()
+        cache_key = self._stream_cache_key(
+            messages,
+            model,
+            temperature,
+            max_tokens,
+            response_format,
+            route,
+        )
+        if cache_key and use_cache:
+            hit, cached = self.response_cache.get(cache_key, response_format)
+            if hit:
+                cached_response = self._cached_llm_response(
+                    messages,
+                    cached,
+                    model,
+                    started_at,
+                )
+                yield cached.model_dump_json()
+                if on_response is not None:
+                    on_response(cached_response)
+                return
+
+        state = self._get_async_state()
+        accounting = _StreamAccounting(messages, model)
+        async with self.router.aslot(route), state.semaphore:
+            online, response = await self._acall_routed(
+                route,
+                lambda deployment: state.client.chat.completions.create(
+                    **self._stream_params(
+                        messages,
+                        temperature,
+                        max_tokens,
+                        response_format,
+                        deployment,
+                    ),
+                ),
+                estimate_request_tokens(messages, max_tokens),
+            )
+            if not online:
+                for chunk in self._generate_offline_stream(
+                    messages,
+                    response_format,
+                    on_response,
+                ):
+                    yield chunk
+                return
+
+            async for chunk in response:
+                text = accounting.feed(chunk)
+                if text:
+                    yield text
+        llm_response = self._record(accounting.to_llm_response())
+        self._cache_streamed(cache_key, llm_response.content, response_format)
+        if on_response is not None:
+            on_response(llm_response)
+
+    def _stream_cache_key(
+        self,
+        messages: list[dict[str, str]],
+        model: str,
+        temperature: float,
+        max_tokens: int | None,
+        response_format: type | None,
+        route: RouteConfig,
+    ) -> str | None:
+        """ストリーミングのキャッシュキー（構造化応答のみ。テキストはキャッシュしない）"""
+        if not self._is_pydantic_format(response_format):
+            return None
+        return self._cache_key(
+            messages,
+            model,
+            temperature,
+            max_tokens,
+            response_format,
+            route,
         )
 
-        for chunk in response:
-            if chunk.choices[0].delta.content:
-                yield chunk.choices[0].delta.content
+    def _cache_streamed(
+        self,
+        cache_key: str | None,
+        content: Any,
+        response_format: type | None,
+    ) -> None:
+        """ストリーミングで受信したJSONを検証し、通ったものだけ保存"""
+        if not cache_key or not isinstance(content, str):
+            return
+        try:
+            parsed = response_format.model_validate_json(content)
+        except ValidationError as exc:
+            logger.warning("ストリーミング応答がスキーマに一致しないため保存しません: %s", exc)
+            return
+        self.response_cache.put(cache_key, parsed)
 
     # ==================================================================
     # ルールベースフォールバック
@@ -225,23 +1177,45 @@ class OpenAILLMRepository(LLMRepository):
 
         return self._build_rule_based_report(user_prompt)
 
-    def _generate_offline_stream(self, messages: list[dict[str, str]]):
+    def _generate_offline_stream(
+        self,
+        messages: list[dict[str, str]],
+        response_format: type | None = None,
+        on_response: Callable[[LLMResponse], None] | None = None,
+    ):
         """簡易ストリーミングフォールバック。"""
-        content = self._build_rule_based_report(
-            self._extract_latest_user_prompt(messages),
+        offline = self._offline_llm_response(
+            messages,
+            response_format,
+            time.perf_counter(),
         )
-        for chunk in content.splitlines():
-            yield chunk
+        if self._is_pydantic_format(response_format):
+            yield offline.content.model_dump_json()
+        else:
+            yield from offline.content.splitlines()
+        if on_response is not None:
+            on_response(offline)
 
     @staticmethod
-    def _extract_latest_user_prompt(messages: list[dict[str, str]]) -> str:
+    def _message_text(content: Any) -> str:
+        """メッセージ本文のテキスト（マルチモーダルの場合はtext部品のみ連結）"""
+        if isinstance(content, list):
+            return "\n".join(
+                part.get("text", "")
+                for part in content
+                if isinstance(part, dict) and part.get("type") == "text"
+            )
+        return content or ""
+
+    @classmethod
+    def _extract_latest_user_prompt(cls, messages: list[dict[str, Any]]) -> str:
         preferred_prompt = ""
 
         for message in reversed(messages):
             if message.get("role") != "user":
                 continue
 
-            content = message.get("content", "")
+            content = cls._message_text(message.get("content", ""))
             if not content:
                 continue
 
@@ -256,7 +1230,7 @@ class OpenAILLMRepository(LLMRepository):
 
         for message in reversed(messages):
             if message.get("role") == "user":
-                return message.get("content", "")
+                return cls._message_text(message.get("content", ""))
 
         return ""
 
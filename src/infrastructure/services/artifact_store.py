@@ -0,0 +1,235 @@
+"""ArtifactStore
+
+ジョブの成果物（主にグラフ画像）をSHA-256でコンテンツアドレス化して保存する。
+
+- 同じ内容の画像（リトライや再実行で再生成されたもの）はジョブ内で1回だけ保存
+- ディスク書き込みはバックグラウンドの書き込みスレッドで行い、ジョブスレッドを止めない
+- 一時ファイルへ書いてから置換する原子的書き込み
+- ジョブ毎のインデックス（artifacts.json）が論理名 → ハッシュの対応を保持
+
+ディレクトリ構成:
+    <job_dir>/
+        <sha256>.png      画像本体（ファイル名がハッシュ）
+        artifacts.json    {"names": {論理名: sha256}, "blobs": {sha256: {...}}}
+
+設計原則:
+- 単一責任の原則（SRP）: 成果物の保存と索引管理のみ
+- スレッドセーフ: 複数ジョブスレッドから同時に投入可能
+"""
+
+import hashlib
+import json
+import logging
+import queue
+import threading
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+INDEX_FILE = "artifacts.json"
+
+_MEDIA_TYPES = {
+    ".png": "image/png",
+    ".jpg": "image/jpeg",
+    ".jpeg": "image/jpeg",
+    ".webp": "image/webp",
+    ".svg": "image/svg+xml",
+}
+
+
+@dataclass(frozen=True)
+class StoredArtifact:
+    """投入済み成果物の参照"""
+
+    sha256: str
+    path: str
+    is_new: bool
+
+
+class ArtifactStore:
+    """コンテンツアドレス型の成果物ストア
+
+    使用方法:
+        ```python
+        store = ArtifactStore()
+        artifact = store.put_bytes(job_dir, "task_1_0.png", png_bytes)
+        ...
+        store.flush(job_dir)  # レポート生成前に書き込み完了を待つ
+        store.release_job(job_dir)
+        ```
+    """
+
+    def __init__(self) -> None:
+        self._queue: queue.Queue[tuple[str, str, bytes | None]] = queue.Queue()
+        self._condition = threading.Condition()
+        self._pending: defaultdict[str, int] = defaultdict(int)
+        self._indexes: dict[str, dict[str, Any]] = {}
+        self._worker: threading.Thread | None = None
+        self._worker_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 公開API
+    # ------------------------------------------------------------------
+    def put_bytes(
+        self,
+        job_dir: str,
+        logical_name: str,
+        data: bytes,
+        suffix: str = ".png",
+    ) -> StoredArtifact:
+        """成果物を投入（書き込みは非同期）
+
+        Args:
+            job_dir: ジョブディレクトリ
+            logical_name: 論理名（例: "<process_id>_<thread_id>_<index>.png"）
+            data: 成果物のバイト列
+            suffix: 保存時の拡張子
+
+        Returns:
+            StoredArtifact: ハッシュと保存先パス。is_newは当ジョブで初出の内容か
+
+        """
+        sha256 = hashlib.sha256(data).hexdigest()
+        blob_name = f"{sha256}{suffix}"
+        path = str(Path(job_dir) / blob_name)
+
+        with self._condition:
+            index = self._get_index(job_dir)
+            is_new = sha256 not in index["blobs"]
+            if is_new:
+                index["blobs"][sha256] = {
+                    "path": blob_name,
+                    "size": len(data),
+                    "media_type": _MEDIA_TYPES.get(suffix, "application/octet-stream"),
+                    "created_at": time.time(),
+                }
+            index["names"][logical_name] = sha256
+            self._pending[job_dir] += 1
+
+        # インデックスにあってもファイルが無い場合（書き込み前に異常終了）は書き直す
+        needs_write = is_new or not Path(path).exists()
+        self._ensure_worker()
+        self._queue.put((job_dir, blob_name, data if needs_write else None))
+        return StoredArtifact(sha256=sha256, path=path, is_new=is_new)
+
+    def flush(self, job_dir: str | None = None, timeout: float | None = 30.0) -> bool:
+        """投入済みの書き込みが完了するまで待機
+
+        Args:
+            job_dir: 対象ジョブ（Noneの場合は全ジョブ）
+            timeout: 最大待機秒数
+
+        Returns:
+            bool: 期限内に完了した場合True
+
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while self._has_pending(job_dir):
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._condition.wait(remaining)
+        return True
+
+    def release_job(self, job_dir: str) -> None:
+        """書き込み完了後、ジョブのインデックスをメモリから解放"""
+        self.flush(job_dir)
+        with self._condition:
+            self._indexes.pop(job_dir, None)
+            self._pending.pop(job_dir, None)
+
+    def load_index(self, job_dir: str) -> dict[str, Any]:
+        """ジョブのインデックスを取得（メモリ上に無ければディスクから読み込み）"""
+        with self._condition:
+            index = self._get_index(job_dir)
+            return json.loads(json.dumps(index))
+
+    def resolve(self, job_dir: str, logical_name: str) -> str | None:
+        """論理名から保存先パスを取得"""
+        with self._condition:
+            index = self._get_index(job_dir)
+            sha256 = index["names"].get(logical_name)
+            if sha256 is None:
+                return None
+            return str(Path(job_dir) / index["blobs"][sha256]["path"])
+
+    # ------------------------------------------------------------------
+    # 書き込みスレッド
+    # ------------------------------------------------------------------
+    def _ensure_worker(self) -> None:
+        with self._worker_lock:
+            if self._worker is None or not self._worker.is_alive():
+                self._worker = threading.Thread(
+                    target=self._run_worker,
+                    name="artifact_store_writer",
+                    daemon=True,
+                )
+                self._worker.start()
+
+    def _run_worker(self) -> None:
+        while True:
+            job_dir, blob_name, data = self._queue.get()
+            try:
+                if data is not None:
+                    self._write_atomic(
+                        Path(job_dir) / blob_name,
+                        data,
+                        overwrite=False,
+                    )
+                with self._condition:
+                    snapshot = json.dumps(
+                        self._get_index(job_dir),
+                        ensure_ascii=False,
+                        indent=2,
+                    )
+                self._write_atomic(
+                    Path(job_dir) / INDEX_FILE,
+                    snapshot.encode("utf-8"),
+                )
+            except OSError as exc:
+                logger.warning("成果物の書き込みに失敗しました (%s): %s", blob_name, exc)
+            finally:
+                with self._condition:
+                    self._pending[job_dir] -= 1
+                    self._condition.notify_all()
+                self._queue.task_done()
+
+    @staticmethod
+    def _write_atomic(path: Path, data: bytes, *, overwrite: bool = True) -> None:
+        if not overwrite and path.exists():
+            # コンテンツアドレスなので既存ファイルは同一内容
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_bytes(data)
+        tmp_path.replace(path)
+
+    # ------------------------------------------------------------------
+    # 内部処理（_conditionを保持した状態で呼び出す）
+    # ------------------------------------------------------------------
+    def _get_index(self, job_dir: str) -> dict[str, Any]:
+        index = self._indexes.get(job_dir)
+        if index is None:
+            index = {"version": 1, "names": {}, "blobs": {}}
+            index_path = Path(job_dir) / INDEX_FILE
+            try:
+                stored = json.loads(index_path.read_text(encoding="utf-8"))
+                index["names"].update(stored.get("names", {}))
+                index["blobs"].update(stored.get("blobs", {}))
+            except FileNotFoundError:
+                pass
+            except (OSError, json.JSONDecodeError) as exc:
+                logger.warning("成果物インデックスが読み込めません (%s): %s", index_path, exc)
+            self._indexes[job_dir] = index
+        return index
+
+    def _has_pending(self, job_dir: str | None) -> bool:
+        if job_dir is None:
+            return any(count > 0 for count in self._pending.values())
+        return self._pending.get(job_dir, 0) > 0
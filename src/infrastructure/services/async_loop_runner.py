@@ -0,0 +1,134 @@
+"""AsyncLoopRunner
+
+プロセス内で共有する単一のイベントループをバックグラウンドスレッドで動かし、
+ジョブスレッドからコルーチン（主にLLM呼び出し）を投入できるようにする。
+
+全セッションのLLM呼び出しが同じイベントループ・同じHTTP接続プール・
+同じ同時実行セマフォを通るため、セッション数に比例してOSスレッドや
+TCP接続が増えない。
+
+設計原則:
+- 単一責任の原則（SRP）: イベントループのライフサイクル管理のみ
+- スレッドセーフ: 任意のスレッドから submit / run / run_all を呼び出せる
+"""
+
+import asyncio
+import concurrent.futures
+import contextvars
+import threading
+from collections.abc import Coroutine, Iterable
+from typing import Any, TypeVar
+
+
+T = TypeVar("T")
+
+
+class AsyncLoopRunner:
+    """バックグラウンドのイベントループへコルーチンを投入する
+
+    使用方法:
+        ```python
+        runner = AsyncLoopRunner()
+        plan = runner.run(plan_use_case.aexecute(...))
+        programs = runner.run_all(
+            code_use_case.aexecute(...) for task in tasks
+        )
+        ```
+    """
+
+    def __init__(self) -> None:
+        self._loop: asyncio.AbstractEventLoop | None = None
+        self._thread: threading.Thread | None = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """実行中のイベントループ（未起動なら起動する）"""
+        with self._lock:
+            if self._loop is None or self._loop.is_closed():
+                ready = threading.Event()
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(
+                    target=self._run_loop,
+                    args=(self._loop, ready),
+                    name="async_loop_runner",
+                    daemon=True,
+                )
+                self._thread.start()
+                ready.wait()
+            return self._loop
+
+    def submit(self, coro: Coroutine[Any, Any, T]) -> concurrent.futures.Future[T]:
+        """コルーチンを投入し、結果を受け取るFutureを返す
+
+        呼び出し元スレッドのcontextvars（使用量のタグ等）を引き継いで実行する。
+        """
+        loop = self.loop
+        context = contextvars.copy_context()
+        future: concurrent.futures.Future[T] = concurrent.futures.Future()
+
+        def _start() -> None:
+            if not future.set_running_or_notify_cancel():
+                coro.close()
+                return
+            # create_taskは現在のコンテキストを複製するため、呼び出し元の文脈で生成する
+            task = context.run(loop.create_task, coro)
+
+            def _copy_result(done: asyncio.Task[T]) -> None:
+                if done.cancelled():
+                    future.set_exception(concurrent.futures.CancelledError())
+                elif done.exception() is not None:
+                    future.set_exception(done.exception())
+                else:
+                    future.set_result(done.result())
+
+            task.add_done_callback(_copy_result)
+
+        loop.call_soon_threadsafe(_start)
+        return future
+
+    def run(self, coro: Coroutine[Any, Any, T], timeout: float | None = None) -> T:
+        """コルーチンを投入して完了まで待機"""
+        if self._is_loop_thread():
+            raise RuntimeError("イベントループのスレッドからrunは呼び出せません")
+        return self.submit(coro).result(timeout)
+
+    def run_all(
+        self,
+        coros: Iterable[Coroutine[Any, Any, T]],
+        timeout: float | None = None,
+    ) -> list[T]:
+        """複数のコルーチンを同じループで並行実行し、投入順に結果を返す
+
+        1つでも失敗した場合は最初の例外を送出する。
+        """
+
+        async def _gather() -> list[T]:
+            return list(await asyncio.gather(*coros))
+
+        return self.run(_gather(), timeout)
+
+    def close(self) -> None:
+        """イベントループを停止"""
+        with self._lock:
+            loop, thread = self._loop, self._thread
+            self._loop = None
+            self._thread = None
+        if loop is None:
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout=5.0)
+
+    def _is_loop_thread(self) -> bool:
+        return self._thread is not None and self._thread is threading.current_thread()
+
+    @staticmethod
+    def _run_loop(loop: asyncio.AbstractEventLoop, ready: threading.Event) -> None:
+        asyncio.set_event_loop(loop)
+        loop.call_soon(ready.set)
+        try:
+            loop.run_forever()
+        finally:
+            loop.run_until_complete(loop.shutdown_asyncgens())
+            loop.close()
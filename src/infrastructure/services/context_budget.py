@@ -0,0 +1,328 @@
+"""ContextBudget
+
+LLMへ渡す文脈（システムプロンプト・データ情報・前回のコード・実行出力・観測結果）を
+トークン上限内に収める。
+
+各セクションに優先度と上限を与え、次の順で圧縮する:
+1. 整形: ANSIエスケープの除去、同一トレースバックの重複排除、
+   ライブラリ内部フレームの省略、繰り返し行（・数行単位の繰り返し）の集約
+2. セクション上限: 先頭と末尾を残して中略（head/tail切り詰め）
+3. 全体上限: 優先度の低いセクションから順に縮め、それでも超える場合は除外
+
+トークン数はAPIを呼ばずにローカルで概算する
+（ASCIIはおよそ4文字 = 1トークン、日本語等はおよそ1文字 = 1トークン）。
+
+全体上限は環境変数LLM_CONTEXT_MAX_TOKENSで設定する（既定: 16000）。
+
+設計原則:
+- 単一責任の原則（SRP）: 文脈の圧縮と配分のみ（メッセージの組み立ては呼び出し側）
+- 決定的: 同じ入力からは常に同じ出力（プロンプトのキャッシュが効く）
+"""
+
+import logging
+import math
+import os
+import re
+from dataclasses import dataclass
+
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_MAX_TOKENS = 16000
+
+# 優先度（小さいほど重要）。PRIORITY_REQUIREDのセクションは圧縮・除外しない
+PRIORITY_REQUIRED = 0
+PRIORITY_HIGH = 1
+PRIORITY_MEDIUM = 2
+PRIORITY_LOW = 3
+
+# 全体上限に合わせて縮める際、これを下回るセクションは除外する
+_MIN_SECTION_TOKENS = 48
+
+_ANSI_ESCAPE = re.compile(r"\x1b\[[0-9;?]*[A-Za-z]")
+_TRACEBACK_START = re.compile(r"Traceback \(most recent call last\)")
+# Python標準（File "...", line N）とIPython（File ~/...:N, in f / Cell In[N], line M）
+_FRAME_HEADER = re.compile(r'^\s*(File "[^"]+", line \d+|File \S+:\d+|Cell In\[\d+\])')
+_EXCEPTION_LINE = re.compile(r"^[\w.]+(Error|Exception|Exit|Interrupt|Warning)\b")
+_LIBRARY_PATH = re.compile(r"site-packages|dist-packages|[/\\]lib[/\\]python\d")
+# 数行単位の繰り返し（警告 + 該当行 等）も集約する最大周期
+_MAX_REPEAT_PERIOD = 4
+
+
+def estimate_tokens(text: str) -> int:
+    """トークン数の概算（ASCII 4文字 ≒ 1トークン、それ以外 1文字 ≒ 1トークン）"""
+    if not text:
+        return 0
+    ascii_chars = sum(1 for char in text if char.isascii())
+    return math.ceil(ascii_chars / 4 + (len(text) - ascii_chars))
+
+
+def _split_lines(text: str) -> list[str]:
+    return text.split("\n")
+
+
+def dedupe_tracebacks(text: str) -> str:
+    """同一トレースバックの重複を除き、ライブラリ内部のフレームを省略する
+
+    トレースバックは開始行から例外行（KeyError: ... 等）までを1件とみなし、
+    その後ろの出力は比較対象に含めない。
+    """
+    lines = _split_lines(text)
+    starts = [i for i, line in enumerate(lines) if _TRACEBACK_START.search(line)]
+    if not starts:
+        return text
+
+    output = lines[: starts[0]]
+    seen: set[str] = set()
+    for position, start in enumerate(starts):
+        limit = starts[position + 1] if position + 1 < len(starts) else len(lines)
+        end = next(
+            (i + 1 for i in range(start + 1, limit) if _EXCEPTION_LINE.match(lines[i])),
+            limit,
+        )
+        block = lines[start:end]
+        key = "\n".join(line.rstrip() for line in block).strip()
+        if key in seen:
+            output.append("(同じトレースバックのため省略)")
+        else:
+            seen.add(key)
+            output.extend(_collapse_library_frames(block))
+        output.extend(lines[end:limit])
+    return "\n".join(output)
+
+
+def _collapse_library_frames(block: list[str]) -> list[str]:
+    """トレースバック内の連続するライブラリフレームを1行に集約（最後のフレームは残す）"""
+    headers = [i for i, line in enumerate(block) if _FRAME_HEADER.match(line)]
+    if len(headers) < 2:
+        return block
+
+    output = block[: headers[0]]
+    skipped = 0
+    for position, start in enumerate(headers):
+        end = headers[position + 1] if position + 1 < len(headers) else len(block)
+        frame = block[start:end]
+        is_last = position == len(headers) - 1
+        if not is_last and _LIBRARY_PATH.search(block[start]):
+            skipped += 1
+            continue
+        if skipped:
+            output.append(f"  ...(ライブラリ内部のフレーム {skipped}件を省略)")
+            skipped = 0
+        output.extend(frame)
+    return output
+
+
+def collapse_repeated_lines(text: str) -> str:
+    """連続して繰り返される行（周期4行まで）を1回分 + 件数表示に集約"""
+    lines = _split_lines(text)
+    for period in range(1, _MAX_REPEAT_PERIOD + 1):
+        lines = _collapse_period(lines, period)
+    return "\n".join(lines)
+
+
+def _collapse_period(lines: list[str], period: int) -> list[str]:
+    output: list[str] = []
+    i = 0
+    while i < len(lines):
+        unit = lines[i : i + period]
+        repeats = 1
+        if len(unit) == period and any(line.strip() for line in unit):
+            while lines[i + repeats * period : i + (repeats + 1) * period] == unit:
+                repeats += 1
+        # 1行の繰り返しは3回以上、複数行の繰り返しは2回以上で集約
+        if repeats >= (3 if period == 1 else 2):
+            output.extend(unit)
+            unit_label = "行" if period == 1 else f"{period}行"
+            output.append(f"...(上の{unit_label}がさらに {repeats - 1}回繰り返されました)")
+            i += repeats * period
+        else:
+            output.append(lines[i])
+            i += 1
+    return output
+
+
+def clean_text(text: str) -> str:
+    """情報を落とさずに縮める整形（ANSI除去・トレースバック重複排除・繰り返し集約）"""
+    text = _ANSI_ESCAPE.sub("", text.replace("\r\n", "\n"))
+    text = dedupe_tracebacks(text)
+    return collapse_repeated_lines(text).strip()
+
+
+def truncate_middle(text: str, max_tokens: int, head_ratio: float = 0.5) -> str:
+    """先頭と末尾を残し、中間を省略してmax_tokens以内に収める
+
+    Args:
+        text: 対象テキスト
+        max_tokens: 上限トークン数
+        head_ratio: 残す量のうち先頭に割り当てる割合
+            （エラー出力のように末尾が重要なものは小さくする）
+
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    if max_tokens <= 0:
+        return ""
+
+    marker_tokens = 16
+    available = max(0, max_tokens - marker_tokens)
+    head_budget = int(available * head_ratio)
+    tail_budget = available - head_budget
+
+    lines = _split_lines(text)
+    head = _take_lines(lines, head_budget)
+    tail = _take_lines(lines[len(head) :][::-1], tail_budget)[::-1]
+    omitted = max(0, len(lines) - len(head) - len(tail))
+    if omitted == 0:
+        # 1行が極端に長い場合: 行の途中で切った分を省略扱いにする
+        omitted = 1
+    marker = f"...(中略: {omitted}行)..."
+    return "\n".join([*head, marker, *tail])
+
+
+def _take_lines(lines: list[str], budget: int) -> list[str]:
+    """先頭からbudget以内に収まる行を取る（最初の行が収まらない場合は文字単位で切る）"""
+    taken: list[str] = []
+    used = 0
+    for line in lines:
+        cost = estimate_tokens(line) + 1
+        if used + cost > budget:
+            if not taken and budget > 0:
+                taken.append(_slice_to_tokens(line, budget))
+            break
+        taken.append(line)
+        used += cost
+    return taken
+
+
+def _slice_to_tokens(line: str, budget: int) -> str:
+    low, high = 0, len(line)
+    while low < high:
+        middle = (low + high + 1) // 2
+        if estimate_tokens(line[:middle]) <= budget:
+            low = middle
+        else:
+            high = middle - 1
+    return line[:low]
+
+
+@dataclass
+class ContextSection:
+    """文脈の1区画
+
+    Attributes:
+        name: 区画名（fitの戻り値のキー。呼び出し内で一意）
+        content: 本文
+        priority: 優先度（小さいほど重要。PRIORITY_REQUIREDは圧縮しない）
+        max_tokens: この区画の上限トークン数（Noneなら全体上限のみ）
+        head_ratio: 切り詰め時に先頭へ割り当てる割合
+
+    """
+
+    name: str
+    content: str
+    priority: int = PRIORITY_MEDIUM
+    max_tokens: int | None = None
+    head_ratio: float = 0.5
+
+
+class ContextBudget:
+    """トークン上限に合わせて文脈の各区画を圧縮・配分する
+
+    使用方法:
+        ```python
+        budget = ContextBudget()
+        fitted = budget.fit(
+            [
+                ContextSection("system", system_prompt, PRIORITY_REQUIRED),
+                ContextSection("stderr", stderr, PRIORITY_HIGH,
+                               max_tokens=budget.share(0.15), head_ratio=0.3),
+                ContextSection("stdout", stdout, PRIORITY_LOW,
+                               max_tokens=budget.share(0.15)),
+            ],
+        )
+        fitted["stderr"]  # 圧縮後の本文（除外された場合は空文字）
+        ```
+    """
+
+    def __init__(self, max_tokens: int | None = None) -> None:
+        """コンストラクタ
+
+        Args:
+            max_tokens: 全体の上限トークン数
+                （省略時は環境変数LLM_CONTEXT_MAX_TOKENS または 16000）
+
+        """
+        if max_tokens is None:
+            max_tokens = int(
+                os.environ.get("LLM_CONTEXT_MAX_TOKENS", str(_DEFAULT_MAX_TOKENS)),
+            )
+        self.max_tokens = max_tokens
+
+    def share(self, ratio: float) -> int:
+        """全体上限に対する割合からセクション上限を計算"""
+        return max(_MIN_SECTION_TOKENS, int(self.max_tokens * ratio))
+
+    def fit(self, sections: list[ContextSection]) -> dict[str, str]:
+        """各区画を圧縮して全体上限内に収める
+
+        Returns:
+            区画名 → 圧縮後の本文（除外された区画は空文字）
+
+        """
+        texts: dict[str, str] = {}
+        tokens: dict[str, int] = {}
+        original_total = 0
+        for section in sections:
+            content = section.content or ""
+            original_total += estimate_tokens(content)
+            if section.priority != PRIORITY_REQUIRED:
+                content = clean_text(content)
+                if section.max_tokens is not None:
+                    content = truncate_middle(
+                        content,
+                        section.max_tokens,
+                        section.head_ratio,
+                    )
+            texts[section.name] = content
+            tokens[section.name] = estimate_tokens(content)
+
+        excess = sum(tokens.values()) - self.max_tokens
+        # 優先度の低い順（同じ優先度なら後ろの区画から）に縮める
+        for section in sorted(
+            reversed(sections),
+            key=lambda item: item.priority,
+            reverse=True,
+        ):
+            if excess <= 0:
+                break
+            if section.priority == PRIORITY_REQUIRED:
+                continue
+            current = tokens[section.name]
+            target = current - excess
+            if target < _MIN_SECTION_TOKENS:
+                texts[section.name] = ""
+            else:
+                texts[section.name] = truncate_middle(
+                    texts[section.name],
+                    target,
+                    section.head_ratio,
+                )
+            tokens[section.name] = estimate_tokens(texts[section.name])
+            excess -= current - tokens[section.name]
+
+        fitted_total = sum(tokens.values())
+        if fitted_total < original_total:
+            logger.debug(
+                "LLM文脈を圧縮しました: 約%dトークン → 約%dトークン（上限 %d）",
+                original_total,
+                fitted_total,
+                self.max_tokens,
+            )
+        if excess > 0:
+            logger.warning(
+                "必須の文脈だけでトークン上限を超えています（約%dトークン / 上限 %d）",
+                fitted_total,
+                self.max_tokens,
+            )
+        return texts
@@ -0,0 +1,465 @@
+"""DatasetProfileService
+
+データセットのプロファイル（列毎の統計量・欠損数・カーディナリティ・サンプル行・
+メモリ使用量）をファイルの指紋（内容のSHA-256）毎に1回だけ作成し、全ての利用箇所で共有する。
+
+- 作成: StreamingProfilerでファイルを1回だけ走査し、同じ走査で型・欠損数・メモリ使用量・
+  サンプル行も集計する。1チャンクに収まるファイルは分位点・ユニーク数を厳密値に置き換える
+- 保存: データの隣（.<ファイル名>.profile.json）に保存し、書き込めない場合は
+  DATASET_PROFILE_CACHE_DIR に指紋名で保存する。同じ内容のファイルは再アップロードでも再利用
+- 共有: データプレビュー、データ記述、計画キャッシュの指紋、定型コード合成のスキーマ、
+  ビルトイン分析が同じプロファイルを参照する
+
+環境変数:
+- DATASET_PROFILE_PERSIST: プロファイルをディスクに保存するか（既定: true）
+- DATASET_PROFILE_CACHE_DIR: データの隣に保存できない場合の保存先（既定: output/.profile_cache）
+- DATASET_PROFILE_MEMORY_ENTRIES: メモリ上に保持するプロファイル数（既定: 32）
+
+設計原則:
+- 単一責任の原則（SRP）: プロファイルの作成・保存・取得のみ（表示・プロンプト化は呼び出し側）
+- スレッドセーフ: 同じファイルを同時に要求された場合も走査は1回
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import warnings
+from collections import OrderedDict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+from src.infrastructure.services.streaming_profiler import StreamingProfiler
+
+
+logger = logging.getLogger(__name__)
+
+# プロファイルの形式を変えた場合は上げる（古い保存済みプロファイルは作り直す）
+PROFILE_VERSION = 1
+
+_DEFAULT_CACHE_DIR = "output/.profile_cache"
+_SIDECAR_SUFFIX = ".profile.json"
+_SAMPLE_ROWS = 5
+# サンプル行の乱数シード（同じデータからは同じ記述を生成し、プロンプトキャッシュを効かせる）
+_SAMPLE_RANDOM_STATE = 0
+_DATETIME_PROBE_ROWS = 50
+
+# データの内容ハッシュのキャッシュ件数（パス・サイズ・更新時刻が同じなら再計算しない）
+_MAX_DIGEST_CACHE = 256
+_HASH_CHUNK_BYTES = 1024 * 1024
+
+_digest_cache: OrderedDict[tuple[str, int, int], str] = OrderedDict()
+_digest_lock = threading.Lock()
+
+
+def file_content_digest(file_path: str | Path) -> str | None:
+    """ファイル内容のSHA-256（読めない場合はNone）
+
+    パス・サイズ・更新時刻が同じ間は再計算しない。
+    """
+    path = Path(file_path)
+    try:
+        stat = path.stat()
+        cache_key = (str(path.resolve()), stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        return None
+    with _digest_lock:
+        cached = _digest_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    digest = hashlib.sha256()
+    try:
+        with path.open("rb") as file:
+            while chunk := file.read(_HASH_CHUNK_BYTES):
+                digest.update(chunk)
+    except OSError:
+        return None
+
+    value = digest.hexdigest()
+    with _digest_lock:
+        _digest_cache[cache_key] = value
+        while len(_digest_cache) > _MAX_DIGEST_CACHE:
+            _digest_cache.popitem(last=False)
+    return value
+
+
+def sidecar_path(file_path: str | Path) -> Path:
+    """データの隣に保存するプロファイルのパス"""
+    path = Path(file_path)
+    return path.with_name(f".{path.name}{_SIDECAR_SUFFIX}")
+
+
+def dtype_kind(dtype: Any) -> str:
+    """列の型の種類（bool / numeric / datetime / string）
+
+    欠損の有無でint/floatが入れ替わるため数値は1種類にまとめる。
+    """
+    if pd.api.types.is_bool_dtype(dtype):
+        return "bool"
+    if pd.api.types.is_numeric_dtype(dtype):
+        return "numeric"
+    if pd.api.types.is_datetime64_any_dtype(dtype):
+        return "datetime"
+    return "string"
+
+
+def looks_like_datetime(series: pd.Series) -> bool:
+    """文字列の列が日時として解釈できるか（先頭の値で判定）"""
+    sample = series.dropna().astype(str).head(_DATETIME_PROBE_ROWS)
+    if sample.empty or not sample.str.contains(r"\d{1,4}[-/年.:]\d{1,2}").all():
+        return False
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")
+        parsed = pd.to_datetime(sample, errors="coerce", format="mixed")
+    return bool(parsed.notna().mean() >= 0.9)
+
+
+class _ColumnCollector:
+    """StreamingProfilerと同じ走査で、型・欠損数・メモリ使用量・サンプル行を集計"""
+
+    def __init__(self) -> None:
+        self.chunks = 0
+        self.first_chunk: pd.DataFrame | None = None
+        self.order: list[str] = []
+        self.dtypes: dict[str, Any] = {}
+        self.nulls: dict[str, int] = {}
+        self.memory: dict[str, int] = {}
+        self.datetime_like: dict[str, bool] = {}
+
+    def observe(self, chunks: Iterator[pd.DataFrame]) -> Iterator[pd.DataFrame]:
+        for chunk in chunks:
+            chunk.columns = [str(col) for col in chunk.columns]
+            self._update(chunk)
+            yield chunk
+
+    def _update(self, chunk: pd.DataFrame) -> None:
+        self.chunks += 1
+        if self.first_chunk is None:
+            # 先頭チャンクのみ保持（サンプル行・日時判定、1チャンクの場合は厳密値の計算に使う）
+            self.first_chunk = chunk
+            self.order = list(chunk.columns)
+            for name in self.order:
+                series = chunk[name]
+                self.datetime_like[name] = dtype_kind(
+                    series.dtype,
+                ) == "string" and looks_like_datetime(series)
+
+        memory = chunk.memory_usage(index=False, deep=True)
+        nulls = chunk.isna().sum()
+        for name in chunk.columns:
+            self.nulls[name] = self.nulls.get(name, 0) + int(nulls[name])
+            self.memory[name] = self.memory.get(name, 0) + int(memory[name])
+            self.dtypes[name] = _merge_dtype(self.dtypes.get(name), chunk[name].dtype)
+
+    def sample(self) -> dict[str, Any]:
+        frame = self.first_chunk if self.first_chunk is not None else pd.DataFrame()
+        if not frame.empty:
+            frame = frame.sample(
+                min(len(frame), _SAMPLE_ROWS),
+                random_state=_SAMPLE_RANDOM_STATE,
+            )
+        return json.loads(frame.to_json(orient="split", date_format="iso"))
+
+
+def _merge_dtype(current: Any, new: Any) -> Any:
+    if current is None or current == new:
+        return new
+    try:
+        return np.result_type(current, new)
+    except TypeError:
+        return np.dtype(object)
+
+
+class DatasetProfileService:
+    """ファイルの指紋毎にプロファイルを1回だけ作成して共有する
+
+    使用方法:
+        ```python
+        profiles = get_dataset_profile_service()
+        profile = profiles.get_profile("data.csv")
+        profile["rows"], profile["column_profiles"], profile["statistics"]
+        ```
+    """
+
+    def __init__(
+        self,
+        persist: bool | None = None,
+        cache_dir: str | Path | None = None,
+        memory_entries: int | None = None,
+        profiler: StreamingProfiler | None = None,
+    ) -> None:
+        """コンストラクタ
+
+        Args:
+            persist: ディスクに保存するか（省略時は環境変数DATASET_PROFILE_PERSIST または True）
+            cache_dir: データの隣に保存できない場合の保存先
+                （省略時は環境変数DATASET_PROFILE_CACHE_DIR または output/.profile_cache）
+            memory_entries: メモリ上に保持するプロファイル数
+                （省略時は環境変数DATASET_PROFILE_MEMORY_ENTRIES または 32）
+            profiler: 走査に使うStreamingProfiler
+
+        """
+        if persist is None:
+            persist = os.environ.get("DATASET_PROFILE_PERSIST", "true").lower() == "true"
+        if cache_dir is None:
+            cache_dir = os.environ.get("DATASET_PROFILE_CACHE_DIR", _DEFAULT_CACHE_DIR)
+        if memory_entries is None:
+            memory_entries = int(os.environ.get("DATASET_PROFILE_MEMORY_ENTRIES", "32"))
+
+        self.persist = persist
+        self.cache_dir = Path(cache_dir)
+        self.memory_entries = max(memory_entries, 1)
+        self.profiler = profiler or StreamingProfiler()
+
+        self._profiles: OrderedDict[str, dict[str, Any]] = OrderedDict()
+        self._inflight: dict[str, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self._metrics = {"computed": 0, "memory_hits": 0, "disk_hits": 0}
+
+    def get_profile(self, file_path: str) -> dict[str, Any]:
+        """ファイルのプロファイルを取得（無ければ作成して保存）
+
+        Raises:
+            OSError: ファイルを読めない場合
+            Exception: データとして解析できない場合（pandasの例外）
+
+        """
+        fingerprint = file_content_digest(file_path)
+        if fingerprint is None:
+            raise OSError(f"データファイルを読み込めません: {file_path}")
+
+        profile = self._from_memory(fingerprint)
+        if profile is None:
+            with self._lock:
+                inflight = self._inflight.setdefault(fingerprint, threading.Lock())
+            # 同じ指紋の作成は直列化し、後続は先行の結果を使う
+            try:
+                with inflight:
+                    profile = self._load_or_compute(file_path, fingerprint)
+            finally:
+                with self._lock:
+                    self._inflight.pop(fingerprint, None)
+
+        # 同じ内容の別ファイル（再アップロード等）でも共有するため、パスは返却時に付ける
+        return {**profile, "file_path": file_path}
+
+    def _load_or_compute(self, file_path: str, fingerprint: str) -> dict[str, Any]:
+        profile = self._from_memory(fingerprint)
+        if profile is not None:
+            return profile
+
+        profile = self._load(file_path, fingerprint)
+        if profile is not None:
+            with self._lock:
+                self._metrics["disk_hits"] += 1
+        else:
+            profile = self.profile_chunks(
+                self.profiler.iter_chunks(file_path),
+                file_path=file_path,
+            )
+            profile["fingerprint"] = fingerprint
+            with self._lock:
+                self._metrics["computed"] += 1
+            self._save(file_path, profile)
+
+        self._remember(fingerprint, profile)
+        return profile
+
+    def profile_chunks(
+        self,
+        chunks: Iterator[pd.DataFrame],
+        file_path: str | None = None,
+    ) -> dict[str, Any]:
+        """DataFrameチャンク列からプロファイルを作成（キャッシュしない）
+
+        Returns:
+            StreamingProfilerのプロファイルに、column_profiles（列毎の型・種類・欠損数・
+            ユニーク数・メモリ使用量）、memory_usage_bytes、sample（orient="split"）、
+            exact（分位点・ユニーク数が厳密値か）を加えた辞書
+
+        """
+        collector = _ColumnCollector()
+        profile = self.profiler.profile_chunks(
+            collector.observe(chunks),
+            file_path=file_path,
+        )
+
+        exact = collector.chunks <= 1
+        if exact and collector.first_chunk is not None:
+            _apply_exact_statistics(profile, collector.first_chunk)
+
+        uniques = {row["index"]: row.get("unique") for row in profile["statistics"]}
+        profile["column_profiles"] = [
+            {
+                "name": name,
+                "dtype": str(collector.dtypes[name]),
+                "kind": dtype_kind(collector.dtypes[name]),
+                "datetime_like": collector.datetime_like.get(name, False),
+                "non_null": profile["rows"] - collector.nulls.get(name, 0),
+                "nulls": collector.nulls.get(name, 0),
+                "unique": uniques.get(name),
+                "memory_bytes": collector.memory.get(name, 0),
+            }
+            for name in collector.order
+        ]
+        profile["memory_usage_bytes"] = sum(collector.memory.values())
+        profile["sample"] = collector.sample()
+        profile["exact"] = exact
+        profile["version"] = PROFILE_VERSION
+        profile["created_at"] = time.time()
+        return profile
+
+    def get_metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {**self._metrics, "memory_entries": len(self._profiles)}
+
+    def _from_memory(self, fingerprint: str) -> dict[str, Any] | None:
+        with self._lock:
+            profile = self._profiles.get(fingerprint)
+            if profile is not None:
+                self._profiles.move_to_end(fingerprint)
+                self._metrics["memory_hits"] += 1
+            return profile
+
+    def _remember(self, fingerprint: str, profile: dict[str, Any]) -> None:
+        with self._lock:
+            self._profiles[fingerprint] = profile
+            self._profiles.move_to_end(fingerprint)
+            while len(self._profiles) > self.memory_entries:
+                self._profiles.popitem(last=False)
+
+    def _candidates(self, file_path: str, fingerprint: str) -> list[Path]:
+        return [sidecar_path(file_path), self.cache_dir / f"{fingerprint}.json"]
+
+    def _load(self, file_path: str, fingerprint: str) -> dict[str, Any] | None:
+        if not self.persist:
+            return None
+        for candidate in self._candidates(file_path, fingerprint):
+            try:
+                stored = json.loads(candidate.read_text(encoding="utf-8"))
+            except (OSError, ValueError):
+                continue
+            if (
+                stored.get("version") == PROFILE_VERSION
+                and stored.get("fingerprint") == fingerprint
+            ):
+                return _decode(stored)
+        return None
+
+    def _save(self, file_path: str, profile: dict[str, Any]) -> None:
+        if not self.persist:
+            return
+        payload = json.dumps(
+            _encode(profile),
+            ensure_ascii=False,
+            separators=(",", ":"),
+            default=str,
+        )
+        for candidate in self._candidates(file_path, profile["fingerprint"]):
+            try:
+                _write_atomic(candidate, payload)
+                return
+            except OSError as exc:
+                logger.debug("プロファイルを保存できません: %s (%s)", candidate, exc)
+        logger.warning("データセットのプロファイルを保存できませんでした: %s", file_path)
+
+
+def _apply_exact_statistics(profile: dict[str, Any], frame: pd.DataFrame) -> None:
+    """1チャンクに収まる場合は近似値（t-digest・HyperLogLog）を厳密値に置き換える"""
+    for record in profile["statistics"]:
+        series = frame[record["index"]]
+        record["unique"] = int(series.nunique(dropna=True))
+        if record["index"] in profile["numeric_columns"]:
+            values = pd.to_numeric(series, errors="coerce").astype(float)
+            values = values[np.isfinite(values)]
+            if values.empty:
+                continue
+            for label, q in (("25%", 0.25), ("50%", 0.5), ("75%", 0.75)):
+                record[label] = round(float(values.quantile(q)), 4)
+        else:
+            counts = series.dropna().astype(str).value_counts()
+            record["top_values"] = [
+                (value, int(count)) for value, count in counts.head(10).items()
+            ]
+            if not counts.empty:
+                record["top"], record["freq"] = counts.index[0], int(counts.iloc[0])
+
+
+def _encode(profile: dict[str, Any]) -> dict[str, Any]:
+    """numpy配列・DataFrameをJSONに保存できる形へ変換"""
+    encoded = dict(profile)
+    encoded.pop("file_path", None)
+    encoded["histograms"] = {
+        name: {"counts": counts.tolist(), "edges": edges.tolist()}
+        for name, (counts, edges) in profile.get("histograms", {}).items()
+    }
+    scatter = profile.get("scatter_sample")
+    encoded["scatter_sample"] = (
+        {"columns": list(scatter[0]), "rows": scatter[1].tolist()} if scatter else None
+    )
+    corr = profile.get("correlation")
+    encoded["correlation"] = (
+        json.loads(corr.to_json(orient="split")) if corr is not None else None
+    )
+    return encoded
+
+
+def _decode(stored: dict[str, Any]) -> dict[str, Any]:
+    profile = dict(stored)
+    profile["histograms"] = {
+        name: (np.asarray(value["counts"]), np.asarray(value["edges"], dtype=float))
+        for name, value in stored.get("histograms", {}).items()
+    }
+    scatter = stored.get("scatter_sample")
+    profile["scatter_sample"] = (
+        (tuple(scatter["columns"]), np.asarray(scatter["rows"], dtype=float))
+        if scatter
+        else None
+    )
+    corr = stored.get("correlation")
+    profile["correlation"] = (
+        pd.read_json(io.StringIO(json.dumps(corr)), orient="split")
+        if corr is not None
+        else None
+    )
+    return profile
+
+
+def _write_atomic(path: Path, payload: str) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-", suffix=".json")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8") as file:
+            file.write(payload)
+        os.replace(tmp_name, path)
+    except BaseException:
+        Path(tmp_name).unlink(missing_ok=True)
+        raise
+
+
+# シングルトンインスタンス（アプリケーション全体で共有）
+_global_profile_service: DatasetProfileService | None = None
+_global_profile_lock = threading.Lock()
+
+
+def get_dataset_profile_service() -> DatasetProfileService:
+    """グローバルなデータセットプロファイルサービスを取得
+
+    Returns:
+        DatasetProfileService: ファイルの指紋毎のプロファイルの作成・共有
+
+    """
+    global _global_profile_service
+    with _global_profile_lock:
+        if _global_profile_service is None:
+            _global_profile_service = DatasetProfileService()
+        return _global_profile_service
@@ -0,0 +1,325 @@
+"""DatasetSummarizer
+
+データセットのプロファイル（DatasetProfileService）から、LLMへ渡すデータセット情報
+（data_info）をトークン上限内の段階的な要約として作成する。
+
+要約の構成:
+1. 概要: 行数・列数・メモリ使用量・欠損数
+2. 列の種類別グループ: 数値 / カテゴリ / 日時 / テキスト（高カーディナリティ）
+3. キー候補・時間軸候補: ほぼ全行で値が異なる整数・文字列の列、日時（として解釈できる）列
+4. 統計量の表: 数値列は平均・標準偏差・最小・中央値・最大、それ以外は欠損率・ユニーク数・代表値
+
+上限を超える場合は次の順に詳細を落とす（列が500を超える横長のデータでも上限内に収める）:
+代表値の数 → 表の行数（要求文で名指しされた列を優先） → 列名の一覧 → 概要のみ
+
+上限は環境変数DATA_INFO_MAX_TOKENSで設定する（既定: 2000）。
+
+設計原則:
+- 単一責任の原則（SRP）: プロファイルの要約のみ（プロファイルの作成は DatasetProfileService）
+- 決定的: 同じプロファイルからは常に同じ出力（プロンプトのキャッシュが効く）
+"""
+
+import os
+import re
+from dataclasses import dataclass
+from typing import Any
+
+from src.infrastructure.services.context_budget import estimate_tokens, truncate_middle
+
+
+_DEFAULT_MAX_TOKENS = 2000
+
+# 数値以外の列をカテゴリとして扱う最大のユニーク数
+_MAX_CATEGORY_UNIQUE = 30
+# キー候補とみなす「値が異なる行」の割合
+_KEY_UNIQUE_RATIO = 0.98
+_ID_NAME = re.compile(r"(^|[_\s-])(id|key|code|no)$|ID$", re.IGNORECASE)
+_MAX_VALUE_CHARS = 24
+# キー候補・時間軸候補として列挙する最大の列数
+_MAX_HINT_NAMES = 10
+
+_GROUP_LABELS = (
+    ("numeric", "数値"),
+    ("category", "カテゴリ"),
+    ("datetime", "日時"),
+    ("text", "テキスト"),
+)
+
+
+@dataclass(frozen=True)
+class _Tier:
+    """要約の詳細度"""
+
+    table_rows: int | None  # 種類毎の統計量の表の最大行数（Noneで全列）
+    top_values: int  # 代表値の数
+    group_names: int | None  # 種類毎に列挙する列名の最大数（Noneで全列）
+
+
+# 詳細な順に試し、上限に収まった最初の段階を採用する
+_TIERS = (
+    _Tier(None, 3, None),
+    _Tier(None, 1, None),
+    _Tier(40, 1, None),
+    _Tier(15, 1, 200),
+    _Tier(5, 0, 60),
+    _Tier(0, 0, 20),
+    _Tier(0, 0, 0),
+)
+
+
+class DatasetSummarizer:
+    """データセットのプロファイルをトークン上限内の要約にする
+
+    使用方法:
+        ```python
+        summarizer = DatasetSummarizer()
+        data_info = summarizer.summarize(profile, max_tokens=1500, focus=user_request)
+        ```
+    """
+
+    def __init__(self, max_tokens: int | None = None) -> None:
+        """コンストラクタ
+
+        Args:
+            max_tokens: 要約の上限トークン数
+                （省略時は環境変数DATA_INFO_MAX_TOKENS または 2000）
+
+        """
+        if max_tokens is None:
+            max_tokens = int(
+                os.environ.get("DATA_INFO_MAX_TOKENS", str(_DEFAULT_MAX_TOKENS)),
+            )
+        self.max_tokens = max_tokens
+
+    def summarize(
+        self,
+        profile: dict[str, Any],
+        max_tokens: int | None = None,
+        focus: str = "",
+    ) -> str:
+        """プロファイルを上限トークン数に収まる要約にする
+
+        Args:
+            profile: DatasetProfileServiceのプロファイル
+            max_tokens: 上限トークン数（省略時はコンストラクタの設定）
+            focus: 要求文（詳細を落とす段階で、名指しされた列を表に優先して残す）
+
+        Returns:
+            Markdown形式の要約
+
+        """
+        limit = self.max_tokens if max_tokens is None else max_tokens
+        columns = _describe_columns(profile)
+
+        text = ""
+        for tier in _TIERS:
+            text = _render(profile, columns, tier, focus)
+            if estimate_tokens(text) <= limit:
+                return text
+        # 概要のみでも収まらない場合（上限が極端に小さい場合）は切り詰める
+        return truncate_middle(text, limit, head_ratio=0.8)
+
+
+def _describe_columns(profile: dict[str, Any]) -> list[dict[str, Any]]:
+    """列毎のプロファイルと統計量を統合し、種類・キー候補・時間軸候補を判定"""
+    rows = int(profile.get("rows", 0))
+    statistics = {row["index"]: row for row in profile.get("statistics", [])}
+    described = []
+    for column in profile.get("column_profiles", []):
+        name = column["name"]
+        unique = int(column.get("unique") or 0)
+        kind = column["kind"]
+        if kind == "datetime" or column.get("datetime_like"):
+            group = "datetime"
+        elif kind == "numeric":
+            group = "numeric"
+        elif kind == "bool" or unique <= _MAX_CATEGORY_UNIQUE:
+            group = "category"
+        else:
+            group = "text"
+
+        is_integer_or_text = kind == "string" or column["dtype"].startswith(
+            ("int", "uint", "Int", "UInt"),
+        )
+        is_key = (
+            rows > 1
+            and group in {"numeric", "text"}
+            and is_integer_or_text
+            and column.get("nulls", 0) == 0
+            and (
+                unique >= rows * _KEY_UNIQUE_RATIO
+                or (_ID_NAME.search(name) is not None and unique >= rows * 0.5)
+            )
+        )
+        described.append(
+            {
+                **column,
+                "group": group,
+                "is_key": is_key,
+                "null_ratio": column.get("nulls", 0) / rows if rows else 0.0,
+                "stats": statistics.get(name, {}),
+            },
+        )
+    return described
+
+
+def _render(
+    profile: dict[str, Any],
+    columns: list[dict[str, Any]],
+    tier: _Tier,
+    focus: str,
+) -> str:
+    rows = int(profile.get("rows", 0))
+    memory_kb = profile.get("memory_usage_bytes", 0) / 1024
+    lines = [
+        f"データ: {rows:,}行 × {len(columns):,}列"
+        f"（メモリ {memory_kb:,.1f} KB、欠損 {int(profile.get('missing_values', 0)):,}件）",
+    ]
+    if not profile.get("exact", True):
+        lines.append("※ 分位点・ユニーク数は近似値")
+
+    groups = {
+        group: [column for column in columns if column["group"] == group]
+        for group, _ in _GROUP_LABELS
+    }
+    counts = " / ".join(
+        f"{label} {len(groups[group])}" for group, label in _GROUP_LABELS if groups[group]
+    )
+    if counts:
+        lines.append(f"列の種類: {counts}")
+
+    if tier.group_names != 0:
+        for group, label in _GROUP_LABELS:
+            if groups[group]:
+                names = [column["name"] for column in groups[group]]
+                lines.append(f"- {label}({len(names)}): {_join_limited(names, tier.group_names)}")
+
+    keys = [column["name"] for column in columns if column["is_key"]]
+    times = [column["name"] for column in groups["datetime"]]
+    if keys:
+        lines.append(f"- キー候補: {_join_limited(keys, _MAX_HINT_NAMES)}")
+    if times:
+        lines.append(f"- 時間軸候補: {_join_limited(times, _MAX_HINT_NAMES)}")
+
+    if tier.table_rows != 0:
+        numeric = [column for column in groups["numeric"] if not column["is_key"]]
+        others = [
+            column
+            for group in ("category", "datetime", "text")
+            for column in groups[group]
+        ]
+        lines.extend(_numeric_table(_select(numeric, tier.table_rows, focus)))
+        lines.extend(
+            _value_table(_select(others, tier.table_rows, focus), tier.top_values),
+        )
+
+    return "\n".join(lines)
+
+
+def _select(
+    columns: list[dict[str, Any]],
+    limit: int | None,
+    focus: str,
+) -> tuple[list[dict[str, Any]], int]:
+    """表に載せる列と省略した列数（省略する場合のみ名指しされた列を先頭に）"""
+    if limit is None or len(columns) <= limit:
+        return columns, 0
+    mentioned = [column for column in columns if _is_mentioned(column["name"], focus)]
+    rest = [column for column in columns if not _is_mentioned(column["name"], focus)]
+    selected = (mentioned + rest)[:limit]
+    return selected, len(columns) - len(selected)
+
+
+def _is_mentioned(name: str, focus: str) -> bool:
+    if not focus or len(name) < 2:
+        return False
+    if name.isascii():
+        # 英数字の列名は前後が英数字でない位置のみ（f5 が f599 に一致しないように）
+        pattern = rf"(?<![A-Za-z0-9_]){re.escape(name)}(?![A-Za-z0-9_])"
+        return re.search(pattern, focus) is not None
+    return name in focus
+
+
+def _numeric_table(selection: tuple[list[dict[str, Any]], int]) -> list[str]:
+    columns, omitted = selection
+    if not columns:
+        return []
+    lines = [
+        "",
+        "### 数値列",
+        "| 列 | 欠損% | 平均 | 標準偏差 | 最小 | 中央値 | 最大 |",
+        "| --- | --- | --- | --- | --- | --- | --- |",
+    ]
+    for column in columns:
+        stats = column["stats"]
+        cells = [
+            column["name"],
+            _percent(column["null_ratio"]),
+            *(
+                _number(stats.get(key))
+                for key in ("mean", "std", "min", "50%", "max")
+            ),
+        ]
+        lines.append("| " + " | ".join(cells) + " |")
+    if omitted:
+        lines.append(f"…他{omitted}列")
+    return lines
+
+
+def _value_table(selection: tuple[list[dict[str, Any]], int], top_values: int) -> list[str]:
+    columns, omitted = selection
+    if not columns:
+        return []
+    header = "| 列 | 種類 | 欠損% | ユニーク数 |" + (" 代表値 |" if top_values else "")
+    lines = [
+        "",
+        "### カテゴリ・日時・テキスト列",
+        header,
+        "| --- | --- | --- | --- |" + (" --- |" if top_values else ""),
+    ]
+    labels = dict(_GROUP_LABELS)
+    for column in columns:
+        cells = [
+            column["name"],
+            labels[column["group"]],
+            _percent(column["null_ratio"]),
+            f"{int(column.get('unique') or 0):,}",
+        ]
+        if top_values:
+            values = column["stats"].get("top_values") or []
+            cells.append(
+                ", ".join(
+                    f"{_clip(str(value))}({count})"
+                    for value, count in values[:top_values]
+                ),
+            )
+        lines.append("| " + " | ".join(cells) + " |")
+    if omitted:
+        lines.append(f"…他{omitted}列")
+    return lines
+
+
+def _join_limited(names: list[str], limit: int | None) -> str:
+    if limit is None or len(names) <= limit:
+        return ", ".join(names)
+    return ", ".join(names[:limit]) + f" …他{len(names) - limit}列"
+
+
+def _number(value: Any) -> str:
+    if value is None:
+        return ""
+    try:
+        return f"{float(value):.4g}"
+    except (TypeError, ValueError):
+        return str(value)
+
+
+def _percent(ratio: float) -> str:
+    return f"{ratio * 100:.1f}" if ratio else "0"
+
+
+def _clip(value: str) -> str:
+    value = value.replace("|", "/").replace("\n", " ")
+    if len(value) <= _MAX_VALUE_CHARS:
+        return value
+    return value[: _MAX_VALUE_CHARS - 1] + "…"
@@ -0,0 +1,139 @@
+"""ImageThumbnailer
+
+実行結果のグラフ画像（base64のPNG）を縮小・圧縮し、
+LLMへ渡すマルチモーダルのメッセージ部品（image_url）に変換する。
+
+- 縮小: 長辺を指定ピクセル以下に（縦横比は維持）
+- 圧縮: JPEGまたはWebP（透過は白背景に合成）
+- 上限: 1レポートあたりの画像枚数と合計バイト数（ImageBudget）
+
+環境変数:
+- REPORT_IMAGE_MAX_SIDE: 長辺の最大ピクセル（既定: 768）
+- REPORT_IMAGE_FORMAT: jpeg / webp（既定: jpeg）
+- REPORT_IMAGE_QUALITY: 圧縮品質 1-95（既定: 70）
+- REPORT_IMAGE_DETAIL: low / high / auto（既定: low。lowは1枚あたり固定85トークン）
+- REPORT_IMAGE_MAX_COUNT: 1レポートあたりの最大枚数（既定: 6、0で画像を送らない）
+- REPORT_IMAGE_MAX_BYTES: 1レポートあたりの圧縮後の合計バイト数（既定: 1000000）
+
+設計原則:
+- 単一責任の原則（SRP）: 画像の縮小・圧縮と枚数・容量の管理のみ
+"""
+
+import base64
+import binascii
+import io
+import logging
+import os
+from dataclasses import dataclass
+from typing import Any
+
+from PIL import Image, UnidentifiedImageError
+
+
+logger = logging.getLogger(__name__)
+
+_FORMATS = {"jpeg": ("JPEG", "image/jpeg"), "webp": ("WEBP", "image/webp")}
+
+
+@dataclass
+class ImageBudget:
+    """1レポートあたりの画像の枚数・容量の上限"""
+
+    max_images: int
+    max_bytes: int
+    used_images: int = 0
+    used_bytes: int = 0
+    skipped: int = 0
+
+    @classmethod
+    def from_env(cls) -> "ImageBudget":
+        return cls(
+            max_images=int(os.environ.get("REPORT_IMAGE_MAX_COUNT", "6")),
+            max_bytes=int(os.environ.get("REPORT_IMAGE_MAX_BYTES", "1000000")),
+        )
+
+    def try_add(self, size: int) -> bool:
+        """枠内なら使用量に加えてTrue"""
+        if self.used_images >= self.max_images or self.used_bytes + size > self.max_bytes:
+            self.skipped += 1
+            return False
+        self.used_images += 1
+        self.used_bytes += size
+        return True
+
+
+class ImageThumbnailer:
+    """base64のPNGを縮小・圧縮してimage_urlのメッセージ部品にする
+
+    使用方法:
+        ```python
+        thumbnailer = ImageThumbnailer()
+        budget = ImageBudget.from_env()
+        part = thumbnailer.to_content_part(result["data"], budget)
+        if part is not None:
+            content.append(part)
+        ```
+    """
+
+    def __init__(
+        self,
+        max_side: int | None = None,
+        image_format: str | None = None,
+        quality: int | None = None,
+        detail: str | None = None,
+    ) -> None:
+        self.max_side = max_side or int(os.environ.get("REPORT_IMAGE_MAX_SIDE", "768"))
+        image_format = (
+            image_format or os.environ.get("REPORT_IMAGE_FORMAT", "jpeg")
+        ).lower()
+        if image_format == "jpg":
+            image_format = "jpeg"
+        if image_format not in _FORMATS:
+            logger.warning("未対応の画像形式のためJPEGを使用します: %s", image_format)
+            image_format = "jpeg"
+        self.image_format = image_format
+        self.quality = quality or int(os.environ.get("REPORT_IMAGE_QUALITY", "70"))
+        self.detail = detail or os.environ.get("REPORT_IMAGE_DETAIL", "low")
+
+    def compress(self, image_base64: str) -> bytes | None:
+        """縮小・圧縮した画像のバイト列（画像として読めない場合はNone）"""
+        try:
+            raw = base64.b64decode(image_base64, validate=False)
+            with Image.open(io.BytesIO(raw)) as source:
+                image = source.convert("RGBA") if source.mode in ("P", "LA") else source.copy()
+        except (binascii.Error, UnidentifiedImageError, OSError, ValueError) as exc:
+            logger.warning("画像を読み込めないためレポート生成に含めません: %s", exc)
+            return None
+
+        if image.mode in ("RGBA", "LA"):
+            # JPEGは透過を扱えないため白背景に合成する
+            background = Image.new("RGB", image.size, (255, 255, 255))
+            background.paste(image, mask=image.getchannel("A"))
+            image = background
+        elif image.mode != "RGB":
+            image = image.convert("RGB")
+        image.thumbnail((self.max_side, self.max_side), Image.Resampling.LANCZOS)
+
+        pil_format, _ = _FORMATS[self.image_format]
+        buffer = io.BytesIO()
+        image.save(buffer, format=pil_format, quality=self.quality, optimize=True)
+        return buffer.getvalue()
+
+    def to_content_part(
+        self,
+        image_base64: str,
+        budget: ImageBudget,
+    ) -> dict[str, Any] | None:
+        """Chat Completionsのimage_url部品（読めない・上限超過の場合はNone）"""
+        if budget.used_images >= budget.max_images:
+            budget.skipped += 1
+            return None
+        data = self.compress(image_base64)
+        if data is None or not budget.try_add(len(data)):
+            return None
+        _, mime_type = _FORMATS[self.image_format]
+        encoded = base64.b64encode(data).decode("ascii")
+        return {
+            "type": "image_url",
+            "image_url": {"url": f"data:{mime_type};base64,{encoded}", "detail": self.detail},
+        }
@@ -0,0 +1,285 @@
+"""JobCheckpointStore
+
+分析ジョブの計画・タスク実行結果をジョブディレクトリへ永続化し、
+プロセス再起動やカーネル異常終了後に未完了タスクから再開できるようにする。
+
+ディレクトリ構成:
+    <job_dir>/
+        job.json            ジョブ情報（要求・ファイル・状態・完了タスク数）
+        plan.json           生成済みの計画
+        tasks/task_001.json 完了したタスクのDataThread
+
+設計原則:
+- 単一責任の原則（SRP）: チェックポイントの読み書きのみ
+- 原子性: 一時ファイルへ書き込んでから置換し、途中状態のJSONを残さない
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any
+
+from pydantic import ValidationError
+
+from src.domain.entities.data_thread import DataThread
+from src.domain.entities.plan import Plan
+
+
+logger = logging.getLogger(__name__)
+
+JOB_MANIFEST_FILE = "job.json"
+PLAN_FILE = "plan.json"
+TASKS_DIR = "tasks"
+
+STATUS_RUNNING = "running"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+
+
+@dataclass
+class JobCheckpoint:
+    """読み込まれたチェックポイント"""
+
+    job_dir: str
+    manifest: dict[str, Any]
+    plan: Plan | None = None
+    task_results: list[DataThread] = field(default_factory=list)
+
+    @property
+    def completed_tasks(self) -> int:
+        return len(self.task_results)
+
+
+class JobCheckpointStore:
+    """ジョブチェックポイントの読み書き
+
+    使用方法:
+        ```python
+        store = JobCheckpointStore()
+        store.start_job(output_dir, session_id=..., message=..., file_path=...)
+        store.save_plan(output_dir, plan, data_info)
+        store.save_task(output_dir, 1, data_thread)
+        store.mark_completed(output_dir)
+        ```
+    """
+
+    def __init__(self, output_root: str | Path | None = None) -> None:
+        """コンストラクタ
+
+        Args:
+            output_root: ジョブディレクトリのルート
+                （省略時は環境変数JOB_OUTPUT_ROOT または output）
+
+        """
+        if output_root is None:
+            output_root = os.environ.get("JOB_OUTPUT_ROOT", "output")
+        self.output_root = Path(output_root)
+        self._lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 書き込み
+    # ------------------------------------------------------------------
+    def start_job(
+        self,
+        job_dir: str,
+        *,
+        session_id: str,
+        message: str,
+        file_path: str | None,
+        is_temporary_file: bool = False,
+    ) -> None:
+        """ジョブ開始を記録（既存のjob.jsonがあれば再開として扱う）"""
+        manifest = self._read_manifest(Path(job_dir))
+        now = time.time()
+        if manifest is None:
+            manifest = {
+                "job_dir": str(job_dir),
+                "session_id": session_id,
+                "message": message,
+                "file_path": file_path,
+                "is_temporary_file": is_temporary_file,
+                "created_at": now,
+                "completed_tasks": 0,
+                "task_count": None,
+                "resume_count": 0,
+            }
+        else:
+            manifest["resume_count"] = int(manifest.get("resume_count", 0)) + 1
+            manifest["session_id"] = session_id
+
+        manifest.update({"status": STATUS_RUNNING, "updated_at": now, "error": None})
+        self._write_manifest(Path(job_dir), manifest)
+
+    def save_plan(self, job_dir: str, plan: Plan, data_info: str) -> None:
+        """計画とdata_infoを保存"""
+        path = Path(job_dir)
+        payload = {"data_info": data_info, "plan": plan.model_dump(mode="json")}
+        self._write_json(path / PLAN_FILE, payload)
+        self._update_manifest(path, task_count=len(plan.tasks))
+
+    def save_task(self, job_dir: str, index: int, data_thread: DataThread) -> None:
+        """完了したタスクのDataThreadを保存
+
+        Args:
+            job_dir: ジョブディレクトリ
+            index: タスク番号（1始まり）
+            data_thread: 実行結果
+
+        """
+        path = Path(job_dir)
+        self._write_json(
+            path / TASKS_DIR / f"task_{index:03d}.json",
+            data_thread.model_dump(mode="json"),
+        )
+        with self._lock:
+            # レビューでの再保存や並行実行で番号が前後しても、load() で復元できる
+            # 連続したタスク数を記録する
+            self._update_manifest_locked(
+                path,
+                completed_tasks=self._count_completed_tasks(path),
+            )
+
+    def mark_completed(self, job_dir: str) -> None:
+        """ジョブ完了を記録"""
+        self._update_manifest(Path(job_dir), status=STATUS_COMPLETED)
+
+    def mark_failed(self, job_dir: str, error: str) -> None:
+        """ジョブ失敗を記録（再開候補として残る）"""
+        self._update_manifest(Path(job_dir), status=STATUS_FAILED, error=error)
+
+    def save_llm_usage(self, job_dir: str, usage: dict[str, Any]) -> None:
+        """ジョブのLLM使用量（トークン数・コスト）を記録"""
+        self._update_manifest(Path(job_dir), llm_usage=usage)
+
+    # ------------------------------------------------------------------
+    # 読み込み
+    # ------------------------------------------------------------------
+    def load(self, job_dir: str) -> JobCheckpoint | None:
+        """チェックポイントを読み込む
+
+        タスクは1から連続している分だけ復元する（欠番以降は未完了扱い）。
+        """
+        path = Path(job_dir)
+        manifest = self._read_manifest(path)
+        if manifest is None:
+            return None
+
+        checkpoint = JobCheckpoint(job_dir=str(path), manifest=manifest)
+
+        plan_payload = self._read_json(path / PLAN_FILE)
+        if plan_payload:
+            try:
+                checkpoint.plan = Plan.model_validate(plan_payload["plan"])
+                manifest.setdefault("data_info", plan_payload.get("data_info"))
+            except (KeyError, ValidationError) as exc:
+                logger.warning("計画チェックポイントが壊れています (%s): %s", path, exc)
+                return checkpoint
+
+        index = 1
+        while True:
+            task_payload = self._read_json(path / TASKS_DIR / f"task_{index:03d}.json")
+            if task_payload is None:
+                break
+            try:
+                checkpoint.task_results.append(DataThread.model_validate(task_payload))
+            except ValidationError as exc:
+                logger.warning("タスク%sのチェックポイントが壊れています: %s", index, exc)
+                break
+            index += 1
+
+        return checkpoint
+
+    def find_resumable_jobs(
+        self,
+        limit: int = 20,
+        session_id: str | None = None,
+    ) -> list[dict[str, Any]]:
+        """未完了（実行中のまま停止 or 失敗）のジョブを新しい順に列挙
+
+        Args:
+            limit: 最大件数
+            session_id: 指定時はそのセッションのディレクトリのみ走査
+
+        """
+        if not self.output_root.exists():
+            return []
+
+        session_pattern = session_id or "*"
+        jobs: list[dict[str, Any]] = []
+        for manifest_path in self.output_root.glob(
+            f"{session_pattern}/*/{JOB_MANIFEST_FILE}",
+        ):
+            manifest = self._read_json(manifest_path)
+            if not manifest or manifest.get("status") == STATUS_COMPLETED:
+                continue
+            if not (manifest_path.parent / PLAN_FILE).exists():
+                # 計画前に停止したジョブは再開しても節約にならない
+                continue
+            manifest["job_dir"] = str(manifest_path.parent)
+            jobs.append(manifest)
+
+        jobs.sort(key=lambda item: item.get("updated_at", 0), reverse=True)
+        return jobs[:limit]
+
+    def is_job_dir(self, job_dir: str) -> bool:
+        """出力ルート配下の正当なジョブディレクトリか判定"""
+        try:
+            resolved = Path(job_dir).resolve()
+            root = self.output_root.resolve()
+        except (OSError, RuntimeError):
+            return False
+        return (
+            resolved.is_relative_to(root)
+            and (resolved / JOB_MANIFEST_FILE).exists()
+        )
+
+    # ------------------------------------------------------------------
+    # 内部処理
+    # ------------------------------------------------------------------
+    def _update_manifest(self, job_dir: Path, **changes: Any) -> None:
+        with self._lock:
+            self._update_manifest_locked(job_dir, **changes)
+
+    def _update_manifest_locked(self, job_dir: Path, **changes: Any) -> None:
+        manifest = self._read_manifest(job_dir) or {"job_dir": str(job_dir)}
+        manifest.update(changes)
+        manifest["updated_at"] = time.time()
+        self._write_json(job_dir / JOB_MANIFEST_FILE, manifest)
+
+    @staticmethod
+    def _count_completed_tasks(job_dir: Path) -> int:
+        count = 0
+        while (job_dir / TASKS_DIR / f"task_{count + 1:03d}.json").exists():
+            count += 1
+        return count
+
+    def _write_manifest(self, job_dir: Path, manifest: dict[str, Any]) -> None:
+        with self._lock:
+            self._write_json(job_dir / JOB_MANIFEST_FILE, manifest)
+
+    def _read_manifest(self, job_dir: Path) -> dict[str, Any] | None:
+        return self._read_json(job_dir / JOB_MANIFEST_FILE)
+
+    @staticmethod
+    def _write_json(path: Path, payload: Any) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f".{path.name}.{threading.get_ident()}.tmp")
+        tmp_path.write_text(
+            json.dumps(payload, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        tmp_path.replace(path)
+
+    @staticmethod
+    def _read_json(path: Path) -> dict[str, Any] | None:
+        try:
+            return json.loads(path.read_text(encoding="utf-8"))
+        except FileNotFoundError:
+            return None
+        except (OSError, json.JSONDecodeError) as exc:
+            logger.warning("チェックポイントの読み込みに失敗しました (%s): %s", path, exc)
+            return None
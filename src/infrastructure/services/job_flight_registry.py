@@ -0,0 +1,206 @@
+"""JobFlightRegistry
+
+同じデータ（内容のハッシュ）・同じ趣旨の要求・同じ設定のジョブが同時に開始された場合に、
+実行中の1本（リーダー）へ後続のセッション（フォロワー）を相乗りさせる（single-flight）。
+
+- 進捗: リーダーのセッションキュー（BroadcastQueue）へのputをフォロワーのキューにも配る。
+  途中から相乗りしたフォロワーには直近のメッセージを1件渡す
+- 結果: リーダーの完了時に finish() がフォロワーのセッションIDを返し、
+  呼び出し側が同じ最終結果（同じ出力フォルダの成果物）を配る
+- 離脱: フォロワーは detach() で相乗りをやめ、独立したジョブとして実行し直せる
+
+環境変数JOB_COALESCING_ENABLED=falseで無効化できる（既定: 有効）。
+
+設計原則:
+- 単一責任の原則（SRP）: 相乗りの判定とメッセージの配布のみ（ジョブの実行は呼び出し側）
+- スレッドセーフ: 相乗り・離脱・完了は1つのロックで直列化し、完了後の相乗りを防ぐ
+"""
+
+import hashlib
+import json
+import queue
+import threading
+from dataclasses import dataclass, field
+from typing import Any
+
+from src.infrastructure.services.dataset_profile import file_content_digest
+from src.infrastructure.services.plan_cache import normalize_request
+
+
+class BroadcastQueue(queue.Queue):
+    """put()したメッセージをフォロワーのキューにも配るセッションキュー"""
+
+    def __init__(self) -> None:
+        super().__init__()
+        self._followers: dict[str, queue.Queue] = {}
+        self._last: Any = None
+        self._followers_lock = threading.Lock()
+
+    def put(self, item: Any, block: bool = True, timeout: float | None = None) -> None:
+        super().put(item, block, timeout)
+        with self._followers_lock:
+            self._last = item
+            followers = list(self._followers.values())
+        for follower in followers:
+            follower.put(item)
+
+    def attach(self, session_id: str) -> queue.Queue:
+        """フォロワーのキューを追加（直近のメッセージを先に入れておく）"""
+        follower: queue.Queue = queue.Queue()
+        with self._followers_lock:
+            if self._last is not None:
+                follower.put(self._last)
+            self._followers[session_id] = follower
+        return follower
+
+    def detach(self, session_id: str) -> bool:
+        with self._followers_lock:
+            return self._followers.pop(session_id, None) is not None
+
+    def followers(self) -> list[str]:
+        with self._followers_lock:
+            return list(self._followers)
+
+
+@dataclass
+class JobFlight:
+    """実行中の1本のジョブと、その結果を待つフォロワー"""
+
+    key: str
+    leader_session: str
+    thread: threading.Thread
+    queue: BroadcastQueue = field(default_factory=BroadcastQueue)
+    # フォロワー毎の開始引数（離脱して独立実行する場合に使う）
+    follower_args: dict[str, tuple[Any, ...]] = field(default_factory=dict)
+    finished: bool = False
+
+
+class JobFlightRegistry:
+    """同一ジョブの相乗りを管理する
+
+    使用方法:
+        ```python
+        registry = JobFlightRegistry()
+        key = registry.make_key(file_path, message, {"refresh_plan": False})
+        flight, follower_queue = registry.join_or_lead(key, session_id, thread, job_args)
+        if follower_queue is None:
+            thread.start()  # リーダーとして実行（flight.queueへ進捗をput）
+            ...
+            for follower in registry.finish(key):
+                ...  # 最終結果を配る
+        ```
+    """
+
+    def __init__(self) -> None:
+        self._flights: dict[str, JobFlight] = {}
+        self._lock = threading.Lock()
+        self._metrics = {"leaders": 0, "followers": 0, "detached": 0}
+
+    def make_key(
+        self,
+        file_path: str | None,
+        message: str,
+        settings: dict[str, Any] | None = None,
+    ) -> str | None:
+        """データの内容・正規化した要求・設定から相乗りのキーを計算
+
+        Returns:
+            キー（データを読めない場合はNoneで、相乗りしない）
+
+        """
+        content_digest = None
+        if file_path:
+            content_digest = file_content_digest(file_path)
+            if content_digest is None:
+                return None
+        canonical = json.dumps(
+            {
+                "data": content_digest,
+                "request": normalize_request(message),
+                "settings": settings or {},
+            },
+            ensure_ascii=False,
+            sort_keys=True,
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    def join_or_lead(
+        self,
+        key: str,
+        session_id: str,
+        thread: threading.Thread,
+        job_args: tuple[Any, ...],
+    ) -> tuple[JobFlight, queue.Queue | None]:
+        """実行中の同一ジョブがあれば相乗りし、無ければリーダーとして登録
+
+        Returns:
+            (ジョブ, フォロワーのキュー)。リーダーになった場合のキューはNone
+
+        """
+        with self._lock:
+            flight = self._flights.get(key)
+            if (
+                flight is not None
+                and not flight.finished
+                and flight.leader_session != session_id
+            ):
+                flight.follower_args[session_id] = job_args
+                self._metrics["followers"] += 1
+                return flight, flight.queue.attach(session_id)
+
+            flight = JobFlight(key=key, leader_session=session_id, thread=thread)
+            self._flights[key] = flight
+            self._metrics["leaders"] += 1
+            return flight, None
+
+    def flight_of(self, session_id: str) -> JobFlight | None:
+        """フォロワーとして相乗りしているジョブ"""
+        with self._lock:
+            return next(
+                (
+                    flight
+                    for flight in self._flights.values()
+                    if session_id in flight.follower_args
+                ),
+                None,
+            )
+
+    def detach(self, session_id: str) -> tuple[Any, ...] | None:
+        """相乗りをやめる
+
+        Returns:
+            フォロワーの開始引数（相乗りしていなかった場合はNone）
+
+        """
+        with self._lock:
+            for flight in self._flights.values():
+                job_args = flight.follower_args.pop(session_id, None)
+                if job_args is not None:
+                    flight.queue.detach(session_id)
+                    self._metrics["detached"] += 1
+                    return job_args
+        return None
+
+    def finish(self, key: str) -> list[str]:
+        """リーダーの完了を記録し、結果を配るフォロワーのセッションIDを返す"""
+        with self._lock:
+            flight = self._flights.pop(key, None)
+            if flight is None:
+                return []
+            flight.finished = True
+            followers = list(flight.follower_args)
+            for session_id in followers:
+                flight.queue.detach(session_id)
+            flight.follower_args.clear()
+            return followers
+
+    def get_metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                **self._metrics,
+                "in_flight": len(self._flights),
+                "waiting_followers": sum(
+                    len(flight.follower_args) for flight in self._flights.values()
+                ),
+            }
@@ -0,0 +1,188 @@
+"""LLMリクエストのヘッジ
+
+応答が遅い呼び出し（レイテンシの裾）を短縮するため、一定時間内に応答が無ければ
+同じリクエストをもう1本送り、先に得られた有効な応答を採用して残りをキャンセルする。
+
+- しきい値: ステージ毎の直近のレイテンシの指定パーセンタイル（既定: p95）。
+  サンプルが揃うまでは初期値を使い、最小値・最大値で挟む。
+  2本目が採用されてキャンセルした1本目は、完了したレイテンシではなく下限
+  （実際はそれ以上かかる）として扱い、しきい値を引き下げないようにする
+- 送信先: 既定ではルートの次のデプロイメント（無ければ同じデプロイメント）
+- 上限: ヘッジした割合が全リクエストの指定割合を超えないようにする
+  （クォータを食い潰さないため。少数のバーストは許容する）
+
+環境変数（既定は無効。LLM_HEDGE_ENABLED=true で有効化）:
+- LLM_HEDGE_STAGES: 対象ステージ（カンマ区切り。空なら全ステージ、既定: code）
+- LLM_HEDGE_PERCENTILE: しきい値に使うパーセンタイル（既定: 0.95）
+- LLM_HEDGE_INITIAL_DELAY_SECONDS: サンプル不足時のしきい値（既定: 10）
+- LLM_HEDGE_MIN_DELAY_SECONDS / LLM_HEDGE_MAX_DELAY_SECONDS: しきい値の下限・上限
+  （既定: 1 / 60）
+- LLM_HEDGE_MAX_RATIO: ヘッジする割合の上限（既定: 0.05）
+- LLM_HEDGE_TO_FALLBACK: ルートの次のデプロイメントへ送るか（既定: true）
+
+設計原則:
+- 単一責任の原則（SRP）: ヘッジするか・いつするかの判断のみ（送信はリポジトリ側）
+- スレッドセーフ: 複数ジョブスレッド・イベントループから同時に利用可能
+"""
+
+import math
+import os
+import threading
+from collections import deque
+from typing import Any
+
+
+# しきい値の計算に使う直近のサンプル数・必要な最小サンプル数
+_LATENCY_WINDOW = 200
+_MIN_SAMPLES = 20
+# ヘッジ上限のバースト（割合の上限に加えて許容する件数）
+_HEDGE_BURST = 1
+
+
+def _env_flag(name: str, default: str) -> bool:
+    return os.environ.get(name, default).lower() == "true"
+
+
+class RequestHedger:
+    """ヘッジのしきい値と送信割合を管理する
+
+    使用方法:
+        ```python
+        hedger = get_request_hedger()
+        if hedger.applies_to(stage):
+            delay = hedger.delay_for(stage)
+            ...  # delay秒以内に応答が無ければ
+            if hedger.try_acquire():
+                ...  # 2本目を送信
+        hedger.observe(stage, latency)
+        ```
+    """
+
+    def __init__(
+        self,
+        enabled: bool | None = None,
+        stages: set[str] | None = None,
+        percentile: float | None = None,
+        max_ratio: float | None = None,
+    ) -> None:
+        self.enabled = (
+            enabled if enabled is not None else _env_flag("LLM_HEDGE_ENABLED", "false")
+        )
+        if stages is None:
+            raw = os.environ.get("LLM_HEDGE_STAGES", "code")
+            stages = {stage.strip() for stage in raw.split(",") if stage.strip()}
+        self.stages = stages
+        self.percentile = (
+            percentile
+            if percentile is not None
+            else float(os.environ.get("LLM_HEDGE_PERCENTILE", "0.95"))
+        )
+        self.max_ratio = (
+            max_ratio
+            if max_ratio is not None
+            else float(os.environ.get("LLM_HEDGE_MAX_RATIO", "0.05"))
+        )
+        self.initial_delay = float(os.environ.get("LLM_HEDGE_INITIAL_DELAY_SECONDS", "10"))
+        self.min_delay = float(os.environ.get("LLM_HEDGE_MIN_DELAY_SECONDS", "1"))
+        self.max_delay = float(os.environ.get("LLM_HEDGE_MAX_DELAY_SECONDS", "60"))
+        self.to_fallback = _env_flag("LLM_HEDGE_TO_FALLBACK", "true")
+        # ステージ毎の (秒数, 完了したか)。未完了はキャンセル時点までの下限
+        self._latencies: dict[str, deque[tuple[float, bool]]] = {}
+        self._requests = 0
+        self._hedged = 0
+        self._hedge_wins = 0
+        self._budget_skips = 0
+        self._lock = threading.Lock()
+
+    def applies_to(self, stage: str | None) -> bool:
+        """このステージの呼び出しをヘッジ対象にするか"""
+        return self.enabled and (not self.stages or (stage or "") in self.stages)
+
+    def delay_for(self, stage: str | None) -> float:
+        """2本目を送るまでの待機秒数（直近のレイテンシのパーセンタイル）"""
+        with self._lock:
+            self._requests += 1
+            samples = list(self._latencies.get(stage or "", ()))
+        if len(samples) < _MIN_SAMPLES:
+            delay = self.initial_delay
+        else:
+            # 未完了のサンプルは完了したどのサンプルよりも遅いとみなして順位を付ける
+            finished = sorted(latency for latency, done in samples if done)
+            censored = sorted(latency for latency, done in samples if not done)
+            index = min(len(samples) - 1, math.ceil(len(samples) * self.percentile) - 1)
+            if index < len(finished):
+                delay = finished[index]
+            else:
+                delay = max(
+                    finished[-1] if finished else 0.0,
+                    censored[index - len(finished)],
+                )
+        return min(self.max_delay, max(self.min_delay, delay))
+
+    def try_acquire(self) -> bool:
+        """送信割合の上限内なら2本目の送信枠を確保"""
+        with self._lock:
+            if self._hedged + 1 > self._requests * self.max_ratio + _HEDGE_BURST:
+                self._budget_skips += 1
+                return False
+            self._hedged += 1
+            return True
+
+    def observe(
+        self,
+        stage: str | None,
+        latency: float,
+        *,
+        finished: bool = True,
+    ) -> None:
+        """1本目のレイテンシを記録
+
+        Args:
+            stage: ステージ名
+            latency: 応答までの秒数（finished=Falseの場合はキャンセルまでの秒数）
+            finished: 応答を受信したか（Falseは2本目の採用でキャンセルした下限値）
+
+        """
+        with self._lock:
+            window = self._latencies.setdefault(
+                stage or "",
+                deque(maxlen=_LATENCY_WINDOW),
+            )
+            window.append((latency, finished))
+
+    def record_win(self) -> None:
+        """2本目の応答が採用された"""
+        with self._lock:
+            self._hedge_wins += 1
+
+    def get_metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                "enabled": self.enabled,
+                "requests": self._requests,
+                "hedged": self._hedged,
+                "hedge_wins": self._hedge_wins,
+                "budget_skips": self._budget_skips,
+                "hedge_ratio": (
+                    round(self._hedged / self._requests, 4) if self._requests else 0.0
+                ),
+            }
+
+
+# シングルトンインスタンス（アプリケーション全体で共有）
+_global_hedger: RequestHedger | None = None
+_global_hedger_lock = threading.Lock()
+
+
+def get_request_hedger() -> RequestHedger:
+    """グローバルなリクエストヘッジャーを取得
+
+    Returns:
+        RequestHedger: ヘッジのしきい値と送信割合
+
+    """
+    global _global_hedger
+    with _global_hedger_lock:
+        if _global_hedger is None:
+            _global_hedger = RequestHedger()
+        return _global_hedger
@@ -0,0 +1,377 @@
+"""LLM呼び出しのスロットリング・リトライ・サーキットブレーカー
+
+Azure OpenAIのデプロイメント毎のクォータ（RPM / TPM）に合わせて
+クライアント側で送信ペースを制御し、429・一時的な5xxをリトライで吸収する。
+
+- TokenBucket: 1分あたりの補充量を持つトークンバケット
+- DeploymentRateLimiter: RPMとTPM（推定トークン数）の2つのバケットを同時に満たすまで待機。
+  429を受けたらRetry-Afterの間、デプロイメント全体の送信を止めて過剰な再送を防ぐ
+- RetryPolicy: 指数バックオフ + フルジッター（Retry-Afterがあればそれを下限とする）
+- CircuitBreaker: リトライを使い切った失敗が続いたら一定時間オープンし、
+  呼び出し側はルールベースのフォールバックへ切り替える
+
+制限値は環境変数で設定する:
+- LLM_RPM_LIMIT / LLM_TPM_LIMIT: 全デプロイメント共通の既定値（0以下で無制限）
+- LLM_RATE_LIMITS: デプロイメント別の上書き（JSON）
+  例: {"gpt-4o-mini": {"rpm": 300, "tpm": 150000}}
+
+設計原則:
+- 単一責任の原則（SRP）: 送信ペースと失敗時の振る舞いのみ
+- スレッドセーフ: 複数ジョブスレッド・イベントループから同時に利用可能
+"""
+
+import asyncio
+import email.utils
+import json
+import logging
+import os
+import random
+import threading
+import time
+from dataclasses import dataclass
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+RETRYABLE_STATUS_CODES = frozenset({408, 409, 429, 500, 502, 503, 504})
+RETRYABLE_ERROR_NAMES = frozenset({"APITimeoutError", "APIConnectionError"})
+
+# 完了トークン数が指定されていない場合の見積もり
+_DEFAULT_COMPLETION_TOKENS = 1000
+# 画像1枚あたりの見積もり（detail=lowは固定85トークン、それ以外は512pxタイル4枚分）
+_IMAGE_TOKENS = {"low": 85}
+_DEFAULT_IMAGE_TOKENS = 765
+
+
+def estimate_prompt_tokens(messages: list[dict[str, Any]]) -> int:
+    """プロンプトのトークン数の概算
+
+    日本語混じりのテキストを想定し、おおよそ3文字 = 1トークンで概算する。
+    マルチモーダルの画像部品はbase64の長さではなく1枚あたりの固定値で数える。
+    """
+    chars = 0
+    image_tokens = 0
+    for message in messages:
+        content = message.get("content", "")
+        if isinstance(content, str):
+            chars += len(content)
+            continue
+        for part in content if isinstance(content, list) else [content]:
+            if isinstance(part, dict) and part.get("type") == "image_url":
+                detail = (part.get("image_url") or {}).get("detail", "auto")
+                image_tokens += _IMAGE_TOKENS.get(detail, _DEFAULT_IMAGE_TOKENS)
+            elif isinstance(part, dict) and part.get("type") == "text":
+                chars += len(part.get("text", ""))
+            else:
+                chars += len(json.dumps(part, ensure_ascii=False, default=str))
+    return chars // 3 + 4 * len(messages) + image_tokens
+
+
+def estimate_request_tokens(
+    messages: list[dict[str, Any]],
+    max_tokens: int | None = None,
+) -> int:
+    """TPM消費量の見積もり（プロンプト + 完了トークン上限）
+
+    Azureも送信時点では max_tokens 分を予約してTPMを計上する。
+    """
+    return estimate_prompt_tokens(messages) + (
+        max_tokens or _DEFAULT_COMPLETION_TOKENS
+    )
+
+
+class TokenBucket:
+    """1分あたり rate_per_minute を補充するトークンバケット"""
+
+    def __init__(self, rate_per_minute: float, capacity: float | None = None) -> None:
+        self.rate_per_second = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """amount を取得できるまでの秒数（0なら即時取得可能）"""
+        self._refill(now)
+        # 1回の要求が容量を超える場合は満タンになった時点で通す
+        amount = min(amount, self.capacity)
+        if self._tokens >= amount:
+            return 0.0
+        return (amount - self._tokens) / self.rate_per_second
+
+    def consume(self, amount: float) -> None:
+        self._tokens -= min(amount, self.capacity)
+
+    def _refill(self, now: float) -> None:
+        elapsed = max(0.0, now - self._updated_at)
+        self._tokens = min(self.capacity, self._tokens + elapsed * self.rate_per_second)
+        self._updated_at = now
+
+
+class DeploymentRateLimiter:
+    """デプロイメント単位のRPM / TPMリミッター"""
+
+    def __init__(self, rpm: float | None, tpm: float | None) -> None:
+        self._requests = TokenBucket(rpm) if rpm and rpm > 0 else None
+        self._tokens = TokenBucket(tpm) if tpm and tpm > 0 else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+        self.throttled_seconds = 0.0
+
+    def reserve(self, tokens: int) -> float:
+        """枠を予約する。予約できた場合は0、できない場合は待機すべき秒数を返す"""
+        with self._lock:
+            now = time.monotonic()
+            wait = max(0.0, self._paused_until - now)
+            if self._requests is not None:
+                wait = max(wait, self._requests.wait_time(1, now))
+            if self._tokens is not None:
+                wait = max(wait, self._tokens.wait_time(tokens, now))
+            if wait > 0:
+                return wait
+            if self._requests is not None:
+                self._requests.consume(1)
+            if self._tokens is not None:
+                self._tokens.consume(tokens)
+            return 0.0
+
+    def acquire(self, tokens: int) -> None:
+        """枠が空くまでスレッドをブロックして待機"""
+        while (wait := self.reserve(tokens)) > 0:
+            self._record_throttle(wait)
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        """枠が空くまでイベントループを止めずに待機"""
+        while (wait := self.reserve(tokens)) > 0:
+            self._record_throttle(wait)
+            await asyncio.sleep(wait)
+
+    def pause(self, seconds: float) -> None:
+        """429受信時: 指定秒数、このデプロイメントへの送信を全体で止める"""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def _record_throttle(self, wait: float) -> None:
+        with self._lock:
+            self.throttled_seconds += wait
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """指数バックオフ + フルジッター"""
+
+    max_retries: int = 5
+    base_delay: float = 1.0
+    max_delay: float = 60.0
+
+    @classmethod
+    def from_env(cls) -> "RetryPolicy":
+        return cls(
+            max_retries=int(os.environ.get("LLM_MAX_RETRIES", "5")),
+            base_delay=float(os.environ.get("LLM_RETRY_BASE_DELAY", "1.0")),
+            max_delay=float(os.environ.get("LLM_RETRY_MAX_DELAY", "60.0")),
+        )
+
+    def compute_delay(self, attempt: int, retry_after: float | None = None) -> float:
+        """attempt回目（0始まり）のリトライ前の待機秒数"""
+        backoff = min(self.max_delay, self.base_delay * (2**attempt))
+        delay = random.uniform(0, backoff)
+        if retry_after is not None:
+            # サーバー指定の待機時間は下回らない（同時再送を避けるため少し散らす）
+            delay = max(delay, retry_after + random.uniform(0, self.base_delay))
+        return min(delay, max(self.max_delay, retry_after or 0.0))
+
+
+def is_retryable_error(exc: BaseException) -> bool:
+    """429・一時的な5xx・タイムアウト・接続エラーか判定"""
+    if type(exc).__name__ in RETRYABLE_ERROR_NAMES:
+        return True
+    return getattr(exc, "status_code", None) in RETRYABLE_STATUS_CODES
+
+
+def is_rate_limit_error(exc: BaseException) -> bool:
+    return getattr(exc, "status_code", None) == 429
+
+
+def retry_after_seconds(exc: BaseException) -> float | None:
+    """例外のHTTPレスポンスから Retry-After（秒）を取得"""
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    retry_after_ms = headers.get("retry-after-ms")
+    if retry_after_ms:
+        try:
+            return float(retry_after_ms) / 1000.0
+        except ValueError:
+            pass
+
+    retry_after = headers.get("retry-after")
+    if not retry_after:
+        return None
+    try:
+        return float(retry_after)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(retry_after)
+        if parsed is None:
+            return None
+        return max(0.0, parsed.timestamp() - time.time())
+
+
+class CircuitBreaker:
+    """連続失敗でオープンし、一定時間後に1件だけ試行（ハーフオープン）する"""
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int = 3, reset_timeout: float = 60.0) -> None:
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            return self._state
+
+    def is_cooling_down(self) -> bool:
+        """オープン中でリセット待ちの間はTrue（送信先の選択で迂回するため）"""
+        with self._lock:
+            return (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at < self.reset_timeout
+            )
+
+    def allow_request(self) -> bool:
+        """送信してよいか（オープン中はFalse、ハーフオープンでは1件のみTrue）"""
+        with self._lock:
+            if self._state == self.CLOSED:
+                return True
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.reset_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probe_in_flight = False
+            if self._probe_in_flight:
+                return False
+            self._probe_in_flight = True
+            return True
+
+    def cancel_probe(self) -> None:
+        """試行中の送信が結果を得ずに中断された（成功・失敗のどちらにも数えない）"""
+        with self._lock:
+            self._probe_in_flight = False
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._state = self.CLOSED
+            self._failures = 0
+            self._probe_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self._failures += 1
+            self._probe_in_flight = False
+            if self._state == self.HALF_OPEN or self._failures >= self.failure_threshold:
+                if self._state != self.OPEN:
+                    logger.warning(
+                        "LLMサーキットブレーカーをオープンしました（連続失敗 %d 回）",
+                        self._failures,
+                    )
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+
+
+@dataclass
+class DeploymentGuard:
+    """デプロイメント毎のリミッターとサーキットブレーカー"""
+
+    deployment: str
+    limiter: DeploymentRateLimiter
+    breaker: CircuitBreaker
+    retries: int = 0
+    rate_limited: int = 0
+    fallbacks: int = 0
+
+    def get_metrics(self) -> dict[str, Any]:
+        return {
+            "deployment": self.deployment,
+            "breaker_state": self.breaker.state,
+            "retries": self.retries,
+            "rate_limited": self.rate_limited,
+            "fallbacks": self.fallbacks,
+            "throttled_seconds": round(self.limiter.throttled_seconds, 3),
+        }
+
+
+class DeploymentGuardRegistry:
+    """デプロイメント名 → DeploymentGuard の共有レジストリ
+
+    クォータはデプロイメント単位でプロセス全体に効くため、
+    リポジトリのインスタンスが複数あっても同じガードを共有する。
+    """
+
+    def __init__(self) -> None:
+        self._guards: dict[str, DeploymentGuard] = {}
+        self._lock = threading.Lock()
+        self.retry_policy = RetryPolicy.from_env()
+
+    def get(self, deployment: str) -> DeploymentGuard:
+        with self._lock:
+            guard = self._guards.get(deployment)
+            if guard is None:
+                rpm, tpm = self._limits_for(deployment)
+                guard = DeploymentGuard(
+                    deployment=deployment,
+                    limiter=DeploymentRateLimiter(rpm, tpm),
+                    breaker=CircuitBreaker(
+                        failure_threshold=int(
+                            os.environ.get("LLM_BREAKER_FAILURE_THRESHOLD", "3"),
+                        ),
+                        reset_timeout=float(
+                            os.environ.get("LLM_BREAKER_RESET_SECONDS", "60"),
+                        ),
+                    ),
+                )
+                self._guards[deployment] = guard
+            return guard
+
+    def get_metrics(self) -> list[dict[str, Any]]:
+        with self._lock:
+            guards = list(self._guards.values())
+        return [guard.get_metrics() for guard in guards]
+
+    @staticmethod
+    def _limits_for(deployment: str) -> tuple[float, float]:
+        rpm = float(os.environ.get("LLM_RPM_LIMIT", "0"))
+        tpm = float(os.environ.get("LLM_TPM_LIMIT", "0"))
+        overrides = os.environ.get("LLM_RATE_LIMITS")
+        if overrides:
+            try:
+                specific = json.loads(overrides).get(deployment, {})
+                rpm = float(specific.get("rpm", rpm))
+                tpm = float(specific.get("tpm", tpm))
+            except (ValueError, AttributeError) as exc:
+                logger.warning("LLM_RATE_LIMITS を解釈できません: %s", exc)
+        return rpm, tpm
+
+
+# シングルトンインスタンス（アプリケーション全体で共有）
+_global_guard_registry = DeploymentGuardRegistry()
+
+
+def get_deployment_guards() -> DeploymentGuardRegistry:
+    """グローバルなデプロイメントガードレジストリを取得
+
+    Returns:
+        DeploymentGuardRegistry: デプロイメント毎のリミッター・ブレーカー
+
+    """
+    return _global_guard_registry
@@ -0,0 +1,293 @@
+"""LLMResponseCache
+
+LLM応答をSQLiteへ永続化し、同一リクエストの再呼び出しを省略するキャッシュ。
+
+キーは次の要素を正規化したJSONのSHA-256:
+- messages（順序込み）
+- デプロイメント名・モデル名・temperature・max_tokens
+- response_format（Pydanticモデルの場合はJSONスキーマ）
+
+スキーマが変わればキーも変わるため、古い構造の応答が復元されることはない。
+Pydantic応答（Plan / Program / Review 等）はJSONで保存し、取得時に
+model_validate_jsonで同じ型へ復元する。
+
+設計原則:
+- 単一責任の原則（SRP）: 応答の保存・取得・破棄のみ
+- スレッドセーフ: 接続は1本をロックで保護（WALで他プロセスとも共有可能）
+"""
+
+import hashlib
+import inspect
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any
+
+from pydantic import BaseModel, ValidationError
+
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_DB_PATH = "output/.llm_cache/responses.sqlite3"
+_DEFAULT_TTL_SECONDS = 7 * 24 * 60 * 60
+_DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+
+KIND_TEXT = "text"
+KIND_PYDANTIC = "pydantic"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    kind TEXT NOT NULL,
+    format_name TEXT,
+    payload TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_responses_accessed_at ON responses(accessed_at);
+CREATE INDEX IF NOT EXISTS idx_responses_created_at ON responses(created_at);
+"""
+
+
+class LLMResponseCache:
+    """ディスク永続のLLM応答キャッシュ（TTL + サイズ上限のLRU破棄）
+
+    使用方法:
+        ```python
+        cache = LLMResponseCache()
+        key = cache.make_key(messages, params, response_format)
+        hit, value = cache.get(key, response_format)
+        if not hit:
+            value = call_llm(...)
+            cache.put(key, value)
+        ```
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path | None = None,
+        ttl_seconds: float | None = None,
+        max_bytes: int | None = None,
+    ) -> None:
+        """コンストラクタ
+
+        Args:
+            db_path: SQLiteファイルのパス
+                （省略時は環境変数LLM_CACHE_PATH または output/.llm_cache/responses.sqlite3）
+            ttl_seconds: 保存からの有効秒数
+                （省略時は環境変数LLM_CACHE_TTL_SECONDS または 7日）
+            max_bytes: 保存する応答の合計バイト数上限
+                （省略時は環境変数LLM_CACHE_MAX_BYTES または 256MB）
+
+        """
+        if db_path is None:
+            db_path = os.environ.get("LLM_CACHE_PATH", _DEFAULT_DB_PATH)
+        if ttl_seconds is None:
+            ttl_seconds = float(
+                os.environ.get("LLM_CACHE_TTL_SECONDS", str(_DEFAULT_TTL_SECONDS)),
+            )
+        if max_bytes is None:
+            max_bytes = int(os.environ.get("LLM_CACHE_MAX_BYTES", str(_DEFAULT_MAX_BYTES)))
+
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+
+        self._lock = threading.Lock()
+        self._metrics = {"hits": 0, "misses": 0, "writes": 0, "expired": 0, "evictions": 0}
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=30.0,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ------------------------------------------------------------------
+    # キー生成
+    # ------------------------------------------------------------------
+    @staticmethod
+    def make_key(
+        messages: list[dict[str, Any]],
+        params: dict[str, Any],
+        response_format: type | dict[str, Any] | None = None,
+    ) -> str:
+        """リクエストの正規化ハッシュを生成
+
+        Args:
+            messages: LLMへ送るメッセージ
+            params: モデル名・temperature等の呼び出しパラメータ
+            response_format: 応答フォーマット（Pydanticモデルまたは辞書）
+
+        """
+        if inspect.isclass(response_format) and issubclass(response_format, BaseModel):
+            format_spec: Any = {
+                "name": response_format.__name__,
+                "schema": response_format.model_json_schema(),
+            }
+        else:
+            format_spec = response_format
+
+        canonical = json.dumps(
+            {"messages": messages, "params": params, "response_format": format_spec},
+            ensure_ascii=False,
+            sort_keys=True,
+            separators=(",", ":"),
+            default=str,
+        )
+        return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+    # ------------------------------------------------------------------
+    # 取得・保存
+    # ------------------------------------------------------------------
+    def get(
+        self,
+        key: str,
+        response_format: type | dict[str, Any] | None = None,
+    ) -> tuple[bool, Any]:
+        """キャッシュを参照
+
+        Returns:
+            (ヒットしたか, 復元した応答)。ミス時の応答はNone
+
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT kind, payload, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self._metrics["misses"] += 1
+                return False, None
+
+            kind, payload, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._metrics["expired"] += 1
+                self._metrics["misses"] += 1
+                return False, None
+
+            try:
+                value = self._decode(kind, payload, response_format)
+            except (ValidationError, ValueError) as exc:
+                logger.warning("キャッシュ済み応答を復元できないため破棄します: %s", exc)
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._metrics["misses"] += 1
+                return False, None
+
+            self._conn.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (now, key),
+            )
+            self._metrics["hits"] += 1
+            return True, value
+
+    def put(self, key: str, value: Any) -> None:
+        """応答を保存（文字列またはPydanticモデルのみ。それ以外は保存しない）"""
+        if isinstance(value, BaseModel):
+            kind, format_name, payload = (
+                KIND_PYDANTIC,
+                type(value).__name__,
+                value.model_dump_json(),
+            )
+        elif isinstance(value, str):
+            kind, format_name, payload = KIND_TEXT, None, value
+        else:
+            return
+
+        now = time.time()
+        size = len(payload.encode("utf-8"))
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses "
+                "(key, kind, format_name, payload, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (key, kind, format_name, payload, size, now, now),
+            )
+            self._metrics["writes"] += 1
+            self._purge_locked(now)
+
+    def clear(self) -> None:
+        """全エントリを削除"""
+        with self._lock:
+            self._conn.execute("DELETE FROM responses")
+
+    def get_metrics(self) -> dict[str, Any]:
+        """ヒット率・件数・サイズ等のメトリクスを取得"""
+        with self._lock:
+            entries, total_bytes = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses",
+            ).fetchone()
+            metrics: dict[str, Any] = dict(self._metrics)
+
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics.update(
+            {
+                "hit_ratio": metrics["hits"] / lookups if lookups else 0.0,
+                "entries": entries,
+                "bytes": total_bytes,
+                "max_bytes": self.max_bytes,
+            },
+        )
+        return metrics
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # 内部処理
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _decode(
+        kind: str,
+        payload: str,
+        response_format: type | dict[str, Any] | None,
+    ) -> Any:
+        if kind == KIND_TEXT:
+            return payload
+        if not (
+            inspect.isclass(response_format) and issubclass(response_format, BaseModel)
+        ):
+            raise ValueError("構造化応答の復元に必要なresponse_formatがありません")
+        return response_format.model_validate_json(payload)
+
+    def _purge_locked(self, now: float) -> None:
+        """TTL切れを削除し、サイズ上限を超えた分を古いアクセス順に破棄"""
+        expired = self._conn.execute(
+            "DELETE FROM responses WHERE created_at < ?",
+            (now - self.ttl_seconds,),
+        ).rowcount
+        self._metrics["expired"] += max(expired, 0)
+
+        (total_bytes,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM responses",
+        ).fetchone()
+        if total_bytes <= self.max_bytes:
+            return
+
+        overflow = total_bytes - self.max_bytes
+        victims: list[str] = []
+        for key, size in self._conn.execute(
+            "SELECT key, size FROM responses ORDER BY accessed_at ASC",
+        ):
+            victims.append(key)
+            overflow -= size
+            if overflow <= 0:
+                break
+
+        self._conn.executemany(
+            "DELETE FROM responses WHERE key = ?",
+            [(key,) for key in victims],
+        )
+        self._metrics["evictions"] += len(victims)
@@ -0,0 +1,418 @@
+"""LLMルーター
+
+ステージ（plan / code / review / report 等）毎に送信先のデプロイメントを振り分ける。
+
+- ルート: ステージ → デプロイメントの優先順リスト（フォールバックチェーン）。
+  呼び出し回数の多いステージ（コード生成等）を安価なデプロイメントへ、
+  品質が効くステージ（計画・レポート）を上位のデプロイメントへ向けられる
+- 健全性: デプロイメント毎に直近の呼び出し（件数・経過時間の窓）のレイテンシと
+  エラーを記録し、p95レイテンシまたはエラー率がルートのSLOを超えたら
+  チェーンの次のデプロイメントへ切り替える。窓から古い記録が抜けると
+  サンプル不足で健全扱いに戻るため、一定時間後に自然に元のデプロイメントを再試行する
+- 同時実行数: ルート（ステージ）毎に上限を設け、大量のコード生成が
+  計画・レポートの送信枠を使い切らないようにする
+
+ステージは `llm_usage_scope(stage=...)` のタグから取得する（リポジトリ側）。
+
+ルートは環境変数LLM_ROUTESで設定する（JSON文字列、またはJSONファイルのパス）。
+"default" はルートが無いステージに使う。リストだけを書いた場合はデプロイメントのみ指定。
+    例: {"plan": {"deployments": ["gpt-4o", "gpt-4o-mini"], "p95_slo_seconds": 45},
+         "code": {"deployments": ["gpt-4o-mini", "gpt-4o"], "max_concurrency": 8},
+         "report": ["gpt-4o", "gpt-4o-mini"]}
+
+ルート毎に省略した値は次の環境変数の既定値を使う:
+- LLM_ROUTE_P95_SLO_SECONDS: p95レイテンシの上限秒数（0以下で判定しない、既定: 60）
+- LLM_ROUTE_MAX_ERROR_RATE: エラー率の上限（0以下で判定しない、既定: 0.25）
+- LLM_ROUTE_MAX_CONCURRENCY: 同時送信数の上限（0以下で無制限、既定: 0）
+- LLM_ROUTE_WINDOW / LLM_ROUTE_WINDOW_SECONDS: 健全性を判定する直近の件数・秒数
+  （既定: 50件 / 300秒）
+- LLM_ROUTE_MIN_SAMPLES: 判定に必要な最小件数（既定: 5）
+
+設計原則:
+- 単一責任の原則（SRP）: 送信先の選択と健全性の記録のみ（送信・リトライはリポジトリ側）
+- スレッドセーフ: 複数ジョブスレッド・イベントループから同時に利用可能
+"""
+
+import asyncio
+import contextlib
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from collections.abc import AsyncIterator, Callable, Iterator
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from src.infrastructure.services.llm_rate_limiter import (
+    DeploymentGuardRegistry,
+    get_deployment_guards,
+)
+
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_ROUTE = "default"
+
+
+def _env_float(name: str, default: float) -> float:
+    return float(os.environ.get(name, str(default)))
+
+
+@dataclass(frozen=True)
+class RouteConfig:
+    """ステージ毎の送信先とSLO
+
+    Attributes:
+        stage: ステージ名（ルート名）
+        deployments: 優先順のデプロイメント名（先頭が通常の送信先）
+        p95_slo_seconds: p95レイテンシの上限（Noneなら判定しない）
+        max_error_rate: エラー率の上限（Noneなら判定しない）
+        max_concurrency: 同時送信数の上限（0なら無制限）
+
+    """
+
+    stage: str
+    deployments: tuple[str, ...]
+    p95_slo_seconds: float | None = None
+    max_error_rate: float | None = None
+    max_concurrency: int = 0
+
+    @property
+    def key(self) -> str:
+        """応答キャッシュのキーに使う識別子（デプロイメントの組）"""
+        return ",".join(self.deployments)
+
+
+class DeploymentHealth:
+    """デプロイメント毎の直近のレイテンシとエラー"""
+
+    def __init__(self, window: int, window_seconds: float) -> None:
+        self.window_seconds = window_seconds
+        # (記録時刻, レイテンシ秒, 成功したか)
+        self._samples: deque[tuple[float, float, bool]] = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.append((time.monotonic(), latency, ok))
+
+    def snapshot(self) -> dict[str, Any]:
+        """窓内の件数・p95レイテンシ（成功分）・エラー率"""
+        with self._lock:
+            cutoff = time.monotonic() - self.window_seconds
+            while self._samples and self._samples[0][0] < cutoff:
+                self._samples.popleft()
+            samples = list(self._samples)
+        latencies = sorted(latency for _, latency, ok in samples if ok)
+        errors = sum(1 for _, _, ok in samples if not ok)
+        p95 = (
+            latencies[min(len(latencies) - 1, math.ceil(len(latencies) * 0.95) - 1)]
+            if latencies
+            else None
+        )
+        return {
+            "samples": len(samples),
+            "p95_latency_seconds": round(p95, 4) if p95 is not None else None,
+            "error_rate": round(errors / len(samples), 4) if samples else 0.0,
+        }
+
+
+@dataclass
+class _SlotWaiter:
+    """枠の空きを待つ呼び出し元（wake() で起こす）"""
+
+    wake: Callable[[], None]
+    granted: bool = False
+
+
+class _RouteSlots:
+    """ルート毎の同時送信数の上限（スレッド・イベントループ共通）
+
+    空いた枠は release() が待機中の呼び出し元へ到着順に直接渡す。
+    イベントループ側はループ上のFutureで待つため、待機中もスレッドを占有しない。
+    """
+
+    def __init__(self, limit: int) -> None:
+        self.limit = limit
+        self._available = max(limit, 0)
+        self._waiters: deque[_SlotWaiter] = deque()
+        self._lock = threading.Lock()
+        self.waits = 0
+
+    def acquire(self) -> None:
+        if self.limit <= 0:
+            return
+        event = threading.Event()
+        if self._try_acquire_or_enqueue(event.set) is None:
+            return
+        event.wait()
+
+    async def aacquire(self) -> None:
+        """枠が空くまでイベントループを止めずに待機"""
+        if self.limit <= 0:
+            return
+        loop = asyncio.get_running_loop()
+        granted: asyncio.Future[None] = loop.create_future()
+
+        def _grant() -> None:
+            if not granted.done():
+                granted.set_result(None)
+
+        waiter = self._try_acquire_or_enqueue(
+            lambda: loop.call_soon_threadsafe(_grant),
+        )
+        if waiter is None:
+            return
+        try:
+            await granted
+        except asyncio.CancelledError:
+            with self._lock:
+                if not waiter.granted:
+                    self._waiters.remove(waiter)
+            # 取り消しと同時に枠を渡されていた場合は次の待機者へ回す
+            if waiter.granted:
+                self.release()
+            raise
+
+    def release(self) -> None:
+        if self.limit <= 0:
+            return
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                waiter.granted = True
+                try:
+                    waiter.wake()
+                    return
+                except RuntimeError:
+                    # 待機していたイベントループが既に閉じている
+                    continue
+            if self._available >= self.limit:
+                raise ValueError("取得していない送信枠を解放しました")
+            self._available += 1
+
+    def _try_acquire_or_enqueue(self, wake: Callable[[], None]) -> _SlotWaiter | None:
+        """空きがあれば取得してNone、無ければ待機列に加えた待機者を返す"""
+        with self._lock:
+            if self._available > 0 and not self._waiters:
+                self._available -= 1
+                return None
+            self.waits += 1
+            waiter = _SlotWaiter(wake)
+            self._waiters.append(waiter)
+            return waiter
+
+
+class ModelRouter:
+    """ステージ → デプロイメントの振り分けとSLO違反時のフォールバック
+
+    使用方法:
+        ```python
+        router = get_model_router()
+        route = router.route_for("code", default_deployment)
+        with router.slot(route):
+            for deployment in router.candidates(route):
+                ...  # 送信し、router.record(deployment, latency, ok)
+        ```
+    """
+
+    def __init__(
+        self,
+        routes: dict[str, Any] | None = None,
+        guards: DeploymentGuardRegistry | None = None,
+    ) -> None:
+        """コンストラクタ
+
+        Args:
+            routes: ステージ → ルート設定（省略時は環境変数LLM_ROUTES）
+            guards: ブレーカーの状態を参照するレジストリ（省略時はプロセス共有）
+
+        """
+        self.guards = guards or get_deployment_guards()
+        self.window = int(os.environ.get("LLM_ROUTE_WINDOW", "50"))
+        self.window_seconds = _env_float("LLM_ROUTE_WINDOW_SECONDS", 300.0)
+        self.min_samples = int(os.environ.get("LLM_ROUTE_MIN_SAMPLES", "5"))
+        self._default_slo = _env_float("LLM_ROUTE_P95_SLO_SECONDS", 60.0)
+        self._default_error_rate = _env_float("LLM_ROUTE_MAX_ERROR_RATE", 0.25)
+        self._default_concurrency = int(os.environ.get("LLM_ROUTE_MAX_CONCURRENCY", "0"))
+        raw_routes = routes if routes is not None else self._load_env_routes()
+        self._routes: dict[str, RouteConfig] = {}
+        for stage, spec in raw_routes.items():
+            try:
+                self._routes[stage] = self._parse_route(stage, spec)
+            except (AttributeError, TypeError, ValueError) as exc:
+                logger.warning("ルート %s を解釈できないため無視します: %s", stage, exc)
+        self._health: dict[str, DeploymentHealth] = {}
+        self._slots: dict[str, _RouteSlots] = {}
+        self._fallbacks: dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    def route_for(self, stage: str | None, default_deployment: str) -> RouteConfig:
+        """ステージのルート（未設定なら"default"、それも無ければ既定のデプロイメントのみ）"""
+        route = self._routes.get(stage or DEFAULT_ROUTE) or self._routes.get(DEFAULT_ROUTE)
+        if route is not None:
+            return route
+        return self._parse_route(stage or DEFAULT_ROUTE, [default_deployment])
+
+    def candidates(self, route: RouteConfig) -> list[str]:
+        """送信を試す順のデプロイメント
+
+        SLOを満たすもの（チェーン順）→ 満たさないもの の順。
+        ブレーカーがオープン中のものは除く（全てオープンなら先頭のみ返し、
+        ブレーカー側のフォールバックに任せる）。
+        """
+        healthy: list[str] = []
+        degraded: list[str] = []
+        for deployment in route.deployments:
+            if self.guards.get(deployment).breaker.is_cooling_down():
+                continue
+            if self._meets_slo(deployment, route):
+                healthy.append(deployment)
+            else:
+                degraded.append(deployment)
+        ordered = healthy + degraded
+        if not ordered:
+            return [route.deployments[0]]
+        if ordered[0] != route.deployments[0]:
+            with self._lock:
+                self._fallbacks[route.stage] = self._fallbacks.get(route.stage, 0) + 1
+            logger.info(
+                "ルート %s: %s がSLOを満たさないため %s へ送信します",
+                route.stage,
+                route.deployments[0],
+                ordered[0],
+            )
+        return ordered
+
+    def record(self, deployment: str, latency: float, ok: bool) -> None:
+        """送信1回分の結果を記録"""
+        self._health_of(deployment).record(latency, ok)
+
+    @contextlib.contextmanager
+    def slot(self, route: RouteConfig) -> Iterator[None]:
+        """ルートの同時送信枠を確保（スレッドをブロックして待機）"""
+        slots = self._slots_of(route)
+        slots.acquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    @contextlib.asynccontextmanager
+    async def aslot(self, route: RouteConfig) -> AsyncIterator[None]:
+        """ルートの同時送信枠を確保（イベントループを止めずに待機）"""
+        slots = self._slots_of(route)
+        await slots.aacquire()
+        try:
+            yield
+        finally:
+            slots.release()
+
+    def get_metrics(self) -> dict[str, Any]:
+        with self._lock:
+            health = dict(self._health)
+            slots = dict(self._slots)
+            fallbacks = dict(self._fallbacks)
+        return {
+            "routes": {
+                stage: {
+                    "deployments": list(route.deployments),
+                    "fallbacks": fallbacks.get(stage, 0),
+                    "slot_waits": slots[stage].waits if stage in slots else 0,
+                }
+                for stage, route in self._routes.items()
+            },
+            "deployments": {
+                deployment: state.snapshot() for deployment, state in health.items()
+            },
+        }
+
+    def _meets_slo(self, deployment: str, route: RouteConfig) -> bool:
+        snapshot = self._health_of(deployment).snapshot()
+        if snapshot["samples"] < self.min_samples:
+            return True
+        if (
+            route.max_error_rate is not None
+            and snapshot["error_rate"] > route.max_error_rate
+        ):
+            return False
+        p95 = snapshot["p95_latency_seconds"]
+        return not (
+            route.p95_slo_seconds is not None
+            and p95 is not None
+            and p95 > route.p95_slo_seconds
+        )
+
+    def _health_of(self, deployment: str) -> DeploymentHealth:
+        with self._lock:
+            health = self._health.get(deployment)
+            if health is None:
+                health = DeploymentHealth(self.window, self.window_seconds)
+                self._health[deployment] = health
+            return health
+
+    def _slots_of(self, route: RouteConfig) -> _RouteSlots:
+        with self._lock:
+            slots = self._slots.get(route.stage)
+            if slots is None:
+                slots = _RouteSlots(route.max_concurrency)
+                self._slots[route.stage] = slots
+            return slots
+
+    def _parse_route(self, stage: str, spec: Any) -> RouteConfig:
+        if isinstance(spec, (list, tuple)):
+            spec = {"deployments": spec}
+        deployments = tuple(spec.get("deployments") or ())
+        if not deployments:
+            raise ValueError(f"ルート {stage} にデプロイメントがありません")
+        slo = float(spec.get("p95_slo_seconds", self._default_slo))
+        error_rate = float(spec.get("max_error_rate", self._default_error_rate))
+        return RouteConfig(
+            stage=stage,
+            deployments=deployments,
+            p95_slo_seconds=slo if slo > 0 else None,
+            max_error_rate=error_rate if error_rate > 0 else None,
+            max_concurrency=max(
+                0,
+                int(spec.get("max_concurrency", self._default_concurrency)),
+            ),
+        )
+
+    @staticmethod
+    def _load_env_routes() -> dict[str, Any]:
+        raw = os.environ.get("LLM_ROUTES", "").strip()
+        if not raw:
+            return {}
+        try:
+            if not raw.startswith("{"):
+                raw = Path(raw).read_text(encoding="utf-8")
+            routes = json.loads(raw)
+            if not isinstance(routes, dict):
+                raise ValueError("オブジェクト形式で指定してください")
+            return routes
+        except (OSError, ValueError) as exc:
+            logger.warning("LLM_ROUTES を読み込めません: %s", exc)
+            return {}
+
+
+# シングルトンインスタンス（アプリケーション全体で共有）
+_global_router: ModelRouter | None = None
+_global_router_lock = threading.Lock()
+
+
+def get_model_router() -> ModelRouter:
+    """グローバルなLLMルーターを取得
+
+    Returns:
+        ModelRouter: ステージ毎の振り分けとデプロイメントの健全性
+
+    """
+    global _global_router
+    with _global_router_lock:
+        if _global_router is None:
+            _global_router = ModelRouter()
+        return _global_router
@@ -0,0 +1,257 @@
+"""LLMUsageTracker
+
+LLM呼び出し毎のトークン数・レイテンシ・コストを記録し、ジョブ毎・セッション毎に集計する。
+
+呼び出し元（オーケストレーター）は `llm_usage_scope()` でジョブやステージを
+タグ付けする。タグはcontextvarsで伝播するため、ユースケースやリポジトリの
+引数を変えずに、どのステージ（plan / code / report 等）の呼び出しかを記録できる。
+
+ジョブディレクトリがタグ付けされている場合は、1呼び出し1行で
+<job_dir>/llm_trace.jsonl に追記する（ジョブトレース）。
+
+料金表（USD / 100万トークン）は環境変数LLM_PRICE_TABLEで上書きできる
+（JSON文字列、またはJSONファイルのパス）。モデル名は前方一致で引き当てる。
+    例: {"gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.6}}
+
+設計原則:
+- 単一責任の原則（SRP）: 使用量の記録と集計のみ
+- スレッドセーフ: 複数ジョブスレッド・イベントループから同時に記録される
+"""
+
+import contextlib
+import contextvars
+import json
+import logging
+import os
+import threading
+from collections import defaultdict
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+from src.domain.entities.llm_response import LLMResponse
+
+
+logger = logging.getLogger(__name__)
+
+TRACE_FILE = "llm_trace.jsonl"
+
+DEFAULT_PRICE_TABLE: dict[str, dict[str, float]] = {
+    "gpt-4o-mini": {"input": 0.15, "cached_input": 0.075, "output": 0.60},
+    "gpt-4o": {"input": 2.50, "cached_input": 1.25, "output": 10.00},
+    "gpt-4.1-mini": {"input": 0.40, "cached_input": 0.10, "output": 1.60},
+    "gpt-4.1-nano": {"input": 0.10, "cached_input": 0.025, "output": 0.40},
+    "gpt-4.1": {"input": 2.00, "cached_input": 0.50, "output": 8.00},
+}
+
+_usage_scope: contextvars.ContextVar[dict[str, Any]] = contextvars.ContextVar(
+    "llm_usage_scope",
+    default={},
+)
+
+
+@contextlib.contextmanager
+def llm_usage_scope(**tags: Any) -> Iterator[None]:
+    """以降のLLM呼び出しにタグを付ける（入れ子の場合は外側のタグに上書きで合成）
+
+    主なタグ: session_id, job_dir, stage
+    """
+    token = _usage_scope.set({**_usage_scope.get(), **tags})
+    try:
+        yield
+    finally:
+        _usage_scope.reset(token)
+
+
+def current_usage_tags() -> dict[str, Any]:
+    return dict(_usage_scope.get())
+
+
+class LLMPriceTable:
+    """モデル別の単価表（USD / 100万トークン）"""
+
+    def __init__(self, prices: dict[str, dict[str, float]] | None = None) -> None:
+        if prices is None:
+            prices = {**DEFAULT_PRICE_TABLE, **self._load_env_prices()}
+        # 前方一致は長いキーを優先（gpt-4o-mini を gpt-4o より先に照合）
+        self._prices = dict(sorted(prices.items(), key=lambda item: -len(item[0])))
+
+    def cost(
+        self,
+        model: str,
+        input_tokens: int,
+        output_tokens: int,
+        cached_input_tokens: int = 0,
+    ) -> float | None:
+        """料金を計算（単価が不明なモデルはNone）"""
+        price = self.lookup(model)
+        if price is None:
+            return None
+        uncached = max(0, input_tokens - cached_input_tokens)
+        cached_price = price.get("cached_input", price.get("input", 0.0))
+        total = (
+            uncached * price.get("input", 0.0)
+            + cached_input_tokens * cached_price
+            + output_tokens * price.get("output", 0.0)
+        )
+        return round(total / 1_000_000, 8)
+
+    def lookup(self, model: str) -> dict[str, float] | None:
+        model_name = (model or "").lower()
+        for prefix, price in self._prices.items():
+            if model_name.startswith(prefix.lower()):
+                return price
+        return None
+
+    @staticmethod
+    def _load_env_prices() -> dict[str, dict[str, float]]:
+        raw = os.environ.get("LLM_PRICE_TABLE", "").strip()
+        if not raw:
+            return {}
+        try:
+            if not raw.startswith("{"):
+                raw = Path(raw).read_text(encoding="utf-8")
+            return json.loads(raw)
+        except (OSError, ValueError) as exc:
+            logger.warning("LLM_PRICE_TABLE を読み込めません: %s", exc)
+            return {}
+
+
+def _empty_totals() -> dict[str, Any]:
+    return {
+        "calls": 0,
+        "cache_hits": 0,
+        "input_tokens": 0,
+        "cached_input_tokens": 0,
+        "output_tokens": 0,
+        "cost": 0.0,
+        "latency_seconds": 0.0,
+        "max_latency_seconds": 0.0,
+    }
+
+
+def _add(totals: dict[str, Any], record: dict[str, Any]) -> None:
+    totals["calls"] += 1
+    totals["cache_hits"] += int(record["cache_hit"])
+    totals["input_tokens"] += record["input_tokens"]
+    totals["cached_input_tokens"] += record["cached_input_tokens"]
+    totals["output_tokens"] += record["output_tokens"]
+    totals["cost"] = round(totals["cost"] + (record["cost"] or 0.0), 8)
+    latency = record["latency_seconds"] or 0.0
+    totals["latency_seconds"] = round(totals["latency_seconds"] + latency, 4)
+    totals["max_latency_seconds"] = max(totals["max_latency_seconds"], latency)
+
+
+def _with_ratios(totals: dict[str, Any]) -> dict[str, Any]:
+    """プロンプトキャッシュが効いた入力トークンの割合を付加"""
+    input_tokens = totals["input_tokens"]
+    return {
+        **totals,
+        "cached_token_ratio": (
+            round(totals["cached_input_tokens"] / input_tokens, 4)
+            if input_tokens
+            else 0.0
+        ),
+    }
+
+
+class _Aggregate:
+    """合計とステージ別内訳"""
+
+    def __init__(self) -> None:
+        self.totals = _empty_totals()
+        self.by_stage: defaultdict[str, dict[str, Any]] = defaultdict(_empty_totals)
+
+    def add(self, record: dict[str, Any]) -> None:
+        _add(self.totals, record)
+        _add(self.by_stage[record.get("stage") or "other"], record)
+
+    def to_dict(self) -> dict[str, Any]:
+        return {
+            **_with_ratios(self.totals),
+            "by_stage": {
+                stage: _with_ratios(totals) for stage, totals in self.by_stage.items()
+            },
+        }
+
+
+class LLMUsageTracker:
+    """LLM使用量の記録・集計
+
+    使用方法:
+        ```python
+        with llm_usage_scope(session_id=sid, job_dir=output_dir):
+            with llm_usage_scope(stage="plan"):
+                plan_use_case.execute(...)
+        tracker.job_summary(output_dir)
+        ```
+    """
+
+    def __init__(self, price_table: LLMPriceTable | None = None) -> None:
+        self.price_table = price_table or LLMPriceTable()
+        self._jobs: dict[str, _Aggregate] = {}
+        self._sessions: dict[str, _Aggregate] = {}
+        self._lock = threading.Lock()
+
+    def record(self, response: LLMResponse) -> None:
+        """呼び出し1件を記録（コスト未設定なら料金表から算出して設定）"""
+        if response.cost is None and not response.cache_hit:
+            response.cost = self.price_table.cost(
+                response.model,
+                response.input_tokens,
+                response.output_tokens,
+                response.cached_input_tokens,
+            )
+
+        tags = current_usage_tags()
+        record = {
+            "session_id": tags.get("session_id"),
+            "stage": tags.get("stage"),
+            "task": tags.get("task"),
+            "model": response.model,
+            "created_at": response.created_at,
+            "input_tokens": response.input_tokens,
+            "cached_input_tokens": response.cached_input_tokens,
+            "output_tokens": response.output_tokens,
+            "cost": response.cost if not response.cache_hit else 0.0,
+            "latency_seconds": response.latency_seconds,
+            "time_to_first_token": response.time_to_first_token,
+            "cache_hit": response.cache_hit,
+            "usage_estimated": response.usage_estimated,
+        }
+
+        job_dir = tags.get("job_dir")
+        session_id = tags.get("session_id")
+        with self._lock:
+            if job_dir:
+                self._jobs.setdefault(str(job_dir), _Aggregate()).add(record)
+                self._append_trace(Path(job_dir), record)
+            if session_id:
+                self._sessions.setdefault(session_id, _Aggregate()).add(record)
+
+    def job_summary(self, job_dir: str) -> dict[str, Any]:
+        with self._lock:
+            aggregate = self._jobs.get(str(job_dir))
+            return aggregate.to_dict() if aggregate else _Aggregate().to_dict()
+
+    def session_summary(self, session_id: str) -> dict[str, Any]:
+        with self._lock:
+            aggregate = self._sessions.get(session_id)
+            return aggregate.to_dict() if aggregate else _Aggregate().to_dict()
+
+    def release_job(self, job_dir: str) -> None:
+        with self._lock:
+            self._jobs.pop(str(job_dir), None)
+
+    def discard_session(self, session_id: str) -> None:
+        with self._lock:
+            self._sessions.pop(session_id, None)
+
+    @staticmethod
+    def _append_trace(job_dir: Path, record: dict[str, Any]) -> None:
+        try:
+            job_dir.mkdir(parents=True, exist_ok=True)
+            with (job_dir / TRACE_FILE).open("a", encoding="utf-8") as handle:
+                handle.write(json.dumps(record, ensure_ascii=False) + "\n")
+        except OSError as exc:
+            logger.warning("LLMトレースの書き込みに失敗しました (%s): %s", job_dir, exc)
@@ -0,0 +1,591 @@
+"""Mock LLM Server
+
+Azure OpenAI / OpenAI互換のChat Completions APIをローカルで模擬するHTTPサーバー。
+AZURE_OPENAI_ENDPOINT をこのサーバーへ向けると、実際のOpenAILLMRepositoryの
+経路（HTTP接続プール・レート制御・リトライ・ブレーカー・ルーティング・ストリーミング）を
+通したまま、1台のマシンでオーケストレーターのスループットを計測できる。
+
+対応するリクエスト:
+- POST /openai/deployments/{deployment}/chat/completions（Azure形式）
+- POST /v1/chat/completions, /chat/completions（OpenAI形式）
+- 通常応答・ストリーミング（SSE）・Structured Outputs（response_format: json_schema）
+- GET /metrics: 受信数・注入した障害の件数、GET /health: 死活確認
+
+応答本文の決め方（上から順に採用）:
+1. リプレイファイル（JSONL）の一致する行。1行の形式:
+       {"schema": "Plan", "contains": "売上", "deployment": "gpt-4o", "content": ...}
+   schema / contains / deployment は省略可（省略した条件は常に一致）。
+   contentが文字列の場合はJinja2テンプレートとして描画する
+   （変数: user = 最後のユーザーメッセージ, model, schema, request_number）。
+   オブジェクトの場合はJSON文字列にして返す
+2. スキーマ名が Plan / Program / Review の場合、および通常のテキスト応答は、
+   オフライン時と同じルールベースのテンプレート（生成コードはそのまま実行できる）
+3. それ以外のスキーマはJSONスキーマから最小限の値を合成する
+
+障害・性能特性の注入:
+- レイテンシ分布（最初のバイトまで）: fixed:秒 / uniform:最小:最大 /
+  lognormal:中央値:シグマ / exponential:平均。デプロイメント別に上書き可能
+- ストリーミング: 1チャンクの文字数と1秒あたりのチャンク数。
+  Azureと同様に、先頭にchoicesが空のチャンク（フィルタ結果）を送る
+- 429（Retry-After付き）・500・タイムアウト（応答せずに待ち続けて切断）の発生率
+- プロンプトキャッシュ: 以前に受信したリクエストと先頭から一致するメッセージ分を
+  usage.prompt_tokens_details.cached_tokens として返す（1024トークン以上、128単位）
+
+使用方法:
+    ```bash
+    python run_mock_llm_server.py --port 8765 --latency lognormal:1.5:0.5 --rate-429 0.05
+    AZURE_OPENAI_ENDPOINT=http://127.0.0.1:8765 AZURE_OPENAI_API_KEY=dummy \\
+        python run_batch.py manifest.csv --concurrency 4
+    ```
+
+設計原則:
+- 標準ライブラリのHTTPサーバーのみで動作（追加の依存なし）
+- 再現性: --seed で障害注入・レイテンシの乱数を固定できる
+"""
+
+import argparse
+import hashlib
+import json
+import logging
+import math
+import os
+import random
+import re
+import threading
+import time
+import uuid
+from collections import Counter
+from dataclasses import dataclass, field
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any
+
+from jinja2 import Template
+
+from src.infrastructure.services.context_budget import estimate_tokens
+from src.infrastructure.services.llm_rate_limiter import estimate_prompt_tokens
+
+
+logger = logging.getLogger(__name__)
+
+_AZURE_PATH = re.compile(r"/openai/deployments/([^/]+)/chat/completions$")
+_OPENAI_PATH = re.compile(r"(/v1)?/chat/completions$")
+
+# プロンプトキャッシュの模擬（Azure OpenAIの仕様に合わせる）
+_CACHE_MIN_TOKENS = 1024
+_CACHE_BLOCK_TOKENS = 128
+
+
+class LatencyModel:
+    """レイテンシ分布（秒）
+
+    仕様の文字列:
+        fixed:0.5 / uniform:0.2:2.0 / lognormal:1.5:0.5（中央値:シグマ） /
+        exponential:1.0（平均）
+    """
+
+    def __init__(self, spec: str = "fixed:0") -> None:
+        kind, *params = spec.split(":")
+        try:
+            values = [float(value) for value in params]
+        except ValueError as exc:
+            raise ValueError(f"レイテンシ分布を解釈できません: {spec}") from exc
+        expected = {"fixed": 1, "uniform": 2, "lognormal": 2, "exponential": 1}
+        if expected.get(kind) != len(values):
+            raise ValueError(f"レイテンシ分布を解釈できません: {spec}")
+        self.spec = spec
+        self.kind = kind
+        self.values = values
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "fixed":
+            return max(0.0, self.values[0])
+        if self.kind == "uniform":
+            return rng.uniform(self.values[0], self.values[1])
+        if self.kind == "lognormal":
+            median, sigma = self.values
+            return rng.lognormvariate(math.log(max(median, 1e-6)), sigma)
+        return rng.expovariate(1.0 / max(self.values[0], 1e-6))
+
+
+@dataclass
+class MockServerConfig:
+    """模擬サーバーの振る舞い
+
+    Attributes:
+        latency: 最初のバイトまでのレイテンシ分布
+        deployment_latency: デプロイメント別のレイテンシ分布（latencyを上書き）
+        chunk_chars: ストリーミング1チャンクの文字数
+        chunks_per_second: ストリーミングの送信レート（0以下で待たない）
+        rate_429: 429を返す割合
+        retry_after: 429のRetry-After秒数
+        error_rate: 500を返す割合
+        timeout_rate: 応答せずに待ち続ける割合
+        timeout_seconds: タイムアウト注入時に待ち続ける秒数
+        replay_path: リプレイファイル（JSONL）
+        seed: 乱数シード
+
+    """
+
+    latency: LatencyModel = field(default_factory=LatencyModel)
+    deployment_latency: dict[str, LatencyModel] = field(default_factory=dict)
+    chunk_chars: int = 8
+    chunks_per_second: float = 50.0
+    rate_429: float = 0.0
+    retry_after: float = 1.0
+    error_rate: float = 0.0
+    timeout_rate: float = 0.0
+    timeout_seconds: float = 300.0
+    replay_path: str | None = None
+    seed: int | None = None
+
+
+class ResponseBook:
+    """リプレイファイルとテンプレートから応答本文を決める"""
+
+    def __init__(self, replay_path: str | None = None) -> None:
+        self._entries: list[dict[str, Any]] = []
+        if replay_path:
+            with Path(replay_path).open(encoding="utf-8") as handle:
+                for line in handle:
+                    if line.strip():
+                        self._entries.append(json.loads(line))
+        self._templates: dict[int, Template] = {}
+
+    def content_for(
+        self,
+        deployment: str,
+        messages: list[dict[str, Any]],
+        schema_name: str | None,
+        schema: dict[str, Any] | None,
+        request_number: int,
+    ) -> str:
+        from src.infrastructure.repositories.openai_llm_repository import (
+            OpenAILLMRepository,
+        )
+
+        user_prompt = OpenAILLMRepository._extract_latest_user_prompt(messages)
+        for index, entry in enumerate(self._entries):
+            if not self._matches(entry, deployment, user_prompt, schema_name):
+                continue
+            content = entry.get("content", "")
+            if not isinstance(content, str):
+                return json.dumps(content, ensure_ascii=False)
+            template = self._templates.get(index)
+            if template is None:
+                template = self._templates[index] = Template(content)
+            return template.render(
+                user=user_prompt,
+                model=deployment,
+                schema=schema_name,
+                request_number=request_number,
+            )
+
+        if schema_name == "Plan":
+            return OpenAILLMRepository._build_rule_based_plan(user_prompt).model_dump_json()
+        if schema_name == "Program":
+            return OpenAILLMRepository._build_rule_based_program().model_dump_json()
+        if schema_name == "Review":
+            return OpenAILLMRepository._build_rule_based_review(
+                user_prompt,
+            ).model_dump_json()
+        if schema is not None:
+            return json.dumps(_example_from_schema(schema, schema), ensure_ascii=False)
+        return OpenAILLMRepository._build_rule_based_report(user_prompt)
+
+    @staticmethod
+    def _matches(
+        entry: dict[str, Any],
+        deployment: str,
+        user_prompt: str,
+        schema_name: str | None,
+    ) -> bool:
+        if "schema" in entry and entry["schema"] != schema_name:
+            return False
+        if "deployment" in entry and entry["deployment"] != deployment:
+            return False
+        return entry.get("contains", "") in user_prompt
+
+
+def _example_from_schema(node: dict[str, Any], root: dict[str, Any]) -> Any:
+    """JSONスキーマを満たす最小限の値を合成"""
+    if "$ref" in node:
+        target: Any = root
+        for part in node["$ref"].lstrip("#/").split("/"):
+            target = target[part]
+        return _example_from_schema(target, root)
+    for key in ("anyOf", "oneOf", "allOf"):
+        if node.get(key):
+            return _example_from_schema(node[key][0], root)
+    if "enum" in node:
+        return node["enum"][0]
+    if "const" in node:
+        return node["const"]
+    kind = node.get("type")
+    if isinstance(kind, list):
+        kind = next((item for item in kind if item != "null"), "null")
+    if kind == "object":
+        return {
+            name: _example_from_schema(child, root)
+            for name, child in node.get("properties", {}).items()
+        }
+    if kind == "array":
+        items = node.get("items", {})
+        count = max(1, int(node.get("minItems", 1)))
+        return [_example_from_schema(items, root) for _ in range(count)]
+    if kind == "integer":
+        return 0
+    if kind == "number":
+        return 0.0
+    if kind == "boolean":
+        return False
+    if kind == "null":
+        return None
+    return "sample"
+
+
+class PromptCacheSimulator:
+    """先頭一致のプロンプトキャッシュを模擬する（メッセージ単位で一致を判定）"""
+
+    def __init__(self, max_entries: int = 100_000) -> None:
+        self.max_entries = max_entries
+        self._prefixes: set[str] = set()
+        self._lock = threading.Lock()
+
+    def cached_tokens(self, messages: list[dict[str, Any]]) -> int:
+        digest = hashlib.sha256()
+        prefix_tokens = 0
+        cached = 0
+        hashes: list[str] = []
+        with self._lock:
+            for message in messages:
+                digest.update(json.dumps(message, sort_keys=True).encode("utf-8"))
+                key = digest.hexdigest()
+                prefix_tokens += estimate_prompt_tokens([message])
+                if key in self._prefixes:
+                    cached = prefix_tokens
+                hashes.append(key)
+            if len(self._prefixes) < self.max_entries:
+                self._prefixes.update(hashes)
+        if cached < _CACHE_MIN_TOKENS:
+            return 0
+        return cached // _CACHE_BLOCK_TOKENS * _CACHE_BLOCK_TOKENS
+
+
+class MockLLMServer(ThreadingHTTPServer):
+    """模擬サーバー本体（設定・乱数・メトリクスを保持）"""
+
+    daemon_threads = True
+
+    def __init__(self, address: tuple[str, int], config: MockServerConfig) -> None:
+        super().__init__(address, _MockLLMHandler)
+        self.config = config
+        self.book = ResponseBook(config.replay_path)
+        self.prompt_cache = PromptCacheSimulator()
+        self._rng = random.Random(config.seed)
+        self._rng_lock = threading.Lock()
+        self._metrics: Counter[str] = Counter()
+        self._metrics_lock = threading.Lock()
+
+    def draw(self) -> float:
+        with self._rng_lock:
+            return self._rng.random()
+
+    def sample_latency(self, deployment: str) -> float:
+        model = self.config.deployment_latency.get(deployment, self.config.latency)
+        with self._rng_lock:
+            return model.sample(self._rng)
+
+    def count(self, name: str) -> int:
+        with self._metrics_lock:
+            self._metrics[name] += 1
+            return self._metrics[name]
+
+    def get_metrics(self) -> dict[str, int]:
+        with self._metrics_lock:
+            return dict(self._metrics)
+
+
+class _MockLLMHandler(BaseHTTPRequestHandler):
+    server: MockLLMServer
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+        logger.debug("%s - %s", self.address_string(), format % args)
+
+    def do_GET(self) -> None:  # noqa: N802
+        path = self.path.split("?", 1)[0]
+        if path == "/health":
+            self._send_json(200, {"status": "ok"})
+        elif path == "/metrics":
+            self._send_json(200, self.server.get_metrics())
+        else:
+            self._send_json(404, {"error": {"code": "NotFound", "message": path}})
+
+    def do_POST(self) -> None:  # noqa: N802
+        path = self.path.split("?", 1)[0]
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            body = json.loads(self.rfile.read(length) or b"{}")
+        except ValueError:
+            self._send_json(400, {"error": {"code": "BadRequest", "message": "invalid JSON"}})
+            return
+
+        azure = _AZURE_PATH.search(path)
+        if azure is None and not _OPENAI_PATH.search(path):
+            self._send_json(404, {"error": {"code": "NotFound", "message": path}})
+            return
+        deployment = azure.group(1) if azure else str(body.get("model") or "mock")
+        request_number = self.server.count("requests")
+        self.server.count(f"requests.{deployment}")
+
+        if self._inject_fault():
+            return
+        time.sleep(self.server.sample_latency(deployment))
+
+        messages = body.get("messages") or []
+        schema_name, schema = _requested_schema(body.get("response_format"))
+        content = self.server.book.content_for(
+            deployment,
+            messages,
+            schema_name,
+            schema,
+            request_number,
+        )
+        prompt_tokens = estimate_prompt_tokens(messages)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": estimate_tokens(content),
+            "total_tokens": prompt_tokens + estimate_tokens(content),
+            "prompt_tokens_details": {
+                "cached_tokens": self.server.prompt_cache.cached_tokens(messages),
+            },
+        }
+        if body.get("stream"):
+            self.server.count("streams")
+            include_usage = bool((body.get("stream_options") or {}).get("include_usage"))
+            self._send_stream(deployment, content, usage if include_usage else None)
+        else:
+            self._send_json(200, _completion(deployment, content, usage))
+
+    def _inject_fault(self) -> bool:
+        """429・500・タイムアウトの注入（注入した場合はTrue）"""
+        config = self.server.config
+        draw = self.server.draw()
+        if draw < config.rate_429:
+            self.server.count("injected_429")
+            self._send_json(
+                429,
+                {
+                    "error": {
+                        "code": "429",
+                        "message": (
+                            "Requests to the ChatCompletions_Create Operation have "
+                            "exceeded call rate limit. "
+                            f"Please retry after {config.retry_after:g} seconds."
+                        ),
+                    },
+                },
+                headers={
+                    "Retry-After": f"{math.ceil(config.retry_after)}",
+                    "retry-after-ms": f"{int(config.retry_after * 1000)}",
+                },
+            )
+            return True
+        draw -= config.rate_429
+        if draw < config.error_rate:
+            self.server.count("injected_500")
+            self._send_json(
+                500,
+                {"error": {"code": "InternalServerError", "message": "injected error"}},
+            )
+            return True
+        draw -= config.error_rate
+        if draw < config.timeout_rate:
+            self.server.count("injected_timeouts")
+            # 応答せずに待ち続け、クライアント側のタイムアウトを発生させる
+            time.sleep(config.timeout_seconds)
+            self.close_connection = True
+            return True
+        return False
+
+    def _send_json(
+        self,
+        status: int,
+        payload: dict[str, Any],
+        headers: dict[str, str] | None = None,
+    ) -> None:
+        data = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        try:
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            for name, value in (headers or {}).items():
+                self.send_header(name, value)
+            self.end_headers()
+            self.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            self.close_connection = True
+
+    def _send_stream(
+        self,
+        deployment: str,
+        content: str,
+        usage: dict[str, Any] | None,
+    ) -> None:
+        """SSEで応答を送る（チャンクの長さ・送信レートは設定に従う）"""
+        config = self.server.config
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:24]}"
+        created = int(time.time())
+        interval = 1.0 / config.chunks_per_second if config.chunks_per_second > 0 else 0.0
+        size = max(1, config.chunk_chars)
+
+        def chunk(delta: dict[str, Any] | None, finish: str | None = None) -> dict[str, Any]:
+            return {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": created,
+                "model": deployment,
+                "choices": (
+                    []
+                    if delta is None
+                    else [{"index": 0, "delta": delta, "finish_reason": finish}]
+                ),
+            }
+
+        self.close_connection = True
+        try:
+            self.send_response(200)
+            self.send_header("Content-Type", "text/event-stream")
+            self.send_header("Cache-Control", "no-cache")
+            self.send_header("Connection", "close")
+            self.end_headers()
+            # Azureはプロンプトのフィルタ結果だけのチャンク（choices空）を先頭に送る
+            self._write_event({**chunk(None), "model": "", "prompt_filter_results": []})
+            self._write_event(chunk({"role": "assistant", "content": ""}))
+            for start in range(0, len(content), size):
+                if interval:
+                    time.sleep(interval)
+                self._write_event(chunk({"content": content[start : start + size]}))
+            self._write_event(chunk({}, finish="stop"))
+            if usage is not None:
+                self._write_event({**chunk(None), "usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            self.server.count("client_disconnects")
+
+    def _write_event(self, payload: dict[str, Any]) -> None:
+        data = json.dumps(payload, ensure_ascii=False)
+        self.wfile.write(f"data: {data}\n\n".encode("utf-8"))
+        self.wfile.flush()
+
+
+def _requested_schema(
+    response_format: Any,
+) -> tuple[str | None, dict[str, Any] | None]:
+    """response_formatから (スキーマ名, JSONスキーマ) を取り出す"""
+    if not isinstance(response_format, dict):
+        return None, None
+    if response_format.get("type") != "json_schema":
+        return None, None
+    json_schema = response_format.get("json_schema") or {}
+    return json_schema.get("name"), json_schema.get("schema") or {}
+
+
+def _completion(deployment: str, content: str, usage: dict[str, Any]) -> dict[str, Any]:
+    return {
+        "id": f"chatcmpl-{uuid.uuid4().hex[:24]}",
+        "object": "chat.completion",
+        "created": int(time.time()),
+        "model": deployment,
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": content, "refusal": None},
+                "finish_reason": "stop",
+                "logprobs": None,
+            },
+        ],
+        "usage": usage,
+    }
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLIエントリポイント"""
+    parser = argparse.ArgumentParser(
+        description="負荷試験用のAzure OpenAI互換の模擬LLMサーバーを起動します",
+    )
+    parser.add_argument("--host", default=os.environ.get("MOCK_LLM_HOST", "127.0.0.1"))
+    parser.add_argument(
+        "--port",
+        type=int,
+        default=int(os.environ.get("MOCK_LLM_PORT", "8765")),
+    )
+    parser.add_argument(
+        "--latency",
+        default=os.environ.get("MOCK_LLM_LATENCY", "fixed:0"),
+        help="最初のバイトまでのレイテンシ分布（例: lognormal:1.5:0.5）",
+    )
+    parser.add_argument(
+        "--deployment-latency",
+        action="append",
+        default=[],
+        metavar="DEPLOYMENT=SPEC",
+        help="デプロイメント別のレイテンシ分布（複数指定可）",
+    )
+    parser.add_argument("--chunk-chars", type=int, default=8)
+    parser.add_argument(
+        "--chunks-per-second",
+        type=float,
+        default=50.0,
+        help="ストリーミングの送信レート（0以下で待たない）",
+    )
+    parser.add_argument("--rate-429", type=float, default=0.0, help="429を返す割合")
+    parser.add_argument("--retry-after", type=float, default=1.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="500を返す割合")
+    parser.add_argument(
+        "--timeout-rate",
+        type=float,
+        default=0.0,
+        help="応答せずに待ち続ける割合",
+    )
+    parser.add_argument("--timeout-seconds", type=float, default=300.0)
+    parser.add_argument("--replay", help="リプレイする応答（JSONL）")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    deployment_latency: dict[str, LatencyModel] = {}
+    for item in args.deployment_latency:
+        name, _, spec = item.partition("=")
+        deployment_latency[name] = LatencyModel(spec)
+
+    config = MockServerConfig(
+        latency=LatencyModel(args.latency),
+        deployment_latency=deployment_latency,
+        chunk_chars=args.chunk_chars,
+        chunks_per_second=args.chunks_per_second,
+        rate_429=args.rate_429,
+        retry_after=args.retry_after,
+        error_rate=args.error_rate,
+        timeout_rate=args.timeout_rate,
+        timeout_seconds=args.timeout_seconds,
+        replay_path=args.replay,
+        seed=args.seed,
+    )
+    server = MockLLMServer((args.host, args.port), config)
+    host, port = server.server_address[:2]
+    print(f"模擬LLMサーバー: http://{host}:{port}  (AZURE_OPENAI_ENDPOINT に指定)")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        print(f"メトリクス: {json.dumps(server.get_metrics(), ensure_ascii=False)}")
+    return 0
@@ -0,0 +1,113 @@
+"""Partial JSON
+
+ストリーミング中の（まだ閉じていない）JSONから、配列の要素を完成した順に取り出す。
+
+例えば計画（Plan）の応答
+    {"purpose": "...", "archivement": "...", "tasks": [{...}, {...
+を受信しながら、"tasks" 配列の各オブジェクトが閉じた時点で1件ずつ返す。
+
+文字列リテラル（エスケープを含む）と括弧の入れ子だけを追跡する軽量な走査で、
+受信済みの文字は1度しか読まない。
+
+設計原則:
+- 単一責任の原則（SRP）: 部分JSONからの要素抽出のみ（検証は呼び出し側）
+"""
+
+import json
+from typing import Any
+
+
+class IncrementalArrayParser:
+    """最上位オブジェクトの指定キーの配列要素を、完成した順に返す
+
+    使用方法:
+        ```python
+        parser = IncrementalArrayParser("tasks")
+        for chunk in stream:
+            for item in parser.feed(chunk):
+                handle(item)  # dict
+        ```
+    """
+
+    def __init__(self, key: str) -> None:
+        self.key = key
+        self.text = ""
+        self._position = 0
+        self._stack: list[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = -1
+        self._last_key: str | None = None
+        self._array_depth: int | None = None
+        self._item_start = -1
+        self._emitted = 0
+
+    @property
+    def emitted(self) -> int:
+        """これまでに返した要素数"""
+        return self._emitted
+
+    def feed(self, chunk: str) -> list[Any]:
+        """チャンクを追加し、新たに完成した要素を返す"""
+        self.text += chunk
+        completed: list[Any] = []
+        text = self.text
+        for index in range(self._position, len(text)):
+            char = text[index]
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif char == "\\":
+                    self._escape = True
+                elif char == '"':
+                    self._in_string = False
+                    if len(self._stack) == 1:
+                        # 最上位オブジェクト直下の文字列（キーまたは値）
+                        self._last_key = text[self._string_start + 1 : index]
+                continue
+
+            if char == '"':
+                self._in_string = True
+                self._string_start = index
+            elif char in "{[":
+                if (
+                    char == "["
+                    and len(self._stack) == 1
+                    and self._array_depth is None
+                    and self._last_key == self.key
+                ):
+                    self._array_depth = len(self._stack) + 1
+                if char == "{" and len(self._stack) == self._array_depth:
+                    self._item_start = index
+                self._stack.append(char)
+            elif char in "}]":
+                if self._stack:
+                    self._stack.pop()
+                if (
+                    char == "}"
+                    and self._item_start >= 0
+                    and len(self._stack) == self._array_depth
+                ):
+                    item = self._decode(text[self._item_start : index + 1])
+                    self._item_start = -1
+                    if item is not None:
+                        completed.append(item)
+                        self._emitted += 1
+                elif char == "]" and self._array_depth is not None and (
+                    len(self._stack) == self._array_depth - 1
+                ):
+                    # 対象の配列が閉じた（以降の同名キーは対象外）
+                    self._array_depth = -1
+        self._position = len(text)
+        return completed
+
+    def result(self) -> Any:
+        """受信完了後のJSON全体（不完全な場合はValueError）"""
+        return json.loads(self.text)
+
+    @staticmethod
+    def _decode(fragment: str) -> Any:
+        try:
+            return json.loads(fragment)
+        except ValueError:
+            return None
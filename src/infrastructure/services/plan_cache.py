@@ -0,0 +1,394 @@
+"""PlanCache
+
+同じ構造のデータセット（毎日差し替わる抽出データ等）に同じ趣旨の分析要求が来た場合に、
+前回生成した計画（Plan）を再利用してLLMの往復を省略するキャッシュ。
+
+キーは次の2つ:
+- スキーマ指紋: 列名・型の種類・カーディナリティ帯から計算（行数や値そのものは含めない）
+- 正規化した要求文: NFKC正規化・小文字化・空白と句読点の除去
+
+要求文は完全一致で再利用する。PLAN_CACHE_SIMILARITYを1未満にすると、
+同じスキーマ指紋の保存済み要求との類似度（difflib.SequenceMatcher）が
+しきい値以上の場合も再利用する。ただし数字（年・件数等）・英数字の語・言及した列名が
+全て一致する要求に限る（「2023年」と「2024年」のように1文字違いで意味が変わるため）。
+
+スキーマのドリフト（同じ列名の集合で型・カーディナリティ帯が変わった場合）を検知すると、
+古い指紋の計画は破棄する。
+
+環境変数:
+- PLAN_CACHE_ENABLED: 計画キャッシュを使うか（既定: true）
+- PLAN_CACHE_PATH: SQLiteファイルのパス（既定: output/.llm_cache/plans.sqlite3）
+- PLAN_CACHE_TTL_SECONDS: 保存からの有効秒数（既定: 30日）
+- PLAN_CACHE_MAX_ENTRIES: 保存する計画の上限件数（既定: 1000、超過分は古いアクセス順に破棄）
+- PLAN_CACHE_SIMILARITY: 要求文の類似度のしきい値 0-1（既定: 1 = 完全一致のみ）
+
+設計原則:
+- 単一責任の原則（SRP）: 計画の保存・検索・破棄のみ
+- スレッドセーフ: 接続は1本をロックで保護（WALで他プロセスとも共有可能）
+"""
+
+import difflib
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from collections.abc import Iterable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+import pandas as pd
+from pydantic import ValidationError
+
+from src.domain.entities.plan import Plan
+from src.infrastructure.services.dataset_profile import dtype_kind
+
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_DB_PATH = "output/.llm_cache/plans.sqlite3"
+_DEFAULT_TTL_SECONDS = 30 * 24 * 60 * 60
+_DEFAULT_MAX_ENTRIES = 1000
+_DEFAULT_SIMILARITY = 1.0
+
+# 類似検索で比較する保存済み要求の最大件数（新しいアクセス順）
+_MAX_SIMILARITY_CANDIDATES = 200
+# 数値以外の列のカーディナリティ帯の境界（日々の件数の揺れで指紋が変わらない粗さ）
+_CARDINALITY_BUCKETS = ((2, "binary"), (20, "low"), (200, "mid"))
+_PUNCTUATION = re.compile(r"[\s\W_]+", re.UNICODE)
+# 類似検索でも完全一致を求める語（正規化後の数字・英字の連なり）
+_EXACT_TERMS = re.compile(r"[0-9]+|[a-z]+")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS plans (
+    key TEXT PRIMARY KEY,
+    family TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    request TEXT NOT NULL,
+    payload TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    accessed_at REAL NOT NULL,
+    hits INTEGER NOT NULL DEFAULT 0
+);
+CREATE INDEX IF NOT EXISTS idx_plans_family ON plans(family);
+CREATE INDEX IF NOT EXISTS idx_plans_digest ON plans(digest);
+CREATE INDEX IF NOT EXISTS idx_plans_accessed_at ON plans(accessed_at);
+"""
+
+
+@dataclass(frozen=True)
+class SchemaFingerprint:
+    """データセットの構造の指紋
+
+    family: 列名の集合のハッシュ（ドリフト検知の単位）
+    digest: 列名・型の種類・カーディナリティ帯のハッシュ（再利用の単位）
+    """
+
+    family: str
+    digest: str
+    columns: tuple[tuple[str, str, str], ...]
+
+    @classmethod
+    def from_dataframe(cls, df: pd.DataFrame) -> "SchemaFingerprint":
+        return cls.from_columns(
+            (
+                str(name),
+                dtype_kind(df[name].dtype),
+                int(df[name].nunique(dropna=True)),
+            )
+            for name in df.columns
+        )
+
+    @classmethod
+    def from_profile(cls, profile: dict[str, Any]) -> "SchemaFingerprint":
+        """データセットのプロファイル（DatasetProfileService）から指紋を計算"""
+        return cls.from_columns(
+            (column["name"], column["kind"], int(column.get("unique") or 0))
+            for column in profile.get("column_profiles", [])
+        )
+
+    @classmethod
+    def from_columns(cls, columns: Iterable[tuple[str, str, int]]) -> "SchemaFingerprint":
+        """(列名, 型の種類, ユニーク数) の列から指紋を計算"""
+        described = tuple(
+            (name, kind, _cardinality_bucket(kind, unique))
+            for name, kind, unique in columns
+        )
+        family = _sha256(sorted(name for name, _, _ in described))
+        return cls(family=family, digest=_sha256(described), columns=described)
+
+
+def _cardinality_bucket(kind: str, unique: int) -> str:
+    if kind == "numeric":
+        return "binary" if unique <= 2 else "continuous"
+    for limit, label in _CARDINALITY_BUCKETS:
+        if unique <= limit:
+            return label
+    return "high"
+
+
+def _sha256(value: Any) -> str:
+    canonical = json.dumps(value, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def normalize_request(text: str) -> str:
+    """要求文の正規化（表記揺れ・空白・句読点の違いを吸収）"""
+    return _PUNCTUATION.sub("", unicodedata.normalize("NFKC", text or "").lower())
+
+
+def _exact_terms(
+    normalized: str,
+    column_names: list[str],
+) -> tuple[frozenset[str], frozenset[str]]:
+    """正規化した要求文のうち、類似検索でも一致を求める数字・英字の語と列名"""
+    return (
+        frozenset(_EXACT_TERMS.findall(normalized)),
+        frozenset(name for name in column_names if name and name in normalized),
+    )
+
+
+class PlanCache:
+    """スキーマ指紋と要求文をキーにした計画のキャッシュ
+
+    使用方法:
+        ```python
+        cache = PlanCache()
+        fingerprint = SchemaFingerprint.from_dataframe(df)
+        plan = cache.get(fingerprint, user_request)
+        if plan is None:
+            plan = generate_plan(...)
+            cache.put(fingerprint, user_request, plan)
+        ```
+    """
+
+    def __init__(
+        self,
+        db_path: str | Path | None = None,
+        ttl_seconds: float | None = None,
+        max_entries: int | None = None,
+        similarity: float | None = None,
+    ) -> None:
+        """コンストラクタ
+
+        Args:
+            db_path: SQLiteファイルのパス
+                （省略時は環境変数PLAN_CACHE_PATH または output/.llm_cache/plans.sqlite3）
+            ttl_seconds: 保存からの有効秒数
+                （省略時は環境変数PLAN_CACHE_TTL_SECONDS または 30日）
+            max_entries: 保存する計画の上限件数
+                （省略時は環境変数PLAN_CACHE_MAX_ENTRIES または 1000）
+            similarity: 要求文の類似度のしきい値
+                （省略時は環境変数PLAN_CACHE_SIMILARITY または 1 = 完全一致のみ）
+
+        """
+        if db_path is None:
+            db_path = os.environ.get("PLAN_CACHE_PATH", _DEFAULT_DB_PATH)
+        if ttl_seconds is None:
+            ttl_seconds = float(
+                os.environ.get("PLAN_CACHE_TTL_SECONDS", str(_DEFAULT_TTL_SECONDS)),
+            )
+        if max_entries is None:
+            max_entries = int(
+                os.environ.get("PLAN_CACHE_MAX_ENTRIES", str(_DEFAULT_MAX_ENTRIES)),
+            )
+        if similarity is None:
+            similarity = float(
+                os.environ.get("PLAN_CACHE_SIMILARITY", str(_DEFAULT_SIMILARITY)),
+            )
+
+        self.db_path = Path(db_path)
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.similarity = similarity
+
+        self._lock = threading.Lock()
+        self._metrics = {
+            "hits": 0,
+            "similar_hits": 0,
+            "misses": 0,
+            "writes": 0,
+            "invalidated": 0,
+            "expired": 0,
+            "evictions": 0,
+        }
+
+        self.db_path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(
+            str(self.db_path),
+            timeout=30.0,
+            check_same_thread=False,
+            isolation_level=None,
+        )
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+
+    # ------------------------------------------------------------------
+    # 取得・保存
+    # ------------------------------------------------------------------
+    def get(self, fingerprint: SchemaFingerprint, request: str) -> Plan | None:
+        """同じ構造のデータセットへの同じ趣旨の要求に対する計画を取得
+
+        Returns:
+            再利用できる計画（無ければNone）
+
+        """
+        normalized = normalize_request(request)
+        now = time.time()
+        with self._lock:
+            self._invalidate_drift_locked(fingerprint)
+
+            row = self._conn.execute(
+                "SELECT key, payload, created_at FROM plans WHERE key = ?",
+                (self._make_key(fingerprint, normalized),),
+            ).fetchone()
+            similar = False
+            if row is None and self.similarity < 1.0:
+                row = self._find_similar_locked(fingerprint, normalized)
+                similar = row is not None
+            if row is None:
+                self._metrics["misses"] += 1
+                return None
+
+            key, payload, created_at = row
+            if now - created_at > self.ttl_seconds:
+                self._conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+                self._metrics["expired"] += 1
+                self._metrics["misses"] += 1
+                return None
+
+            try:
+                plan = Plan.model_validate_json(payload)
+            except (ValidationError, ValueError) as exc:
+                logger.warning("キャッシュ済みの計画を復元できないため破棄します: %s", exc)
+                self._conn.execute("DELETE FROM plans WHERE key = ?", (key,))
+                self._metrics["misses"] += 1
+                return None
+
+            self._conn.execute(
+                "UPDATE plans SET accessed_at = ?, hits = hits + 1 WHERE key = ?",
+                (now, key),
+            )
+            self._metrics["hits"] += 1
+            if similar:
+                self._metrics["similar_hits"] += 1
+            return plan
+
+    def put(self, fingerprint: SchemaFingerprint, request: str, plan: Plan) -> None:
+        """計画を保存（同じキーの計画は置き換える。強制再生成の結果もここで更新）"""
+        normalized = normalize_request(request)
+        payload = plan.model_dump_json()
+        now = time.time()
+        with self._lock:
+            self._invalidate_drift_locked(fingerprint)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO plans "
+                "(key, family, digest, request, payload, created_at, accessed_at, hits) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, 0)",
+                (
+                    self._make_key(fingerprint, normalized),
+                    fingerprint.family,
+                    fingerprint.digest,
+                    normalized,
+                    payload,
+                    now,
+                    now,
+                ),
+            )
+            self._metrics["writes"] += 1
+            self._purge_locked(now)
+
+    def invalidate(self, fingerprint: SchemaFingerprint | None = None) -> int:
+        """指定した構造（省略時は全て）の計画を破棄し、破棄した件数を返す"""
+        with self._lock:
+            if fingerprint is None:
+                removed = self._conn.execute("DELETE FROM plans").rowcount
+            else:
+                removed = self._conn.execute(
+                    "DELETE FROM plans WHERE digest = ?",
+                    (fingerprint.digest,),
+                ).rowcount
+            self._metrics["invalidated"] += max(removed, 0)
+            return max(removed, 0)
+
+    def get_metrics(self) -> dict[str, Any]:
+        """ヒット率・件数等のメトリクスを取得"""
+        with self._lock:
+            (entries,) = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()
+            metrics: dict[str, Any] = dict(self._metrics)
+
+        lookups = metrics["hits"] + metrics["misses"]
+        metrics.update(
+            {
+                "hit_ratio": metrics["hits"] / lookups if lookups else 0.0,
+                "entries": entries,
+                "max_entries": self.max_entries,
+            },
+        )
+        return metrics
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    # ------------------------------------------------------------------
+    # 内部処理
+    # ------------------------------------------------------------------
+    @staticmethod
+    def _make_key(fingerprint: SchemaFingerprint, normalized_request: str) -> str:
+        return _sha256([fingerprint.digest, normalized_request])
+
+    def _find_similar_locked(
+        self,
+        fingerprint: SchemaFingerprint,
+        normalized: str,
+    ) -> tuple[str, str, float] | None:
+        column_names = [normalize_request(name) for name, _, _ in fingerprint.columns]
+        terms = _exact_terms(normalized, column_names)
+        best: tuple[float, tuple[str, str, float]] | None = None
+        for key, request, payload, created_at in self._conn.execute(
+            "SELECT key, request, payload, created_at FROM plans "
+            "WHERE digest = ? ORDER BY accessed_at DESC LIMIT ?",
+            (fingerprint.digest, _MAX_SIMILARITY_CANDIDATES),
+        ):
+            if _exact_terms(request, column_names) != terms:
+                continue
+            ratio = difflib.SequenceMatcher(None, normalized, request).ratio()
+            if ratio >= self.similarity and (best is None or ratio > best[0]):
+                best = (ratio, (key, payload, created_at))
+        return best[1] if best else None
+
+    def _invalidate_drift_locked(self, fingerprint: SchemaFingerprint) -> None:
+        """同じ列名の集合で構造が変わった計画（スキーマのドリフト）を破棄"""
+        removed = self._conn.execute(
+            "DELETE FROM plans WHERE family = ? AND digest != ?",
+            (fingerprint.family, fingerprint.digest),
+        ).rowcount
+        if removed > 0:
+            logger.info("スキーマの変化を検知したため計画キャッシュを%d件破棄しました", removed)
+            self._metrics["invalidated"] += removed
+
+    def _purge_locked(self, now: float) -> None:
+        """TTL切れを削除し、上限件数を超えた分を古いアクセス順に破棄"""
+        expired = self._conn.execute(
+            "DELETE FROM plans WHERE created_at < ?",
+            (now - self.ttl_seconds,),
+        ).rowcount
+        self._metrics["expired"] += max(expired, 0)
+
+        (entries,) = self._conn.execute("SELECT COUNT(*) FROM plans").fetchone()
+        overflow = entries - self.max_entries
+        if overflow <= 0:
+            return
+        evicted = self._conn.execute(
+            "DELETE FROM plans WHERE key IN "
+            "(SELECT key FROM plans ORDER BY accessed_at ASC LIMIT ?)",
+            (overflow,),
+        ).rowcount
+        self._metrics["evictions"] += max(evicted, 0)
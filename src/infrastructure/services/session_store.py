@@ -0,0 +1,325 @@
+"""SessionResultStore
+
+セッション毎の分析結果を保持する、TTL・メモリ上限付きストア。
+
+設計原則:
+- 単一責任の原則（SRP）: セッション結果の保持と退避のみ
+- 後方互換性: dict と同じ `in` / `[]` / `get` / `del` で操作可能
+- スレッドセーフ: ジョブスレッドとUIスレッドから同時にアクセスされる
+"""
+
+import logging
+import os
+import pickle
+import shutil
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any
+
+
+logger = logging.getLogger(__name__)
+
+_DEFAULT_MAX_RESIDENT_BYTES = 256 * 1024 * 1024
+_DEFAULT_TTL_SECONDS = 6 * 60 * 60
+_DEFAULT_SPILL_DIR = "output/.session_cache"
+
+
+class _Entry:
+    """ストア内部のエントリ（メモリ常駐 or ディスク退避）"""
+
+    __slots__ = ("last_access", "size", "spill_path", "value")
+
+    def __init__(self, value: Any, size: int) -> None:
+        self.value = value
+        self.size = size
+        self.spill_path: Path | None = None
+        self.last_access = time.monotonic()
+
+    @property
+    def is_spilled(self) -> bool:
+        return self.spill_path is not None
+
+
+class SessionResultStore:
+    """セッション結果のLRU + TTLストア
+
+    - メモリ常駐サイズ（pickleサイズで推定）が上限を超えたら、
+      最も古くアクセスされた結果をディスクへ退避する
+      （サイズは値が変わった時のみ推定し、同じ結果の再設定では再計算しない）
+    - 退避先はプロセス毎のサブディレクトリ。起動時に終了済みのプロセスが残した
+      退避ファイルを削除する
+    - 退避済みの結果は参照時にディスクから再読み込みする
+    - 最終アクセスからTTLを過ぎたセッションは `expired_sessions()` で列挙でき、
+      `discard()` でメモリ・ディスク双方から削除する
+    """
+
+    def __init__(
+        self,
+        max_resident_bytes: int | None = None,
+        ttl_seconds: float | None = None,
+        spill_dir: str | Path | None = None,
+    ) -> None:
+        """コンストラクタ
+
+        Args:
+            max_resident_bytes: メモリ常駐を許容する合計バイト数
+                （省略時は環境変数SESSION_STORE_MAX_BYTES または 256MB）
+            ttl_seconds: 最終アクセスからの保持秒数
+                （省略時は環境変数SESSION_STORE_TTL_SECONDS または 6時間）
+            spill_dir: 退避先ディレクトリ
+                （省略時は環境変数SESSION_STORE_SPILL_DIR または output/.session_cache）
+
+        """
+        if max_resident_bytes is None:
+            max_resident_bytes = int(
+                os.environ.get(
+                    "SESSION_STORE_MAX_BYTES",
+                    str(_DEFAULT_MAX_RESIDENT_BYTES),
+                ),
+            )
+        if ttl_seconds is None:
+            ttl_seconds = float(
+                os.environ.get("SESSION_STORE_TTL_SECONDS", str(_DEFAULT_TTL_SECONDS)),
+            )
+        if spill_dir is None:
+            spill_dir = os.environ.get("SESSION_STORE_SPILL_DIR", _DEFAULT_SPILL_DIR)
+
+        self.max_resident_bytes = max_resident_bytes
+        self.ttl_seconds = ttl_seconds
+        self.spill_root = Path(spill_dir)
+        # 同じ退避先を共有する他のプロセス（UI・バッチ）のファイルと区別する
+        self.spill_dir = self.spill_root / str(os.getpid())
+
+        self._entries: OrderedDict[str, _Entry] = OrderedDict()
+        self._resident_bytes = 0
+        self._lock = threading.RLock()
+        self._stats = {"spills": 0, "reloads": 0, "expired": 0}
+        self._purge_stale_spills()
+
+    # ------------------------------------------------------------------
+    # dict互換インターフェース
+    # ------------------------------------------------------------------
+    def __contains__(self, session_id: object) -> bool:
+        with self._lock:
+            return session_id in self._entries
+
+    def __getitem__(self, session_id: str) -> Any:
+        with self._lock:
+            entry = self._entries[session_id]
+            entry.last_access = time.monotonic()
+            self._entries.move_to_end(session_id)
+            if entry.is_spilled:
+                self._reload(session_id, entry)
+            return entry.value
+
+    def __setitem__(self, session_id: str, value: Any) -> None:
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None and not entry.is_spilled and entry.value is value:
+                # 同じ結果の再設定はサイズを再計算しない
+                entry.last_access = time.monotonic()
+                self._entries.move_to_end(session_id)
+                return
+        size = self._estimate_size(value)
+        with self._lock:
+            self._remove(session_id)
+            self._entries[session_id] = _Entry(value, size)
+            self._resident_bytes += size
+            self._enforce_budget(protect=session_id)
+
+    def __delitem__(self, session_id: str) -> None:
+        with self._lock:
+            if session_id not in self._entries:
+                raise KeyError(session_id)
+            self._remove(session_id)
+
+    def __len__(self) -> int:
+        with self._lock:
+            return len(self._entries)
+
+    def get(self, session_id: str, default: Any = None) -> Any:
+        """結果を取得（退避済みならディスクから再読み込み）"""
+        try:
+            return self[session_id]
+        except KeyError:
+            return default
+
+    def discard(self, session_id: str) -> None:
+        """セッションの結果をメモリ・ディスクから削除（存在しなくてもよい）"""
+        with self._lock:
+            self._remove(session_id)
+
+    def touch(self, session_id: str) -> None:
+        """結果を読み込まずに最終アクセス時刻のみ更新"""
+        with self._lock:
+            entry = self._entries.get(session_id)
+            if entry is not None:
+                entry.last_access = time.monotonic()
+                self._entries.move_to_end(session_id)
+
+    # ------------------------------------------------------------------
+    # TTL / メトリクス
+    # ------------------------------------------------------------------
+    def expired_sessions(self, now: float | None = None) -> list[str]:
+        """TTLを過ぎたセッションIDを列挙（削除は呼び出し側で行う）"""
+        if self.ttl_seconds <= 0:
+            return []
+        current = time.monotonic() if now is None else now
+        with self._lock:
+            return [
+                session_id
+                for session_id, entry in self._entries.items()
+                if current - entry.last_access > self.ttl_seconds
+            ]
+
+    def mark_expired(self, session_id: str) -> None:
+        """TTL切れによる削除を記録して削除"""
+        with self._lock:
+            if session_id in self._entries:
+                self._stats["expired"] += 1
+                self._remove(session_id)
+
+    def get_metrics(self) -> dict[str, Any]:
+        """メモリ常駐量とセッション毎の内訳を取得
+
+        Returns:
+            resident_bytes / max_resident_bytes / spills / reloads / expired と、
+            sessions（セッションID毎の resident_bytes, spilled, idle_seconds）
+
+        """
+        now = time.monotonic()
+        with self._lock:
+            sessions = {
+                session_id: {
+                    "resident_bytes": 0 if entry.is_spilled else entry.size,
+                    "spilled": entry.is_spilled,
+                    "idle_seconds": round(now - entry.last_access, 1),
+                }
+                for session_id, entry in self._entries.items()
+            }
+            return {
+                "resident_bytes": self._resident_bytes,
+                "max_resident_bytes": self.max_resident_bytes,
+                "session_count": len(self._entries),
+                **self._stats,
+                "sessions": sessions,
+            }
+
+    # ------------------------------------------------------------------
+    # 内部処理
+    # ------------------------------------------------------------------
+    def _remove(self, session_id: str) -> None:
+        entry = self._entries.pop(session_id, None)
+        if entry is None:
+            return
+        if entry.is_spilled:
+            self._unlink(entry.spill_path)
+        else:
+            self._resident_bytes -= entry.size
+
+    def _enforce_budget(self, protect: str | None = None) -> None:
+        """上限を超えている間、LRU順に結果をディスクへ退避"""
+        if self._resident_bytes <= self.max_resident_bytes:
+            return
+
+        for session_id, entry in list(self._entries.items()):
+            if self._resident_bytes <= self.max_resident_bytes:
+                break
+            if session_id == protect or entry.is_spilled or entry.value is None:
+                continue
+            self._spill(session_id, entry)
+
+    def _spill(self, session_id: str, entry: _Entry) -> None:
+        spill_path = self.spill_dir / f"{session_id}.pkl"
+        try:
+            self.spill_dir.mkdir(parents=True, exist_ok=True)
+            tmp_path = spill_path.with_suffix(".tmp")
+            with tmp_path.open("wb") as fh:
+                pickle.dump(entry.value, fh, protocol=pickle.HIGHEST_PROTOCOL)
+            tmp_path.replace(spill_path)
+        except (OSError, pickle.PicklingError, TypeError, AttributeError) as exc:
+            logger.warning("セッション結果の退避に失敗しました (%s): %s", session_id, exc)
+            return
+
+        entry.value = None
+        entry.spill_path = spill_path
+        self._resident_bytes -= entry.size
+        self._stats["spills"] += 1
+
+    def _reload(self, session_id: str, entry: _Entry) -> None:
+        spill_path = entry.spill_path
+        try:
+            with spill_path.open("rb") as fh:  # type: ignore[union-attr]
+                value = pickle.load(fh)  # noqa: S301 - 自プロセスが書き出したファイルのみ
+        except (OSError, pickle.UnpicklingError, EOFError) as exc:
+            logger.warning("退避済み結果の読み込みに失敗しました (%s): %s", session_id, exc)
+            value = None
+
+        self._unlink(spill_path)
+        entry.value = value
+        entry.spill_path = None
+        self._resident_bytes += entry.size
+        self._stats["reloads"] += 1
+        self._enforce_budget(protect=session_id)
+
+    def _purge_stale_spills(self) -> None:
+        """終了済みのプロセスが残した退避ファイルを削除"""
+        try:
+            children = list(self.spill_root.iterdir())
+        except OSError:
+            return
+        removed = 0
+        for child in children:
+            if child.is_dir():
+                if not child.name.isdigit() or not self._is_stale_spill_dir(child):
+                    continue
+                shutil.rmtree(child, ignore_errors=True)
+            elif child.suffix in {".pkl", ".tmp"}:
+                # プロセス毎のサブディレクトリ導入前の退避ファイル
+                self._unlink(child)
+            else:
+                continue
+            removed += 1
+        if removed:
+            logger.info("前回のプロセスの退避ファイルを削除しました: %d件", removed)
+
+    def _is_stale_spill_dir(self, directory: Path) -> bool:
+        pid = int(directory.name)
+        if pid == os.getpid():
+            # 同じプロセス内の別インスタンス（DIコンテナのreset等）が使用中の可能性がある
+            return False
+        if os.name == "nt":
+            # Windowsでは os.kill(pid, 0) がプロセスを終了させるため、TTLを過ぎたもののみ
+            try:
+                return time.time() - directory.stat().st_mtime > self.ttl_seconds
+            except OSError:
+                return False
+        try:
+            os.kill(pid, 0)
+        except ProcessLookupError:
+            return True
+        except OSError:
+            # 権限が無い場合は実行中の別ユーザーのプロセス
+            return False
+        return False
+
+    @staticmethod
+    def _unlink(path: Path | None) -> None:
+        if path is None:
+            return
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    @staticmethod
+    def _estimate_size(value: Any) -> int:
+        """pickleサイズでメモリ常駐量を推定"""
+        if value is None:
+            return 0
+        try:
+            return len(pickle.dumps(value, protocol=pickle.HIGHEST_PROTOCOL))
+        except (pickle.PicklingError, TypeError, AttributeError):
+            return len(repr(value).encode("utf-8", errors="replace"))
@@ -0,0 +1,531 @@
+"""StreamingProfiler
+
+大きなファイルをチャンク単位で1回だけ走査し、一定メモリで統計量を求める。
+ビルトイン分析（LLM生成コードが失敗した場合のフォールバック）で使用する。
+
+集計内容:
+- 平均・分散: Welford法（チャンク統合はChanらの並列版）
+- 近似分位点: t-digest（k1スケール関数によるマージ型）
+- 近似ユニーク数: HyperLogLog
+- 頻出カテゴリ: Misra-Gries要約による上位k件
+- ヒストグラム: 範囲拡張時にビンを2つずつ統合する固定ビン数ヒストグラム
+- 散布図用サンプル: リザーバサンプリング
+- 相関行列: 共積率行列のストリーミング統合
+
+設計原則:
+- 単一責任の原則（SRP）: 統計量の逐次集計のみ（描画は呼び出し側）
+- 有界メモリ: 保持するのはスケッチとチャンク1つ分のみ
+"""
+
+import math
+import os
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any
+
+import numpy as np
+import pandas as pd
+
+
+_DEFAULT_CHUNK_ROWS = 100_000
+
+
+class RunningMoments:
+    """Welford法による平均・分散・最小・最大の逐次計算"""
+
+    def __init__(self) -> None:
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def update(self, values: np.ndarray) -> None:
+        """有限値の配列を取り込む（チャンク統計をまとめて統合）"""
+        if values.size == 0:
+            return
+        n_b = int(values.size)
+        mean_b = float(values.mean())
+        m2_b = float(((values - mean_b) ** 2).sum())
+
+        n_a = self.count
+        total = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / total
+        self.m2 += m2_b + delta * delta * n_a * n_b / total
+        self.count = total
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+
+    @property
+    def variance(self) -> float | None:
+        """不偏分散（pandasのstdと同じ ddof=1）"""
+        if self.count < 2:
+            return None
+        return self.m2 / (self.count - 1)
+
+    @property
+    def std(self) -> float | None:
+        variance = self.variance
+        return None if variance is None else math.sqrt(variance)
+
+
+class TDigest:
+    """マージ型t-digestによる近似分位点
+
+    新しい値と既存のセントロイドを整列し、k1スケール関数
+    k(q) = δ/(2π)·asin(2q-1) の整数区間ごとに1つのセントロイドへ統合する。
+    分布の両端ほどセントロイドが細かくなるため裾の分位点も精度が保たれる。
+    """
+
+    def __init__(self, compression: float = 100.0) -> None:
+        self.compression = compression
+        self._means = np.empty(0, dtype=float)
+        self._weights = np.empty(0, dtype=float)
+        self.minimum = math.inf
+        self.maximum = -math.inf
+
+    def update(self, values: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        self.minimum = min(self.minimum, float(values.min()))
+        self.maximum = max(self.maximum, float(values.max()))
+        means = np.concatenate([self._means, values.astype(float)])
+        weights = np.concatenate([self._weights, np.ones(values.size)])
+        self._merge(means, weights)
+
+    def _merge(self, means: np.ndarray, weights: np.ndarray) -> None:
+        order = np.argsort(means, kind="mergesort")
+        means = means[order]
+        weights = weights[order]
+
+        total = weights.sum()
+        q_left = (np.cumsum(weights) - weights) / total
+        k_left = self.compression / (2 * math.pi) * np.arcsin(2 * q_left - 1)
+        bucket = np.floor(k_left - k_left[0]).astype(np.int64)
+
+        starts = np.flatnonzero(np.r_[True, bucket[1:] != bucket[:-1]])
+        merged_weights = np.add.reduceat(weights, starts)
+        self._means = np.add.reduceat(means * weights, starts) / merged_weights
+        self._weights = merged_weights
+
+    def quantile(self, q: float) -> float | None:
+        if self._weights.size == 0:
+            return None
+        if self._weights.size == 1:
+            return float(self._means[0])
+        cumulative = np.cumsum(self._weights) - self._weights / 2
+        positions = np.r_[0.0, cumulative, self._weights.sum()]
+        means = np.r_[self.minimum, self._means, self.maximum]
+        return float(np.interp(q * self._weights.sum(), positions, means))
+
+
+class HyperLogLog:
+    """HyperLogLogによる近似ユニーク数（標準誤差 ≈ 1.04/√2^p）"""
+
+    def __init__(self, precision: int = 12) -> None:
+        self.precision = precision
+        self._registers = np.zeros(1 << precision, dtype=np.uint8)
+
+    def update(self, values: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        hashed = pd.util.hash_array(values).astype(np.uint64)
+        remaining_bits = 64 - self.precision
+        index = (hashed >> np.uint64(remaining_bits)).astype(np.int64)
+        # 残りビットは2^52未満なのでfloat64で正確に表現でき、frexpの指数がbit長になる
+        remainder = (hashed & np.uint64((1 << remaining_bits) - 1)).astype(float)
+        _, bit_length = np.frexp(remainder)
+        rank = (remaining_bits - bit_length + 1).astype(np.uint8)
+        np.maximum.at(self._registers, index, rank)
+
+    def estimate(self) -> int:
+        m = self._registers.size
+        alpha = 0.7213 / (1 + 1.079 / m)
+        raw = alpha * m * m / np.power(2.0, -self._registers.astype(float)).sum()
+        zeros = int((self._registers == 0).sum())
+        if raw <= 2.5 * m and zeros:
+            return round(m * math.log(m / zeros))
+        return round(raw)
+
+
+class TopK:
+    """Misra-Gries要約による頻出値の追跡（保持数は capacity 以下）"""
+
+    def __init__(self, capacity: int = 200) -> None:
+        self.capacity = capacity
+        self._counts: dict[Any, int] = {}
+
+    def update(self, values: pd.Series) -> None:
+        for value, count in values.value_counts(sort=False).items():
+            self._counts[value] = self._counts.get(value, 0) + int(count)
+        if len(self._counts) > self.capacity:
+            ordered = sorted(self._counts.values(), reverse=True)
+            threshold = ordered[self.capacity]
+            self._counts = {
+                value: count - threshold
+                for value, count in self._counts.items()
+                if count > threshold
+            }
+
+    def most_common(self, k: int = 10) -> list[tuple[Any, int]]:
+        return sorted(self._counts.items(), key=lambda item: item[1], reverse=True)[:k]
+
+
+class StreamingHistogram:
+    """ビン数固定のストリーミングヒストグラム
+
+    範囲外の値が来たら幅を2倍にして隣接ビンを統合し、範囲を拡張する。
+    """
+
+    def __init__(self, bins: int = 50) -> None:
+        self.bins = bins + bins % 2
+        self.counts = np.zeros(self.bins, dtype=np.int64)
+        self.lower: float | None = None
+        self.width = 0.0
+
+    def update(self, values: np.ndarray) -> None:
+        if values.size == 0:
+            return
+        low, high = float(values.min()), float(values.max())
+        if self.lower is None:
+            span = high - low or max(abs(low), 1.0)
+            self.lower = low
+            self.width = span / self.bins * (1 + 1e-9)
+
+        while low < self.lower:
+            self._expand(left=True)
+        while high >= self.lower + self.width * self.bins:
+            self._expand(left=False)
+
+        index = ((values - self.lower) / self.width).astype(np.int64)
+        np.clip(index, 0, self.bins - 1, out=index)
+        self.counts += np.bincount(index, minlength=self.bins)
+
+    def _expand(self, *, left: bool) -> None:
+        zeros = np.zeros(self.bins, dtype=np.int64)
+        if left:
+            extended = np.concatenate([zeros, self.counts])
+            self.lower -= self.width * self.bins  # type: ignore[operator]
+        else:
+            extended = np.concatenate([self.counts, zeros])
+        self.counts = extended.reshape(self.bins, 2).sum(axis=1)
+        self.width *= 2
+
+    @property
+    def edges(self) -> np.ndarray:
+        lower = self.lower or 0.0
+        return lower + self.width * np.arange(self.bins + 1)
+
+    def trimmed(self) -> tuple[np.ndarray, np.ndarray]:
+        """空の端ビンを除いた (counts, edges)"""
+        nonzero = np.flatnonzero(self.counts)
+        if nonzero.size == 0:
+            return self.counts, self.edges
+        first, last = nonzero[0], nonzero[-1] + 1
+        return self.counts[first:last], self.edges[first : last + 1]
+
+
+class ReservoirSample:
+    """リザーバサンプリング（Algorithm R をチャンク単位でベクトル化）"""
+
+    def __init__(self, size: int = 5000, seed: int = 0) -> None:
+        self.size = size
+        self.seen = 0
+        self.rows: np.ndarray | None = None
+        self._rng = np.random.default_rng(seed)
+
+    def update(self, rows: np.ndarray) -> None:
+        if rows.shape[0] == 0:
+            return
+        if self.rows is None:
+            self.rows = np.empty((0, rows.shape[1]), dtype=float)
+
+        free = max(self.size - self.rows.shape[0], 0)
+        head, rows = rows[:free], rows[free:]
+        if head.shape[0]:
+            self.rows = np.vstack([self.rows, head])
+            self.seen += head.shape[0]
+        if rows.shape[0] == 0:
+            return
+
+        positions = self.seen + 1 + np.arange(rows.shape[0])
+        slots = (self._rng.random(rows.shape[0]) * positions).astype(np.int64)
+        accepted = slots < self.size
+        self.rows[slots[accepted]] = rows[accepted]
+        self.seen += rows.shape[0]
+
+
+class StreamingCorrelation:
+    """共積率行列の逐次統合による相関行列（全列が非欠損の行のみ使用）"""
+
+    def __init__(self, columns: list[str]) -> None:
+        self.columns = columns
+        self.count = 0
+        self.mean = np.zeros(len(columns))
+        self.comoment = np.zeros((len(columns), len(columns)))
+
+    def update(self, rows: np.ndarray) -> None:
+        rows = rows[np.isfinite(rows).all(axis=1)]
+        n_b = rows.shape[0]
+        if n_b == 0:
+            return
+        mean_b = rows.mean(axis=0)
+        centered = rows - mean_b
+        comoment_b = centered.T @ centered
+
+        n_a = self.count
+        total = n_a + n_b
+        delta = mean_b - self.mean
+        self.mean += delta * n_b / total
+        self.comoment += comoment_b + np.outer(delta, delta) * n_a * n_b / total
+        self.count = total
+
+    def correlation(self) -> pd.DataFrame | None:
+        if self.count < 2:
+            return None
+        scale = np.sqrt(np.diag(self.comoment))
+        with np.errstate(divide="ignore", invalid="ignore"):
+            corr = self.comoment / np.outer(scale, scale)
+        return pd.DataFrame(corr, index=self.columns, columns=self.columns)
+
+
+class _NumericColumnProfile:
+    def __init__(self, histogram_bins: int) -> None:
+        self.non_null = 0
+        self.moments = RunningMoments()
+        self.digest = TDigest()
+        self.distinct = HyperLogLog()
+        self.histogram = StreamingHistogram(histogram_bins)
+
+    def update(self, series: pd.Series) -> None:
+        values = pd.to_numeric(series, errors="coerce").to_numpy(
+            dtype=float,
+            na_value=np.nan,
+        )
+        values = values[np.isfinite(values)]
+        self.non_null += int(values.size)
+        self.moments.update(values)
+        self.digest.update(values)
+        self.distinct.update(values)
+        self.histogram.update(values)
+
+    def to_record(self, name: str) -> dict[str, Any]:
+        return {
+            "index": name,
+            "count": self.non_null,
+            "mean": _round(self.moments.mean if self.non_null else None),
+            "std": _round(self.moments.std),
+            "min": _round(self.moments.minimum if self.non_null else None),
+            "25%": _round(self.digest.quantile(0.25)),
+            "50%": _round(self.digest.quantile(0.5)),
+            "75%": _round(self.digest.quantile(0.75)),
+            "max": _round(self.moments.maximum if self.non_null else None),
+            "unique": self.distinct.estimate(),
+        }
+
+
+class _CategoricalColumnProfile:
+    def __init__(self, top_k_capacity: int) -> None:
+        self.non_null = 0
+        self.distinct = HyperLogLog()
+        self.top = TopK(top_k_capacity)
+
+    def update(self, series: pd.Series) -> None:
+        values = series.dropna().astype(str)
+        self.non_null += len(values)
+        self.distinct.update(values.to_numpy(dtype=object))
+        self.top.update(values)
+
+    def to_record(self, name: str) -> dict[str, Any]:
+        most_common = self.top.most_common(10)
+        top, freq = most_common[0] if most_common else ("", "")
+        return {
+            "index": name,
+            "count": self.non_null,
+            "unique": self.distinct.estimate(),
+            "top": top,
+            "freq": freq,
+            "top_values": most_common,
+        }
+
+
+class StreamingProfiler:
+    """ファイルをチャンク単位で走査してプロファイルを作成
+
+    使用方法:
+        ```python
+        profile = StreamingProfiler().profile_file("large.csv")
+        profile["statistics"]  # describe(include="all") 相当の近似値
+        ```
+    """
+
+    def __init__(
+        self,
+        chunk_rows: int | None = None,
+        histogram_bins: int = 50,
+        sample_size: int = 5000,
+        max_correlation_columns: int = 20,
+        top_k_capacity: int = 200,
+    ) -> None:
+        """コンストラクタ
+
+        Args:
+            chunk_rows: 1チャンクの行数（省略時は環境変数BUILTIN_PROFILE_CHUNK_ROWS または 100000）
+            histogram_bins: ヒストグラムのビン数
+            sample_size: 散布図用サンプルの行数
+            max_correlation_columns: 相関行列に含める数値列の上限
+            top_k_capacity: 頻出カテゴリ要約の保持数
+
+        """
+        if chunk_rows is None:
+            chunk_rows = int(
+                os.environ.get("BUILTIN_PROFILE_CHUNK_ROWS", str(_DEFAULT_CHUNK_ROWS)),
+            )
+        self.chunk_rows = chunk_rows
+        self.histogram_bins = histogram_bins
+        self.sample_size = sample_size
+        self.max_correlation_columns = max_correlation_columns
+        self.top_k_capacity = top_k_capacity
+
+    def profile_file(self, file_path: str) -> dict[str, Any]:
+        """ファイルを1回走査してプロファイルを返す
+
+        Returns:
+            rows, columns, numeric_columns, categorical_columns, missing_values,
+            statistics（列毎のレコード）, histograms, scatter_sample, correlation
+            を含む辞書
+
+        """
+        return self.profile_chunks(self.iter_chunks(file_path), file_path=file_path)
+
+    def profile_chunks(
+        self,
+        chunks: Iterator[pd.DataFrame],
+        file_path: str | None = None,
+    ) -> dict[str, Any]:
+        """DataFrameチャンク列からプロファイルを作成"""
+        rows = 0
+        missing_values = 0
+        column_order: list[str] = []
+        numeric: dict[str, _NumericColumnProfile] = {}
+        categorical: dict[str, _CategoricalColumnProfile] = {}
+        sample: ReservoirSample | None = None
+        correlation: StreamingCorrelation | None = None
+
+        for chunk in chunks:
+            if not column_order:
+                column_order = [str(col) for col in chunk.columns]
+                numeric_names = [
+                    str(col)
+                    for col in chunk.select_dtypes(include=["number"]).columns
+                ]
+                for name in column_order:
+                    if name in numeric_names:
+                        numeric[name] = _NumericColumnProfile(self.histogram_bins)
+                    else:
+                        categorical[name] = _CategoricalColumnProfile(
+                            self.top_k_capacity,
+                        )
+                if len(numeric_names) >= 2:
+                    sample = ReservoirSample(self.sample_size)
+                    correlation = StreamingCorrelation(
+                        numeric_names[: self.max_correlation_columns],
+                    )
+
+            chunk.columns = [str(col) for col in chunk.columns]
+            rows += len(chunk)
+            missing_values += int(chunk.isna().sum().sum())
+
+            for name, column_profile in numeric.items():
+                if name in chunk.columns:
+                    column_profile.update(chunk[name])
+            for name, column_profile in categorical.items():
+                if name in chunk.columns:
+                    column_profile.update(chunk[name])
+
+            if correlation is not None and sample is not None:
+                matrix = (
+                    chunk.reindex(columns=correlation.columns)
+                    .apply(pd.to_numeric, errors="coerce")
+                    .to_numpy(dtype=float, na_value=np.nan)
+                )
+                correlation.update(matrix)
+                pair = matrix[:, :2]
+                sample.update(pair[np.isfinite(pair).all(axis=1)])
+
+        statistics = [
+            (numeric.get(name) or categorical[name]).to_record(name)
+            for name in column_order
+        ]
+
+        return {
+            "rows": rows,
+            "columns": len(column_order),
+            "numeric_columns": list(numeric),
+            "categorical_columns": list(categorical),
+            "missing_values": missing_values,
+            "file_path": file_path,
+            "statistics": statistics,
+            "histograms": {
+                name: column_profile.histogram.trimmed()
+                for name, column_profile in numeric.items()
+                if column_profile.non_null
+            },
+            "scatter_sample": (
+                (correlation.columns[:2], sample.rows)
+                if sample is not None and sample.rows is not None
+                else None
+            ),
+            "correlation": correlation.correlation() if correlation else None,
+        }
+
+    def iter_chunks(self, file_path: str) -> Iterator[pd.DataFrame]:
+        """拡張子に応じてファイルをチャンク単位で読み込む
+
+        CSV/TSV/JSON Lines/Parquetはストリーミングで読み込む。
+        Excelと通常のJSONは形式上ストリーミングできないため一括読み込みして分割する。
+        """
+        path = Path(file_path)
+        suffix = path.suffix.lower()
+
+        if suffix in {".csv", ".txt", ".tsv", ""}:
+            sep = "\t" if suffix == ".tsv" else ","
+            yield from pd.read_csv(path, sep=sep, chunksize=self.chunk_rows)
+            return
+        if suffix in {".jsonl", ".ndjson"}:
+            yield from pd.read_json(path, lines=True, chunksize=self.chunk_rows)
+            return
+        if suffix == ".parquet":
+            yield from self._iter_parquet(path)
+            return
+
+        if suffix in {".xlsx", ".xls"}:
+            frame = pd.read_excel(path)
+        elif suffix == ".json":
+            frame = pd.read_json(path)
+        else:
+            yield from pd.read_csv(path, chunksize=self.chunk_rows)
+            return
+
+        for start in range(0, len(frame), self.chunk_rows):
+            yield frame.iloc[start : start + self.chunk_rows].copy()
+
+    def _iter_parquet(self, path: Path) -> Iterator[pd.DataFrame]:
+        try:
+            import pyarrow.parquet as pq  # type: ignore[import-not-found]
+        except ImportError:
+            frame = pd.read_parquet(path)
+            for start in range(0, len(frame), self.chunk_rows):
+                yield frame.iloc[start : start + self.chunk_rows].copy()
+            return
+
+        parquet_file = pq.ParquetFile(path)
+        for batch in parquet_file.iter_batches(batch_size=self.chunk_rows):
+            yield batch.to_pandas()
+
+
+def _round(value: float | None, digits: int = 4) -> float | None:
+    if value is None or not math.isfinite(value):
+        return None
+    return round(value, digits)
@@ -2,15 +2,188 @@
 
 Jinjaテンプレートの読み込みを担当するインフラストラクチャ層。
 
+プロセス全体で1つのTemplateRegistryを共有し、テンプレートの読み込み・コンパイルを
+タスク毎に繰り返さない。
+
+- 起動時のコンパイル: src/prompts 配下の全テンプレートを最初の取得時にまとめてコンパイル
+- バイトコードキャッシュ: コンパイル結果をディスクに保存し、次のプロセスでも再利用
+- ホットリロード: ファイルの更新時刻が変わったテンプレートのみ再コンパイル（開発時）
+- 描画時間のフック: render_template の所要時間をコールバックへ通知し、メトリクスに集計
+
+環境変数:
+- TEMPLATE_BYTECODE_CACHE_DIR: バイトコードキャッシュの保存先（既定: output/.jinja_cache、
+  空文字でディスクに保存しない）
+- TEMPLATE_AUTO_RELOAD: 更新時刻を確認して再読み込みするか（既定: true、本番ではfalse推奨）
+
 設計原則:
 - 単一責任の原則（SRP）: テンプレート読み込みのみ
 - 依存性逆転（DIP）: Jinja2への具体的依存をここに集約
 - テスト容易性: ファイルシステムアクセスの抽象化
+- スレッドセーフ: 複数ジョブスレッド・イベントループから同時に利用可能
 """
 
+import logging
+import os
+import threading
+import time
+from collections.abc import Callable
 from pathlib import Path
+from typing import Any
+
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader, Template
+
+
+logger = logging.getLogger(__name__)
+
+PROMPTS_DIR = Path(__file__).resolve().parents[1] / "prompts"
+_DEFAULT_BYTECODE_CACHE_DIR = "output/.jinja_cache"
+
+RenderHook = Callable[[str, float], None]
+
+
+class TemplateRegistry:
+    """共有のJinja環境とコンパイル済みテンプレート
+
+    使用方法:
+        ```python
+        registry = get_template_registry()
+        registry.add_render_hook(lambda name, seconds: ...)
+        text = render_template("src/prompts/generate_plan.jinja", key=value)
+        ```
+    """
+
+    def __init__(
+        self,
+        bytecode_cache_dir: str | Path | None = None,
+        auto_reload: bool | None = None,
+    ) -> None:
+        """コンストラクタ
+
+        Args:
+            bytecode_cache_dir: バイトコードキャッシュの保存先
+                （省略時は環境変数TEMPLATE_BYTECODE_CACHE_DIR または output/.jinja_cache）
+            auto_reload: 更新時刻を確認して再読み込みするか
+                （省略時は環境変数TEMPLATE_AUTO_RELOAD または True）
+
+        """
+        if bytecode_cache_dir is None:
+            bytecode_cache_dir = os.environ.get(
+                "TEMPLATE_BYTECODE_CACHE_DIR",
+                _DEFAULT_BYTECODE_CACHE_DIR,
+            )
+        if auto_reload is None:
+            auto_reload = os.environ.get("TEMPLATE_AUTO_RELOAD", "true").lower() == "true"
+
+        self.auto_reload = auto_reload
+        self._bytecode_cache: FileSystemBytecodeCache | None = None
+        if bytecode_cache_dir:
+            try:
+                Path(bytecode_cache_dir).mkdir(parents=True, exist_ok=True)
+                self._bytecode_cache = FileSystemBytecodeCache(str(bytecode_cache_dir))
+            except OSError as exc:
+                logger.warning("テンプレートのバイトコードキャッシュを使用できません: %s", exc)
+
+        # テンプレートのフォルダ毎に1つの環境（src/prompts 以外のテンプレートも共有する）
+        self._environments: dict[Path, Environment] = {}
+        self._hooks: list[RenderHook] = []
+        self._metrics: dict[str, dict[str, float]] = {}
+        self._lock = threading.Lock()
 
-from jinja2 import Environment, FileSystemLoader, Template
+    def get(self, template_file: str | Path) -> Template:
+        """コンパイル済みのテンプレートを取得（更新されていれば再コンパイル）"""
+        path = Path(template_file).resolve()
+        return self._environment_for(path.parent).get_template(path.name)
+
+    def precompile(self, directory: str | Path = PROMPTS_DIR) -> int:
+        """フォルダ内の全テンプレートをコンパイルし、件数を返す"""
+        directory = Path(directory).resolve()
+        if not directory.is_dir():
+            return 0
+        environment = self._environment_for(directory)
+        names = environment.list_templates(filter_func=lambda name: name.endswith(".jinja"))
+        for name in names:
+            environment.get_template(name)
+        return len(names)
+
+    def render(self, template_file: str | Path, **context: Any) -> str:
+        """テンプレートを描画し、所要時間をフックとメトリクスへ通知"""
+        name = Path(template_file).name
+        started_at = time.perf_counter()
+        rendered = self.get(template_file).render(**context)
+        elapsed = time.perf_counter() - started_at
+
+        with self._lock:
+            metrics = self._metrics.setdefault(
+                name,
+                {"renders": 0, "total_seconds": 0.0, "max_seconds": 0.0},
+            )
+            metrics["renders"] += 1
+            metrics["total_seconds"] += elapsed
+            metrics["max_seconds"] = max(metrics["max_seconds"], elapsed)
+            hooks = list(self._hooks)
+        for hook in hooks:
+            try:
+                hook(name, elapsed)
+            except Exception as exc:  # noqa: BLE001 - 計測の失敗で描画を止めない
+                logger.warning("テンプレート描画フックでエラーが発生しました: %s", exc)
+        return rendered
+
+    def add_render_hook(self, hook: RenderHook) -> None:
+        """描画毎に (テンプレート名, 所要秒数) で呼ばれるコールバックを登録"""
+        with self._lock:
+            self._hooks.append(hook)
+
+    def remove_render_hook(self, hook: RenderHook) -> None:
+        with self._lock:
+            if hook in self._hooks:
+                self._hooks.remove(hook)
+
+    def get_metrics(self) -> dict[str, Any]:
+        with self._lock:
+            return {
+                name: {
+                    "renders": int(values["renders"]),
+                    "total_seconds": round(values["total_seconds"], 6),
+                    "max_seconds": round(values["max_seconds"], 6),
+                }
+                for name, values in self._metrics.items()
+            }
+
+    def _environment_for(self, directory: Path) -> Environment:
+        with self._lock:
+            environment = self._environments.get(directory)
+            if environment is None:
+                environment = Environment(
+                    loader=FileSystemLoader(directory),
+                    autoescape=True,
+                    auto_reload=self.auto_reload,
+                    bytecode_cache=self._bytecode_cache,
+                    # 全テンプレートを保持（既定の400件で追い出されないように）
+                    cache_size=-1,
+                )
+                self._environments[directory] = environment
+            return environment
+
+
+# シングルトンインスタンス（アプリケーション全体で共有）
+_global_registry: TemplateRegistry | None = None
+_global_registry_lock = threading.Lock()
+
+
+def get_template_registry() -> TemplateRegistry:
+    """グローバルなテンプレートレジストリを取得（初回に src/prompts をコンパイル）
+
+    Returns:
+        TemplateRegistry: 共有のJinja環境とコンパイル済みテンプレート
+
+    """
+    global _global_registry
+    with _global_registry_lock:
+        if _global_registry is None:
+            _global_registry = TemplateRegistry()
+            count = _global_registry.precompile()
+            logger.info("プロンプトテンプレートを%d件コンパイルしました", count)
+        return _global_registry
 
 
 def load_template(template_file: str) -> Template:
@@ -20,13 +193,16 @@ def load_template(template_file: str) -> Template:
         template_file: テンプレートファイルパス
 
     Returns:
-        Template: 読み込まれたJinjaテンプレート
+        Template: 読み込まれたJinjaテンプレート（共有環境のコンパイル済みテンプレート）
 
     設計判断:
     - FileSystemLoader使用でセキュリティ確保
     - autoescape=Trueでインジェクション対策
     - パス正規化で安全性向上
     """
-    template_path = Path(template_file)
-    env = Environment(loader=FileSystemLoader(template_path.parent), autoescape=True)
-    return env.get_template(template_path.name)
\ No newline at end of file
+    return get_template_registry().get(template_file)
+
+
+def render_template(template_file: str, **context: Any) -> str:
+    """テンプレートを描画（描画時間はレジストリのフック・メトリクスへ通知）"""
+    return get_template_registry().render(template_file, **context)
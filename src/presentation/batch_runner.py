@@ -0,0 +1,559 @@
+"""BatchRunner
+
+Streamlitを介さずに、マニフェスト（CSV / JSONL）に列挙した
+(データファイル, 分析要求) の組をまとめて分析するヘッドレス実行。
+
+- ワーカー毎にDIContainer・StreamlitWorkflowOrchestratorを持たせ、
+  Jupyterカーネルをジョブ間で共有しない（カーネルは並行実行に非対応のため）
+- ジョブ毎の出力ディレクトリ: <output_root>/batch_<job_id>/<timestamp>/
+- 再開性: 結果を <output_root>/batch_results.jsonl に追記し、再実行時は
+  完了済みジョブをスキップ、中断ジョブはチェックポイントから再開する
+- 終了時にスループット・レイテンシのサマリーを batch_summary.json に出力
+
+使用方法:
+    ```bash
+    python run_batch.py manifest.csv --concurrency 4
+    ```
+
+マニフェスト形式:
+    CSV:   file_path,request[,job_id] のヘッダー付き
+    JSONL: {"file_path": "...", "request": "...", "job_id": "..."} を1行1件
+    相対パスはマニフェストのあるディレクトリ基準で解決する
+"""
+
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import os
+import queue
+import re
+import statistics
+import sys
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+from src.infrastructure.di_container import DIContainer
+from src.presentation.file_utils import allow_data_folder
+from src.presentation.workflow_orchestrator import StreamlitWorkflowOrchestrator
+
+
+logger = logging.getLogger(__name__)
+
+RESULTS_FILE = "batch_results.jsonl"
+SUMMARY_FILE = "batch_summary.json"
+
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+STATUS_TIMEOUT = "timeout"
+STATUS_SKIPPED = "skipped"
+
+_FILE_KEYS = ("file_path", "file", "path", "dataset")
+_REQUEST_KEYS = ("request", "message", "question", "prompt")
+_ID_KEYS = ("job_id", "id")
+_UNSAFE_ID_CHARS = re.compile(r"[^0-9A-Za-z_.-]+")
+
+
+@dataclass(frozen=True)
+class BatchJob:
+    """マニフェストの1行"""
+
+    job_id: str
+    file_path: str | None
+    request: str
+
+    @property
+    def session_id(self) -> str:
+        return f"batch_{self.job_id}"
+
+
+def load_manifest(manifest_path: str | Path) -> list[BatchJob]:
+    """マニフェスト（CSV / JSONL）を読み込む
+
+    Raises:
+        ValueError: 要求が空の行、またはジョブIDが重複している場合
+
+    """
+    path = Path(manifest_path)
+    if path.suffix.lower() in {".jsonl", ".ndjson"}:
+        rows = [
+            json.loads(line)
+            for line in path.read_text(encoding="utf-8").splitlines()
+            if line.strip()
+        ]
+    else:
+        with path.open(encoding="utf-8-sig", newline="") as handle:
+            rows = list(csv.DictReader(handle))
+
+    jobs: list[BatchJob] = []
+    seen_ids: set[str] = set()
+    digest_counts: dict[str, int] = {}
+    for line_no, row in enumerate(rows, start=1):
+        request = _first_value(row, _REQUEST_KEYS)
+        if not request:
+            raise ValueError(f"マニフェスト{line_no}件目: 分析要求が空です")
+
+        file_value = _first_value(row, _FILE_KEYS)
+        file_path = None
+        if file_value:
+            file_obj = Path(file_value).expanduser()
+            if not file_obj.is_absolute():
+                file_obj = path.parent / file_obj
+            file_path = str(file_obj.resolve())
+
+        job_id = _first_value(row, _ID_KEYS)
+        if job_id:
+            job_id = _UNSAFE_ID_CHARS.sub("_", job_id)
+        else:
+            # 行の挿入・並べ替えで変わらないよう、ファイルと要求のみから決める
+            # （同じ組み合わせの2件目以降は出現順の連番を付ける）
+            digest = hashlib.sha1(
+                f"{file_path}\n{request}".encode(),
+            ).hexdigest()[:12]
+            occurrence = digest_counts.get(digest, 0) + 1
+            digest_counts[digest] = occurrence
+            job_id = digest if occurrence == 1 else f"{digest}_{occurrence}"
+        if job_id in seen_ids:
+            raise ValueError(f"マニフェスト{line_no}件目: ジョブIDが重複しています ({job_id})")
+        seen_ids.add(job_id)
+
+        jobs.append(BatchJob(job_id=job_id, file_path=file_path, request=request))
+
+    return jobs
+
+
+def _first_value(row: dict[str, Any], keys: tuple[str, ...]) -> str | None:
+    for key in keys:
+        value = row.get(key)
+        if value is not None and str(value).strip():
+            return str(value).strip()
+    return None
+
+
+def _percentile(sorted_values: list[float], percentile: float) -> float:
+    """最近傍順位法によるパーセンタイル"""
+    rank = max(1, int(-(-percentile * len(sorted_values) // 100)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+class BatchRunner:
+    """マニフェストのジョブを並行実行する
+
+    使用方法:
+        ```python
+        runner = BatchRunner("output/batch", concurrency=4)
+        summary = runner.run(load_manifest("manifest.csv"))
+        ```
+    """
+
+    def __init__(
+        self,
+        output_root: str | Path,
+        concurrency: int = 2,
+        job_timeout: float | None = None,
+        poll_interval: float = 1.0,
+        container_factory: Callable[[], DIContainer] = DIContainer,
+        refresh_plan: bool = False,
+    ) -> None:
+        """コンストラクタ
+
+        Args:
+            output_root: ジョブディレクトリ・結果ファイルのルート
+            concurrency: 同時実行ジョブ数（= 起動するカーネル数）
+            job_timeout: 1ジョブの最大待機秒数（Noneは無制限）
+            poll_interval: ジョブ状態のポーリング間隔（秒）
+            container_factory: ワーカー毎のDIContainerを生成する関数
+            refresh_plan: 計画キャッシュを使わずに全ジョブの計画を再生成する
+
+        """
+        self.output_root = Path(output_root)
+        self.concurrency = max(1, concurrency)
+        self.job_timeout = job_timeout
+        self.poll_interval = poll_interval
+        self.container_factory = container_factory
+        self.refresh_plan = refresh_plan
+        self._results_lock = threading.Lock()
+
+    # ------------------------------------------------------------------
+    # 公開API
+    # ------------------------------------------------------------------
+    def run(self, jobs: list[BatchJob], *, rerun: bool = False) -> dict[str, Any]:
+        """全ジョブを実行してサマリーを返す
+
+        Args:
+            jobs: 実行するジョブ
+            rerun: Trueの場合、前回完了済みのジョブも再実行する
+
+        """
+        self.output_root.mkdir(parents=True, exist_ok=True)
+        previous = {} if rerun else self._load_previous_results()
+
+        records: list[dict[str, Any]] = []
+        job_queue: queue.Queue[BatchJob] = queue.Queue()
+        for job in jobs:
+            done = previous.get(job.job_id)
+            if done and done.get("status") == STATUS_COMPLETED:
+                records.append({**done, "status": STATUS_SKIPPED})
+            else:
+                job_queue.put(job)
+
+        pending = job_queue.qsize()
+        logger.info(
+            "バッチ開始: 全%d件 (実行%d件, 完了済みスキップ%d件, 並行数%d)",
+            len(jobs),
+            pending,
+            len(jobs) - pending,
+            self.concurrency,
+        )
+
+        started_at = time.monotonic()
+        workers = [
+            threading.Thread(
+                target=self._run_worker,
+                args=(job_queue, records),
+                name=f"batch_worker_{index}",
+                daemon=True,
+            )
+            for index in range(min(self.concurrency, pending))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+        summary = self._build_summary(records, time.monotonic() - started_at)
+        (self.output_root / SUMMARY_FILE).write_text(
+            json.dumps(summary, ensure_ascii=False, indent=2),
+            encoding="utf-8",
+        )
+        return summary
+
+    # ------------------------------------------------------------------
+    # ワーカー
+    # ------------------------------------------------------------------
+    def _run_worker(
+        self,
+        job_queue: queue.Queue[BatchJob],
+        records: list[dict[str, Any]],
+    ) -> None:
+        container, orchestrator = self._create_orchestrator()
+        try:
+            while True:
+                try:
+                    job = job_queue.get_nowait()
+                except queue.Empty:
+                    return
+
+                record = self._run_job(orchestrator, job)
+                self._append_result(record, records)
+
+                if record["status"] == STATUS_TIMEOUT:
+                    # 実行中のカーネルを止め、以降のジョブは新しいカーネルで実行
+                    self._shutdown(container)
+                    container, orchestrator = self._create_orchestrator()
+        finally:
+            self._shutdown(container)
+
+    def _create_orchestrator(
+        self,
+    ) -> tuple[DIContainer, StreamlitWorkflowOrchestrator]:
+        container = self.container_factory()
+        container.get_job_checkpoint_store(output_root=str(self.output_root))
+        return container, StreamlitWorkflowOrchestrator(container)
+
+    @staticmethod
+    def _shutdown(container: DIContainer) -> None:
+        try:
+            container.get_sandbox_repository().kill()
+        except Exception as exc:  # noqa: BLE001 - 停止失敗はログのみ
+            logger.warning("サンドボックス停止に失敗しました: %s", exc)
+        container.get_async_loop_runner().close()
+
+    def _run_job(
+        self,
+        orchestrator: StreamlitWorkflowOrchestrator,
+        job: BatchJob,
+    ) -> dict[str, Any]:
+        """1ジョブを実行して結果レコードを返す"""
+        session_id = job.session_id
+        record: dict[str, Any] = {
+            "job_id": job.job_id,
+            "file_path": job.file_path,
+            "request": job.request,
+            "status": STATUS_FAILED,
+            "output_dir": None,
+            "error": None,
+            "resumed": False,
+        }
+
+        resumable = orchestrator.job_checkpoint_store.find_resumable_jobs(
+            limit=1,
+            session_id=session_id,
+        )
+        started_at = time.monotonic()
+        if resumable:
+            record["resumed"] = True
+            record["output_dir"] = resumable[0]["job_dir"]
+            logger.info("[%s] チェックポイントから再開: %s", job.job_id, record["output_dir"])
+            start_status = orchestrator.resume_job_async(
+                resumable[0]["job_dir"],
+                session_id,
+            )
+        else:
+            logger.info("[%s] 開始: %s", job.job_id, job.file_path)
+            start_status = orchestrator.process_user_message_async(
+                job.request,
+                session_id,
+                job.file_path,
+                refresh_plan=self.refresh_plan,
+            )
+
+        if start_status != "STARTED":
+            record["error"] = start_status
+            record["latency_seconds"] = 0.0
+            return record
+
+        last_message = None
+        while True:
+            status = orchestrator.get_job_status(session_id)
+            state = status.get("status")
+            if state == "completed":
+                record["status"] = STATUS_COMPLETED
+                record["output_dir"] = status.get("output_dir")
+                record["llm_usage"] = status.get("llm_usage")
+                break
+            if state == "error":
+                record["error"] = status.get("error")
+                break
+            if state == "progress":
+                if status.get("message") != last_message:
+                    last_message = status.get("message")
+                    logger.info(
+                        "[%s] %s/%s %s",
+                        job.job_id,
+                        status.get("step"),
+                        status.get("total"),
+                        last_message,
+                    )
+                continue
+            if state == "idle":
+                record["error"] = "ジョブが結果を返さずに終了しました"
+                break
+            if (
+                self.job_timeout is not None
+                and time.monotonic() - started_at > self.job_timeout
+            ):
+                record["status"] = STATUS_TIMEOUT
+                record["error"] = f"{self.job_timeout:.0f}秒以内に完了しませんでした"
+                break
+            time.sleep(self.poll_interval)
+
+        record["latency_seconds"] = round(time.monotonic() - started_at, 3)
+        if record["status"] != STATUS_TIMEOUT:
+            orchestrator.cleanup_session(session_id)
+        logger.info(
+            "[%s] %s (%.1f秒) %s",
+            job.job_id,
+            record["status"],
+            record["latency_seconds"],
+            record["error"] or record["output_dir"],
+        )
+        return record
+
+    # ------------------------------------------------------------------
+    # 結果の永続化とサマリー
+    # ------------------------------------------------------------------
+    def _append_result(
+        self,
+        record: dict[str, Any],
+        records: list[dict[str, Any]],
+    ) -> None:
+        record["finished_at"] = time.time()
+        with self._results_lock:
+            records.append(record)
+            with (self.output_root / RESULTS_FILE).open("a", encoding="utf-8") as f:
+                f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+    def _load_previous_results(self) -> dict[str, dict[str, Any]]:
+        """前回までの結果（ジョブ毎に最新の1件）"""
+        results_path = self.output_root / RESULTS_FILE
+        if not results_path.exists():
+            return {}
+
+        previous: dict[str, dict[str, Any]] = {}
+        for line in results_path.read_text(encoding="utf-8").splitlines():
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # 書き込み途中で停止した行は無視
+                continue
+            previous[record["job_id"]] = record
+        return previous
+
+    @staticmethod
+    def _build_summary(
+        records: list[dict[str, Any]],
+        wall_seconds: float,
+    ) -> dict[str, Any]:
+        counts = Counter(record["status"] for record in records)
+        executed = [record for record in records if record["status"] != STATUS_SKIPPED]
+        latencies = sorted(
+            record["latency_seconds"]
+            for record in executed
+            if record["status"] == STATUS_COMPLETED
+        )
+
+        summary: dict[str, Any] = {
+            "total": len(records),
+            "executed": len(executed),
+            "completed": counts[STATUS_COMPLETED],
+            "failed": counts[STATUS_FAILED],
+            "timeout": counts[STATUS_TIMEOUT],
+            "skipped": counts[STATUS_SKIPPED],
+            "resumed": sum(1 for record in executed if record.get("resumed")),
+            "wall_seconds": round(wall_seconds, 3),
+            "throughput_jobs_per_minute": (
+                round(counts[STATUS_COMPLETED] * 60 / wall_seconds, 3)
+                if wall_seconds > 0
+                else 0.0
+            ),
+            "latency_seconds": None,
+            "failures": [
+                {"job_id": record["job_id"], "error": record["error"]}
+                for record in executed
+                if record["status"] in {STATUS_FAILED, STATUS_TIMEOUT}
+            ],
+        }
+        usages = [record.get("llm_usage") or {} for record in executed]
+        input_tokens = sum(usage.get("input_tokens", 0) for usage in usages)
+        cached_tokens = sum(usage.get("cached_input_tokens", 0) for usage in usages)
+        summary["llm_usage"] = {
+            "calls": sum(usage.get("calls", 0) for usage in usages),
+            "input_tokens": input_tokens,
+            "cached_input_tokens": cached_tokens,
+            "cached_token_ratio": (
+                round(cached_tokens / input_tokens, 4) if input_tokens else 0.0
+            ),
+            "output_tokens": sum(usage.get("output_tokens", 0) for usage in usages),
+            "cost": round(sum(usage.get("cost", 0.0) for usage in usages), 6),
+        }
+        if latencies:
+            summary["latency_seconds"] = {
+                "mean": round(statistics.fmean(latencies), 3),
+                "p50": _percentile(latencies, 50),
+                "p90": _percentile(latencies, 90),
+                "p95": _percentile(latencies, 95),
+                "max": latencies[-1],
+            }
+        return summary
+
+
+def format_summary(summary: dict[str, Any]) -> str:
+    """サマリーを表示用テキストに整形"""
+    lines = [
+        "=" * 60,
+        "バッチ実行サマリー",
+        "=" * 60,
+        f"ジョブ数: {summary['total']} (実行 {summary['executed']}, "
+        f"スキップ {summary['skipped']}, 再開 {summary['resumed']})",
+        f"完了: {summary['completed']}  失敗: {summary['failed']}  "
+        f"タイムアウト: {summary['timeout']}",
+        f"所要時間: {summary['wall_seconds']:.1f}秒  "
+        f"スループット: {summary['throughput_jobs_per_minute']:.2f} ジョブ/分",
+    ]
+    latency = summary.get("latency_seconds")
+    if latency:
+        lines.append(
+            "レイテンシ(秒): mean={mean:.1f} p50={p50:.1f} p90={p90:.1f} "
+            "p95={p95:.1f} max={max:.1f}".format(**latency),
+        )
+    usage = summary.get("llm_usage")
+    if usage and usage["calls"]:
+        lines.append(
+            f"LLM: {usage['calls']}回  入力 {usage['input_tokens']:,} "
+            f"(キャッシュ {usage['cached_token_ratio']:.0%}) / "
+            f"出力 {usage['output_tokens']:,} トークン  推定コスト ${usage['cost']:.4f}",
+        )
+    for failure in summary["failures"]:
+        lines.append(f"  ✗ {failure['job_id']}: {failure['error']}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    """CLIエントリポイント
+
+    Returns:
+        終了コード（失敗・タイムアウトが1件でもあれば1）
+
+    """
+    parser = argparse.ArgumentParser(
+        description="マニフェストに列挙した分析ジョブをStreamlitなしで一括実行します",
+    )
+    parser.add_argument("manifest", help="ジョブのマニフェスト（.csv / .jsonl）")
+    parser.add_argument(
+        "--output-root",
+        default=os.environ.get("BATCH_OUTPUT_ROOT", "output/batch"),
+        help="ジョブ出力と結果ファイルのルート（既定: output/batch）",
+    )
+    parser.add_argument(
+        "--concurrency",
+        type=int,
+        default=int(os.environ.get("BATCH_CONCURRENCY", "2")),
+        help="同時実行ジョブ数（既定: 2）",
+    )
+    parser.add_argument(
+        "--job-timeout",
+        type=float,
+        default=float(os.environ.get("BATCH_JOB_TIMEOUT_SECONDS", "3600")),
+        help="1ジョブの最大秒数（既定: 3600）",
+    )
+    parser.add_argument(
+        "--data-root",
+        action="append",
+        default=[],
+        help="データファイルの置き場として許可するフォルダ（複数指定可、"
+        "既定: マニフェストのあるフォルダ）",
+    )
+    parser.add_argument(
+        "--rerun",
+        action="store_true",
+        help="前回完了済みのジョブも再実行する",
+    )
+    parser.add_argument(
+        "--refresh-plan",
+        action="store_true",
+        help="計画キャッシュを使わずに計画を再生成する（結果でキャッシュを更新）",
+    )
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s %(levelname)s %(message)s",
+    )
+
+    manifest_path = Path(args.manifest)
+    for folder in args.data_root or [str(manifest_path.resolve().parent)]:
+        allow_data_folder(folder)
+
+    jobs = load_manifest(manifest_path)
+    runner = BatchRunner(
+        args.output_root,
+        concurrency=args.concurrency,
+        job_timeout=args.job_timeout,
+        refresh_plan=args.refresh_plan,
+    )
+    summary = runner.run(jobs, rerun=args.rerun)
+    print(format_summary(summary))
+    print(f"結果: {runner.output_root / RESULTS_FILE}")
+
+    return 1 if summary["failed"] or summary["timeout"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
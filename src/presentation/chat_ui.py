@@ -12,6 +12,10 @@ from src.presentation.session_state_manager import SessionStateManager
 from src.presentation.workflow_orchestrator import StreamlitWorkflowOrchestrator
 
 
+# 実行中ジョブの進捗・途中経過のレポートを確認する間隔（秒）
+PROGRESS_POLL_INTERVAL_SECONDS = 0.5
+
+
 @st.cache_resource
 def get_orchestrator() -> StreamlitWorkflowOrchestrator:
     """オーケストレータの永続化
@@ -242,6 +246,12 @@ def main() -> None:
         disabled=st.session_state.job_running,
         key="user_input",
     )
+    refresh_plan = st.checkbox(
+        "計画を再生成する",
+        value=False,
+        disabled=st.session_state.job_running,
+        help="同じ構造のデータへの同じ要求でも、保存済みの計画を使わずに作り直します",
+    )
 
     # Streamlitテスト環境での互換性確保
     columns = st.columns([1, 1, 4])
@@ -268,7 +278,13 @@ def main() -> None:
         )
 
     with col3:
-        if st.session_state.job_running:
+        if st.session_state.job_running and orchestrator.is_following_job(session_id):
+            st.info("⏳ 同じデータ・同じ要求の実行中の分析に相乗りしています")
+            if st.button("🔀 単独で実行", help="相乗りをやめて、この画面だけで分析をやり直します"):
+                detach_result = orchestrator.detach_job_async(session_id)
+                if detach_result != "STARTED":
+                    st.warning(f"⚠️ {detach_result}")
+        elif st.session_state.job_running:
             st.info("⏳ 分析実行中...")
             st.caption("⚠️ Pythonスレッドの制限により、完全なキャンセルはできません")
 
@@ -293,6 +309,7 @@ def main() -> None:
             session_id,
             selected_file_path,
             is_temporary_file=is_temp_file,
+            refresh_plan=refresh_plan,
         )
         print(f"[DEBUG UI] process_user_message_async結果: {result}")
 
@@ -338,12 +355,21 @@ def main() -> None:
                 else:
                     st.info("⏳ 分析実行中...")
 
-                # 即座に再実行（sleepなし）
+                # 完了したタスクから順に書き足されるレポートを表示
+                partial_report = orchestrator.get_partial_report(session_id)
+                if partial_report:
+                    from src.presentation.components.result_viewer import render_partial_report
+                    render_partial_report(partial_report)
+
+                # 間隔を空けて再実行（再描画の連続によるちらつき・CPU使用を抑える）
+                import time
+                time.sleep(PROGRESS_POLL_INTERVAL_SECONDS)
                 st.rerun()
 
             elif status["status"] == "completed":
                 # 完了
                 st.session_state.job_running = False
+                st.session_state.pop("partial_report", None)
                 st.session_state.analysis_result = status
                 st.session_state.assistant_messages.append("分析が完了しました")
                 st.success("✅ 分析完了！")
@@ -355,6 +381,7 @@ def main() -> None:
                 from src.presentation.components.error_handler import handle_error
 
                 st.session_state.job_running = False
+                st.session_state.pop("partial_report", None)
                 error_msg = status.get("error", "不明なエラー")
                 st.session_state.assistant_messages.append(f"エラー: {error_msg}")
 
@@ -403,6 +430,44 @@ def main() -> None:
         if st.button("🔄 セッションリセット", disabled=st.session_state.job_running):
             reset_session()
 
+        render_resumable_jobs(orchestrator, session_id)
+
+
+def render_resumable_jobs(
+    orchestrator: StreamlitWorkflowOrchestrator,
+    session_id: str,
+) -> None:
+    """中断されたジョブの再開UIを表示
+
+    設計判断:
+    - プロセス再起動後もチェックポイントから一覧を復元
+    - 再開は最後に完了したタスクの次から（計画の再生成なし）
+    """
+    resumable_jobs = orchestrator.list_resumable_jobs(limit=5)
+    if not resumable_jobs:
+        return
+
+    st.markdown("---")
+    st.subheader("♻️ 中断されたジョブ")
+    for job in resumable_jobs:
+        completed = job.get("completed_tasks", 0)
+        total = job.get("task_count") or "?"
+        request = str(job.get("message", ""))[:40]
+        st.caption(f"{request} ({completed}/{total} タスク完了)")
+        if st.button(
+            "▶️ 続きから再開",
+            key=f"resume_{job['job_dir']}",
+            disabled=st.session_state.job_running,
+        ):
+            result = orchestrator.resume_job_async(job["job_dir"], session_id)
+            if result == "STARTED":
+                st.session_state.job_running = True
+                st.session_state.analysis_result = None
+                st.session_state.user_messages.append(f"(再開) {request}")
+                st.rerun()
+            else:
+                st.error(f"❌ {result}")
+
 
 if __name__ == "__main__":
     main()
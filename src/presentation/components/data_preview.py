@@ -19,6 +19,7 @@ from typing import Optional
 import pandas as pd
 import streamlit as st
 
+from src.infrastructure.services.dataset_profile import get_dataset_profile_service
 from src.presentation.file_utils import safe_preview_file
 
 
@@ -105,8 +106,8 @@ def _render_preview_data(preview_result: dict, file_path: str) -> None:
         height=400,  # 固定高さで見やすく
     )
     
-    # データ統計情報
-    _render_data_statistics(dataframe)
+    # データ統計情報（ファイル全体のプロファイル）
+    _render_data_statistics(dataframe, file_path)
     
     # 制限事項の表示
     st.caption("📝 最大1000行まで表示されます。完全なデータは分析時に使用されます。")
@@ -146,61 +147,110 @@ def _render_file_info(preview_result: dict, file_path: str) -> None:
             st.metric("🔤 エンコーディング", encoding)
 
 
-def _render_data_statistics(dataframe: Optional[pd.DataFrame]) -> None:
+def _render_data_statistics(
+    dataframe: Optional[pd.DataFrame],
+    file_path: Optional[str] = None,
+) -> None:
     """
     データ統計情報を表示
     
-    TDD Green: 最小限の実装
-    
     Args:
-        dataframe: pandas DataFrame
+        dataframe: プレビュー用のpandas DataFrame（プロファイルを作成できない場合に使用）
+        file_path: データファイルのパス
         
     設計判断:
     - 基本統計のみ表示（詳細は分析結果で）
     - 視覚的に分かりやすい表示
+    - ファイル全体のプロファイルを表示し、分析ジョブでも同じプロファイルを再利用
+      （アップロード毎のプロファイル作成は1回のみ）
     """
     if dataframe is None or dataframe.empty:
         return
     
+    profile = _load_profile(file_path)
+    
     st.markdown("**📈 データ概要**")
     
     col1, col2, col3, col4 = st.columns(4)
     
+    if profile is not None:
+        column_profiles = profile["column_profiles"]
+        row_count = profile["rows"]
+        column_count = len(column_profiles)
+        numeric_count = len(profile["numeric_columns"])
+        missing_count = profile["missing_values"]
+    else:
+        row_count = len(dataframe)
+        column_count = len(dataframe.columns)
+        numeric_count = len(dataframe.select_dtypes(include=["number"]).columns)
+        missing_count = dataframe.isnull().sum().sum()
+    
     with col1:
-        st.metric("行数", f"{len(dataframe):,}")
+        st.metric("行数", f"{row_count:,}")
     
     with col2:
-        st.metric("列数", f"{len(dataframe.columns):,}")
+        st.metric("列数", f"{column_count:,}")
     
     with col3:
         # 数値列の数
-        numeric_cols = dataframe.select_dtypes(include=["number"]).columns
-        st.metric("数値列", f"{len(numeric_cols)}")
+        st.metric("数値列", f"{numeric_count}")
     
     with col4:
         # 欠損値の数
-        missing_count = dataframe.isnull().sum().sum()
         st.metric("欠損値", f"{missing_count:,}")
     
     # 列情報の表示（展開可能）
     with st.expander("📋 列情報"):
-        column_info = []
-        for col in dataframe.columns:
-            dtype = str(dataframe[col].dtype)
-            non_null = dataframe[col].count()
-            null_count = len(dataframe) - non_null
-            
-            column_info.append({
-                "列名": col,
-                "データ型": dtype,
-                "非NULL数": non_null,
-                "NULL数": null_count,
-            })
+        if profile is not None:
+            column_info = [
+                {
+                    "列名": column["name"],
+                    "データ型": column["dtype"],
+                    "非NULL数": column["non_null"],
+                    "NULL数": column["nulls"],
+                    "ユニーク数": column["unique"],
+                    "メモリ(KB)": round(column["memory_bytes"] / 1024, 1),
+                }
+                for column in column_profiles
+            ]
+        else:
+            column_info = []
+            for col in dataframe.columns:
+                dtype = str(dataframe[col].dtype)
+                non_null = dataframe[col].count()
+                null_count = len(dataframe) - non_null
+                
+                column_info.append({
+                    "列名": col,
+                    "データ型": dtype,
+                    "非NULL数": non_null,
+                    "NULL数": null_count,
+                })
         
         info_df = pd.DataFrame(column_info)
         st.dataframe(info_df, width="stretch")
 
 
+def _load_profile(file_path: Optional[str]) -> Optional[dict]:
+    """
+    データセットのプロファイルを取得（作成できない場合はNone）
+    
+    Args:
+        file_path: データファイルのパス
+        
+    Returns:
+        DatasetProfileServiceのプロファイル
+    """
+    if not file_path:
+        return None
+    try:
+        with st.spinner("データ全体の統計量を集計中..."):
+            return get_dataset_profile_service().get_profile(file_path)
+    except Exception:
+        # プレビュー範囲の統計量で代替表示
+        return None
+
+
 def _get_display_filename(file_path: str) -> str:
     """
     表示用ファイル名を取得
@@ -8,12 +8,19 @@
 - テスト容易性: 純粋な表示関数
 """
 
+import re
 from pathlib import Path
 from typing import Any
 
 import streamlit as st
 
 
+_META_REFRESH = re.compile(
+    r"<meta\s+http-equiv=\"refresh\"[^>]*>\s*",
+    re.IGNORECASE,
+)
+
+
 def render_result(result: dict[str, Any]) -> None:
     """分析結果を表示する
 
@@ -71,6 +78,15 @@ def _render_completion_message(result: dict[str, Any]) -> None:
     message = result.get("message", "分析が完了しました")
     st.success(f"✅ {message}")
 
+    usage = result.get("llm_usage")
+    if usage and usage.get("calls"):
+        st.caption(
+            f"LLM呼び出し {usage['calls']}回 / "
+            f"入力 {usage['input_tokens']:,} / 出力 {usage['output_tokens']:,} トークン "
+            f"(キャッシュ {usage.get('cached_token_ratio', 0.0):.0%}) / "
+            f"推定コスト ${usage['cost']:.4f}",
+        )
+
 
 def _render_images(output_path: Path) -> None:
     """生成された画像を表示"""
@@ -85,6 +101,38 @@ def _render_images(output_path: Path) -> None:
         st.image(str(image_file), caption=image_file.name, width="stretch")
 
 
+def render_partial_report(html_path: str) -> None:
+    """実行中ジョブの途中経過のレポートを表示
+
+    ポーリング毎の再描画で数MBのファイル（画像を埋め込み済み）を読み直さないよう、
+    更新時刻が変わった場合のみ読み込み、同じ内容のiframeを渡す（再構築されない）。
+
+    Args:
+        html_path: 途中経過のレポート（report.html）のパス
+
+    """
+    html_file = Path(html_path)
+    try:
+        mtime_ns = html_file.stat().st_mtime_ns
+        cached = st.session_state.get("partial_report")
+        if (
+            cached is None
+            or cached["path"] != html_path
+            or cached["mtime_ns"] != mtime_ns
+        ):
+            html_content = html_file.read_text(encoding="utf-8")
+            # iframe内ではStreamlitのポーリングで更新するため、自動再読み込みを除く
+            html_content = _META_REFRESH.sub("", html_content)
+            cached = {"path": html_path, "mtime_ns": mtime_ns, "html": html_content}
+            st.session_state.partial_report = cached
+    except OSError:
+        # 最終レポートへの置き換え・ジョブの後片付けと重なった場合は次のポーリングで表示
+        return
+
+    with st.expander("📄 レポート（生成中）", expanded=True):
+        st.components.v1.html(cached["html"], height=600, scrolling=True)
+
+
 def _render_html_report(output_path: Path) -> None:
     """HTMLレポートを表示"""
     html_file = output_path / "report.html"
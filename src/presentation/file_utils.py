@@ -24,6 +24,21 @@ ALLOWED_DATA_FOLDERS = [
 ]
 
 
+def allow_data_folder(folder: str | Path) -> str:
+    """許可データフォルダを追加する
+
+    バッチ実行など、運用者が明示したデータ置き場を許可範囲に含める用途。
+
+    Returns:
+        追加（または既に登録済み）のフォルダの正規化済みパス
+
+    """
+    resolved = str(resolve_with_project_root(str(folder)))
+    if resolved not in ALLOWED_DATA_FOLDERS:
+        ALLOWED_DATA_FOLDERS.append(resolved)
+    return resolved
+
+
 def resolve_with_project_root(path_str: str) -> Path:
     """プロジェクトルート基準でパスを解決する"""
 
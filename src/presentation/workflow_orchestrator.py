@@ -4,21 +4,115 @@
 """
 
 import base64
+import concurrent.futures
+import os
 import queue
 import threading
 import time
+from collections import deque
+from collections.abc import Iterator
 from datetime import datetime
 from pathlib import Path
 from typing import Any
 
 import matplotlib.pyplot as plt
-import pandas as pd
 import seaborn as sns
 
+from src.application.use_cases.generate_report import GenerateReportUseCase
+from src.application.use_cases.generate_review import GenerateReviewUseCase
+from src.application.use_cases.synthesize_code import DatasetSchema
 from src.domain.entities.data_thread import DataThread
+from src.domain.entities.llm_response import LLMResponse
+from src.domain.entities.plan import Plan
 from src.domain.entities.plan import Task as PlanTask
+from src.domain.entities.review import Review
 from src.infrastructure.di_container import DIContainer
 from src.infrastructure.renderers.html_renderer import HTMLRenderer
+from src.infrastructure.renderers.progressive_report import ProgressiveReportWriter
+from src.infrastructure.services.llm_usage_tracker import llm_usage_scope
+from src.infrastructure.services.plan_cache import SchemaFingerprint
+
+
+# エラーフォールバックログの保持上限（古いものから破棄）
+ERROR_FALLBACK_LOG_LIMIT = 200
+# TTL切れセッションの掃除間隔（秒）
+SESSION_SWEEP_INTERVAL_SECONDS = 60.0
+# 計画をストリーミング生成し、完成したタスクから順に着手する
+PLAN_STREAMING_ENABLED = os.environ.get("PLAN_STREAMING", "true").lower() == "true"
+# 各タスクの実行結果を次のタスクと並行してレビューし、未達成のタスクのみ再実行する
+REVIEW_ENABLED = os.environ.get("REVIEW_ENABLED", "true").lower() == "true"
+# レビューで未達成と判定されたタスクの再実行回数の上限（0で再実行しない）
+REVIEW_MAX_RETRIES = int(os.environ.get("REVIEW_MAX_RETRIES", "1"))
+# レポート生成前にレビューの完了を待つ最大秒数（超過したレビューは反映しない）
+REVIEW_TIMEOUT_SECONDS = float(os.environ.get("REVIEW_TIMEOUT_SECONDS", "180"))
+# レポートの仮説セクションの完了を待つ最大秒数（超過したセクションは実行結果から簡易作成）
+REPORT_SECTION_TIMEOUT_SECONDS = float(
+    os.environ.get("REPORT_SECTION_TIMEOUT_SECONDS", "180"),
+)
+# 計画の作成後すぐにレポートの骨組みを書き出し、タスクの完了毎に途中経過を書き足す
+REPORT_PROGRESSIVE_ENABLED = (
+    os.environ.get("REPORT_PROGRESSIVE", "true").lower() == "true"
+)
+
+
+class _PlanStream:
+    """ストリーミング生成中の計画から、完成したタスクを順に受け渡す
+
+    計画の生成はイベントループ上で進み、ジョブスレッドはtasks()で
+    届いたタスクから順にコード生成・実行する。
+    """
+
+    def __init__(self, fallback_task: PlanTask) -> None:
+        self._queue: queue.Queue[tuple[str, Any]] = queue.Queue()
+        self._fallback_task = fallback_task
+        self._received = 0
+        self._total: int | None = None
+        self.plan: Plan | None = None
+        # 計画の生成に使ったLLMの応答（フォールバックの判定用）
+        self.responses: list[LLMResponse] = []
+
+    @property
+    def finished(self) -> bool:
+        """計画の生成が完了したか（未着手のタスクが残っていてもTrue）"""
+        return self._total is not None
+
+    @property
+    def task_count(self) -> int:
+        """確定したタスク数（生成中は受信済みの数）"""
+        return self._total if self._total is not None else self._received
+
+    def put_task(self, task: PlanTask) -> None:
+        self._received += 1
+        self._queue.put(("task", task))
+
+    def finish(self, plan: Plan) -> None:
+        self._total = max(1, len(getattr(plan, "tasks", []) or []))
+        self._queue.put(("plan", plan))
+
+    def fail(self, error: BaseException) -> None:
+        self._queue.put(("error", error))
+
+    def tasks(self) -> Iterator[PlanTask]:
+        """タスクを計画内の順に返す（計画が完成するまでブロック）"""
+        yielded = 0
+        while True:
+            kind, value = self._queue.get()
+            if kind == "task":
+                yielded += 1
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                plan_tasks = list(getattr(value, "tasks", []) or [])
+                if not plan_tasks:
+                    plan_tasks = [self._fallback_task]
+                self.plan = (
+                    value.model_copy(update={"tasks": plan_tasks})
+                    if isinstance(value, Plan)
+                    else Plan(purpose="", archivement="", tasks=plan_tasks)
+                )
+                yield from plan_tasks[yielded:]
+                return
 
 
 class StreamlitWorkflowOrchestrator:
@@ -47,11 +141,39 @@ class StreamlitWorkflowOrchestrator:
         # セッション毎の状態管理
         self.session_jobs: dict[str, threading.Thread] = {}
         self.session_queues: dict[str, queue.Queue[dict[str, Any]]] = {}
-        self.session_results: dict[str, dict[str, Any] | None] = {}
+        # 完了結果はTTL・メモリ上限付きストアで保持（超過分はディスクへ退避）
+        self.session_results = di_container.get_session_result_store()
         self.session_thread_counters: dict[str, int] = {}  # スレッドID管理
-
-        # TDD Green: エラーフォールバック通知用ログ
-        self.error_fallback_log: list[dict[str, Any]] = []  # スレッドID管理
+        # 実行中ジョブの途中経過のレポートの出力先（セッションID → ジョブディレクトリ）
+        self.partial_report_dirs: dict[str, str] = {}
+        self._last_session_sweep = time.monotonic()
+
+        # ジョブ再開用チェックポイント（計画・完了タスクを永続化）
+        self.job_checkpoint_store = di_container.get_job_checkpoint_store()
+        self._active_job_dirs: set[str] = set()
+
+        # 成果物（画像）のコンテンツアドレス型ストア（非同期書き込み）
+        self.artifact_store = di_container.get_artifact_store()
+
+        # LLM呼び出しは共有イベントループへ集約（接続プール・同時実行数を共有）
+        self.llm_loop = di_container.get_async_loop_runner()
+        # LLM呼び出し毎のトークン数・コストをジョブ毎・セッション毎に集計
+        self.usage_tracker = di_container.get_llm_usage_tracker()
+        # 同じ構造のデータセットへの同じ趣旨の要求は計画を再利用
+        self.plan_cache = di_container.get_plan_cache()
+        # 同時に開始された同一ジョブ（同じデータ・要求・設定）は1本の実行に相乗り
+        self.job_flights = di_container.get_job_flight_registry()
+        # プロンプトテンプレートは起動時にコンパイル（タスク毎の読み込み・コンパイルを無くす）
+        self.template_registry = di_container.get_template_registry()
+        # データセットのプロファイルはファイルの指紋毎に1回だけ作成し、全ての段階で共有
+        self.dataset_profiles = di_container.get_dataset_profile_service()
+        # data_info はプロファイルからトークン上限内の要約として作成
+        self.dataset_summarizer = di_container.get_dataset_summarizer()
+
+        # TDD Green: エラーフォールバック通知用ログ（上限付き）
+        self.error_fallback_log: deque[dict[str, Any]] = deque(
+            maxlen=ERROR_FALLBACK_LOG_LIMIT,
+        )
 
     def process_user_message_async(
         self,
@@ -60,28 +182,163 @@ class StreamlitWorkflowOrchestrator:
         file_path: str | None = None,
         *,
         is_temporary_file: bool = False,
+        refresh_plan: bool = False,
+        independent: bool = False,
     ) -> str:
         """セッション分離対応の非同期処理
 
+        同じデータ内容・同じ趣旨の要求・同じ設定のジョブが実行中の場合は、
+        新たに実行せずにその結果を受け取る（independent=Trueで単独実行）。
+
         Args:
             message: ユーザーメッセージ
             session_id: セッションID
             file_path: アップロードされたファイルのパス（オプション）
+            refresh_plan: Trueの場合は計画キャッシュを使わずに再生成する
+            independent: Trueの場合は実行中の同一ジョブに相乗りしない
 
         Returns:
             "STARTED" または エラーメッセージ
 
         """
         print(f"[DEBUG] process_user_message_async呼び出し: session_id={session_id}")
+        self._evict_expired_sessions()
+
+        flight_key = None
+        if self.job_flights is not None and not independent:
+            flight_key = self.job_flights.make_key(
+                file_path,
+                message,
+                {"refresh_plan": refresh_plan},
+            )
+
+        return self._start_job(
+            session_id,
+            (message, session_id, file_path, is_temporary_file, None, refresh_plan),
+            flight_key=flight_key,
+        )
+
+    def detach_job_async(self, session_id: str) -> str:
+        """相乗りしている同一ジョブから離脱し、単独のジョブとして実行し直す
+
+        Returns:
+            "STARTED" または エラーメッセージ
+
+        """
+        job_args = self.job_flights.detach(session_id) if self.job_flights else None
+        if job_args is None:
+            return "ERROR: 相乗りしているジョブがありません"
+
+        print(f"[DEBUG] 相乗りから離脱して単独実行: {session_id}")
+        self.session_jobs.pop(session_id, None)
+        return self._start_job(session_id, job_args)
+
+    def is_following_job(self, session_id: str) -> bool:
+        """他のセッションが実行中の同一ジョブに相乗りしているか"""
+        return (
+            self.job_flights is not None
+            and self.job_flights.flight_of(session_id) is not None
+        )
+
+    def resume_job_async(self, job_dir: str, session_id: str) -> str:
+        """中断されたジョブを最後に完了したタスクの次から再開
+
+        計画と完了済みタスクはチェックポイントから復元するため、
+        LLM呼び出しとコード実行は未完了タスクの分だけ行われる。
+
+        Args:
+            job_dir: 再開対象のジョブディレクトリ（list_resumable_jobsの値）
+            session_id: 再開後の進捗を受け取るセッションID
+
+        Returns:
+            "STARTED" または エラーメッセージ
+
+        """
+        if not self.job_checkpoint_store.is_job_dir(job_dir):
+            return f"ERROR: 再開できるジョブではありません: {job_dir}"
+        if str(Path(job_dir).resolve()) in self._active_job_dirs:
+            return "ERROR: このジョブは現在実行中です"
+
+        checkpoint = self.job_checkpoint_store.load(job_dir)
+        if checkpoint is None or checkpoint.plan is None:
+            return f"ERROR: チェックポイントが見つかりません: {job_dir}"
+
+        manifest = checkpoint.manifest
+        print(
+            "[DEBUG] ジョブ再開: %s (完了タスク: %s)"
+            % (job_dir, checkpoint.completed_tasks),
+        )
+        return self._start_job(
+            session_id,
+            (
+                manifest.get("message", ""),
+                session_id,
+                manifest.get("file_path"),
+                bool(manifest.get("is_temporary_file", False)),
+                job_dir,
+            ),
+        )
+
+    def list_resumable_jobs(self, limit: int = 20) -> list[dict[str, Any]]:
+        """再開可能な（未完了のまま停止した）ジョブを取得
+
+        Returns:
+            job_dir, message, completed_tasks, task_count 等を含む辞書のリスト
+
+        """
+        return [
+            job
+            for job in self.job_checkpoint_store.find_resumable_jobs(limit=limit)
+            if str(Path(job["job_dir"]).resolve()) not in self._active_job_dirs
+        ]
+
+    def _start_job(
+        self,
+        session_id: str,
+        job_args: tuple[Any, ...],
+        *,
+        flight_key: str | None = None,
+    ) -> str:
+        """セッション毎の状態を初期化してバックグラウンドジョブを開始
 
+        flight_keyが同じジョブが実行中なら、そのジョブに相乗りする。
+        """
         # セッション毎のジョブ状態チェック
         current_job = self.session_jobs.get(session_id)
         if current_job and current_job.is_alive():
             print(f"[DEBUG] 既存ジョブ実行中: {session_id}")
             return "ERROR: このセッションで他の分析が実行中です"
 
+        job_thread = threading.Thread(
+            target=self._run_analysis_job,
+            args=job_args,
+            kwargs={"flight_key": flight_key},
+            name=f"analysis_job_{session_id}",
+            daemon=True,
+        )
+
         # セッション専用キューを初期化（古いメッセージをクリア）
-        self.session_queues[session_id] = queue.Queue()
+        # 相乗りする場合はリーダーのキューから配られるメッセージを受け取る
+        session_queue: queue.Queue[dict[str, Any]] = queue.Queue()
+        if flight_key is not None and self.job_flights is not None:
+            flight, follower_queue = self.job_flights.join_or_lead(
+                flight_key,
+                session_id,
+                job_thread,
+                job_args,
+            )
+            if follower_queue is not None:
+                print(
+                    f"[DEBUG] 実行中の同一ジョブに相乗り: {session_id} → "
+                    f"{flight.leader_session}",
+                )
+                self.session_queues[session_id] = follower_queue
+                self.session_results[session_id] = None
+                # 状態確認（実行中判定）はリーダーのスレッドで行う
+                self.session_jobs[session_id] = flight.thread
+                return "STARTED"
+            session_queue = flight.queue
+        self.session_queues[session_id] = session_queue
         print(f"[DEBUG] セッションキュー作成: {session_id}")
 
         # セッション結果をクリア
@@ -93,12 +350,6 @@ class StreamlitWorkflowOrchestrator:
         self.session_thread_counters[session_id] += 1
 
         # バックグラウンドスレッドで実行
-        job_thread = threading.Thread(
-            target=self._run_analysis_job,
-            args=(message, session_id, file_path, is_temporary_file),
-            name=f"analysis_job_{session_id}",
-            daemon=True,
-        )
         job_thread.start()
         print(f"[DEBUG] ワークフロースレッド開始: {session_id}")
 
@@ -113,6 +364,10 @@ class StreamlitWorkflowOrchestrator:
         session_id: str,
         file_path: str | None = None,
         is_temporary_file: bool = False,
+        resume_dir: str | None = None,
+        refresh_plan: bool = False,
+        *,
+        flight_key: str | None = None,
     ) -> None:
         """セッション分離されたバックグラウンド分析実行
 
@@ -120,6 +375,9 @@ class StreamlitWorkflowOrchestrator:
             message: ユーザーメッセージ
             session_id: セッションID
             file_path: アップロードされたファイルのパス（オプション）
+            resume_dir: 再開するジョブディレクトリ（チェックポイントから復元）
+            refresh_plan: 計画キャッシュを使わずに再生成する（結果でキャッシュを更新）
+            flight_key: 相乗りのキー（このジョブがリーダーの場合、結果をフォロワーへ配る）
 
         """
         # セッション専用キューの存在確認（cleanup_session対策）
@@ -132,11 +390,33 @@ class StreamlitWorkflowOrchestrator:
         thread_id = self.session_thread_counters.get(session_id, 1)
         process_id = f"{session_id}_{thread_id}"
 
+        # ジョブディレクトリ（チェックポイントと成果物の保存先）
+        checkpoint = (
+            self.job_checkpoint_store.load(resume_dir) if resume_dir else None
+        )
+        output_dir = resume_dir or self._build_output_dir(session_id)
+        job_key = str(Path(output_dir).resolve())
+        self._active_job_dirs.add(job_key)
+        job_result: dict[str, Any] | None = None
+        progress_report: ProgressiveReportWriter | None = None
+
         try:
+            self.job_checkpoint_store.start_job(
+                output_dir,
+                session_id=session_id,
+                message=message,
+                file_path=file_path,
+                is_temporary_file=is_temporary_file,
+            )
+
+            # 定型タスクのコード合成に使うスキーマと計画キャッシュの指紋
+            # （データを読めた場合のみ）
+            dataset_schema = None
+            schema_fingerprint = None
+
             # TDD Green: file_pathに基づくdata_infoの適切な設定
             if file_path:
                 # ファイルパスの再検証（セキュリティ）
-                from pathlib import Path
                 from src.presentation.file_utils import validate_file_path
                 import tempfile
 
@@ -178,6 +458,7 @@ class StreamlitWorkflowOrchestrator:
                     }
                     session_queue.put(error_result)
                     self.session_results[session_id] = error_result
+                    job_result = error_result
                     return
 
                 session_queue.put(
@@ -190,36 +471,34 @@ class StreamlitWorkflowOrchestrator:
                 )
 
                 # ファイル情報をdata_infoに含める
-                display_name = Path(file_path).name
                 if is_temporary_file:
-                    data_info = f"アップロードされたファイル: {display_name}"
+                    # 一時ファイル名はアップロード毎に変わるため含めない
+                    # （同じデータならプロンプトの先頭側が同じバイト列になるように）
+                    data_info = f"アップロードされたファイル: {path_obj.suffix or '.csv'}形式"
                 else:
                     data_info = f"指定ファイル: {file_path}"
                 
                 # ファイル内容の詳細情報をdata_infoに追加（デバッグ用）
+                # プロファイルはファイルの指紋毎に1回だけ作成（プレビュー時の結果を再利用）
                 try:
-                    suffix = path_obj.suffix.lower()
-                    if suffix in {".csv", ""}:
-                        df_check = pd.read_csv(file_path)
-                    elif suffix in {".xlsx", ".xls"}:
-                        df_check = pd.read_excel(file_path)
-                    elif suffix == ".json":
-                        df_check = pd.read_json(file_path)
-                    elif suffix == ".parquet":
-                        df_check = pd.read_parquet(file_path)
-                    else:
-                        df_check = pd.read_csv(file_path)
-
-                    columns_preview = list(df_check.columns[:5])
-                    if len(df_check.columns) > 5:
-                        columns_preview.append("...")
-
-                    data_info += (
-                        f" (Shape: {df_check.shape}, Columns: {columns_preview})"
+                    dataset_profile = self.dataset_profiles.get_profile(file_path)
+                    dataset_schema = DatasetSchema.from_profile(dataset_profile)
+                    schema_fingerprint = SchemaFingerprint.from_profile(dataset_profile)
+                    column_names = [
+                        column["name"]
+                        for column in dataset_profile["column_profiles"]
+                    ]
+                    shape = (dataset_profile["rows"], len(column_names))
+
+                    # 列の種類・統計量・代表値をトークン上限内に要約して渡す
+                    # （横長のデータでもプロンプトが肥大化しないように段階的に詳細を落とす）
+                    data_info += "\n" + self.dataset_summarizer.summarize(
+                        dataset_profile,
+                        focus=message,
                     )
                     print(
                         "[DEBUG] ファイル内容確認: Shape=%s, Columns=%s"
-                        % (df_check.shape, df_check.columns.tolist()),
+                        % (shape, column_names),
                     )
                 except Exception as e:
                     print(f"[DEBUG] ファイル内容確認失敗: {e}")
@@ -255,41 +534,105 @@ class StreamlitWorkflowOrchestrator:
                 },
             )
 
-            print(f"[DEBUG] セッション {session_id}: 計画生成開始")
-            plan_use_case = self.di_container.get_generate_plan_use_case()
-            plan_result = plan_use_case.execute(
-                data_info=data_info,
-                user_request=message,
-                model="gpt-4o-mini",
-            )
-            print(f"[DEBUG] セッション {session_id}: 計画生成完了")
-
-            plan_tasks = list(getattr(plan_result, "tasks", []) or [])
-            if not plan_tasks:
-                plan_tasks = [
-                    PlanTask(
-                        hypothesis=message,
-                        purpose="ユーザー要求に直接対応する分析タスク",
-                        description="元のユーザー要求をそのまま実行します。",
-                        chart_type="auto",
-                    ),
-                ]
+            plan_stream: _PlanStream | None = None
+            cached_plan = None
+            if not (checkpoint and checkpoint.plan is not None):
+                cached_plan = self._lookup_cached_plan(
+                    schema_fingerprint,
+                    message,
+                    session_id,
+                    refresh=refresh_plan,
+                )
 
-            task_count = len(plan_tasks)
-            total_steps = step_offset + task_count + 2
+            if checkpoint and checkpoint.plan is not None:
+                plan_result = checkpoint.plan
+                data_info = checkpoint.manifest.get("data_info") or data_info
+                print(f"[DEBUG] セッション {session_id}: 計画をチェックポイントから復元")
+            elif cached_plan is not None:
+                plan_result = cached_plan
+                print(f"[DEBUG] セッション {session_id}: 計画をキャッシュから再利用")
+                self.job_checkpoint_store.save_plan(output_dir, plan_result, data_info)
+            elif PLAN_STREAMING_ENABLED:
+                print(f"[DEBUG] セッション {session_id}: 計画のストリーミング生成開始")
+                plan_result = None
+                plan_stream = self._start_plan_stream(
+                    data_info,
+                    message,
+                    session_id,
+                    output_dir,
+                )
+            else:
+                print(f"[DEBUG] セッション {session_id}: 計画生成開始")
+                plan_use_case = self.di_container.get_generate_plan_use_case()
+                plan_responses: list[LLMResponse] = []
+                with llm_usage_scope(
+                    session_id=session_id,
+                    job_dir=output_dir,
+                    stage="plan",
+                ):
+                    plan_result = self.llm_loop.run(
+                        plan_use_case.aexecute(
+                            data_info=data_info,
+                            user_request=message,
+                            model="gpt-4o-mini",
+                            on_response=plan_responses.append,
+                        ),
+                    )
+                print(f"[DEBUG] セッション {session_id}: 計画生成完了")
+                if hasattr(plan_result, "model_dump"):
+                    self.job_checkpoint_store.save_plan(
+                        output_dir,
+                        plan_result,
+                        data_info,
+                    )
+                    self._store_cached_plan(
+                        schema_fingerprint,
+                        message,
+                        plan_result,
+                        plan_responses,
+                    )
 
-            session_queue.put(
-                {
-                    "status": "progress",
-                    "message": f"計画生成が完了しました (タスク数: {task_count})",
-                    "step": current_step,
-                    "total": total_steps,
-                },
-            )
+            if plan_stream is None:
+                plan_tasks = list(getattr(plan_result, "tasks", []) or [])
+                if not plan_tasks:
+                    plan_tasks = [self._fallback_task(message)]
+
+                task_count = len(plan_tasks)
+                total_steps = step_offset + task_count + 2
+                task_source: Iterator[PlanTask] = iter(plan_tasks)
+
+                session_queue.put(
+                    {
+                        "status": "progress",
+                        "message": f"計画生成が完了しました (タスク数: {task_count})",
+                        "step": current_step,
+                        "total": total_steps,
+                    },
+                )
+            else:
+                # 計画の完成を待たず、完成したタスクから順に着手する
+                task_count = 0
+                task_source = plan_stream.tasks()
 
             code_use_case = self.di_container.get_generate_code_use_case()
+            synthesize_use_case = self.di_container.get_synthesize_code_use_case()
             execute_use_case = self.di_container.get_execute_code_use_case()
-            output_dir = self._build_output_dir(session_id)
+            review_use_case = (
+                self.di_container.get_generate_review_use_case()
+                if REVIEW_ENABLED
+                else None
+            )
+            # (タスク番号, タスク文, レビューのFuture)。レビューは次のタスクと並行して進む
+            pending_reviews: list[
+                tuple[int, str, concurrent.futures.Future[Review]]
+            ] = []
+            report_use_case = self.di_container.get_generate_report_use_case_with_renderer(
+                "html",
+            )
+            # タスク番号 → 仮説セクションのFuture（map-reduce方式のみ）。
+            # セクションはタスクの確定（レビューが無効なら実行直後、有効ならレビュー通過時）
+            # から次のタスクと並行して書く
+            report_sections: dict[int, concurrent.futures.Future[str]] = {}
 
             plot_enhancement_code = '''
 # グラフ表示機能の再定義とDataFrame補助ユーティリティ
@@ -375,16 +718,76 @@ def show_plot():
 plt.show = show_plot
 '''
 
-            task_results: list[DataThread] = []
-            all_saved_images: list[str] = []
-            encountered_error = False
+            # 計画が保存される前に中断したジョブは、再生成した計画と
+            # 整合しないため完了済みタスクを引き継がない
+            task_results: list[DataThread] = (
+                list(checkpoint.task_results[:task_count])
+                if checkpoint and checkpoint.plan is not None
+                else []
+            )
+            all_saved_images: list[str] = [
+                image
+                for restored in task_results
+                for image in restored.pathes.get("images", [])
+            ]
+            encountered_error = any(
+                self._has_execution_error(restored) for restored in task_results
+            )
+            for restored in task_results:
+                # 画像書き込み前に停止していた場合に備え、不足分を再投入する
+                self._save_execution_artifacts(restored, output_dir)
+
+            if REPORT_PROGRESSIVE_ENABLED:
+                # 最終レポートを待たずに、計画の骨組みと完了したタスクから見せる
+                progress_report = ProgressiveReportWriter(output_dir)
+                progress_report.start(
+                    message,
+                    plan_tasks if plan_stream is None else None,
+                )
+                if task_results and not self.artifact_store.flush(output_dir):
+                    print("[DEBUG] 画像書き込みの完了待ちがタイムアウトしました")
+                for index, restored in enumerate(task_results, start=1):
+                    progress_report.complete_task(
+                        index,
+                        restored,
+                        code=self._task_code_body(
+                            restored.code,
+                            file_path,
+                            plot_enhancement_code,
+                        ),
+                    )
+                self.partial_report_dirs[session_id] = output_dir
 
-            for index, task in enumerate(plan_tasks, start=1):
+            for index, task in enumerate(task_source, start=1):
                 current_step += 1
+                count_label = str(task_count)
+                if plan_stream is not None:
+                    task_count = plan_stream.task_count
+                    total_steps = step_offset + task_count + 2
+                    # 計画の生成中はタスク数が確定していない
+                    count_label = (
+                        str(task_count) if plan_stream.finished else f"{task_count}+"
+                    )
+                    if progress_report is not None:
+                        progress_report.add_task(index, task)
+                if index <= len(task_results):
+                    session_queue.put(
+                        {
+                            "status": "progress",
+                            "message": (
+                                f"タスク{index}/{count_label} は"
+                                "チェックポイントから復元しました"
+                            ),
+                            "step": current_step,
+                            "total": total_steps,
+                        },
+                    )
+                    continue
+
                 session_queue.put(
                     {
                         "status": "progress",
-                        "message": f"タスク{index}/{task_count} を実行中...",
+                        "message": f"タスク{index}/{count_label} を実行中...",
                         "step": current_step,
                         "total": total_steps,
                     },
@@ -399,47 +802,42 @@ plt.show = show_plot
                     task_parts.append(f"想定可視化: {task.chart_type}")
                 task_prompt = "\n\n".join(part for part in task_parts if part)
 
-                print(
-                    f"[DEBUG] セッション {session_id}: タスク{index}のコード生成開始",
-                )
-                code_result = code_use_case.execute(
-                    data_info=data_info,
-                    user_request=task_prompt,
-                    previous_thread=task_results[-1] if task_results else None,
-                    model="gpt-4o-mini",
-                )
-                print(
-                    f"[DEBUG] セッション {session_id}: タスク{index}のコード生成完了",
-                )
-
-                enhanced_code = code_result.code or ""
-                if file_path:
-                    data_loading_code = f"""
-# データファイルを読み込み
-import pandas as pd
-import numpy as np
-from pathlib import Path
-
-file_path = r"{file_path}"
-try:
-    path_obj = Path(file_path)
-    if path_obj.suffix.lower() == '.csv':
-        df = pd.read_csv(file_path)
-    elif path_obj.suffix.lower() in ['.xlsx', '.xls']:
-        df = pd.read_excel(file_path)
-    elif path_obj.suffix.lower() == '.json':
-        df = pd.read_json(file_path)
-    else:
-        df = pd.read_csv(file_path)
-
-    print(f"データ読み込み完了: {{df.shape}}")
-except Exception as e:
-    print(f"データ読み込みエラー: {{e}}")
-    df = pd.DataFrame()
-"""
-                    enhanced_code = data_loading_code + "\n" + enhanced_code
+                # 定型の可視化タスクはテンプレートから合成し、それ以外のみLLMで生成
+                code_result = synthesize_use_case.execute(task, dataset_schema)
+                if code_result is not None:
+                    print(
+                        f"[DEBUG] セッション {session_id}: タスク{index}は定型のため"
+                        f"ルールベースでコード生成 ({task.chart_type})",
+                    )
+                else:
+                    print(
+                        f"[DEBUG] セッション {session_id}: タスク{index}のコード生成開始",
+                    )
+                    with llm_usage_scope(
+                        session_id=session_id,
+                        job_dir=output_dir,
+                        stage="code",
+                        task=index,
+                    ):
+                        code_result = self.llm_loop.run(
+                            code_use_case.aexecute(
+                                data_info=data_info,
+                                user_request=task_prompt,
+                                previous_thread=(
+                                    task_results[-1] if task_results else None
+                                ),
+                                model="gpt-4o-mini",
+                            ),
+                        )
+                    print(
+                        f"[DEBUG] セッション {session_id}: タスク{index}のコード生成完了",
+                    )
 
-                enhanced_code = plot_enhancement_code + "\n" + enhanced_code
+                enhanced_code = self._build_task_code(
+                    code_result.code or "",
+                    file_path,
+                    plot_enhancement_code,
+                )
 
                 task_process_id = f"{process_id}_task_{index}"
                 print(
@@ -470,18 +868,216 @@ except Exception as e:
                     output_dir,
                 )
                 all_saved_images.extend(saved_images)
+                self.job_checkpoint_store.save_task(output_dir, index, execution_result)
+                if progress_report is not None:
+                    # グラフはdata URIで埋め込むため、書き込みの完了を待つ
+                    self.artifact_store.flush(output_dir)
+                    progress_report.complete_task(
+                        index,
+                        execution_result,
+                        code=self._task_code_body(
+                            execution_result.code,
+                            file_path,
+                            plot_enhancement_code,
+                        ),
+                    )
 
-                if execution_result.error or (
-                    execution_result.stderr
-                    and "Error" in execution_result.stderr
-                ):
+                if self._has_execution_error(execution_result):
                     encountered_error = True
 
+                if review_use_case is None and report_use_case.map_reduce:
+                    report_sections[index] = self._submit_report_section(
+                        report_use_case,
+                        data_info,
+                        message,
+                        execution_result,
+                        session_id,
+                        output_dir,
+                        index,
+                        progress_report,
+                    )
+
+                if review_use_case is not None:
+                    pending_reviews.append(
+                        (
+                            index,
+                            task_prompt,
+                            self._submit_review(
+                                review_use_case,
+                                data_info,
+                                task_prompt,
+                                execution_result,
+                                session_id,
+                                output_dir,
+                                index,
+                            ),
+                        ),
+                    )
+
+                if review_use_case is not None and report_use_case.map_reduce:
+                    # レビューを通過したタスクは、残りのタスクの実行と並行してセクションを書き始める
+                    for reviewed_index, _, review_future in pending_reviews:
+                        if (
+                            reviewed_index in report_sections
+                            or not review_future.done()
+                        ):
+                            continue
+                        if review_future.cancelled() or review_future.exception():
+                            continue
+                        review = review_future.result()
+                        if not review.is_completed:
+                            continue
+                        reviewed = task_results[reviewed_index - 1]
+                        reviewed.observation = review.observation
+                        reviewed.is_completed = review.is_completed
+                        report_sections[reviewed_index] = self._submit_report_section(
+                            report_use_case,
+                            data_info,
+                            message,
+                            reviewed,
+                            session_id,
+                            output_dir,
+                            reviewed_index,
+                            progress_report,
+                        )
+
+            if plan_stream is not None:
+                plan_result = plan_stream.plan
+                task_count = plan_stream.task_count
+                print(f"[DEBUG] セッション {session_id}: 計画のストリーミング生成完了")
+                self.job_checkpoint_store.save_plan(output_dir, plan_result, data_info)
+                self._store_cached_plan(
+                    schema_fingerprint,
+                    message,
+                    plan_result,
+                    plan_stream.responses,
+                )
+
+            # レビュー結果を反映し、未達成と判定されたタスクのみ再実行する
+            for index, task_prompt, review_future in pending_reviews:
+                try:
+                    review = review_future.result(timeout=REVIEW_TIMEOUT_SECONDS)
+                except Exception as e:  # noqa: BLE001 - レビューは品質向上のみ
+                    review_future.cancel()
+                    print(f"[DEBUG] セッション {session_id}: タスク{index}のレビュー失敗: {e}")
+                    continue
+
+                reviewed = task_results[index - 1]
+                try:
+                    for attempt in range(1, REVIEW_MAX_RETRIES + 1):
+                        reviewed.observation = review.observation
+                        reviewed.is_completed = review.is_completed
+                        if review.is_completed:
+                            break
+
+                        print(
+                            f"[DEBUG] セッション {session_id}: タスク{index}はレビューで"
+                            f"未達成と判定されたため再実行 ({attempt}/{REVIEW_MAX_RETRIES})",
+                        )
+                        session_queue.put(
+                            {
+                                "status": "progress",
+                                "message": f"タスク{index} をレビュー結果に基づき再実行中...",
+                                "step": current_step,
+                                "total": total_steps,
+                            },
+                        )
+                        with llm_usage_scope(
+                            session_id=session_id,
+                            job_dir=output_dir,
+                            stage="code",
+                            task=index,
+                        ):
+                            retry_program = self.llm_loop.run(
+                                code_use_case.aexecute(
+                                    data_info=data_info,
+                                    user_request=task_prompt,
+                                    previous_thread=reviewed,
+                                    model="gpt-4o-mini",
+                                ),
+                            )
+                        retried = execute_use_case.execute(
+                            process_id=f"{process_id}_task_{index}_retry{attempt}",
+                            thread_id=thread_id,
+                            code=self._build_task_code(
+                                retry_program.code or "",
+                                file_path,
+                                plot_enhancement_code,
+                            ),
+                            user_request=task_prompt,
+                        )
+                        if self._has_execution_error(retried) and not (
+                            self._has_execution_error(reviewed)
+                        ):
+                            print(
+                                f"[DEBUG] セッション {session_id}: タスク{index}の再実行が"
+                                "エラーのため元の結果を維持",
+                            )
+                            break
+
+                        replaced_images = set(reviewed.pathes.get("images", []))
+                        all_saved_images = [
+                            image
+                            for image in all_saved_images
+                            if image not in replaced_images
+                        ]
+                        all_saved_images.extend(
+                            self._save_execution_artifacts(retried, output_dir),
+                        )
+                        task_results[index - 1] = reviewed = retried
+                        review = self._submit_review(
+                            review_use_case,
+                            data_info,
+                            task_prompt,
+                            retried,
+                            session_id,
+                            output_dir,
+                            index,
+                        ).result(timeout=REVIEW_TIMEOUT_SECONDS)
+                    else:
+                        reviewed.observation = review.observation
+                        reviewed.is_completed = review.is_completed
+                except Exception as e:  # noqa: BLE001 - 再実行できなくても元の結果で続行
+                    print(f"[DEBUG] セッション {session_id}: タスク{index}の再実行失敗: {e}")
+
+                self.job_checkpoint_store.save_task(output_dir, index, reviewed)
+                if progress_report is not None:
+                    self.artifact_store.flush(output_dir)
+                    progress_report.complete_task(
+                        index,
+                        reviewed,
+                        code=self._task_code_body(
+                            reviewed.code,
+                            file_path,
+                            plot_enhancement_code,
+                        ),
+                    )
+                if report_use_case.map_reduce and index not in report_sections:
+                    report_sections[index] = self._submit_report_section(
+                        report_use_case,
+                        data_info,
+                        message,
+                        reviewed,
+                        session_id,
+                        output_dir,
+                        index,
+                        progress_report,
+                    )
+
+            if pending_reviews:
+                encountered_error = any(
+                    self._has_execution_error(result) for result in task_results
+                )
+
             print(
                 "[DEBUG] セッション %s: タスク総数=%s, 画像生成数=%s"
                 % (session_id, task_count, len(all_saved_images)),
             )
 
+            # レポートは保存済み画像を参照するため、書き込み完了を待つ
+            if not self.artifact_store.flush(output_dir):
+                print("[DEBUG] 画像書き込みの完了待ちがタイムアウトしました")
+
             built_in_summary = None
             if encountered_error and file_path:
                 print(
@@ -505,6 +1101,8 @@ except Exception as e:
             )
 
             if built_in_summary:
+                if progress_report is not None:
+                    progress_report.close()
                 report_content = self._build_builtin_report(
                     built_in_summary,
                     output_dir,
@@ -514,26 +1112,96 @@ except Exception as e:
                     "content": report_content,
                     "output_dir": output_dir,
                 }
+                for section_future in report_sections.values():
+                    section_future.cancel()
                 print(f"[DEBUG] セッション {session_id}: ビルトインレポートを生成")
-            else:
-                report_use_case = (
-                    self.di_container.get_generate_report_use_case_with_renderer(
-                        "html",
+            elif report_use_case.map_reduce:
+                sections = []
+                for index, execution_result in enumerate(task_results, start=1):
+                    # 復元したタスク・レビューに失敗したタスクのセクションはここで投入する
+                    if index not in report_sections:
+                        report_sections[index] = self._submit_report_section(
+                            report_use_case,
+                            data_info,
+                            message,
+                            execution_result,
+                            session_id,
+                            output_dir,
+                            index,
+                            progress_report,
+                        )
+                for index, execution_result in enumerate(task_results, start=1):
+                    section_future = report_sections[index]
+                    try:
+                        sections.append(
+                            section_future.result(timeout=REPORT_SECTION_TIMEOUT_SECONDS),
+                        )
+                    except Exception as e:  # noqa: BLE001 - タスクをレポートから欠落させない
+                        section_future.cancel()
+                        print(
+                            f"[DEBUG] セッション {session_id}: タスク{index}の"
+                            f"セクション生成失敗: {e}",
+                        )
+                        sections.append(
+                            report_use_case.fallback_section(execution_result, index),
+                        )
+                # 以降は最終レポートが report.html を置き換える
+                if progress_report is not None:
+                    progress_report.close()
+                with llm_usage_scope(
+                    session_id=session_id,
+                    job_dir=output_dir,
+                    stage="report",
+                ):
+                    report_result = self.llm_loop.run(
+                        report_use_case.acompose(
+                            data_info=data_info,
+                            user_request=message,
+                            process_data_threads=task_results,
+                            sections=sections,
+                            model="gpt-4o-mini",
+                            output_dir=output_dir,
+                        ),
                     )
+                print(
+                    f"[DEBUG] セッション {session_id}: レポート生成完了"
+                    f" (セクション{len(sections)}件)",
                 )
-                report_result = report_use_case.execute(
-                    data_info=data_info,
-                    user_request=message,
-                    process_data_threads=task_results,
-                    model="gpt-4o-mini",
-                    output_dir=output_dir,
-                )
+            else:
+                if progress_report is not None:
+                    progress_report.close()
+                with llm_usage_scope(
+                    session_id=session_id,
+                    job_dir=output_dir,
+                    stage="report",
+                ):
+                    report_result = report_use_case.execute(
+                        data_info=data_info,
+                        user_request=message,
+                        process_data_threads=task_results,
+                        model="gpt-4o-mini",
+                        output_dir=output_dir,
+                    )
                 print(f"[DEBUG] セッション {session_id}: レポート生成完了")
 
             # 最終結果をセッション状態に保存
             print(f"[DEBUG] セッション {session_id}: 最終結果を作成中")
 
             final_execution = task_results[-1] if task_results else None
+            llm_usage = self.usage_tracker.job_summary(output_dir)
+            self.job_checkpoint_store.save_llm_usage(output_dir, llm_usage)
+            print(
+                "[DEBUG] セッション %s: LLM使用量 calls=%s, tokens=%s/%s, "
+                "cached=%.0f%%, cost=$%.4f"
+                % (
+                    session_id,
+                    llm_usage["calls"],
+                    llm_usage["input_tokens"],
+                    llm_usage["output_tokens"],
+                    llm_usage["cached_token_ratio"] * 100,
+                    llm_usage["cost"],
+                ),
+            )
 
             final_result = {
                 "status": "completed",
@@ -546,6 +1214,7 @@ except Exception as e:
                     "report": report_result,
                 },
                 "output_dir": output_dir,  # UIで使用するために追加
+                "llm_usage": llm_usage,
             }
 
             # 完了メッセージを複数回キューに入れる（UIが確実に取得できるように）
@@ -553,6 +1222,8 @@ except Exception as e:
                 session_queue.put(final_result)
 
             self.session_results[session_id] = final_result
+            job_result = final_result
+            self.job_checkpoint_store.mark_completed(output_dir)
             print(
                 "[DEBUG] セッション %s: ワークフロー完了！ output_dir=%s"
                 % (session_id, output_dir),
@@ -565,6 +1236,14 @@ except Exception as e:
 
             traceback.print_exc()
             error_result = {"status": "error", "error": str(e)}
+            job_result = error_result
+            if progress_report is not None:
+                # 生成中の表示と自動再読み込みが残らないよう、失敗した旨の版で終える
+                progress_report.abort(f"失敗: {e}")
+            try:
+                self.job_checkpoint_store.mark_failed(output_dir, str(e))
+            except OSError as checkpoint_error:
+                print(f"[DEBUG] チェックポイント更新失敗: {checkpoint_error}")
 
             # TDD Green: 既にキャプチャしたキューオブジェクトを使用
             try:
@@ -575,7 +1254,7 @@ except Exception as e:
             except Exception:
                 # キューオブジェクトも使用不可能な場合のフォールバック
                 if not hasattr(self, "error_fallback_log"):
-                    self.error_fallback_log = []
+                    self.error_fallback_log = deque(maxlen=ERROR_FALLBACK_LOG_LIMIT)
                 self.error_fallback_log.append(
                     {
                         "session_id": session_id,
@@ -585,24 +1264,269 @@ except Exception as e:
                 )
 
         finally:
+            if progress_report is not None:
+                progress_report.close()
+            self.partial_report_dirs.pop(session_id, None)
+            self._active_job_dirs.discard(job_key)
+            self.artifact_store.release_job(output_dir)
+            self.usage_tracker.release_job(output_dir)
+            if flight_key is not None:
+                self._deliver_to_followers(flight_key, job_result)
             # ジョブ完了時にスレッド参照をクリア（遅延削除）
             # 注: すぐに削除すると、完了直後の重複チェックが機能しない
             time.sleep(0.1)  # 短い遅延を入れて、完了状態を確認可能にする
             if session_id in self.session_jobs:
                 del self.session_jobs[session_id]
 
+    def _submit_review(
+        self,
+        review_use_case: GenerateReviewUseCase,
+        data_info: str,
+        task_prompt: str,
+        execution_result: DataThread,
+        session_id: str,
+        output_dir: str,
+        index: int,
+    ) -> concurrent.futures.Future[Review]:
+        """タスクの実行結果のレビューを共有イベントループへ投入（完了を待たない）"""
+        with llm_usage_scope(
+            session_id=session_id,
+            job_dir=output_dir,
+            stage="review",
+            task=index,
+        ):
+            return self.llm_loop.submit(
+                review_use_case.aexecute(
+                    data_info=data_info,
+                    user_request=task_prompt,
+                    data_thread=execution_result,
+                    has_results=bool(execution_result.results),
+                    model="gpt-4o-mini",
+                ),
+            )
+
+    def _submit_report_section(
+        self,
+        report_use_case: GenerateReportUseCase,
+        data_info: str,
+        user_request: str,
+        execution_result: DataThread,
+        session_id: str,
+        output_dir: str,
+        index: int,
+        progress_report: ProgressiveReportWriter | None = None,
+    ) -> concurrent.futures.Future[str]:
+        """タスクの仮説セクションの生成を共有イベントループへ投入（完了を待たない）
+
+        途中経過のレポートがある場合は、生成が完了した時点でタスクの考察として書き足す。
+        """
+        with llm_usage_scope(
+            session_id=session_id,
+            job_dir=output_dir,
+            stage="report",
+            task=index,
+        ):
+            future = self.llm_loop.submit(
+                report_use_case.asection(
+                    data_info=data_info,
+                    user_request=user_request,
+                    data_thread=execution_result,
+                    index=index,
+                    model="gpt-4o-mini",
+                ),
+            )
+        if progress_report is not None:
+
+            def _append_narrative(done: concurrent.futures.Future[str]) -> None:
+                if not done.cancelled() and done.exception() is None:
+                    progress_report.set_narrative(index, done.result())
+
+            future.add_done_callback(_append_narrative)
+        return future
+
+    def _task_code_body(
+        self,
+        code: str | None,
+        file_path: str | None,
+        plot_enhancement_code: str,
+    ) -> str | None:
+        """実行したコードからグラフ表示の補助とデータ読み込みを除いた部分（表示用）"""
+        prefix = self._build_task_code("", file_path, plot_enhancement_code)
+        if code and code.startswith(prefix):
+            return code[len(prefix):]
+        return code
+
+    @staticmethod
+    def _build_task_code(
+        code: str,
+        file_path: str | None,
+        plot_enhancement_code: str,
+    ) -> str:
+        """タスクのコードにグラフ表示の補助とデータ読み込みを付加"""
+        enhanced_code = code
+        if file_path:
+            data_loading_code = f"""
+# データファイルを読み込み
+import pandas as pd
+import numpy as np
+from pathlib import Path
+
+file_path = r"{file_path}"
+try:
+    path_obj = Path(file_path)
+    if path_obj.suffix.lower() == '.csv':
+        df = pd.read_csv(file_path)
+    elif path_obj.suffix.lower() in ['.xlsx', '.xls']:
+        df = pd.read_excel(file_path)
+    elif path_obj.suffix.lower() == '.json':
+        df = pd.read_json(file_path)
+    else:
+        df = pd.read_csv(file_path)
+
+    print(f"データ読み込み完了: {{df.shape}}")
+except Exception as e:
+    print(f"データ読み込みエラー: {{e}}")
+    df = pd.DataFrame()
+"""
+            enhanced_code = data_loading_code + "\n" + enhanced_code
+
+        return plot_enhancement_code + "\n" + enhanced_code
+
+    def _deliver_to_followers(
+        self,
+        flight_key: str,
+        job_result: dict[str, Any] | None,
+    ) -> None:
+        """相乗りしたセッションへ最終結果（同じ出力フォルダの成果物）を配る"""
+        if self.job_flights is None:
+            return
+        # 完了・エラーのメッセージはリーダーのキュー経由で配布済み
+        broadcast = job_result is not None
+        if job_result is None:
+            job_result = {"status": "error", "error": "相乗りしたジョブが中断されました"}
+        for follower in self.job_flights.finish(flight_key):
+            print(f"[DEBUG] 相乗りしたセッションへ結果を配布: {follower}")
+            follower_queue = self.session_queues.get(follower)
+            if follower_queue is not None and not broadcast:
+                follower_queue.put(job_result)
+            if follower in self.session_results:
+                self.session_results[follower] = job_result
+            self.session_jobs.pop(follower, None)
+
+    @staticmethod
+    def _fallback_task(message: str) -> PlanTask:
+        """計画にタスクがない場合に、ユーザー要求をそのまま実行するタスク"""
+        return PlanTask(
+            hypothesis=message,
+            purpose="ユーザー要求に直接対応する分析タスク",
+            description="元のユーザー要求をそのまま実行します。",
+            chart_type="auto",
+        )
+
+    def _lookup_cached_plan(
+        self,
+        fingerprint: SchemaFingerprint | None,
+        message: str,
+        session_id: str,
+        *,
+        refresh: bool,
+    ) -> Plan | None:
+        """同じ構造のデータセットへの同じ趣旨の要求に対するキャッシュ済み計画を取得"""
+        if self.plan_cache is None or fingerprint is None:
+            return None
+        if refresh:
+            print(f"[DEBUG] セッション {session_id}: 計画キャッシュを使わずに再生成")
+            return None
+        try:
+            return self.plan_cache.get(fingerprint, message)
+        except Exception as e:  # noqa: BLE001 - キャッシュの障害で分析を止めない
+            print(f"[DEBUG] 計画キャッシュの参照に失敗: {e}")
+            return None
+
+    def _store_cached_plan(
+        self,
+        fingerprint: SchemaFingerprint | None,
+        message: str,
+        plan: Plan | None,
+        responses: list[LLMResponse],
+    ) -> None:
+        """LLMが生成した計画をキャッシュへ保存
+
+        計画の生成に使った応答が1件も報告されない場合や、フォールバック
+        （ブレーカー作動中・全送信先の失敗を含む）の応答があった場合は保存しない。
+        """
+        if (
+            self.plan_cache is None
+            or fingerprint is None
+            or not isinstance(plan, Plan)
+            or not plan.tasks
+            or not responses
+            or any(response.is_fallback for response in responses)
+        ):
+            return
+        try:
+            self.plan_cache.put(fingerprint, message, plan)
+        except Exception as e:  # noqa: BLE001 - キャッシュの障害で分析を止めない
+            print(f"[DEBUG] 計画キャッシュの保存に失敗: {e}")
+
+    def _start_plan_stream(
+        self,
+        data_info: str,
+        message: str,
+        session_id: str,
+        output_dir: str,
+    ) -> _PlanStream:
+        """計画のストリーミング生成をイベントループ上で開始"""
+        plan_use_case = self.di_container.get_generate_plan_use_case()
+        plan_stream = _PlanStream(self._fallback_task(message))
+
+        async def _produce() -> None:
+            try:
+                plan = await plan_use_case.astream_execute(
+                    data_info=data_info,
+                    user_request=message,
+                    on_task=plan_stream.put_task,
+                    model="gpt-4o-mini",
+                    on_response=plan_stream.responses.append,
+                )
+            except Exception as e:  # noqa: BLE001 - ジョブスレッドで再送出
+                plan_stream.fail(e)
+            else:
+                plan_stream.finish(plan)
+
+        with llm_usage_scope(session_id=session_id, job_dir=output_dir, stage="plan"):
+            self.llm_loop.submit(_produce())
+        return plan_stream
+
     def _build_output_dir(self, session_id: str) -> str:
         """セッション専用の出力ディレクトリを生成"""
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S_%f")
-        return str(Path("output") / session_id / timestamp)
+        return str(self.job_checkpoint_store.output_root / session_id / timestamp)
+
+    @staticmethod
+    def _has_execution_error(execution_result: DataThread) -> bool:
+        """実行結果にエラーが含まれるか判定"""
+        return bool(
+            execution_result.error
+            or (execution_result.stderr and "Error" in execution_result.stderr),
+        )
 
     def _save_execution_artifacts(
         self,
         execution_result: DataThread,
         output_dir: str,
     ) -> list[str]:
-        """コード実行結果のアーティファクトを永続化"""
-        decoded_artifacts: list[tuple[Path, bytes]] = []
+        """コード実行結果のアーティファクトを永続化
+
+        画像はSHA-256でコンテンツアドレス化してArtifactStoreへ投入する
+        （書き込みはバックグラウンド）。同一内容の画像は1回だけ保存され、
+        DataThread.pathes["artifacts"] に 論理名 → ハッシュ の対応を記録する。
+
+        Returns:
+            このジョブで新たに保存対象となった画像パスのリスト
+
+        """
+        decoded_artifacts: list[tuple[str, bytes]] = []
 
         for index, artifact in enumerate(execution_result.results):
             if not isinstance(artifact, dict):
@@ -651,12 +1575,11 @@ except Exception as e:
                     else:
                         continue
 
-                    filename = (
+                    logical_name = (
                         f"{execution_result.process_id}_"
                         f"{execution_result.thread_id}_{index}.png"
                     )
-                    file_path = Path(output_dir) / filename
-                    decoded_artifacts.append((file_path, binary))
+                    decoded_artifacts.append((logical_name, binary))
 
                 except (ValueError, TypeError) as e:
                     print(f"[DEBUG] 画像デコードエラー (index {index}): {e}")
@@ -683,19 +1606,19 @@ except Exception as e:
                     )
             return []
 
-        output_path = Path(output_dir)
-        output_path.mkdir(parents=True, exist_ok=True)
-
         saved_files: list[str] = []
-        for file_path, binary in decoded_artifacts:
-            try:
-                file_path.write_bytes(binary)
-                execution_result.pathes.setdefault("images", []).append(str(file_path))
-                saved_files.append(str(file_path))
-                print(f"[DEBUG] 画像保存成功: {file_path}")
-            except OSError as e:
-                print(f"[DEBUG] 画像保存失敗: {file_path}, error={e}")
-                continue
+        image_paths = execution_result.pathes.setdefault("images", [])
+        artifact_names = execution_result.pathes.setdefault("artifacts", {})
+        for logical_name, binary in decoded_artifacts:
+            artifact = self.artifact_store.put_bytes(output_dir, logical_name, binary)
+            artifact_names[logical_name] = artifact.sha256
+            if artifact.path not in image_paths:
+                image_paths.append(artifact.path)
+            if artifact.is_new:
+                saved_files.append(artifact.path)
+                print(f"[DEBUG] 画像保存キュー投入: {artifact.path}")
+            else:
+                print(f"[DEBUG] 重複画像のため保存を省略: {logical_name}")
 
         return saved_files
 
@@ -704,10 +1627,14 @@ except Exception as e:
         file_path: str,
         output_dir: str,
     ) -> dict[str, Any] | None:
-        """ユーザー提供データに対するデフォルト分析を実行"""
+        """ユーザー提供データに対するデフォルト分析を実行
+
+        ファイルの指紋毎に作成済みのデータセットプロファイル（チャンク単位で1回だけ
+        走査したもの）を使い、大きなファイルでも再読み込みせずに統計量と簡易グラフを作成する。
+        """
         output_path = Path(output_dir)
         try:
-            df = self._load_dataframe(file_path)
+            summary = self.dataset_profiles.get_profile(file_path)
         except Exception as exc:  # noqa: BLE001
             print(
                 "[DEBUG] ビルトイン分析: データ読み込みに失敗 file=%s, error=%s"
@@ -715,81 +1642,53 @@ except Exception as e:
             )
             return None
 
-        if df.empty:
+        if not summary["rows"]:
             return None
 
-        summary = {
-            "rows": len(df),
-            "columns": len(df.columns),
-            "numeric_columns": df.select_dtypes(include=["number"]).columns.tolist(),
-            "categorical_columns": df.select_dtypes(
-                exclude=["number"],
-            ).columns.tolist(),
-            "missing_values": int(df.isna().sum().sum()),
-            "file_path": file_path,
-        }
-
         try:
-            self._create_quick_charts(df, output_path)
+            self._create_quick_charts(summary, output_path)
         except Exception as exc:  # noqa: BLE001
             print(f"[DEBUG] ビルトイン分析: 可視化作成に失敗 error={exc}")
 
-        try:
-            stats = df.describe(include="all").transpose().reset_index()
-            summary["statistics"] = stats.to_dict(orient="records")
-        except Exception:
-            summary["statistics"] = []
-
         return summary
 
-    def _load_dataframe(self, file_path: str) -> pd.DataFrame:
-        """拡張子に応じてDataFrameを読み込む"""
-        path = Path(file_path)
-        suffix = path.suffix.lower()
-
-        if suffix in {".csv", ".txt", ".tsv"}:
-            sep = "\t" if suffix == ".tsv" else ","
-            return pd.read_csv(path, sep=sep)
-        if suffix in {".xlsx", ".xls"}:
-            return pd.read_excel(path)
-        if suffix == ".parquet":
-            return pd.read_parquet(path)
-        if suffix == ".json":
-            return pd.read_json(path)
-
-        # フォールバック: pandasのauto-detect
-        return pd.read_csv(path)
-
-    def _create_quick_charts(self, df: pd.DataFrame, output_path: Path) -> None:
-        """簡易的な可視化を生成"""
+    def _create_quick_charts(self, profile: dict[str, Any], output_path: Path) -> None:
+        """プロファイル（ヒストグラム・サンプル・相関行列）から簡易的な可視化を生成"""
         output_path.mkdir(parents=True, exist_ok=True)
         plt.switch_backend("Agg")
 
-        numeric_cols = df.select_dtypes(include=["number"]).columns.tolist()
+        histograms = profile.get("histograms", {})
+        numeric_cols = [col for col in profile["numeric_columns"] if col in histograms]
 
         if numeric_cols:
             target_col = numeric_cols[0]
+            counts, edges = histograms[target_col]
             plt.figure(figsize=(8, 4))
-            sns.histplot(data=df, x=target_col, kde=True)
+            plt.stairs(counts, edges, fill=True, alpha=0.7)
             plt.title(f"{target_col} の分布")
+            plt.xlabel(target_col)
+            plt.ylabel("Count")
             hist_path = output_path / "distribution.png"
             plt.tight_layout()
             plt.savefig(hist_path)
             plt.close()
 
-        if len(numeric_cols) >= 2:
-            x_col, y_col = numeric_cols[:2]
+        scatter_sample = profile.get("scatter_sample")
+        if scatter_sample is not None:
+            (x_col, y_col), rows = scatter_sample
             plt.figure(figsize=(6, 6))
-            sns.scatterplot(data=df, x=x_col, y=y_col)
+            sns.scatterplot(x=rows[:, 0], y=rows[:, 1], s=10, alpha=0.5)
             plt.title(f"{x_col} vs {y_col}")
+            plt.xlabel(x_col)
+            plt.ylabel(y_col)
             scatter_path = output_path / "scatter.png"
             plt.tight_layout()
             plt.savefig(scatter_path)
             plt.close()
 
-        if len(numeric_cols) >= 2:
+        corr = profile.get("correlation")
+        if corr is not None:
             plt.figure(figsize=(6, 4))
-            corr = df[numeric_cols].corr(numeric_only=True)
             sns.heatmap(corr, annot=True, fmt=".2f", cmap="Blues")
             heatmap_path = output_path / "correlation.png"
             plt.tight_layout()
@@ -818,20 +1717,27 @@ except Exception as e:
         if stats:
             lines.append("## 基本統計量")
             lines.append("")
-            lines.append("| 列名 | count | mean | std | min | max |")
-            lines.append("| --- | --- | --- | --- | --- | --- |")
+            lines.append(
+                "| 列名 | count | mean | std | min | 50% | max | unique |",
+            )
+            lines.append("| --- | --- | --- | --- | --- | --- | --- | --- |")
             for row in stats[:10]:
+                cells = [
+                    row.get(key)
+                    for key in ("index", "count", "mean", "std", "min", "50%", "max")
+                ]
+                cells.append(row.get("unique"))
                 lines.append(
-                    "| {name} | {count} | {mean} | {std} | {min} | {max} |".format(
-                        name=row.get("index", ""),
-                        count=row.get("count", ""),
-                        mean=row.get("mean", ""),
-                        std=row.get("std", ""),
-                        min=row.get("min", ""),
-                        max=row.get("max", ""),
-                    ),
+                    "| "
+                    + " | ".join("" if cell is None else str(cell) for cell in cells)
+                    + " |",
                 )
             lines.append("")
+            if not summary.get("exact"):
+                lines.append(
+                    "※ 分位点・ユニーク数はストリーミング集計による近似値です。",
+                )
+                lines.append("")
 
         lines.append("## 生成された可視化")
         lines.append("")
@@ -850,6 +1756,22 @@ except Exception as e:
 
         return "\n".join(lines)
 
+    def get_partial_report(self, session_id: str) -> str | None:
+        """実行中ジョブの途中経過のレポート（report.html）のパス
+
+        Args:
+            session_id: セッションID
+
+        Returns:
+            途中経過のレポートのパス（実行中のジョブが無い、または未作成の場合はNone）
+
+        """
+        output_dir = self.partial_report_dirs.get(session_id)
+        if output_dir is None:
+            return None
+        html_file = Path(output_dir) / "report.html"
+        return str(html_file) if html_file.exists() else None
+
     def get_job_status(self, session_id: str) -> dict[str, Any]:
         """セッション毎のジョブ状態をポーリング取得
 
@@ -860,6 +1782,9 @@ except Exception as e:
             ジョブ状態辞書
 
         """
+        self._evict_expired_sessions()
+        self.session_results.touch(session_id)
+
         # セッション専用キューから取得
         session_queue = self.session_queues.get(session_id)
         if not session_queue:
@@ -897,6 +1822,12 @@ except Exception as e:
             キャンセル結果辞書
 
         """
+        # 相乗りしているだけのセッションは離脱すればよい（リーダーのジョブは継続）
+        if self.job_flights is not None and self.job_flights.detach(session_id):
+            self.session_jobs.pop(session_id, None)
+            self.session_queues.pop(session_id, None)
+            return {"success": True, "message": "相乗りしていたジョブから離脱しました"}
+
         current_job = self.session_jobs.get(session_id)
         if current_job and current_job.is_alive():
             # Pythonスレッドは強制終了不可のため、協調的終了のみ
@@ -914,6 +1845,10 @@ except Exception as e:
             session_id: セッションID
 
         """
+        # 相乗りしているだけの場合は離脱する（リーダーのジョブを待たない）
+        if self.job_flights is not None and self.job_flights.detach(session_id):
+            self.session_jobs.pop(session_id, None)
+
         # 実行中ジョブがある場合は完了を待つ（タイムアウト付き）
         current_job = self.session_jobs.get(session_id)
         if current_job and current_job.is_alive():
@@ -941,6 +1876,50 @@ except Exception as e:
             del self.session_results[session_id]
         if session_id in self.session_thread_counters:
             del self.session_thread_counters[session_id]
+        self.usage_tracker.discard_session(session_id)
+
+    def _evict_expired_sessions(self) -> None:
+        """TTLを過ぎたアイドルセッションの状態を破棄
+
+        cleanup_sessionが呼ばれずに放置されたセッション（ブラウザを閉じた等）の
+        キュー・結果・カウンターを定期的に回収する。実行中ジョブは対象外。
+        """
+        now = time.monotonic()
+        if now - self._last_session_sweep < SESSION_SWEEP_INTERVAL_SECONDS:
+            return
+        self._last_session_sweep = now
+
+        for session_id in self.session_results.expired_sessions(now):
+            current_job = self.session_jobs.get(session_id)
+            if current_job and current_job.is_alive():
+                self.session_results.touch(session_id)
+                continue
+
+            print(f"[DEBUG] TTL切れセッションを破棄: {session_id}")
+            self.session_results.mark_expired(session_id)
+            self.session_queues.pop(session_id, None)
+            self.session_thread_counters.pop(session_id, None)
+            self.session_jobs.pop(session_id, None)
+            self.usage_tracker.discard_session(session_id)
+
+    def get_session_llm_usage(self, session_id: str) -> dict[str, Any]:
+        """セッション内の全ジョブのLLM使用量（トークン数・コスト・ステージ別内訳）"""
+        return self.usage_tracker.session_summary(session_id)
+
+    def get_session_memory_metrics(self) -> dict[str, Any]:
+        """セッション結果のメモリ常駐量メトリクスを取得
+
+        Returns:
+            resident_bytes（合計）と sessions（セッション毎の内訳）を含む辞書
+
+        """
+        metrics = self.session_results.get_metrics()
+        metrics["queued_messages"] = {
+            session_id: session_queue.qsize()
+            for session_id, session_queue in list(self.session_queues.items())
+        }
+        metrics["error_fallback_log_size"] = len(self.error_fallback_log)
+        return metrics
 
     def get_error_fallback_log(self) -> list[dict[str, Any]]:
         """エラーフォールバックログをUI向けに取得
@@ -949,7 +1928,7 @@ except Exception as e:
             エラーログのリスト
 
         """
-        return self.error_fallback_log.copy()
+        return list(self.error_fallback_log)
 
     def clear_error_fallback_log(self) -> None:
         """エラーフォールバックログをクリア"""
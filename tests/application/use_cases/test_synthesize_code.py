@@ -0,0 +1,136 @@
+"""SynthesizeCodeUseCase のテンプレートが実行可能なコードを生成するかのテスト
+
+列名はrepr()で埋め込むため、引用符・バックスラッシュ・波括弧・日本語を含む列名でも
+生成コードが構文エラーにならず、サンドボックスと同じ前提（df と show_plot()）で
+実行できることを確認する。
+"""
+
+import matplotlib
+
+matplotlib.use("Agg")
+
+import matplotlib.pyplot as plt
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.application.use_cases.synthesize_code import (
+    DatasetSchema,
+    SynthesizeCodeUseCase,
+)
+from src.domain.entities.plan import Task
+
+
+# 日本語の列名・カテゴリはテスト環境のフォントに無いことがある（描画の正否とは無関係）
+pytestmark = pytest.mark.filterwarnings("ignore:Glyph .* missing from font")
+
+# (地域, 売上, 数量, 日付) の列名の組み合わせ
+COLUMN_NAMES = [
+    pytest.param(("region", "sales", "qty", "date"), id="plain"),
+    pytest.param(('re"gion', "sa'les", 'q"t\'y', "da\"te"), id="quotes"),
+    pytest.param(("re\\gion", "sales\\n", "qty\\", "date\\t"), id="backslashes"),
+    pytest.param(("{region}", "sales {0}", "qty}}", "{{date"), id="braces"),
+    pytest.param(("地域", "売上", "数量", "日付"), id="non-ascii"),
+]
+
+CHART_TYPES = [
+    "ヒストグラム",
+    "箱ひげ図",
+    "散布図",
+    "ヒートマップ",
+    "棒グラフ",
+    "折れ線グラフ",
+    "円グラフ",
+]
+
+
+def _dataframe(names: tuple[str, str, str, str]) -> pd.DataFrame:
+    region, sales, qty, date = names
+    rng = np.random.default_rng(0)
+    rows = 120
+    return pd.DataFrame(
+        {
+            region: rng.choice(["東", "西", 'n"orth', "s\\outh"], size=rows),
+            sales: rng.normal(100, 20, size=rows).round(2),
+            qty: rng.integers(1, 50, size=rows),
+            date: pd.date_range("2024-01-01", periods=rows, freq="D").astype(str),
+        },
+    )
+
+
+def _run(code: str, df: pd.DataFrame) -> list[int]:
+    shown: list[int] = []
+
+    def show_plot() -> None:
+        shown.append(len(plt.get_fignums()))
+        plt.close("all")
+
+    namespace = {"df": df, "pd": pd, "np": np, "plt": plt, "show_plot": show_plot}
+    exec(compile(code, "<synthesized>", "exec"), namespace)  # noqa: S102
+    return shown
+
+
+@pytest.mark.parametrize("names", COLUMN_NAMES)
+@pytest.mark.parametrize("chart_type", CHART_TYPES)
+def test_template_compiles_and_runs(
+    names: tuple[str, str, str, str],
+    chart_type: str,
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    region, sales, qty, _ = names
+    df = _dataframe(names)
+    task = Task(
+        hypothesis=f"{region} ごとに {sales} と {qty} に差がある",
+        purpose=f"{region} 別の {sales} を比較する",
+        description=f"{sales} と {qty} を {region} で集計して可視化する",
+        chart_type=chart_type,
+    )
+
+    program = SynthesizeCodeUseCase(enabled=True).execute(
+        task,
+        DatasetSchema.from_dataframe(df),
+    )
+
+    assert program is not None
+    shown = _run(program.code, df)
+    assert shown and all(count > 0 for count in shown)
+    assert "===" in capsys.readouterr().out
+
+
+@pytest.mark.parametrize("names", COLUMN_NAMES)
+def test_group_headers_print_column_names_at_runtime(
+    names: tuple[str, str, str, str],
+    capsys: pytest.CaptureFixture[str],
+) -> None:
+    region, sales, _, _ = names
+    df = _dataframe(names)
+    task = Task(
+        hypothesis=f"{region} ごとに {sales} に差がある",
+        purpose=f"{region} 別の {sales} を比較する",
+        description=f"{sales} を {region} で比較する",
+        chart_type="箱ひげ図",
+    )
+
+    program = SynthesizeCodeUseCase(enabled=True).execute(
+        task,
+        DatasetSchema.from_dataframe(df),
+    )
+
+    assert program is not None
+    _run(program.code, df)
+    assert f"=== {sales} by {region} ===" in capsys.readouterr().out
+
+
+def test_novel_task_falls_back_to_llm() -> None:
+    df = _dataframe(("region", "sales", "qty", "date"))
+    task = Task(
+        hypothesis="sales は qty から予測できる",
+        purpose="sales の回帰モデルを作る",
+        description="qty を説明変数とした回帰",
+        chart_type="散布図",
+    )
+
+    assert SynthesizeCodeUseCase(enabled=True).execute(
+        task,
+        DatasetSchema.from_dataframe(df),
+    ) is None
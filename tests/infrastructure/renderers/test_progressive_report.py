@@ -0,0 +1,202 @@
+"""ProgressiveReportWriter のテスト（骨組み・セクションの順序・中断・置き換え後の保護）"""
+
+import os
+import stat
+from pathlib import Path
+
+import pytest
+
+from src.domain.entities.data_thread import DataThread
+from src.domain.entities.plan import Task
+from src.infrastructure.renderers.progressive_report import (
+    _MAX_STDOUT_CHARS,
+    REFRESH_SECONDS,
+    ProgressiveReportWriter,
+)
+
+
+REFRESH_META = f'<meta http-equiv="refresh" content="{REFRESH_SECONDS}">'
+
+
+def _task(hypothesis: str) -> Task:
+    return Task(
+        hypothesis=hypothesis,
+        purpose="比較",
+        description="集計",
+        chart_type="棒グラフ",
+    )
+
+
+def _thread(**kwargs: object) -> DataThread:
+    return DataThread(
+        process_id="p",
+        thread_id=1,
+        user_request="地域別の売上",
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def writer(tmp_path: Path) -> ProgressiveReportWriter:
+    return ProgressiveReportWriter(str(tmp_path))
+
+
+def _report(tmp_path: Path) -> str:
+    return (tmp_path / "report.html").read_text(encoding="utf-8")
+
+
+def test_start_writes_skeleton_with_pending_tasks(
+    writer: ProgressiveReportWriter,
+    tmp_path: Path,
+) -> None:
+    writer.start("売上を分析", [_task("地域で差がある\n詳細"), _task("季節性がある")])
+
+    report = _report(tmp_path)
+    assert "売上を分析" in report
+    assert "タスク1: 地域で差がある" in report
+    assert "詳細" not in report
+    assert report.count("実行待ち") == 2
+    assert "生成中: 0/2 タスク完了" in report
+    assert REFRESH_META in report
+    assert (tmp_path / "style.css").exists()
+
+
+def test_add_task_appends_pending_section_once(
+    writer: ProgressiveReportWriter,
+    tmp_path: Path,
+) -> None:
+    writer.start("売上を分析")
+    assert "生成中: 分析計画を作成しています" in _report(tmp_path)
+
+    writer.add_task(1, _task("地域で差がある"))
+    writer.add_task(1, _task("別の仮説"))
+
+    report = _report(tmp_path)
+    assert "タスク1: 地域で差がある" in report
+    assert "別の仮説" not in report
+    assert "生成中: 0/1 タスク完了" in report
+
+
+def test_complete_task_orders_code_output_and_graphs(
+    writer: ProgressiveReportWriter,
+    tmp_path: Path,
+) -> None:
+    writer.start("売上を分析", [_task("地域で差がある"), _task("季節性がある")])
+
+    writer.complete_task(
+        1,
+        _thread(
+            code="import pandas\nprint(df)",
+            stdout="region  sales",
+            pathes={"images": ["/elsewhere/chart_1.png"]},
+        ),
+        code="print(df)",
+    )
+
+    report = _report(tmp_path)
+    section = report[report.index('<section id="task-1">') :]
+    section = section[: section.index("</section>")]
+    positions = [section.index(marker) for marker in ("コード", "出力", "グラフ")]
+    assert positions == sorted(positions)
+    assert "print(df)" in section
+    assert "import pandas" not in section
+    assert "chart_1.png" in section
+    assert "実行待ち" not in section
+    assert "生成中: 1/2 タスク完了" in report
+
+
+def test_complete_task_shows_error_and_truncates_stdout(
+    writer: ProgressiveReportWriter,
+    tmp_path: Path,
+) -> None:
+    writer.start("売上を分析", [_task("地域で差がある")])
+    stdout = "a" * _MAX_STDOUT_CHARS + "TAIL"
+
+    writer.complete_task(1, _thread(code="x", stdout=stdout, error="KeyError: 'x'"))
+
+    report = _report(tmp_path)
+    assert "エラー" in report
+    assert "KeyError" in report
+    assert "TAIL" not in report
+    assert "…（以降省略）" in report
+
+
+def test_set_narrative_strips_images(
+    writer: ProgressiveReportWriter,
+    tmp_path: Path,
+) -> None:
+    writer.start("売上を分析", [_task("地域で差がある")])
+    writer.set_narrative(9, "存在しないタスク")
+
+    writer.set_narrative(1, "東日本が多い\n\n![chart](chart_1.png)")
+
+    report = _report(tmp_path)
+    assert "東日本が多い" in report
+    assert "chart_1.png" not in report
+    assert "存在しないタスク" not in report
+
+
+def test_close_stops_writes(
+    writer: ProgressiveReportWriter,
+    tmp_path: Path,
+) -> None:
+    writer.start("売上を分析", [_task("地域で差がある")])
+    writer.close()
+
+    writer.complete_task(1, _thread(stdout="after close"))
+
+    assert "after close" not in _report(tmp_path)
+
+
+def test_abort_writes_final_status_without_refresh(
+    writer: ProgressiveReportWriter,
+    tmp_path: Path,
+) -> None:
+    writer.start("売上を分析", [_task("地域で差がある")])
+    writer.close()
+
+    writer.abort("失敗: kernel died")
+
+    report = _report(tmp_path)
+    assert "失敗: kernel died" in report
+    assert REFRESH_META not in report
+    writer.complete_task(1, _thread(stdout="after abort"))
+    assert "after abort" not in _report(tmp_path)
+
+
+def test_abort_keeps_replaced_final_report(
+    writer: ProgressiveReportWriter,
+    tmp_path: Path,
+) -> None:
+    writer.start("売上を分析", [_task("地域で差がある")])
+    writer.close()
+    final = tmp_path / "final.html"
+    final.write_text("最終レポート", encoding="utf-8")
+    os.replace(final, tmp_path / "report.html")
+
+    writer.abort("失敗: 最終レポートの生成後")
+
+    assert _report(tmp_path) == "最終レポート"
+
+
+def test_abort_before_start_writes_nothing(
+    writer: ProgressiveReportWriter,
+    tmp_path: Path,
+) -> None:
+    writer.abort("失敗")
+
+    assert not (tmp_path / "report.html").exists()
+
+
+@pytest.mark.skipif(os.name == "nt", reason="POSIXの権限ビットのみ確認する")
+def test_report_is_written_with_regular_file_mode(
+    writer: ProgressiveReportWriter,
+    tmp_path: Path,
+) -> None:
+    umask = os.umask(0)
+    os.umask(umask)
+
+    writer.start("売上を分析")
+
+    mode = stat.S_IMODE((tmp_path / "report.html").stat().st_mode)
+    assert mode == 0o666 & ~umask
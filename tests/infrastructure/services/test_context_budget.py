@@ -0,0 +1,154 @@
+"""ContextBudget のテスト（整形・中略・優先度に応じた配分）"""
+
+import pytest
+
+from src.infrastructure.services.context_budget import (
+    PRIORITY_HIGH,
+    PRIORITY_LOW,
+    PRIORITY_REQUIRED,
+    ContextBudget,
+    ContextSection,
+    clean_text,
+    collapse_repeated_lines,
+    dedupe_tracebacks,
+    estimate_tokens,
+    truncate_middle,
+)
+
+
+TRACEBACK = """Traceback (most recent call last):
+  File "/tmp/cell.py", line 3, in <module>
+    df.groupby("region")["sales"].sum()
+  File "/venv/site-packages/pandas/core/frame.py", line 10, in __getitem__
+    return self._getitem(key)
+  File "/venv/site-packages/pandas/core/indexes/base.py", line 20, in get_loc
+    raise KeyError(key)
+  File "/venv/site-packages/pandas/core/indexes/base.py", line 30, in get_loc
+    raise KeyError(key) from err
+KeyError: 'sales'"""
+
+
+def test_estimate_tokens_counts_ascii_and_wide_characters() -> None:
+    assert estimate_tokens("") == 0
+    assert estimate_tokens("abcd" * 10) == 10
+    assert estimate_tokens("売上分析") == 4
+    assert estimate_tokens("ab売上") == 3
+
+
+def test_dedupe_tracebacks_collapses_library_frames_and_repeats() -> None:
+    text = f"before\n{TRACEBACK}\nbetween\n{TRACEBACK}\nafter"
+
+    cleaned = dedupe_tracebacks(text)
+
+    assert cleaned.count("KeyError: 'sales'") == 1
+    assert "(同じトレースバックのため省略)" in cleaned
+    assert "ライブラリ内部のフレーム 2件を省略" in cleaned
+    # 利用者のコードと最後のフレームは残す
+    assert 'File "/tmp/cell.py", line 3' in cleaned
+    assert "line 30, in get_loc" in cleaned
+    assert cleaned.startswith("before") and cleaned.endswith("after")
+    assert "between" in cleaned
+
+
+def test_collapse_repeated_lines_single_and_multi_line() -> None:
+    single = "\n".join(["start", *["warning"] * 5, "end"])
+    assert collapse_repeated_lines(single).split("\n") == [
+        "start",
+        "warning",
+        "...(上の行がさらに 4回繰り返されました)",
+        "end",
+    ]
+
+    pair = "\n".join(["UserWarning: x", "  plt.plot()"] * 3)
+    assert collapse_repeated_lines(pair).split("\n") == [
+        "UserWarning: x",
+        "  plt.plot()",
+        "...(上の2行がさらに 2回繰り返されました)",
+    ]
+
+    # 2回だけの1行の繰り返しはそのまま
+    assert collapse_repeated_lines("a\na\nb") == "a\na\nb"
+
+
+def test_clean_text_strips_ansi_escapes() -> None:
+    assert clean_text("\x1b[31mError\x1b[0m\r\n") == "Error"
+
+
+def test_truncate_middle_keeps_head_and_tail_within_budget() -> None:
+    text = "\n".join(f"line {index:04d} " + "x" * 40 for index in range(500))
+
+    truncated = truncate_middle(text, 300, head_ratio=0.3)
+
+    assert estimate_tokens(truncated) <= 300
+    assert truncated.startswith("line 0000")
+    assert truncated.endswith("line 0499 " + "x" * 40)
+    assert "...(中略:" in truncated
+    assert truncate_middle("short", 100) == "short"
+    assert truncate_middle(text, 0) == ""
+
+
+def test_truncate_middle_cuts_single_long_line() -> None:
+    truncated = truncate_middle("x" * 10_000, 100)
+
+    assert estimate_tokens(truncated) <= 100
+    assert "...(中略: 1行)..." in truncated
+
+
+def test_fit_shrinks_low_priority_sections_first() -> None:
+    budget = ContextBudget(max_tokens=1_000)
+    system = "s" * 2_000  # 500トークン
+    stderr = "\n".join(f"err {index} " + "e" * 60 for index in range(100))
+    stdout = "\n".join(f"out {index} " + "o" * 60 for index in range(100))
+
+    fitted = budget.fit(
+        [
+            ContextSection("system", system, PRIORITY_REQUIRED),
+            ContextSection("stderr", stderr, PRIORITY_HIGH, head_ratio=0.3),
+            ContextSection("stdout", stdout, PRIORITY_LOW),
+        ],
+    )
+
+    assert fitted["system"] == system
+    assert sum(estimate_tokens(text) for text in fitted.values()) <= 1_000
+    # 優先度の低いstdoutから除外され、stderrは残る
+    assert fitted["stdout"] == ""
+    assert fitted["stderr"].startswith("err 0")
+    assert fitted["stderr"].endswith("e" * 60)
+
+
+def test_fit_applies_section_limits_and_keeps_small_inputs() -> None:
+    budget = ContextBudget(max_tokens=10_000)
+    long_output = "\n".join(f"row {index}" for index in range(5_000))
+
+    fitted = budget.fit(
+        [
+            ContextSection("request", "売上を分析", PRIORITY_REQUIRED),
+            ContextSection("stdout", long_output, PRIORITY_LOW, max_tokens=200),
+        ],
+    )
+
+    assert fitted["request"] == "売上を分析"
+    assert estimate_tokens(fitted["stdout"]) <= 200
+
+
+def test_fit_keeps_required_sections_even_over_limit(
+    caplog: pytest.LogCaptureFixture,
+) -> None:
+    budget = ContextBudget(max_tokens=100)
+
+    fitted = budget.fit(
+        [
+            ContextSection("system", "s" * 1_000, PRIORITY_REQUIRED),
+            ContextSection("stdout", "o" * 1_000, PRIORITY_LOW),
+        ],
+    )
+
+    assert fitted == {"system": "s" * 1_000, "stdout": ""}
+    assert "必須の文脈だけでトークン上限を超えています" in caplog.text
+
+
+def test_share_has_a_floor() -> None:
+    budget = ContextBudget(max_tokens=1_000)
+
+    assert budget.share(0.5) == 500
+    assert budget.share(0.001) == 48
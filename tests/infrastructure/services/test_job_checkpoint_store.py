@@ -0,0 +1,144 @@
+"""JobCheckpointStore のテスト（保存・再開・完了タスク数・再開候補の列挙）"""
+
+import json
+from pathlib import Path
+
+import pytest
+
+from src.domain.entities.data_thread import DataThread
+from src.domain.entities.plan import Plan, Task
+from src.infrastructure.services.job_checkpoint_store import (
+    STATUS_COMPLETED,
+    STATUS_FAILED,
+    JobCheckpointStore,
+)
+
+
+def _plan(task_count: int) -> Plan:
+    return Plan(
+        purpose="売上の傾向",
+        archivement="地域別の差がわかる",
+        tasks=[
+            Task(
+                hypothesis=f"仮説{index}",
+                purpose="目的",
+                description="方針",
+                chart_type="棒グラフ",
+            )
+            for index in range(1, task_count + 1)
+        ],
+    )
+
+
+def _thread(index: int) -> DataThread:
+    return DataThread(
+        process_id="p",
+        thread_id=index,
+        user_request=f"タスク{index}",
+        code=f"print({index})",
+        stdout=str(index),
+        is_completed=True,
+    )
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> JobCheckpointStore:
+    return JobCheckpointStore(tmp_path)
+
+
+@pytest.fixture
+def job_dir(store: JobCheckpointStore, tmp_path: Path) -> str:
+    job_dir = str(tmp_path / "session" / "20240101_000000_000000")
+    store.start_job(job_dir, session_id="session", message="分析", file_path="d.csv")
+    return job_dir
+
+
+def _manifest(job_dir: str) -> dict:
+    return json.loads((Path(job_dir) / "job.json").read_text(encoding="utf-8"))
+
+
+def test_round_trip(store: JobCheckpointStore, job_dir: str) -> None:
+    store.save_plan(job_dir, _plan(3), "data info")
+    store.save_task(job_dir, 1, _thread(1))
+    store.save_task(job_dir, 2, _thread(2))
+
+    checkpoint = store.load(job_dir)
+
+    assert checkpoint is not None
+    assert checkpoint.plan == _plan(3)
+    assert checkpoint.manifest["data_info"] == "data info"
+    assert checkpoint.manifest["task_count"] == 3
+    assert [thread.stdout for thread in checkpoint.task_results] == ["1", "2"]
+    assert checkpoint.completed_tasks == 2
+
+
+def test_completed_tasks_counts_contiguous_files(
+    store: JobCheckpointStore,
+    job_dir: str,
+) -> None:
+    store.save_task(job_dir, 1, _thread(1))
+    store.save_task(job_dir, 3, _thread(3))
+    assert _manifest(job_dir)["completed_tasks"] == 1
+
+    store.save_task(job_dir, 2, _thread(2))
+    assert _manifest(job_dir)["completed_tasks"] == 3
+
+    # レビューでの再保存で件数が減らない
+    store.save_task(job_dir, 1, _thread(1))
+    assert _manifest(job_dir)["completed_tasks"] == 3
+
+
+def test_load_stops_at_missing_or_broken_task(
+    store: JobCheckpointStore,
+    job_dir: str,
+) -> None:
+    store.save_task(job_dir, 1, _thread(1))
+    store.save_task(job_dir, 2, _thread(2))
+    store.save_task(job_dir, 4, _thread(4))
+    (Path(job_dir) / "tasks" / "task_002.json").write_text("{", encoding="utf-8")
+
+    checkpoint = store.load(job_dir)
+
+    assert checkpoint is not None
+    assert [thread.thread_id for thread in checkpoint.task_results] == [1]
+
+
+def test_restart_counts_resumes(store: JobCheckpointStore, job_dir: str) -> None:
+    store.mark_failed(job_dir, "kernel died")
+    store.start_job(job_dir, session_id="other", message="分析", file_path="d.csv")
+
+    manifest = _manifest(job_dir)
+    assert manifest["resume_count"] == 1
+    assert manifest["session_id"] == "other"
+    assert manifest["status"] == "running"
+    assert manifest["error"] is None
+
+
+def test_find_resumable_jobs(store: JobCheckpointStore, tmp_path: Path) -> None:
+    jobs = {}
+    for name in ("planned", "unplanned", "failed", "completed"):
+        job_dir = str(tmp_path / "session" / name)
+        store.start_job(job_dir, session_id="session", message=name, file_path=None)
+        jobs[name] = job_dir
+    for name in ("planned", "failed", "completed"):
+        store.save_plan(jobs[name], _plan(1), "info")
+    store.mark_failed(jobs["failed"], "error")
+    store.mark_completed(jobs["completed"])
+
+    resumable = store.find_resumable_jobs()
+
+    assert {job["message"] for job in resumable} == {"planned", "failed"}
+    statuses = {job["message"]: job["status"] for job in resumable}
+    assert statuses["failed"] == STATUS_FAILED
+    assert _manifest(jobs["completed"])["status"] == STATUS_COMPLETED
+    assert store.find_resumable_jobs(session_id="nobody") == []
+
+
+def test_is_job_dir_rejects_paths_outside_root(
+    store: JobCheckpointStore,
+    job_dir: str,
+    tmp_path: Path,
+) -> None:
+    assert store.is_job_dir(job_dir)
+    assert not store.is_job_dir(str(tmp_path / "session"))
+    assert not store.is_job_dir(str(tmp_path.parent))
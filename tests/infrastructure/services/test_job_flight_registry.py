@@ -0,0 +1,147 @@
+"""JobFlightRegistry のテスト（相乗りキー・リーダー/フォロワー・離脱・完了）"""
+
+import queue
+import threading
+from pathlib import Path
+
+import pytest
+
+from src.infrastructure.services.job_flight_registry import (
+    BroadcastQueue,
+    JobFlightRegistry,
+)
+
+
+def _thread() -> threading.Thread:
+    return threading.Thread(target=lambda: None)
+
+
+def _drain(follower: queue.Queue) -> list:
+    items = []
+    while not follower.empty():
+        items.append(follower.get_nowait())
+    return items
+
+
+@pytest.fixture
+def registry() -> JobFlightRegistry:
+    return JobFlightRegistry()
+
+
+@pytest.fixture
+def data_file(tmp_path: Path) -> Path:
+    path = tmp_path / "data.csv"
+    path.write_text("region,sales\nr1,1\n", encoding="utf-8")
+    return path
+
+
+def test_broadcast_queue_fans_out_and_replays_last_message() -> None:
+    broadcast = BroadcastQueue()
+    broadcast.put("first")
+    broadcast.put("second")
+
+    follower = broadcast.attach("f1")
+    broadcast.put("third")
+
+    assert _drain(follower) == ["second", "third"]
+    # リーダー自身のキューにはすべて残る
+    assert _drain(broadcast) == ["first", "second", "third"]
+    assert broadcast.followers() == ["f1"]
+
+    assert broadcast.detach("f1") is True
+    assert broadcast.detach("f1") is False
+    broadcast.put("fourth")
+    assert follower.empty()
+
+
+def test_attach_before_any_message_starts_empty() -> None:
+    assert BroadcastQueue().attach("f1").empty()
+
+
+def test_make_key_depends_on_content_request_and_settings(
+    registry: JobFlightRegistry,
+    data_file: Path,
+    tmp_path: Path,
+) -> None:
+    key = registry.make_key(str(data_file), "売上を分析", {"refresh_plan": False})
+
+    # 要求文は正規化してから比べる
+    assert registry.make_key(str(data_file), "売上を分析。", {"refresh_plan": False}) == key
+    assert registry.make_key(str(data_file), "数量を分析", {"refresh_plan": False}) != key
+    assert registry.make_key(str(data_file), "売上を分析", {"refresh_plan": True}) != key
+
+    # 同じ内容の別ファイルは同じキー、内容が変わればキーも変わる
+    copy = tmp_path / "copy.csv"
+    copy.write_bytes(data_file.read_bytes())
+    assert registry.make_key(str(copy), "売上を分析", {"refresh_plan": False}) == key
+    copy.write_text("region,sales\nr1,2\n", encoding="utf-8")
+    assert registry.make_key(str(copy), "売上を分析", {"refresh_plan": False}) != key
+
+
+def test_make_key_without_readable_data(
+    registry: JobFlightRegistry,
+    tmp_path: Path,
+) -> None:
+    assert registry.make_key(str(tmp_path / "missing.csv"), "分析") is None
+    assert registry.make_key(None, "分析") == registry.make_key(None, "分析", {})
+
+
+def test_same_key_leads_once_and_followers_join(
+    registry: JobFlightRegistry,
+) -> None:
+    flight, leader_queue = registry.join_or_lead("key", "leader", _thread(), ("a",))
+    assert leader_queue is None
+    flight.queue.put("進捗")
+
+    joined, follower = registry.join_or_lead("key", "follower", _thread(), ("b",))
+
+    assert joined is flight
+    assert follower is not None
+    assert _drain(follower) == ["進捗"]
+    assert registry.flight_of("follower") is flight
+    assert registry.flight_of("leader") is None
+    metrics = registry.get_metrics()
+    assert (metrics["leaders"], metrics["followers"]) == (1, 1)
+    assert (metrics["in_flight"], metrics["waiting_followers"]) == (1, 1)
+
+
+def test_leader_does_not_follow_itself(registry: JobFlightRegistry) -> None:
+    flight, _ = registry.join_or_lead("key", "leader", _thread(), ())
+
+    again, follower = registry.join_or_lead("key", "leader", _thread(), ())
+
+    assert follower is None
+    assert again is not flight
+    assert registry.get_metrics()["leaders"] == 2
+
+
+def test_detach_returns_job_args_and_stops_delivery(
+    registry: JobFlightRegistry,
+) -> None:
+    flight, _ = registry.join_or_lead("key", "leader", _thread(), ())
+    _, follower = registry.join_or_lead("key", "follower", _thread(), ("args",))
+
+    assert registry.detach("follower") == ("args",)
+    assert registry.detach("follower") is None
+    flight.queue.put("進捗")
+
+    assert follower is not None and follower.empty()
+    assert registry.flight_of("follower") is None
+    assert registry.get_metrics()["detached"] == 1
+
+
+def test_finish_returns_followers_and_next_job_leads_anew(
+    registry: JobFlightRegistry,
+) -> None:
+    flight, _ = registry.join_or_lead("key", "leader", _thread(), ())
+    registry.join_or_lead("key", "f1", _thread(), ())
+    registry.join_or_lead("key", "f2", _thread(), ())
+
+    assert registry.finish("key") == ["f1", "f2"]
+    assert flight.finished is True
+    assert flight.queue.followers() == []
+    assert registry.finish("key") == []
+
+    _, follower = registry.join_or_lead("key", "f3", _thread(), ())
+    assert follower is None
+    assert registry.get_metrics()["waiting_followers"] == 0
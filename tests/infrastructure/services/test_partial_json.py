@@ -0,0 +1,71 @@
+"""IncrementalArrayParser のテスト（任意の位置で分割したストリームからの要素抽出）"""
+
+import json
+
+import pytest
+
+from src.infrastructure.services.partial_json import IncrementalArrayParser
+
+
+PLAN = {
+    "purpose": 'braces { and brackets [ in "strings"',
+    "archivement": "tasks",
+    "tasks": [
+        {"hypothesis": "地域別の売上", "chart_type": "棒グラフ"},
+        {"hypothesis": 'quote \\" and } inside', "tags": ["a", {"b": [1, 2]}]},
+        {"hypothesis": "nested", "tasks": [{"ignored": True}]},
+    ],
+    "notes": {"tasks": [{"ignored": True}]},
+}
+
+
+def _feed_all(parser: IncrementalArrayParser, chunks: list[str]) -> list[list]:
+    return [parser.feed(chunk) for chunk in chunks]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 2, 7, 64, 10_000])
+def test_emits_items_in_order_for_any_chunking(chunk_size: int) -> None:
+    text = json.dumps(PLAN, ensure_ascii=False)
+    chunks = [
+        text[start : start + chunk_size] for start in range(0, len(text), chunk_size)
+    ]
+    parser = IncrementalArrayParser("tasks")
+
+    items = [item for batch in _feed_all(parser, chunks) for item in batch]
+
+    assert items == PLAN["tasks"]
+    assert parser.emitted == 3
+    assert parser.result() == PLAN
+
+
+def test_emits_each_item_as_soon_as_it_closes() -> None:
+    parser = IncrementalArrayParser("tasks")
+
+    assert parser.feed('{"purpose": "p", "tasks": [{"a": 1}') == [{"a": 1}]
+    assert parser.feed(', {"b": ') == []
+    assert parser.feed('{"c": 2}}') == [{"b": {"c": 2}}]
+    assert parser.feed("]") == []
+    with pytest.raises(ValueError):
+        parser.result()
+    assert parser.feed("}") == []
+    assert parser.result() == {"purpose": "p", "tasks": [{"a": 1}, {"b": {"c": 2}}]}
+
+
+def test_ignores_other_keys_and_later_arrays() -> None:
+    parser = IncrementalArrayParser("tasks")
+    text = json.dumps(
+        {
+            "other": [{"x": 1}],
+            "tasks": [{"y": 2}],
+            "extra": {"tasks": [{"z": 3}]},
+        },
+    )
+
+    assert parser.feed(text) == [{"y": 2}]
+
+
+def test_skips_items_that_are_not_objects() -> None:
+    parser = IncrementalArrayParser("tasks")
+
+    assert parser.feed('{"tasks": [1, "two", {"three": 3}, [4]]}') == [{"three": 3}]
+    assert parser.emitted == 1
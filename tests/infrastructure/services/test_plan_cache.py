@@ -0,0 +1,163 @@
+"""PlanCache のテスト（スキーマ指紋・要求文の一致・ドリフト・TTL・件数上限）"""
+
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+from src.domain.entities.plan import Plan, Task
+from src.infrastructure.services.plan_cache import (
+    PlanCache,
+    SchemaFingerprint,
+    normalize_request,
+)
+
+
+REQUEST = "2023年のregion別の売上の傾向を詳しく分析してください"
+
+
+def _plan(label: str = "plan") -> Plan:
+    return Plan(
+        purpose=label,
+        archivement="達成条件",
+        tasks=[
+            Task(
+                hypothesis="地域で差がある",
+                purpose="比較",
+                description="region別に集計",
+                chart_type="棒グラフ",
+            ),
+        ],
+    )
+
+
+def _frame(rows: int = 100, regions: int = 4) -> pd.DataFrame:
+    return pd.DataFrame(
+        {
+            "region": [f"r{index % regions}" for index in range(rows)],
+            "売上": [float(index) for index in range(rows)],
+            "数量": list(range(rows)),
+        },
+    )
+
+
+@pytest.fixture
+def fingerprint() -> SchemaFingerprint:
+    return SchemaFingerprint.from_dataframe(_frame())
+
+
+def _cache(tmp_path: Path, **kwargs: float) -> PlanCache:
+    return PlanCache(tmp_path / "plans.sqlite3", **kwargs)
+
+
+def test_fingerprint_ignores_row_count_but_not_structure() -> None:
+    base = SchemaFingerprint.from_dataframe(_frame())
+
+    assert SchemaFingerprint.from_dataframe(_frame(rows=150)) == base
+    reordered = SchemaFingerprint.from_dataframe(_frame()[["数量", "region", "売上"]])
+    assert reordered.family == base.family
+    assert reordered.digest != base.digest
+    drifted = SchemaFingerprint.from_dataframe(_frame(regions=50))
+    assert drifted.family == base.family
+    assert drifted.digest != base.digest
+
+
+def test_normalize_request_absorbs_width_case_and_punctuation() -> None:
+    assert normalize_request("ＲＥＧＩＯＮ別の　売上、分析！") == "region別の売上分析"
+
+
+def test_exact_request_hits_after_normalization(
+    tmp_path: Path,
+    fingerprint: SchemaFingerprint,
+) -> None:
+    cache = _cache(tmp_path)
+    cache.put(fingerprint, REQUEST, _plan())
+
+    assert cache.get(fingerprint, REQUEST + "。") == _plan()
+    assert cache.get(fingerprint, "2023年のregion別の売上の傾向を詳細に分析してください") is None
+    metrics = cache.get_metrics()
+    assert (metrics["hits"], metrics["misses"], metrics["entries"]) == (1, 1, 1)
+
+
+def test_similarity_is_exact_only_by_default(
+    tmp_path: Path,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    monkeypatch.delenv("PLAN_CACHE_SIMILARITY", raising=False)
+
+    assert _cache(tmp_path).similarity == 1.0
+
+
+@pytest.mark.parametrize(
+    ("request_text", "reused"),
+    [
+        ("2023年のregion別の売上の傾向を詳細に分析してください", True),
+        ("2024年のregion別の売上の傾向を詳しく分析してください", False),
+        ("2023年のregion別の数量の傾向を詳しく分析してください", False),
+        ("2023年のarea別の売上の傾向を詳しく分析してください", False),
+    ],
+)
+def test_fuzzy_match_requires_numbers_words_and_columns_to_match(
+    tmp_path: Path,
+    fingerprint: SchemaFingerprint,
+    request_text: str,
+    reused: bool,
+) -> None:
+    cache = _cache(tmp_path, similarity=0.8)
+    cache.put(fingerprint, REQUEST, _plan())
+
+    assert (cache.get(fingerprint, request_text) is not None) is reused
+    assert cache.get_metrics()["similar_hits"] == int(reused)
+
+
+def test_schema_drift_invalidates_old_plans(
+    tmp_path: Path,
+    fingerprint: SchemaFingerprint,
+) -> None:
+    cache = _cache(tmp_path)
+    cache.put(fingerprint, REQUEST, _plan())
+    drifted = SchemaFingerprint.from_dataframe(_frame(regions=50))
+
+    assert cache.get(drifted, REQUEST) is None
+    assert cache.get(fingerprint, REQUEST) is None
+    assert cache.get_metrics()["invalidated"] == 1
+
+
+def test_expired_plans_are_dropped(
+    tmp_path: Path,
+    fingerprint: SchemaFingerprint,
+) -> None:
+    cache = _cache(tmp_path, ttl_seconds=-1)
+    cache.put(fingerprint, REQUEST, _plan())
+
+    assert cache.get(fingerprint, REQUEST) is None
+    assert cache.get_metrics()["entries"] == 0
+
+
+def test_evicts_least_recently_used_over_capacity(
+    tmp_path: Path,
+    fingerprint: SchemaFingerprint,
+) -> None:
+    cache = _cache(tmp_path, max_entries=2)
+    cache.put(fingerprint, "first", _plan("first"))
+    cache.put(fingerprint, "second", _plan("second"))
+    assert cache.get(fingerprint, "first") is not None
+    cache.put(fingerprint, "third", _plan("third"))
+
+    assert cache.get(fingerprint, "second") is None
+    assert cache.get(fingerprint, "first") == _plan("first")
+    assert cache.get(fingerprint, "third") == _plan("third")
+    assert cache.get_metrics()["evictions"] == 1
+
+
+def test_put_replaces_and_invalidate_removes(
+    tmp_path: Path,
+    fingerprint: SchemaFingerprint,
+) -> None:
+    cache = _cache(tmp_path)
+    cache.put(fingerprint, REQUEST, _plan("old"))
+    cache.put(fingerprint, REQUEST, _plan("new"))
+
+    assert cache.get(fingerprint, REQUEST) == _plan("new")
+    assert cache.invalidate(fingerprint) == 1
+    assert cache.get(fingerprint, REQUEST) is None
@@ -0,0 +1,130 @@
+"""SessionResultStore のテスト（LRU退避・再読み込み・TTL・退避ファイルの掃除）"""
+
+import os
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from src.infrastructure.services.session_store import SessionResultStore
+
+
+def _payload(marker: str) -> dict[str, str]:
+    return {"marker": marker, "body": "x" * 10_000}
+
+
+@pytest.fixture
+def store(tmp_path: Path) -> SessionResultStore:
+    return SessionResultStore(
+        max_resident_bytes=25_000,
+        ttl_seconds=60,
+        spill_dir=tmp_path / "spill",
+    )
+
+
+def test_behaves_like_dict(store: SessionResultStore) -> None:
+    store["a"] = _payload("a")
+
+    assert "a" in store
+    assert store["a"]["marker"] == "a"
+    assert store.get("missing", "default") == "default"
+    assert len(store) == 1
+
+    del store["a"]
+    assert "a" not in store
+    with pytest.raises(KeyError):
+        del store["a"]
+
+
+def test_spills_least_recently_used_and_reloads(store: SessionResultStore) -> None:
+    store["a"] = _payload("a")
+    store["b"] = _payload("b")
+    assert store["a"]["marker"] == "a"  # a を最近使ったものにする
+    store["c"] = _payload("c")
+
+    metrics = store.get_metrics()
+    assert metrics["spills"] == 1
+    assert metrics["sessions"]["b"]["spilled"] is True
+    assert metrics["resident_bytes"] <= store.max_resident_bytes
+    assert (store.spill_dir / "b.pkl").exists()
+
+    assert store["b"]["marker"] == "b"
+    assert store.get_metrics()["reloads"] == 1
+    assert not (store.spill_dir / "b.pkl").exists()
+
+
+def test_setting_same_object_does_not_resize(
+    store: SessionResultStore,
+    monkeypatch: pytest.MonkeyPatch,
+) -> None:
+    value = _payload("a")
+    store["a"] = value
+    calls: list[object] = []
+
+    def estimate(v: object) -> int:
+        calls.append(v)
+        return 1
+
+    monkeypatch.setattr(SessionResultStore, "_estimate_size", staticmethod(estimate))
+
+    store["a"] = value
+    assert calls == []
+
+    store["a"] = _payload("changed")
+    assert len(calls) == 1
+
+
+def test_discard_removes_spilled_file(store: SessionResultStore) -> None:
+    store["a"] = _payload("a")
+    store["b"] = _payload("b")
+    store["c"] = _payload("c")
+    spilled = store.spill_dir / "a.pkl"
+    assert spilled.exists()
+
+    store.discard("a")
+
+    assert "a" not in store
+    assert not spilled.exists()
+
+
+def test_expired_sessions(store: SessionResultStore) -> None:
+    store["old"] = _payload("old")
+    store["new"] = _payload("new")
+    now = store._entries["new"].last_access
+
+    store._entries["old"].last_access = now - 61
+
+    assert store.expired_sessions(now=now) == ["old"]
+    store.mark_expired("old")
+    assert "old" not in store
+    assert store.get_metrics()["expired"] == 1
+
+
+def _dead_pid() -> int:
+    process = subprocess.Popen([sys.executable, "-c", "pass"])
+    process.wait()
+    return process.pid
+
+
+@pytest.mark.skipif(os.name == "nt", reason="Windowsは更新時刻で判定する")
+def test_purges_spills_of_finished_processes_only(tmp_path: Path) -> None:
+    spill_root = tmp_path / "spill"
+    dead = spill_root / str(_dead_pid())
+    alive = spill_root / str(os.getppid())
+    own = spill_root / str(os.getpid())
+    for directory in (dead, alive, own):
+        directory.mkdir(parents=True)
+        (directory / "session.pkl").write_bytes(b"data")
+    legacy = spill_root / "legacy.pkl"
+    legacy.write_bytes(b"data")
+    unrelated = spill_root / "notes"
+    unrelated.mkdir()
+
+    SessionResultStore(spill_dir=spill_root)
+
+    assert not dead.exists()
+    assert not legacy.exists()
+    assert alive.exists()
+    assert own.exists()
+    assert unrelated.exists()
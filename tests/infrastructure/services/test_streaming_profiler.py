@@ -0,0 +1,209 @@
+"""StreamingProfiler のスケッチをpandasの厳密な集計と突き合わせるテスト
+
+チャンクに分けて取り込んだ結果が、全件を一度に集計した値と一致する（近似の
+スケッチは理論上の誤差の範囲に収まる）ことを確認する。
+"""
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from src.infrastructure.services.streaming_profiler import (
+    HyperLogLog,
+    ReservoirSample,
+    RunningMoments,
+    StreamingCorrelation,
+    StreamingHistogram,
+    StreamingProfiler,
+    TDigest,
+    TopK,
+)
+
+
+def _chunks(values: np.ndarray, size: int) -> list[np.ndarray]:
+    return [values[start : start + size] for start in range(0, len(values), size)]
+
+
+@pytest.fixture
+def skewed() -> np.ndarray:
+    return np.random.default_rng(1).lognormal(mean=3.0, sigma=1.0, size=60_000)
+
+
+def test_running_moments_merge_matches_pandas(skewed: np.ndarray) -> None:
+    moments = RunningMoments()
+    for chunk in _chunks(skewed, 7_001):
+        moments.update(chunk)
+
+    series = pd.Series(skewed)
+    assert moments.count == len(series)
+    assert moments.mean == pytest.approx(series.mean(), rel=1e-12)
+    assert moments.std == pytest.approx(series.std(), rel=1e-9)
+    assert moments.minimum == series.min()
+    assert moments.maximum == series.max()
+
+
+def test_running_moments_needs_two_values_for_variance() -> None:
+    moments = RunningMoments()
+    moments.update(np.array([5.0]))
+
+    assert moments.mean == 5.0
+    assert moments.variance is None
+
+
+@pytest.mark.parametrize("q", [0.01, 0.25, 0.5, 0.75, 0.99])
+def test_tdigest_quantile_rank_error(skewed: np.ndarray, q: float) -> None:
+    digest = TDigest()
+    for chunk in _chunks(skewed, 5_000):
+        digest.update(chunk)
+
+    estimate = digest.quantile(q)
+
+    # 値の誤差ではなく順位の誤差で評価する（裾ほど細かいセントロイドを持つ）
+    rank = (skewed <= estimate).mean()
+    tolerance = 0.002 if q in (0.01, 0.99) else 0.01
+    assert rank == pytest.approx(q, abs=tolerance)
+
+
+def test_tdigest_extremes_are_exact(skewed: np.ndarray) -> None:
+    digest = TDigest()
+    for chunk in _chunks(skewed, 5_000):
+        digest.update(chunk)
+
+    assert digest.quantile(0.0) == skewed.min()
+    assert digest.quantile(1.0) == skewed.max()
+
+
+@pytest.mark.parametrize("distinct", [50, 1_000, 40_000])
+def test_hyperloglog_within_standard_error(distinct: int) -> None:
+    rng = np.random.default_rng(2)
+    values = rng.integers(0, distinct, size=distinct * 3)
+    sketch = HyperLogLog(precision=12)
+    for chunk in _chunks(values, 9_999):
+        sketch.update(chunk)
+
+    exact = pd.Series(values).nunique()
+    # 標準誤差 1.04/√4096 ≈ 1.6% の4倍まで
+    assert sketch.estimate() == pytest.approx(exact, rel=0.065)
+
+
+def test_hyperloglog_counts_strings() -> None:
+    values = np.array([f"id-{index % 300}" for index in range(3_000)], dtype=object)
+    sketch = HyperLogLog()
+    sketch.update(values)
+
+    assert sketch.estimate() == pytest.approx(300, rel=0.05)
+
+
+def test_top_k_keeps_heavy_hitters() -> None:
+    rng = np.random.default_rng(3)
+    values = pd.Series(rng.zipf(1.6, size=50_000).astype(str))
+    capacity = 50
+    top = TopK(capacity)
+    for start in range(0, len(values), 4_000):
+        top.update(values.iloc[start : start + 4_000])
+
+    exact = values.value_counts()
+    estimated = dict(top.most_common(capacity))
+    # Misra-Gries: 出現数が n/(k+1) を超える値は必ず残り、過小評価は n/(k+1) 以内
+    bound = len(values) / (capacity + 1)
+    for value, count in exact[exact > bound].items():
+        assert value in estimated
+        assert count - bound <= estimated[value] <= count
+    assert top.most_common(1)[0][0] == exact.index[0]
+
+
+def test_streaming_histogram_matches_numpy_after_expansion() -> None:
+    rng = np.random.default_rng(4)
+    # 範囲が両側へ広がる順に取り込み、ビンの統合を起こす
+    values = np.concatenate(
+        [rng.normal(0, 1, 5_000), rng.normal(30, 5, 5_000), rng.normal(-40, 5, 5_000)],
+    )
+    histogram = StreamingHistogram(bins=40)
+    for chunk in _chunks(values, 5_000):
+        histogram.update(chunk)
+
+    assert histogram.counts.sum() == len(values)
+    expected, _ = np.histogram(values, bins=histogram.edges)
+    assert np.abs(histogram.counts - expected).sum() <= len(values) * 0.001
+
+    counts, edges = histogram.trimmed()
+    assert counts.sum() == len(values)
+    assert len(edges) == len(counts) + 1
+    assert edges[0] <= values.min() and values.max() < edges[-1]
+
+
+def test_reservoir_sample_is_bounded_subset() -> None:
+    rows = np.column_stack([np.arange(20_000, dtype=float), np.zeros(20_000)])
+    sample = ReservoirSample(size=500, seed=0)
+    for start in range(0, len(rows), 3_000):
+        sample.update(rows[start : start + 3_000])
+
+    assert sample.seen == len(rows)
+    assert sample.rows is not None and sample.rows.shape == (500, 2)
+    assert len(np.unique(sample.rows[:, 0])) == 500
+    # 一様な抽出なら後半の行も概ね半分含まれる
+    assert 0.35 < (sample.rows[:, 0] >= 10_000).mean() < 0.65
+
+
+def test_streaming_correlation_matches_pandas() -> None:
+    rng = np.random.default_rng(5)
+    x = rng.normal(size=30_000)
+    frame = pd.DataFrame(
+        {"x": x, "y": 2 * x + rng.normal(size=x.size), "z": rng.normal(size=x.size)},
+    )
+    frame.loc[frame.sample(frac=0.05, random_state=0).index, "z"] = np.nan
+    correlation = StreamingCorrelation(["x", "y", "z"])
+    for start in range(0, len(frame), 6_500):
+        correlation.update(frame.iloc[start : start + 6_500].to_numpy())
+
+    expected = frame.dropna().corr()
+    pd.testing.assert_frame_equal(correlation.correlation(), expected, atol=1e-9)
+
+
+def test_profile_chunks_matches_describe() -> None:
+    rng = np.random.default_rng(6)
+    rows = 25_000
+    frame = pd.DataFrame(
+        {
+            "amount": rng.gamma(2.0, 50.0, rows),
+            "qty": rng.integers(1, 20, rows).astype(float),
+            "region": rng.choice(["east", "west", "north"], rows, p=[0.6, 0.3, 0.1]),
+        },
+    )
+    frame.loc[::97, "qty"] = np.nan
+    profiler = StreamingProfiler(chunk_rows=4_000)
+    chunks = (frame.iloc[start : start + 4_000] for start in range(0, rows, 4_000))
+
+    profile = profiler.profile_chunks(chunks)
+
+    assert profile["rows"] == rows
+    assert profile["numeric_columns"] == ["amount", "qty"]
+    assert profile["categorical_columns"] == ["region"]
+    assert profile["missing_values"] == int(frame.isna().sum().sum())
+
+    statistics = {record["index"]: record for record in profile["statistics"]}
+    for name in ("amount", "qty"):
+        series = frame[name].dropna()
+        record = statistics[name]
+        assert record["count"] == len(series)
+        assert record["mean"] == pytest.approx(series.mean(), abs=1e-4)
+        assert record["std"] == pytest.approx(series.std(), abs=1e-4)
+        assert record["min"] == pytest.approx(series.min(), abs=1e-4)
+        assert record["max"] == pytest.approx(series.max(), abs=1e-4)
+    for q, key in ((0.25, "25%"), (0.5, "50%"), (0.75, "75%")):
+        rank = (frame["amount"] <= statistics["amount"][key]).mean()
+        assert rank == pytest.approx(q, abs=0.01)
+        # 整数値の列は同順位が多いため、分位点の値で比べる
+        assert statistics["qty"][key] == pytest.approx(frame["qty"].quantile(q), abs=1)
+    assert statistics["qty"]["unique"] == frame["qty"].nunique()
+
+    region = statistics["region"]
+    counts = frame["region"].value_counts()
+    assert region["unique"] == 3
+    assert (region["top"], region["freq"]) == (counts.index[0], counts.iloc[0])
+
+    pd.testing.assert_frame_equal(
+        profile["correlation"],
+        frame[["amount", "qty"]].dropna().corr(),
+        atol=1e-9,
+    )